@@ -70,6 +70,9 @@ def init_platform(basedir, configfile, use_logging_file=True, logging_file=None,
                   after_settings_init=None, after_logging=None, after_safe_mode=None, after_settings_valid=None,
                   after_event_manager=None, after_connectivity_checker=None,
                   after_plugin_manager=None, after_environment_detector=None):
+	from octoprint.util.profiling import startup_profiler
+	profiler = startup_profiler()
+
 	kwargs = dict()
 
 	logger, recorder = preinit_logging(debug, verbosity, uncaught_logger, uncaught_handler)
@@ -80,7 +83,8 @@ def init_platform(basedir, configfile, use_logging_file=True, logging_file=None,
 		after_preinit_logging(**kwargs)
 
 	try:
-		settings = init_settings(basedir, configfile)
+		with profiler.phase("settings"):
+			settings = init_settings(basedir, configfile)
 	except Exception as ex:
 		raise FatalStartupError("Could not initialize settings manager", cause=ex)
 	kwargs["settings"] = settings
@@ -88,14 +92,15 @@ def init_platform(basedir, configfile, use_logging_file=True, logging_file=None,
 		after_settings_init(**kwargs)
 
 	try:
-		logger = init_logging(settings,
-		                      use_logging_file=use_logging_file,
-		                      logging_file=logging_file,
-		                      default_config=logging_config,
-		                      debug=debug,
-		                      verbosity=verbosity,
-		                      uncaught_logger=uncaught_logger,
-		                      uncaught_handler=uncaught_handler)
+		with profiler.phase("logging"):
+			logger = init_logging(settings,
+			                      use_logging_file=use_logging_file,
+			                      logging_file=logging_file,
+			                      default_config=logging_config,
+			                      debug=debug,
+			                      verbosity=verbosity,
+			                      uncaught_logger=uncaught_logger,
+			                      uncaught_handler=uncaught_handler)
 	except Exception as ex:
 		raise FatalStartupError("Could not initialize logging", cause=ex)
 
@@ -136,10 +141,11 @@ def init_platform(basedir, configfile, use_logging_file=True, logging_file=None,
 		after_connectivity_checker(**kwargs)
 
 	try:
-		plugin_manager = init_pluginsystem(settings,
-		                                   safe_mode=safe_mode,
-		                                   ignore_blacklist=ignore_blacklist,
-		                                   connectivity_checker=connectivity_checker)
+		with profiler.phase("plugin_discovery"):
+			plugin_manager = init_pluginsystem(settings,
+			                                   safe_mode=safe_mode,
+			                                   ignore_blacklist=ignore_blacklist,
+			                                   connectivity_checker=connectivity_checker)
 	except Exception as ex:
 		raise FatalStartupError("Could not initialize settings manager", cause=ex)
 
@@ -148,7 +154,8 @@ def init_platform(basedir, configfile, use_logging_file=True, logging_file=None,
 		after_plugin_manager(**kwargs)
 
 	try:
-		environment_detector = init_environment_detector(plugin_manager)
+		with profiler.phase("environment_detection"):
+			environment_detector = init_environment_detector(plugin_manager)
 	except Exception as ex:
 		raise FatalStartupError("Could not initialize environment detector", cause=ex)
 
@@ -363,13 +370,18 @@ def init_pluginsystem(settings, safe_mode=False, ignore_blacklist=True, connecti
 			return True
 		plugin_validators.append(validator)
 
+	plugin_discovery_cache = None
+	if settings.getBoolean(["server", "pluginDiscoveryCache", "enabled"]):
+		plugin_discovery_cache = os.path.join(settings.getBaseFolder("data"), "plugin_discovery.json")
+
 	from octoprint.plugin import plugin_manager
 	pm = plugin_manager(init=True,
 	                    plugin_folders=plugin_folders,
 	                    plugin_entry_points=plugin_entry_points,
 	                    plugin_disabled_list=plugin_disabled_list,
 	                    plugin_blacklist=plugin_blacklist,
-	                    plugin_validators=plugin_validators)
+	                    plugin_validators=plugin_validators,
+	                    plugin_discovery_cache=plugin_discovery_cache)
 
 	settings_overlays = dict()
 	disabled_from_overlays = dict()
@@ -425,6 +437,25 @@ def init_pluginsystem(settings, safe_mode=False, ignore_blacklist=True, connecti
 	pm.on_plugin_loaded = handle_plugin_loaded
 	pm.on_plugins_loaded = handle_plugins_loaded
 	pm.on_plugin_enabled = handle_plugin_enabled
+
+	from octoprint.util.profiling import startup_profiler, hook_profiler
+	pm.on_plugin_timing = startup_profiler().record_plugin
+
+	profiler = hook_profiler()
+	profiler.enabled = settings.getBoolean(["server", "hookProfiling", "enabled"])
+	slow_threshold = settings.getFloat(["server", "hookProfiling", "slowThreshold"])
+	profiler.slow_threshold = slow_threshold / 1000.0 if slow_threshold else None
+
+	from octoprint.util.upstream_cache import upstream_cache
+	cache = upstream_cache()
+	cache.mode = settings.get(["server", "upstreamCache", "mode"])
+	cache.url = settings.get(["server", "upstreamCache", "url"])
+	cache.folder = settings.get(["server", "upstreamCache", "folder"])
+	if cache.mode == "publish" and not cache.folder:
+		cache.folder = os.path.join(settings.getBaseFolder("data"), "upstream_cache")
+	cache.max_age = settings.getInt(["server", "upstreamCache", "maxAge"]) * 60
+	cache.fallback = settings.getBoolean(["server", "upstreamCache", "fallback"])
+
 	pm.reload_plugins(startup=True, initialize_implementations=False)
 	return pm
 
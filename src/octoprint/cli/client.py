@@ -7,8 +7,6 @@ __copyright__ = "Copyright (C) 2015 The OctoPrint Project - Released under terms
 import click
 import json
 
-import octoprint_client
-
 from octoprint.cli import get_ctx_obj_option, bulk_options
 from octoprint import init_settings, FatalStartupError
 
@@ -37,6 +35,9 @@ def create_client(settings=None, apikey=None, host=None, port=None, httpuser=Non
 	if not apikey:
 		apikey = settings.get(["api", "key"])
 
+	# only pull in the client (and with it requests) when it's actually needed
+	import octoprint_client
+
 	baseurl = octoprint_client.build_base_url(https=https,
 	                                          httpuser=httpuser,
 	                                          httppass=httppass,
@@ -11,9 +11,7 @@ import logging
 from octoprint import init_settings, FatalStartupError
 from octoprint.cli import standard_options, bulk_options, get_ctx_obj_option
 
-import yaml
 import json
-import pprint
 
 def _to_settings_path(path):
 	if not isinstance(path, (list, tuple)):
@@ -207,10 +205,12 @@ def get_command(ctx, path, as_json=False, as_yaml=False, as_raw=False):
 	if as_json:
 		output = json.dumps(value)
 	elif as_yaml:
+		import yaml
 		output = yaml.safe_dump(value, default_flow_style=False, indent="    ", allow_unicode=True)
 	elif as_raw:
 		output = value
 	else:
+		import pprint
 		output = pprint.pformat(value)
 
 	click.echo(output)
@@ -232,10 +232,12 @@ def effective_command(ctx, as_json=False, as_yaml=False, as_raw=False):
 		if as_json:
 				output = json.dumps(value)
 		elif as_yaml:
+				import yaml
 				output = yaml.safe_dump(value, default_flow_style=False, indent="	", allow_unicode=True)
 		elif as_raw:
 				output = value
 		else:
+				import pprint
 				output = pprint.pformat(value)
 
 		click.echo(output)
@@ -8,8 +8,6 @@ __copyright__ = "Copyright (C) 2015 The OctoPrint Project - Released under terms
 
 import click
 
-from past.builtins import basestring
-
 class OctoPrintDevelCommands(click.MultiCommand):
 	"""
 	Custom `click.MultiCommand <http://click.pocoo.org/5/api/#click.MultiCommand>`_
@@ -23,19 +21,26 @@ class OctoPrintDevelCommands(click.MultiCommand):
 	def __init__(self, *args, **kwargs):
 		click.MultiCommand.__init__(self, *args, **kwargs)
 
-		from octoprint.util.commandline import CommandlineCaller
-		from functools import partial
+		self._command_caller = None
+
+	@property
+	def command_caller(self):
+		# created on first use, this group is instantiated on every CLI invocation
+		if self._command_caller is None:
+			from octoprint.util.commandline import CommandlineCaller
+			from functools import partial
 
-		def log_util(f):
-			def log(*lines):
-					for line in lines:
-						f(line)
-			return log
+			def log_util(f):
+				def log(*lines):
+						for line in lines:
+							f(line)
+				return log
 
-		self.command_caller = CommandlineCaller()
-		self.command_caller.on_log_call = log_util(lambda x: click.echo(">> {}".format(x)))
-		self.command_caller.on_log_stdout = log_util(click.echo)
-		self.command_caller.on_log_stderr = log_util(partial(click.echo, err=True))
+			self._command_caller = CommandlineCaller()
+			self._command_caller.on_log_call = log_util(lambda x: click.echo(">> {}".format(x)))
+			self._command_caller.on_log_stdout = log_util(click.echo)
+			self._command_caller.on_log_stderr = log_util(partial(click.echo, err=True))
+		return self._command_caller
 
 	def _get_prefix_methods(self, method_prefix):
 		for name in [x for x in dir(self) if x.startswith(method_prefix)]:
@@ -77,6 +82,7 @@ class OctoPrintDevelCommands(click.MultiCommand):
 			return None
 
 		import contextlib
+		from past.builtins import basestring
 
 		@contextlib.contextmanager
 		def custom_cookiecutter_config(config):
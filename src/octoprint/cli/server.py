@@ -12,9 +12,13 @@ import sys
 from octoprint.cli import bulk_options, standard_options, set_ctx_obj_option, get_ctx_obj_option
 
 def run_server(basedir, configfile, host, port, debug, allow_root, logging_config, verbosity, safe_mode,
-               ignore_blacklist, octoprint_daemon=None):
+               ignore_blacklist, octoprint_daemon=None, startup_profile=None):
 	"""Initializes the environment and starts up the server."""
 
+	# start timing the startup as early as possible
+	from octoprint.util.profiling import startup_profiler
+	startup_profiler(cprofile_path=startup_profile)
+
 	from octoprint import init_platform, __display_version__, FatalStartupError
 
 	def log_startup(recorder=None, safe_mode=None, **kwargs):
@@ -121,10 +125,12 @@ server_options = bulk_options([
 	click.option("--debug", is_flag=True, callback=set_ctx_obj_option,
 	             help="Enable debug mode."),
 	click.option("--ignore-blacklist", "ignore_blacklist", is_flag=True, callback=set_ctx_obj_option,
-	             help="Disable processing of the plugin blacklist.")
+	             help="Disable processing of the plugin blacklist."),
+	click.option("--startup-profile", "startup_profile", type=click.Path(), callback=set_ctx_obj_option,
+	             help="Profile the server startup with cProfile and dump the stats to the given file.")
 ])
 """Decorator to add the options shared among the server commands: ``--host``, ``--port``,
-   ``--logging``, ``--iknowwhatimdoing`` and ``--debug``."""
+   ``--logging``, ``--iknowwhatimdoing``, ``--debug``, ``--ignore-blacklist`` and ``--startup-profile``."""
 
 daemon_options = bulk_options([
 	click.option("--pid", type=click.Path(), default="/tmp/octoprint.pid", callback=set_ctx_obj_option,
@@ -181,10 +187,11 @@ def serve_command(ctx, **kwargs):
 	verbosity = get_value("verbosity")
 	safe_mode = get_value("safe_mode")
 	ignore_blacklist = get_value("ignore_blacklist")
+	startup_profile = get_value("startup_profile")
 
 	run_server(basedir, configfile, host, port, debug,
 	           allow_root, logging, verbosity, safe_mode,
-	           ignore_blacklist)
+	           ignore_blacklist, startup_profile=startup_profile)
 
 
 if sys.platform != "win32" and sys.platform != "darwin":
@@ -219,6 +226,7 @@ if sys.platform != "win32" and sys.platform != "darwin":
 		verbosity = get_value("verbosity")
 		safe_mode = get_value("safe_mode")
 		ignore_blacklist = get_value("ignore_blacklist")
+		startup_profile = get_value("startup_profile")
 
 		if pid is None:
 			click.echo("No path to a pidfile set",
@@ -228,7 +236,7 @@ if sys.platform != "win32" and sys.platform != "darwin":
 		from octoprint.daemon import Daemon
 		class OctoPrintDaemon(Daemon):
 			def __init__(self, pidfile, basedir, configfile, host, port, debug, allow_root, logging_config, verbosity,
-			             safe_mode, ignore_blacklist):
+			             safe_mode, ignore_blacklist, startup_profile):
 				Daemon.__init__(self, pidfile)
 
 				self._basedir = basedir
@@ -241,14 +249,15 @@ if sys.platform != "win32" and sys.platform != "darwin":
 				self._verbosity = verbosity
 				self._safe_mode = safe_mode
 				self._ignore_blacklist = ignore_blacklist
+				self._startup_profile = startup_profile
 
 			def run(self):
 				run_server(self._basedir, self._configfile, self._host, self._port, self._debug,
 				           self._allow_root, self._logging_config, self._verbosity, self._safe_mode,
-				           self._ignore_blacklist, octoprint_daemon=self)
+				           self._ignore_blacklist, octoprint_daemon=self, startup_profile=self._startup_profile)
 
 		octoprint_daemon = OctoPrintDaemon(pid, basedir, configfile, host, port, debug, allow_root, logging, verbosity,
-		                                   safe_mode, ignore_blacklist)
+		                                   safe_mode, ignore_blacklist, startup_profile)
 
 		if command == "start":
 			octoprint_daemon.start()
@@ -16,6 +16,7 @@ import threading
 import collections
 
 from octoprint.settings import settings
+from octoprint.util.profiling import hook_profiler
 import octoprint.plugin
 
 # singleton
@@ -161,7 +162,12 @@ class EventManager(object):
 				for listener in eventListeners:
 					self._logger.debug("Sending action to %r" % listener)
 					try:
-						listener(event, payload)
+						plugin = getattr(getattr(listener, "__self__", None), "_identifier", None)
+						if plugin is not None:
+							# listener registered by a plugin, account for its cost
+							hook_profiler().call("EventManager.listener", plugin, listener, event, payload)
+						else:
+							listener(event, payload)
 					except:
 						self._logger.exception("Got an exception while sending event %s (Payload: %r) to %s" % (event, payload, listener))
 
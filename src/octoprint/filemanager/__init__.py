@@ -18,6 +18,8 @@ from .analysis import QueueEntry, AnalysisQueue
 from .storage import LocalFileStorage
 from .util import AbstractFileWrapper, StreamWrapper, DiskFileWrapper
 
+from octoprint.util.profiling import hook_profiler
+
 from collections import namedtuple
 
 from past.builtins import basestring
@@ -165,6 +167,22 @@ def valid_file_type(filename, type=None):
 	extension = extension[1:].lower()
 	return valid_extension(extension, type=type)
 
+def get_compressed_extensions():
+	"""Extensions of compressed machine code files that are accepted and decompressed on upload, e.g. ``gcode.gz``."""
+	extensions = get_extensions("machinecode")
+	if not extensions:
+		return []
+	return ["{}.gz".format(extension) for extension in extensions]
+
+def is_compressed_file_type(filename):
+	name, extension = os.path.splitext(filename)
+	return extension.lower() == ".gz" and valid_file_type(name, type="machinecode")
+
+def strip_compression_extension(filename):
+	if is_compressed_file_type(filename):
+		return os.path.splitext(filename)[0]
+	return filename
+
 def get_file_type(filename):
 	_, extension = os.path.splitext(filename)
 	extension = extension[1:].lower()
@@ -422,7 +440,8 @@ class FileManager(object):
 				def call_plugins(slicer, source_location, source_path, dest_location, dest_path, progress):
 					for plugin in self._progress_plugins:
 						try:
-							plugin.on_slicing_progress(slicer, source_location, source_path, dest_location, dest_path, progress)
+							hook_profiler().call("ProgressPlugin.on_slicing_progress", plugin._identifier, plugin.on_slicing_progress,
+							                     slicer, source_location, source_path, dest_location, dest_path, progress)
 						except:
 							self._logger.exception("Exception while sending slicing progress to plugin %s" % plugin._identifier)
 
@@ -455,13 +474,21 @@ class FileManager(object):
 			result[dst] = self._storage_managers[dst].list_files(path=path, filter=filter, recursive=recursive)
 		return result
 
+	def query_files(self, destination, path=None, filter=None, recursive=True, prefix=None, search=None, sort="name",
+	                reverse=False, offset=0, limit=None, after=None):
+		return self._storage(destination).query_files(path=path, filter=filter, recursive=recursive, prefix=prefix,
+		                                              search=search, sort=sort, reverse=reverse, offset=offset,
+		                                              limit=limit, after=after)
+
 	def add_file(self, destination, path, file_object, links=None, allow_overwrite=False, printer_profile=None, analysis=None, display=None):
 		if printer_profile is None:
 			printer_profile = self._printer_profile_manager.get_current_or_default()
 
-		for hook in self._preprocessor_hooks.values():
+		for name, hook in self._preprocessor_hooks.items():
 			try:
-				hook_file_object = hook(path, file_object, links=links, printer_profile=printer_profile, allow_overwrite=allow_overwrite)
+				hook_file_object = hook_profiler().call("octoprint.filemanager.preprocessor", name, hook,
+				                                        path, file_object, links=links, printer_profile=printer_profile,
+				                                        allow_overwrite=allow_overwrite)
 			except:
 				self._logger.exception("Error when calling preprocessor hook {}, ignoring".format(hook))
 				continue
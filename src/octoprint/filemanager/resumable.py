@@ -0,0 +1,380 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from octoprint.util import atomic_write, silent_remove
+
+
+class ResumableUploadError(Exception):
+	UNKNOWN = "unknown"
+	DOES_NOT_EXIST = "does_not_exist"
+	INVALID_RANGE = "invalid_range"
+	INCOMPLETE = "incomplete"
+	HASH_MISMATCH = "hash_mismatch"
+
+	def __init__(self, message, code=None):
+		Exception.__init__(self, message)
+		self.message = message
+
+		if code is None:
+			code = ResumableUploadError.UNKNOWN
+		self.code = code
+
+
+class ResumableUploadManager(object):
+	"""
+	Manages resumable uploads.
+
+	An upload session is created with the name and full size of the file to upload. The client may then send the
+	file's contents in chunks at arbitrary offsets, query which byte ranges have been received so far (e.g. after a
+	dropped connection) and finalize the upload once all data has been received. Data is written directly into a
+	``.part`` file in ``folder``, the session state is kept next to it as ``.json`` file so that uploads survive a
+	server restart.
+
+	If the SHA256 of the file is provided on creation, it gets computed while the data arrives (for the contiguous part
+	received so far) and is verified on finalization.
+
+	Arguments:
+	    folder (str): the folder to store session data in
+	    max_age (int): the time in seconds after its last update after which an unfinished session gets removed
+	"""
+
+	BLOCK_SIZE = 64 * 1024
+
+	def __init__(self, folder, max_age=24 * 60 * 60):
+		self._logger = logging.getLogger(__name__)
+
+		self._folder = folder
+		self._max_age = max_age
+
+		self._sessions = dict()
+		self._hashers = dict()
+		self._session_locks = dict()
+		self._lock = threading.RLock()
+
+		if not os.path.isdir(self._folder):
+			os.makedirs(self._folder)
+		self._load()
+
+	def create(self, target, filename, size, path=None, sha256=None, user=None, metadata=None):
+		"""
+		Creates a new upload session for ``filename`` of ``size`` bytes and returns its state.
+		"""
+
+		if size < 0:
+			raise ValueError("size must not be negative")
+
+		self.cleanup()
+
+		upload_id = uuid.uuid4().hex
+		now = time.time()
+		session = dict(id=upload_id,
+		               target=target,
+		               filename=filename,
+		               path=path,
+		               size=size,
+		               sha256=sha256.lower() if sha256 else None,
+		               user=user,
+		               metadata=metadata if metadata else dict(),
+		               received=[],
+		               created=now,
+		               updated=now)
+
+		with io.open(self._data_path(upload_id), "wb"):
+			pass
+
+		with self._lock:
+			self._sessions[upload_id] = session
+			self._hashers[upload_id] = (hashlib.sha256(), 0)
+			self._session_locks[upload_id] = threading.RLock()
+			self._save(session)
+
+		return self._status(session)
+
+	def get(self, upload_id):
+		"""Returns the current state of the upload session ``upload_id``."""
+		with self._lock:
+			return self._status(self._get_session(upload_id))
+
+	def write(self, upload_id, offset, stream, length):
+		"""
+		Writes ``length`` bytes read from ``stream`` to the upload session ``upload_id`` at ``offset``.
+
+		Returns the state of the session after the write.
+		"""
+
+		writer = self.open_chunk(upload_id, offset, length)
+		try:
+			while writer.remaining:
+				data = stream.read(min(ResumableUploadManager.BLOCK_SIZE, writer.remaining))
+				if not data:
+					break
+				writer.write(data)
+		except:
+			try:
+				writer.close()
+			except ResumableUploadError:
+				pass
+			raise
+
+		return writer.close()
+
+	def open_chunk(self, upload_id, offset, length):
+		"""
+		Opens a :class:`ResumableChunkWriter` for ``length`` bytes of the upload session ``upload_id`` starting at
+		``offset``, to which the data can be written as it arrives, e.g. while a request body is being received.
+		"""
+
+		with self._lock:
+			session = self._get_session(upload_id)
+
+		if offset < 0 or length < 0 or offset + length > session["size"]:
+			raise ResumableUploadError("Chunk {}-{} is outside of the upload's size of {} bytes".format(offset, offset + length, session["size"]),
+			                           code=ResumableUploadError.INVALID_RANGE)
+
+		return ResumableChunkWriter(self, upload_id, offset, length)
+
+	def _write_chunk_data(self, upload_id, f, position, data):
+		with self._lock:
+			self._get_session(upload_id)
+			session_lock = self._session_locks[upload_id]
+
+		with session_lock:
+			f.seek(position)
+			f.write(data)
+
+			hasher, hashed = self._hashers[upload_id]
+			if position == hashed:
+				# in order data, hash it right away
+				hasher.update(data)
+				self._hashers[upload_id] = (hasher, hashed + len(data))
+
+	def _finish_chunk(self, upload_id, offset, written, length):
+		with self._lock:
+			session = self._get_session(upload_id)
+			session_lock = self._session_locks[upload_id]
+
+		with session_lock:
+			with self._lock:
+				if written:
+					session["received"] = _merge_ranges(session["received"], offset, offset + written)
+				session["updated"] = time.time()
+				self._save(session)
+
+			if written < length:
+				raise ResumableUploadError("Chunk ended after {} of {} bytes".format(written, length),
+				                           code=ResumableUploadError.INCOMPLETE)
+
+			if session["sha256"]:
+				self._advance_hash(upload_id)
+
+		return self.get(upload_id)
+
+	def finalize(self, upload_id):
+		"""
+		Verifies that the upload session ``upload_id`` is complete and its hash matches (if provided) and returns the
+		path of the uploaded data. The session needs to be removed via :meth:`remove` once the data has been moved to its
+		final destination.
+		"""
+
+		with self._lock:
+			session = self._get_session(upload_id)
+			session_lock = self._session_locks[upload_id]
+
+		with session_lock:
+			if not _is_complete(session):
+				raise ResumableUploadError("Upload {} is not complete yet".format(upload_id),
+				                           code=ResumableUploadError.INCOMPLETE)
+
+			if session["sha256"]:
+				digest = self._advance_hash(upload_id)
+				if digest != session["sha256"]:
+					raise ResumableUploadError("SHA256 of upload {} doesn't match, expected {} but got {}".format(upload_id, session["sha256"], digest),
+					                           code=ResumableUploadError.HASH_MISMATCH)
+
+		return self._data_path(upload_id)
+
+	def remove(self, upload_id):
+		"""Removes the upload session ``upload_id`` and any data received for it."""
+		with self._lock:
+			self._get_session(upload_id)
+			self._remove(upload_id)
+
+	def cleanup(self):
+		"""Removes all sessions that haven't been updated for longer than the configured maximum age."""
+		cutoff = time.time() - self._max_age
+		with self._lock:
+			for upload_id, session in self._sessions.items():
+				if session["updated"] < cutoff:
+					self._logger.info("Removing stale resumable upload {} of {}".format(upload_id, session["filename"]))
+					self._remove(upload_id)
+
+	##~~ helpers
+
+	def _get_session(self, upload_id):
+		if not upload_id in self._sessions:
+			raise ResumableUploadError("Unknown upload {}".format(upload_id),
+			                           code=ResumableUploadError.DOES_NOT_EXIST)
+		return self._sessions[upload_id]
+
+	def _status(self, session):
+		result = dict((key, value) for key, value in session.items() if key != "received")
+		result["received"] = [list(r) for r in session["received"]]
+		result["bytes"] = sum(end - start for start, end in session["received"])
+		result["complete"] = _is_complete(session)
+		return result
+
+	def _advance_hash(self, upload_id):
+		"""
+		Feeds everything received contiguously from the start of the file that hasn't been hashed yet into the hash,
+		returns the hex digest of the data hashed so far.
+		"""
+
+		session = self._sessions[upload_id]
+		hasher, hashed = self._hashers[upload_id]
+
+		contiguous = 0
+		if session["received"] and session["received"][0][0] == 0:
+			contiguous = session["received"][0][1]
+
+		if hashed < contiguous:
+			with io.open(self._data_path(upload_id), "rb") as f:
+				f.seek(hashed)
+				while hashed < contiguous:
+					data = f.read(min(ResumableUploadManager.BLOCK_SIZE, contiguous - hashed))
+					if not data:
+						break
+					hasher.update(data)
+					hashed += len(data)
+			self._hashers[upload_id] = (hasher, hashed)
+
+		return hasher.hexdigest()
+
+	def _data_path(self, upload_id):
+		return os.path.join(self._folder, "{}.part".format(upload_id))
+
+	def _state_path(self, upload_id):
+		return os.path.join(self._folder, "{}.json".format(upload_id))
+
+	def _save(self, session):
+		with atomic_write(self._state_path(session["id"]), "wb") as f:
+			json.dump(session, f)
+
+	def _remove(self, upload_id):
+		silent_remove(self._data_path(upload_id))
+		silent_remove(self._state_path(upload_id))
+		self._sessions.pop(upload_id, None)
+		self._hashers.pop(upload_id, None)
+		self._session_locks.pop(upload_id, None)
+
+	def _load(self):
+		for name in os.listdir(self._folder):
+			if not name.endswith(".json"):
+				continue
+
+			upload_id = name[:-len(".json")]
+			try:
+				with io.open(self._state_path(upload_id), "rb") as f:
+					session = json.load(f)
+			except:
+				self._logger.exception("Could not load state of resumable upload {}, removing it".format(upload_id))
+				self._remove(upload_id)
+				continue
+
+			if not os.path.isfile(self._data_path(upload_id)):
+				self._remove(upload_id)
+				continue
+
+			self._sessions[upload_id] = session
+			# hash state can't be persisted, it will be caught up on the next write or on finalization
+			self._hashers[upload_id] = (hashlib.sha256(), 0)
+			self._session_locks[upload_id] = threading.RLock()
+
+		self.cleanup()
+
+
+class ResumableChunkWriter(object):
+	"""
+	Writes one chunk of a resumable upload directly into the upload's data, see
+	:meth:`ResumableUploadManager.open_chunk`.
+
+	Data beyond the chunk's length is rejected. :meth:`close` records the received range and returns the session
+	state. If less data than announced was written, the received part is still recorded, but an
+	``incomplete`` :class:`ResumableUploadError` is raised.
+	"""
+
+	def __init__(self, manager, upload_id, offset, length):
+		self.upload_id = upload_id
+		self.offset = offset
+		self.length = length
+		self.written = 0
+
+		self._manager = manager
+		self._file = io.open(manager._data_path(upload_id), "r+b")
+		self._closed = False
+
+	@property
+	def remaining(self):
+		return self.length - self.written
+
+	def write(self, data):
+		if self._closed:
+			raise ValueError("Chunk writer is already closed")
+
+		if len(data) > self.remaining:
+			raise ResumableUploadError("Chunk is longer than the announced {} bytes".format(self.length),
+			                           code=ResumableUploadError.INVALID_RANGE)
+
+		if not data:
+			return
+
+		self._manager._write_chunk_data(self.upload_id, self._file, self.offset + self.written, data)
+		self.written += len(data)
+
+	def close(self):
+		if self._closed:
+			return self._manager.get(self.upload_id)
+
+		self._closed = True
+		self._file.close()
+		return self._manager._finish_chunk(self.upload_id, self.offset, self.written, self.length)
+
+
+def _merge_ranges(ranges, start, end):
+	"""
+	Merges the range ``[start, end)`` into the sorted list of non overlapping ranges ``ranges``.
+
+	>>> _merge_ranges([], 0, 10)
+	[[0, 10]]
+	>>> _merge_ranges([[0, 10], [20, 30]], 10, 20)
+	[[0, 30]]
+	>>> _merge_ranges([[0, 10], [20, 30]], 12, 15)
+	[[0, 10], [12, 15], [20, 30]]
+	>>> _merge_ranges([[5, 10]], 0, 7)
+	[[0, 10]]
+	"""
+
+	result = []
+	for s, e in sorted(list(ranges) + [[start, end]]):
+		if result and s <= result[-1][1]:
+			result[-1][1] = max(result[-1][1], e)
+		else:
+			result.append([s, e])
+	return result
+
+
+def _is_complete(session):
+	if session["size"] == 0:
+		return True
+	return len(session["received"]) == 1 and session["received"][0] == [0, session["size"]]
@@ -27,6 +27,7 @@ from emoji import demojize
 from slugify import Slugify
 
 import octoprint.filemanager
+import octoprint.util.compression
 
 from octoprint.util import is_hidden_path, to_unicode
 
@@ -159,6 +160,51 @@ class StorageInterface(object):
 		"""
 		raise NotImplementedError()
 
+	def query_files(self, path=None, filter=None, recursive=True, prefix=None, search=None, sort="name",
+	                reverse=False, offset=0, limit=None, after=None):
+		"""
+		Lists a slice of the flattened file list starting at ``path``.
+
+		All files and folders below ``path`` (and if ``recursive`` is True also below its sub folders) matching the
+		optional ``filter``, ``prefix`` and ``search`` criteria are sorted by ``sort`` and only the slice selected by
+		``offset`` and ``limit`` or ``after`` is returned. Folder entries will not contain any ``children``.
+
+		This default implementation is based on :func:`list_files`, storage implementations should override it if they
+		can avoid fetching the whole file list.
+
+		:param string path:     base path from which to list all files, optional, if not supplied listing will start
+		                        from root of base folder
+		:param function filter: a filter that matches the files that are to be returned, see :func:`list_files`,
+		                        folders are always included
+		:param bool recursive:  whether to also include the contents of sub folders
+		:param string prefix:   only include entries whose path in storage starts with this prefix
+		:param string search:   only include entries whose name contains this (case insensitive)
+		:param string sort:     the attribute to sort by, one of ``name``, ``path``, ``date`` or ``size``
+		:param bool reverse:    whether to sort in descending order
+		:param int offset:      number of entries to skip
+		:param int limit:       maximum number of entries to return, ``None`` for no limit
+		:param tuple after:     a ``(sort value, path)`` tuple of the last entry of the previous page, if set entries will
+		                        be returned starting right after this entry and ``offset`` is ignored
+		:return: a tuple of the list of entry data in the requested slice and the total number of matching entries
+		"""
+		def flatten(nodes):
+			for node in nodes.values():
+				entry = dict(node)
+				entry.pop("children", None)
+				yield entry
+				if recursive and "children" in node:
+					for child in flatten(node["children"]):
+						yield child
+
+		list_filter = None
+		if filter:
+			# the filter only applies to files, folders are always included
+			list_filter = lambda name, data: data.get("type") == "folder" or filter(name, data)
+
+		candidates = [entry for entry in flatten(self.list_files(path=path, filter=list_filter, recursive=recursive))
+		              if matches_query(entry, prefix=prefix, search=search)]
+		return slice_query_result(candidates, sort=sort, reverse=reverse, offset=offset, limit=limit, after=after)
+
 	def add_folder(self, path, ignore_existing=True, display=None):
 		"""
 		Adds a folder as ``path``
@@ -440,6 +486,72 @@ class StorageError(Exception):
 		self.code = code
 
 
+QUERY_SORT_KEYS = ("name", "path", "date", "size")
+
+
+def matches_query(entry, prefix=None, search=None):
+	if prefix and not entry["path"].startswith(prefix):
+		return False
+	if search and not search.lower() in entry["name"].lower():
+		return False
+	return True
+
+
+def query_sort_key(entry, sort):
+	"""The ``(sort value, path)`` tuple ``entry`` is sorted by, also used as pagination cursor."""
+	value = entry.get(sort, 0 if sort in ("date", "size") else "")
+	return value, entry["path"]
+
+
+def slice_query_result(entries, sort="name", reverse=False, offset=0, limit=None, after=None):
+	"""
+	Sorts ``entries`` by ``sort`` and returns the requested slice and the total number of entries.
+
+	Entries are sorted by ``(entry[sort], entry["path"])`` so that the order is stable and can be used for cursor
+	based pagination via ``after``.
+	"""
+	if sort not in QUERY_SORT_KEYS:
+		raise ValueError("Unknown sort key: {}".format(sort))
+
+	sort_key = lambda entry: query_sort_key(entry, sort)
+
+	entries = sorted(entries, key=sort_key, reverse=reverse)
+	total = len(entries)
+
+	if after is not None:
+		after = tuple(after)
+		if reverse:
+			entries = [entry for entry in entries if sort_key(entry) < after]
+		else:
+			entries = [entry for entry in entries if sort_key(entry) > after]
+	elif offset:
+		entries = entries[offset:]
+
+	if limit is not None:
+		entries = entries[:limit]
+
+	return entries, total
+
+
+_INTERNAL_METADATA = ("printTimeTotals",)
+"""Metadata keys only used by the storage itself to maintain the print aggregates, never returned."""
+
+_UNLISTED_METADATA = _INTERNAL_METADATA + ("history",)
+"""Metadata keys not included in file listings, which carry the print aggregates instead of the raw history."""
+
+
+def _public_metadata(metadata, excluded=_INTERNAL_METADATA):
+	return dict((key, value) for key, value in metadata.items() if key not in excluded)
+
+
+def _to_last_print(history_entry):
+	last = dict(success=history_entry["success"],
+	            date=history_entry["timestamp"])
+	if "printTime" in history_entry:
+		last["printTime"] = history_entry["printTime"]
+	return last
+
+
 class LocalFileStorage(StorageInterface):
 	"""
 	The ``LocalFileStorage`` is a storage implementation which holds all files, folders and metadata on disk.
@@ -466,16 +578,24 @@ class LocalFileStorage(StorageInterface):
 		text = demojize(text, delimiters=(u"", u""))
 		return cls._SLUGIFY(text)
 
-	def __init__(self, basefolder, create=False):
+	def __init__(self, basefolder, create=False, history_limit=None, compression_level=None):
 		"""
 		Initializes a ``LocalFileStorage`` instance under the given ``basefolder``, creating the necessary folder
 		if necessary and ``create`` is set to ``True``.
 
-		:param string basefolder: the path to the folder under which to create the storage
-		:param bool create:       ``True`` if the folder should be created if it doesn't exist yet, ``False`` otherwise
+		:param string basefolder:     the path to the folder under which to create the storage
+		:param bool create:           ``True`` if the folder should be created if it doesn't exist yet, ``False`` otherwise
+		:param int history_limit:     maximum number of print history entries to keep per file, ``None`` for no limit.
+		                              Print counts and statistics still cover all prints.
+		:param int compression_level: gzip compression level (1-9) with which to store added machine code files,
+		                              ``None`` to store them uncompressed. Compressed files need to be read through
+		                              :func:`octoprint.util.compression.open_file`.
 		"""
 		self._logger = logging.getLogger(__name__)
 
+		self._history_limit = history_limit
+		self._compression_level = compression_level
+
 		self.basefolder = os.path.realpath(os.path.abspath(to_unicode(basefolder)))
 		if not os.path.exists(self.basefolder) and create:
 			os.makedirs(self.basefolder)
@@ -603,6 +723,100 @@ class LocalFileStorage(StorageInterface):
 			base = u""
 		return self._list_folder(path, base=base, entry_filter=filter, recursive=recursive)
 
+	def query_files(self, path=None, filter=None, recursive=True, prefix=None, search=None, sort="name",
+	                reverse=False, offset=0, limit=None, after=None):
+		if path:
+			path = self.sanitize_path(to_unicode(path))
+			base = self.path_in_storage(path)
+			if base:
+				base += u"/"
+		else:
+			path = self.basefolder
+			base = u""
+
+		# first pass only uses what scandir and the folders' metadata give us, missing metadata is only created for
+		# the requested slice
+		metadata_cache = dict()
+		candidates = [candidate for candidate in self._query_candidates(path, base, recursive=recursive, prefix=prefix,
+		                                                                metadata_cache=metadata_cache)
+		              if matches_query(candidate, prefix=prefix, search=search)
+		              and (not filter or candidate["type"] == "folder" or filter(candidate["name"], candidate))]
+		page, total = slice_query_result(candidates, sort=sort, reverse=reverse, offset=offset, limit=limit, after=after)
+
+		result = []
+		for candidate in page:
+			folder = candidate.pop("_folder")
+			metadata = metadata_cache[folder]
+
+			entry_metadata = metadata.get(candidate["name"])
+			if not isinstance(entry_metadata, dict):
+				if candidate["type"] == "folder":
+					entry_metadata = dict()
+				else:
+					entry_metadata = self._add_basic_metadata(folder, candidate["name"], metadata=metadata)
+
+			entry_data = _public_metadata(entry_metadata or dict(), excluded=_UNLISTED_METADATA)
+			entry_data.update(candidate)
+			entry_data["display"] = entry_data.get("display", candidate["name"])
+			result.append(entry_data)
+
+		return result, total
+
+	def _query_candidates(self, path, base, recursive=True, prefix=None, metadata_cache=None):
+		if metadata_cache is None:
+			metadata_cache = dict()
+		metadata_cache[path] = metadata = self._get_metadata(path)
+
+		for entry in scandir(path):
+			if is_hidden_path(entry.name):
+				continue
+
+			try:
+				entry_name = entry.name
+				entry_is_file = entry.is_file()
+				entry_is_dir = entry.is_dir()
+				entry_stat = entry.stat()
+			except:
+				# file might already have been moved or deleted
+				continue
+
+			path_in_location = entry_name if not base else base + entry_name
+
+			if entry_is_file:
+				type_path = octoprint.filemanager.get_file_type(entry_name)
+				if not type_path:
+					continue
+
+				# files stored compressed are listed with the size of their contents
+				entry_metadata = metadata.get(entry_name)
+				if isinstance(entry_metadata, dict) and "size" in entry_metadata:
+					size = entry_metadata["size"]
+				else:
+					size = entry_stat.st_size
+
+				yield dict(name=entry_name,
+				           path=path_in_location,
+				           type=type_path[0],
+				           typePath=type_path,
+				           size=size,
+				           date=int(entry_stat.st_mtime),
+				           _folder=path)
+
+			elif entry_is_dir:
+				yield dict(name=entry_name,
+				           path=path_in_location,
+				           type="folder",
+				           typePath=["folder"],
+				           date=int(entry_stat.st_mtime),
+				           _folder=path)
+
+				# no need to dive into folders that can't contain anything matching the prefix
+				folder_prefix = path_in_location + "/"
+				if recursive and (not prefix or folder_prefix.startswith(prefix) or prefix.startswith(folder_prefix)):
+					for sub_entry in self._query_candidates(entry.path, folder_prefix, recursive=recursive, prefix=prefix,
+					                                        metadata_cache=metadata_cache):
+						yield sub_entry
+
 	def add_folder(self, path, ignore_existing=True, display=None):
 		display_path, display_name = self.canonicalize(path)
 		path = self.sanitize_path(display_path)
@@ -762,6 +976,13 @@ class LocalFileStorage(StorageInterface):
 		# save the file
 		file_object.save(file_path)
 
+		uncompressed_size = None
+		if octoprint.filemanager.valid_file_type(name, type="machinecode"):
+			if self._compression_level is not None and not octoprint.util.compression.is_compressed(file_path):
+				octoprint.util.compression.compress_file(file_path, level=self._compression_level)
+			if octoprint.util.compression.is_compressed(file_path):
+				uncompressed_size = octoprint.util.compression.uncompressed_size(file_path)
+
 		# save the file's hash to the metadata of the folder
 		file_hash = self._create_hash(file_path)
 		metadata = self._get_metadata_entry(path, name, default=dict())
@@ -776,6 +997,14 @@ class LocalFileStorage(StorageInterface):
 			metadata["display"] = display_name
 			metadata_dirty = True
 
+		if metadata.get("size") != uncompressed_size:
+			# file is stored compressed -> store size of its contents in metadata, that's what gets listed
+			if uncompressed_size is not None:
+				metadata["size"] = uncompressed_size
+			else:
+				del metadata["size"]
+			metadata_dirty = True
+
 		if metadata_dirty:
 			self._update_metadata_entry(path, name, metadata)
 
@@ -849,7 +1078,10 @@ class LocalFileStorage(StorageInterface):
 
 	def get_metadata(self, path):
 		path, name = self.sanitize(path)
-		return self._get_metadata_entry(path, name)
+		metadata = self._get_metadata_entry(path, name)
+		if not isinstance(metadata, dict):
+			return metadata
+		return _public_metadata(metadata)
 
 	def get_link(self, path, rel):
 		path, name = self.sanitize(path)
@@ -1061,8 +1293,13 @@ class LocalFileStorage(StorageInterface):
 		if not "history" in metadata[name]:
 			metadata[name]["history"] = []
 
+		if not "prints" in metadata[name]:
+			# aggregates not yet initialized from any existing history
+			self._calculate_stats_from_history(name, path, metadata=metadata, save=False)
+
 		metadata[name]["history"].append(data)
-		self._calculate_stats_from_history(name, path, metadata=metadata, save=False)
+		self._add_to_print_aggregates(metadata[name], data)
+		self._compact_history(metadata[name])
 		self._save_metadata(path, metadata)
 
 	def _update_history(self, name, path, index, data):
@@ -1071,12 +1308,19 @@ class LocalFileStorage(StorageInterface):
 		if not name in metadata or not "history" in metadata[name]:
 			return
 
-		try:
-			metadata[name]["history"][index].update(data)
+		if not "prints" in metadata[name]:
 			self._calculate_stats_from_history(name, path, metadata=metadata, save=False)
-			self._save_metadata(path, metadata)
+
+		try:
+			history_entry = metadata[name]["history"][index]
 		except IndexError:
-			pass
+			return
+
+		removed = self._remove_from_print_aggregates(metadata[name], history_entry)
+		history_entry.update(data)
+		self._add_to_print_aggregates(metadata[name], history_entry)
+		self._refresh_last_prints(metadata[name], removed)
+		self._save_metadata(path, metadata)
 
 	def _delete_history(self, name, path, index):
 		metadata = self._get_metadata(path)
@@ -1084,64 +1328,179 @@ class LocalFileStorage(StorageInterface):
 		if not name in metadata or not "history" in metadata[name]:
 			return
 
-		try:
-			del metadata[name]["history"][index]
+		if not "prints" in metadata[name]:
 			self._calculate_stats_from_history(name, path, metadata=metadata, save=False)
-			self._save_metadata(path, metadata)
+
+		try:
+			history_entry = metadata[name]["history"].pop(index)
 		except IndexError:
-			pass
+			return
+
+		removed = self._remove_from_print_aggregates(metadata[name], history_entry)
+		self._refresh_last_prints(metadata[name], removed)
+		self._save_metadata(path, metadata)
 
 	def _calculate_stats_from_history(self, name, path, metadata=None, save=True):
+		"""
+		Recalculates the print aggregates of ``name`` from scratch from its full history.
+
+		Only needed to initialize the aggregates of entries that predate them, all further history changes update the
+		aggregates incrementally.
+		"""
 		if metadata is None:
 			metadata = self._get_metadata(path)
 
 		if not name in metadata or not "history" in metadata[name]:
 			return
 
-		# collect data from history
-		former_print_times = dict()
-		last_print = dict()
+		entry_metadata = metadata[name]
+		entry_metadata["prints"] = dict(success=0, failure=0)
+		entry_metadata["statistics"] = dict(averagePrintTime=dict(), lastPrintTime=dict())
+		entry_metadata["printTimeTotals"] = dict()
 
+		for history_entry in entry_metadata["history"]:
+			self._add_to_print_aggregates(entry_metadata, history_entry, name=name, path=path)
+		self._compact_history(entry_metadata)
 
-		for history_entry in metadata[name]["history"]:
-			if not "printTime" in history_entry or not "success" in history_entry or not history_entry["success"] or not "printerProfile" in history_entry:
-				continue
+		if save:
+			self._save_metadata(path, metadata)
+
+	def _add_to_print_aggregates(self, entry_metadata, history_entry, name=None, path=None):
+		prints = entry_metadata.setdefault("prints", dict(success=0, failure=0))
+		statistics = entry_metadata.setdefault("statistics", dict(averagePrintTime=dict(), lastPrintTime=dict()))
+		totals = entry_metadata.setdefault("printTimeTotals", dict())
+
+		if "success" in history_entry:
+			if history_entry["success"]:
+				prints["success"] += 1
+			else:
+				prints["failure"] += 1
+
+		last = prints.get("last")
+		if "success" in history_entry and "timestamp" in history_entry \
+				and (last is None or history_entry["timestamp"] >= last["date"]):
+			prints["last"] = _to_last_print(history_entry)
+
+		print_time = self._successful_print_time(history_entry, name=name, path=path)
+		if print_time is None:
+			return
 
+		printer_profile = history_entry["printerProfile"]
+		profile_totals = totals.setdefault(printer_profile, dict(count=0, total=0.0, lastTimestamp=None))
+		profile_totals["count"] += 1
+		profile_totals["total"] += print_time
+		statistics["averagePrintTime"][printer_profile] = profile_totals["total"] / float(profile_totals["count"])
+
+		timestamp = history_entry.get("timestamp")
+		if profile_totals["lastTimestamp"] is None or (timestamp is not None and timestamp >= profile_totals["lastTimestamp"]):
+			profile_totals["lastTimestamp"] = timestamp
+			statistics["lastPrintTime"][printer_profile] = history_entry["printTime"]
+
+	def _remove_from_print_aggregates(self, entry_metadata, history_entry):
+		"""
+		Removes the contribution of ``history_entry`` from the aggregates.
+
+		Returns a tuple of the removed entry's timestamp and the set of "last print" values it provided (``None`` for
+		the overall last print, printer profile ids for the last print times). Those have to be refreshed through
+		:func:`_refresh_last_prints` once the history has been modified.
+		"""
+		prints = entry_metadata["prints"]
+		statistics = entry_metadata["statistics"]
+		totals = entry_metadata["printTimeTotals"]
+
+		timestamp = history_entry.get("timestamp")
+		stale = set()
+
+		if "success" in history_entry:
+			if history_entry["success"]:
+				prints["success"] = max(prints["success"] - 1, 0)
+			else:
+				prints["failure"] = max(prints["failure"] - 1, 0)
+
+		last = prints.get("last")
+		if last is not None and timestamp == last["date"]:
+			stale.add(None)
+
+		print_time = self._successful_print_time(history_entry)
+		if print_time is not None:
 			printer_profile = history_entry["printerProfile"]
-			if not printer_profile:
-				continue
+			profile_totals = totals.get(printer_profile)
+			if profile_totals:
+				profile_totals["count"] -= 1
+				profile_totals["total"] -= print_time
+				if profile_totals["count"] > 0:
+					statistics["averagePrintTime"][printer_profile] = profile_totals["total"] / float(profile_totals["count"])
+				else:
+					del totals[printer_profile]
+					statistics["averagePrintTime"].pop(printer_profile, None)
+					statistics["lastPrintTime"].pop(printer_profile, None)
 
-			print_time = history_entry["printTime"]
-			try:
-				print_time = float(print_time)
-			except:
-				self._logger.warn("Invalid print time value found in print history for {} in {}/.metadata.json: {!r}".format(name, path, print_time))
+				if printer_profile in totals and profile_totals["lastTimestamp"] == timestamp:
+					stale.add(printer_profile)
+
+		return timestamp, stale
+
+	def _refresh_last_prints(self, entry_metadata, removed):
+		timestamp, stale = removed
+		if not stale:
+			return
+
+		prints = entry_metadata["prints"]
+		statistics = entry_metadata["statistics"]
+		totals = entry_metadata["printTimeTotals"]
+
+		# if an entry with the same timestamp was (re)added it is still the newest one, otherwise we have to go
+		# looking for the new newest one in the (capped) history
+		if None in stale:
+			last = prints.get("last")
+			if last is None or last["date"] != timestamp or not any(e.get("timestamp") == timestamp for e in entry_metadata["history"]):
+				prints.pop("last", None)
+				for history_entry in entry_metadata["history"]:
+					if "success" in history_entry and "timestamp" in history_entry \
+							and ("last" not in prints or history_entry["timestamp"] >= prints["last"]["date"]):
+						prints["last"] = _to_last_print(history_entry)
+
+		for printer_profile in stale - {None}:
+			if not printer_profile in totals:
 				continue
 
-			if not printer_profile in former_print_times:
-				former_print_times[printer_profile] = []
-			former_print_times[printer_profile].append(print_time)
+			candidates = [e for e in entry_metadata["history"]
+			              if self._successful_print_time(e) is not None and e["printerProfile"] == printer_profile]
+			if candidates:
+				newest = max(candidates, key=lambda e: e.get("timestamp", 0))
+				totals[printer_profile]["lastTimestamp"] = newest.get("timestamp")
+				statistics["lastPrintTime"][printer_profile] = newest["printTime"]
+			else:
+				# newest print has been compacted away already, keep what we have
+				totals[printer_profile]["lastTimestamp"] = None
 
-			if not printer_profile in last_print or last_print[printer_profile] is None or ("timestamp" in history_entry and history_entry["timestamp"] > last_print[printer_profile]["timestamp"]):
-				last_print[printer_profile] = history_entry
+	def _compact_history(self, entry_metadata):
+		"""Drops the oldest history entries beyond the configured limit, aggregates stay untouched."""
+		if self._history_limit is None or self._history_limit < 0:
+			return
 
-		# calculate stats
-		statistics = dict(averagePrintTime=dict(), lastPrintTime=dict())
+		history = entry_metadata.get("history")
+		if history is None or len(history) <= self._history_limit:
+			return
 
-		for printer_profile in former_print_times:
-			if not former_print_times[printer_profile]:
-				continue
-			statistics["averagePrintTime"][printer_profile] = sum(former_print_times[printer_profile]) / float(len(former_print_times[printer_profile]))
+		# clients address history entries by index, so the remaining ones have to keep their order
+		by_age = sorted(range(len(history)), key=lambda i: (history[i].get("timestamp", 0), i))
+		dropped = set(by_age[:len(history) - self._history_limit])
+		history[:] = [entry for i, entry in enumerate(history) if i not in dropped]
 
-		for printer_profile in last_print:
-			if not last_print[printer_profile]:
-				continue
-			statistics["lastPrintTime"][printer_profile] = last_print[printer_profile]["printTime"]
+	def _successful_print_time(self, history_entry, name=None, path=None):
+		if not "printTime" in history_entry or not "success" in history_entry or not history_entry["success"] or not "printerProfile" in history_entry:
+			return None
 
-		metadata[name]["statistics"] = statistics
+		if not history_entry["printerProfile"]:
+			return None
 
-		if save:
-			self._save_metadata(path, metadata)
+		try:
+			return float(history_entry["printTime"])
+		except:
+			if name is not None:
+				self._logger.warn("Invalid print time value found in print history for {} in {}/.metadata.json: {!r}".format(name, path, history_entry["printTime"]))
+			return None
 
 	def _get_links(self, name, path, searched_rel):
 		metadata = self._get_metadata(path)
@@ -1333,6 +1692,10 @@ class LocalFileStorage(StorageInterface):
 							metadata[entry_name]["display"] = entry_display
 							entry_metadata["display"] = entry_display
 							metadata_dirty = True
+						if "history" in entry_metadata and not "prints" in entry_metadata:
+							# one time migration of print aggregates for entries that predate them
+							self._calculate_stats_from_history(entry_name, path, metadata=metadata, save=False)
+							metadata_dirty = True
 					else:
 						entry_metadata = self._add_basic_metadata(path, entry_name,
 						                                          display_name=entry_display,
@@ -1344,8 +1707,7 @@ class LocalFileStorage(StorageInterface):
 
 					if not entry_filter or entry_filter(entry_name, entry_metadata):
 						# only add files passing the optional filter
-						extended_entry_data = dict()
-						extended_entry_data.update(entry_metadata)
+						extended_entry_data = _public_metadata(entry_metadata, excluded=_UNLISTED_METADATA)
 						extended_entry_data["name"] = entry_name
 						extended_entry_data["display"] = entry_metadata.get("display", entry_name)
 						extended_entry_data["path"] = path_in_location
@@ -1353,7 +1715,8 @@ class LocalFileStorage(StorageInterface):
 						extended_entry_data["typePath"] = type_path
 						stat = entry_stat
 						if stat:
-							extended_entry_data["size"] = stat.st_size
+							# files stored compressed are listed with the size of their contents
+							extended_entry_data["size"] = entry_metadata.get("size", stat.st_size)
 							extended_entry_data["date"] = int(stat.st_mtime)
 
 						result[entry_name] = extended_entry_data
@@ -1462,7 +1825,8 @@ class LocalFileStorage(StorageInterface):
 
 		blocksize = 65536
 		hash = hashlib.sha1()
-		with open(path, "rb") as f:
+		# hash the contents, no matter whether they are stored compressed or not
+		with octoprint.util.compression.open_file(path) as f:
 			buffer = f.read(blocksize)
 			while len(buffer) > 0:
 				hash.update(buffer)
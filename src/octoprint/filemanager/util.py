@@ -8,6 +8,7 @@ __copyright__ = "Copyright (C) 2015 The OctoPrint Project - Released under terms
 import io
 
 from octoprint.util import atomic_write
+from octoprint.util.compression import CompressedFile
 
 class AbstractFileWrapper(object):
 	"""
@@ -101,6 +102,35 @@ class StreamWrapper(AbstractFileWrapper):
 		else:
 			return self.streams[0]
 
+class DecompressingFileWrapper(AbstractFileWrapper):
+	"""
+	A wrapper around another :class:`.AbstractFileWrapper` holding gzip compressed data, decompressing it on the fly.
+
+	Arguments:
+	    file_obj (AbstractFileWrapper): The wrapped compressed file
+	    filename (str): The file's name, defaults to the name of the wrapped file without its compression extension
+	"""
+	def __init__(self, file_obj, filename=None):
+		if filename is None:
+			from octoprint.filemanager import strip_compression_extension
+			filename = strip_compression_extension(file_obj.filename)
+
+		AbstractFileWrapper.__init__(self, filename)
+		self.file_obj = file_obj
+
+	def save(self, path):
+		"""
+		Will dump the decompressed contents of the wrapped file into the target file.
+		"""
+		import shutil
+
+		with atomic_write(path, "wb") as dest:
+			with self.stream() as source:
+				shutil.copyfileobj(source, dest)
+
+	def stream(self):
+		return io.BufferedReader(CompressedFile(self.file_obj.stream()))
+
 class MultiStream(io.RawIOBase):
 	"""
 	A stream implementation which when read reads from multiple streams, one after the other, basically concatenating
@@ -27,7 +27,8 @@ from octoprint.settings import settings as s
 from octoprint.plugin.core import (PluginInfo, PluginManager, Plugin)
 from octoprint.plugin.types import *
 
-from octoprint.util import deprecated
+from octoprint.util import deprecated, monotonic_time
+from octoprint.util.profiling import hook_profiler
 
 # singleton
 _instance = None
@@ -47,7 +48,7 @@ def _validate_plugin(phase, plugin_info):
 
 def plugin_manager(init=False, plugin_folders=None, plugin_bases=None, plugin_entry_points=None, plugin_disabled_list=None,
                    plugin_blacklist=None, plugin_restart_needing_hooks=None, plugin_obsolete_hooks=None,
-                   plugin_validators=None):
+                   plugin_validators=None, plugin_discovery_cache=None):
 	"""
 	Factory method for initially constructing and consecutively retrieving the :class:`~octoprint.plugin.core.PluginManager`
 	singleton.
@@ -73,6 +74,8 @@ def plugin_manager(init=False, plugin_folders=None, plugin_bases=None, plugin_en
 	    plugin_obsolete_hooks (list): A list of hooks that have been declared obsolete. Plugins implementing them will
 	        not be enabled since they might depend on functionality that is no longer available.
 	    plugin_validators (list): A list of additional plugin validators through which to process each plugin.
+	    plugin_discovery_cache (str): Path of the file in which to cache the results of plugin discovery. If not
+	        provided no discovery cache will be used.
 
 	Returns:
 	    PluginManager: A fully initialized :class:`~octoprint.plugin.core.PluginManager` instance to be used for plugin
@@ -114,7 +117,8 @@ def plugin_manager(init=False, plugin_folders=None, plugin_bases=None, plugin_en
 			                          plugin_blacklist=plugin_blacklist,
 			                          plugin_restart_needing_hooks=plugin_restart_needing_hooks,
 			                          plugin_obsolete_hooks=plugin_obsolete_hooks,
-			                          plugin_validators=plugin_validators)
+			                          plugin_validators=plugin_validators,
+			                          plugin_discovery_cache=plugin_discovery_cache)
 		else:
 			raise ValueError("Plugin Manager not initialized yet")
 	return _instance
@@ -219,6 +223,9 @@ def call_plugin(types, method, args=None, kwargs=None, callback=None, error_call
 
 	logger = logging.getLogger(__name__)
 
+	profiler = hook_profiler()
+	hook = "{}.{}".format("/".join(t.__name__ for t in types), method)
+
 	plugins = plugin_manager().get_implementations(*types, sorting_context=sorting_context)
 	for plugin in plugins:
 		if initialized and not hasattr(plugin, "_identifier"):
@@ -227,7 +234,11 @@ def call_plugin(types, method, args=None, kwargs=None, callback=None, error_call
 		if hasattr(plugin, method):
 			logger.debug("Calling {} on {}".format(method, plugin._identifier))
 			try:
-				result = getattr(plugin, method)(*args, **kwargs)
+				start = monotonic_time()
+				try:
+					result = getattr(plugin, method)(*args, **kwargs)
+				finally:
+					profiler.record(hook, plugin._identifier, monotonic_time() - start)
 				if callback:
 					callback(plugin._identifier, plugin, result)
 			except Exception as exc:
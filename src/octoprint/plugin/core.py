@@ -33,11 +33,11 @@ from collections import defaultdict, namedtuple, OrderedDict
 import logging
 import fnmatch
 import inspect
+import threading
+import time
 
-import pkg_resources
 import pkginfo
-
-from past.builtins import basestring
+from past.builtins import basestring, long
 
 try:
 	from os import scandir
@@ -137,6 +137,14 @@ class PluginInfo(object):
 	attr_disable = '__plugin_disable__'
 	""" Module attribute which to call when disabling the plugin. """
 
+	attr_provides = '__plugin_provides__'
+	"""
+	Module attribute declaring the hooks and mixins the plugin provides, as a literal ``dict`` with the optional keys
+	``hooks`` (list of hook names) and ``mixins`` (list of mixin class names). Plugins declaring this will only get
+	imported once one of the declared hooks is called or one of the declared mixins is requested. Read from the
+	plugin's source, so it has to be a plain literal.
+	"""
+
 	def __init__(self, key, location, instance, name=None, version=None, description=None, author=None, url=None, license=None, parsed_metadata=None):
 		self.key = key
 		self.location = location
@@ -150,6 +158,11 @@ class PluginInfo(object):
 		self.managable = True
 		self.needs_restart = False
 
+		self.lazy = False
+		self.lazy_hooks = None
+		self.lazy_mixins = None
+		self.lazy_import = None
+
 		self._name = name
 		self._version = version
 		self._description = description
@@ -385,9 +398,14 @@ class PluginInfo(object):
 		Hooks provided by the plugin. Will be taken from the hooks attribute of the plugin module as defiend in
 		:attr:`attr_hooks` if available, otherwise an empty dictionary is returned.
 
+		For plugins that are not yet imported (see :attr:`lazy`) placeholders for the declared hooks are returned
+		which import the plugin on first call.
+
 		Returns:
 		    dict: Hooks provided by the plugin.
 		"""
+		if self.lazy and self.lazy_hooks is not None:
+			return self.lazy_hooks
 		return self._get_instance_attribute(self.__class__.attr_hooks, default={})
 
 	@property
@@ -412,6 +430,17 @@ class PluginInfo(object):
 		"""
 		return self._get_instance_attribute(self.__class__.attr_helpers, default={})
 
+	@property
+	def provides(self):
+		"""
+		Hooks and mixins the plugin declares to provide through :attr:`attr_provides`, taken from the plugin module
+		if already imported or from its parsed metadata otherwise.
+
+		Returns:
+		    dict or None: Declared hooks and mixins, None if nothing is declared.
+		"""
+		return self._get_instance_attribute(self.__class__.attr_provides, default=None, incl_metadata=True)
+
 	@property
 	def check(self):
 		"""
@@ -490,21 +519,33 @@ class PluginInfo(object):
 			self._cached_parsed_metadata = self._parse_metadata()
 		return self._cached_parsed_metadata
 
-	def _parse_metadata(self):
-		result = dict()
-
+	@property
+	def metadata_source(self):
+		"""
+		Path of the source file from which :attr:`parsed_metadata` is extracted, or ``None`` if the plugin doesn't
+		have a plain text source file to parse.
+		"""
 		path = self.location
 		if not path:
-			return result
+			return None
 
 		if os.path.isdir(path):
 			path = os.path.join(self.location, "__init__.py")
 
 		if not os.path.isfile(path):
-			return result
+			return None
 
 		if not path.endswith(".py"):
 			# we only support parsing plain text source files
+			return None
+
+		return path
+
+	def _parse_metadata(self):
+		result = dict()
+
+		path = self.metadata_source
+		if path is None:
 			return result
 
 		self._logger.debug("Parsing plugin metadata for {} from AST of {}".format(self.key, path))
@@ -536,12 +577,224 @@ class PluginInfo(object):
 							result[key] = a.value.args[0].s
 
 						break
+
+			for a in reversed(assignments):
+				if self.__class__.attr_provides in extract_target_ids(a):
+					try:
+						result[self.__class__.attr_provides] = ast.literal_eval(a.value)
+					except ValueError:
+						self._logger.warn("{} of plugin {} is not a literal, ignoring it".format(self.__class__.attr_provides,
+						                                                                       self.key))
+					break
 		except:
 			pass
 
 		return result
 
 
+class PluginDiscoveryCache(object):
+	"""
+	Persistent cache for the results of plugin discovery.
+
+	Enumerating the entry points of all installed packages requires building a fresh ``pkg_resources.WorkingSet``
+	which reads the metadata of every single distribution in the Python environment. Together with parsing the
+	package metadata and the AST of every found plugin this can take several seconds on slower hardware. This cache
+	stores the found entry points including their package metadata, keyed by a fingerprint of the modification times
+	and sizes of all distribution metadata found on the Python path, plus the parsed plugin metadata, keyed by
+	the modification time and size of the parsed source file. As long as nothing changes, discovery can then be
+	performed without touching the working set.
+
+	Arguments:
+	    path (str): Path of the JSON file in which to persist the cache.
+	"""
+
+	version = 1
+
+	metadata_suffixes = (".dist-info", ".egg-info", ".egg-link", ".egg", ".pth")
+
+	def __init__(self, path):
+		self.path = path
+
+		self._logger = logging.getLogger(__name__)
+		self._data = None
+		self._dirty = False
+
+	def get_entry_points(self, groups, fingerprint):
+		"""
+		Returns the cached entry points for ``groups`` if they were stored with the provided ``fingerprint``, ``None``
+		otherwise.
+		"""
+		data = self._load()
+		cached = data["entry_points"].get(self._groups_key(groups))
+		if cached is None or cached.get("fingerprint") != fingerprint:
+			return None
+		return cached.get("entries")
+
+	def set_entry_points(self, groups, fingerprint, entries):
+		data = self._load()
+		data["entry_points"][self._groups_key(groups)] = dict(fingerprint=fingerprint, entries=entries)
+		self._dirty = True
+
+	def get_parsed_metadata(self, path):
+		"""
+		Returns the cached parsed metadata for source file ``path`` if the file hasn't changed since it was
+		stored, ``None`` otherwise.
+		"""
+		signature = self._file_signature(path)
+		if signature is None:
+			return None
+
+		cached = self._load()["metadata"].get(path)
+		if cached is None or cached.get("signature") != signature:
+			return None
+		return cached.get("data")
+
+	def set_parsed_metadata(self, path, metadata):
+		"""
+		Stores the parsed ``metadata`` of source file ``path``. Sets and tuples are stored as lists, entries that
+		can't be represented in JSON at all are left out.
+		"""
+		signature = self._file_signature(path)
+		if signature is None:
+			return
+
+		cached = dict()
+		for key, value in metadata.items():
+			try:
+				cached[key] = self._to_json(value)
+			except ValueError:
+				self._logger.debug("Not caching {} parsed from {}, it can't be serialized".format(key, path))
+
+		data = self._load()
+		data["metadata"][path] = dict(signature=signature, data=cached)
+		self._dirty = True
+
+	def invalidate(self):
+		"""Drops all cached data, both in memory and on disk."""
+		self._data = self._empty()
+		self._dirty = False
+
+		try:
+			os.remove(self.path)
+		except OSError:
+			pass
+
+	def save(self):
+		"""Persists the cache if anything changed since it was loaded."""
+		if not self._dirty or self._data is None:
+			return
+
+		import json
+		import tempfile
+
+		try:
+			folder = os.path.dirname(self.path)
+			if folder and not os.path.isdir(folder):
+				os.makedirs(folder)
+
+			fd, temp = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=folder or None)
+			with os.fdopen(fd, "w") as f:
+				json.dump(self._data, f)
+
+			try:
+				os.rename(temp, self.path)
+			except OSError:
+				# windows won't replace existing files on rename
+				os.remove(self.path)
+				os.rename(temp, self.path)
+
+			self._dirty = False
+		except:
+			self._logger.exception("Error while saving plugin discovery cache to {}".format(self.path))
+
+	@classmethod
+	def _to_json(cls, value):
+		if value is None or isinstance(value, (basestring, bool, int, long, float)):
+			return value
+		elif isinstance(value, dict):
+			if not all(isinstance(key, basestring) for key in value):
+				raise ValueError("Only string keys are supported")
+			return dict((key, cls._to_json(v)) for key, v in value.items())
+		elif isinstance(value, (set, frozenset)):
+			return sorted(cls._to_json(v) for v in value)
+		elif isinstance(value, (list, tuple)):
+			return [cls._to_json(v) for v in value]
+		raise ValueError("Unsupported type: {}".format(type(value)))
+
+	@classmethod
+	def fingerprint(cls, paths):
+		"""
+		Creates a fingerprint of the distributions installed in ``paths``.
+
+		Only the modification times and sizes of the path entries themselves and of the distribution metadata they
+		contain are taken into account, the metadata is not read.
+		"""
+		import hashlib
+
+		collected = []
+		for path in paths:
+			if not path or not os.path.isdir(path):
+				continue
+
+			try:
+				stat = os.stat(path)
+				collected.append((path, stat.st_mtime, stat.st_size))
+
+				for entry in scandir(path):
+					if not entry.name.endswith(cls.metadata_suffixes):
+						continue
+
+					stat = entry.stat()
+					collected.append((entry.name, stat.st_mtime, stat.st_size))
+
+					if entry.is_dir():
+						# development installs rewrite their entry points in place
+						entry_points = os.path.join(entry.path, "entry_points.txt")
+						if os.path.isfile(entry_points):
+							stat = os.stat(entry_points)
+							collected.append((entry_points, stat.st_mtime, stat.st_size))
+			except OSError:
+				collected.append((path, None, None))
+
+		return hashlib.sha1(repr(collected).encode("utf-8")).hexdigest()
+
+	def _load(self):
+		if self._data is not None:
+			return self._data
+
+		import json
+
+		data = None
+		if os.path.isfile(self.path):
+			try:
+				with open(self.path, "r") as f:
+					data = json.load(f)
+			except:
+				self._logger.exception("Error while loading plugin discovery cache from {}, "
+				                       "discarding it".format(self.path))
+
+		if not isinstance(data, dict) or data.get("version") != self.version:
+			data = self._empty()
+
+		self._data = data
+		return self._data
+
+	def _empty(self):
+		return dict(version=self.version, entry_points=dict(), metadata=dict())
+
+	@staticmethod
+	def _groups_key(groups):
+		return "|".join(groups)
+
+	@staticmethod
+	def _file_signature(path):
+		try:
+			stat = os.stat(path)
+		except OSError:
+			return None
+		return [stat.st_mtime, stat.st_size]
+
+
 class PluginManager(object):
 	"""
 	The :class:`PluginManager` is the central component for finding, loading and accessing plugins provided to the
@@ -552,7 +805,7 @@ class PluginManager(object):
 
 	def __init__(self, plugin_folders, plugin_bases, plugin_entry_points, logging_prefix=None,
 	             plugin_disabled_list=None, plugin_blacklist=None, plugin_restart_needing_hooks=None,
-	             plugin_obsolete_hooks=None, plugin_validators=None):
+	             plugin_obsolete_hooks=None, plugin_validators=None, plugin_discovery_cache=None):
 		self.logger = logging.getLogger(__name__)
 
 		if logging_prefix is None:
@@ -578,6 +831,10 @@ class PluginManager(object):
 		self.plugin_validators = plugin_validators
 		self.logging_prefix = logging_prefix
 
+		self._discovery_cache = None
+		if plugin_discovery_cache is not None:
+			self._discovery_cache = PluginDiscoveryCache(plugin_discovery_cache)
+
 		self.enabled_plugins = dict()
 		self.disabled_plugins = dict()
 		self.plugin_implementations = dict()
@@ -595,6 +852,7 @@ class PluginManager(object):
 		self.on_plugin_enabled = lambda *args, **kwargs: None
 		self.on_plugin_disabled = lambda *args, **kwargs: None
 		self.on_plugin_implementations_initialized = lambda *args, **kwargs: None
+		self.on_plugin_timing = lambda *args, **kwargs: None
 
 		self.on_plugins_loaded = lambda *args, **kwargs: None
 		self.on_plugins_enabled = lambda *args, **kwargs: None
@@ -603,6 +861,9 @@ class PluginManager(object):
 
 		self.marked_plugins = defaultdict(list)
 
+		self._lazy_lock = threading.RLock()
+		self._implementations_initialized = False
+
 		self._python_install_dir = None
 		self._python_virtual_env = False
 		self._detect_python_environment()
@@ -630,6 +891,14 @@ class PluginManager(object):
 	def plugin_hooks(self):
 		return {key: map(lambda v: (v[1], v[2]), value) for key, value in self._plugin_hooks.items()}
 
+	def invalidate_discovery_cache(self):
+		"""
+		Invalidates the plugin discovery cache, if one is configured. Needs to be called whenever plugins get installed
+		or uninstalled through other means than a regular change of the Python environment.
+		"""
+		if self._discovery_cache is not None:
+			self._discovery_cache.invalidate()
+
 	def find_plugins(self, existing=None, ignore_uninstalled=True, incl_all_found=False):
 		added, found = self._find_plugins(existing=existing, ignore_uninstalled=ignore_uninstalled)
 		if incl_all_found:
@@ -665,6 +934,9 @@ class PluginManager(object):
 			except:
 				self.logger.exception("Error fetching plugins from entry points")
 
+		if self._discovery_cache is not None:
+			self._discovery_cache.save()
+
 		return result_added, result_found
 
 	def _find_plugins_from_folders(self, folders, existing, ignored_uninstalled=True):
@@ -731,20 +1003,82 @@ class PluginManager(object):
 		added = OrderedDict()
 		found = []
 
-		# let's make sure we have a current working set ...
-		working_set = pkg_resources.WorkingSet()
+		if not isinstance(groups, (list, tuple)):
+			groups = [groups]
+
+		for entry in self._get_entry_points(groups):
+			try:
+				group = entry["group"]
+				key = entry["name"]
+				module_name = entry["module_name"]
+				version = entry["version"]
+
+				found.append(key)
+				if key in existing or key in added or (ignore_uninstalled and key in self.marked_plugins["uninstalled"]):
+					# plugin is already defined or marked as uninstalled, ignore it
+					continue
+
+				kwargs = dict(module_name=module_name, version=version)
+				package_name = entry["package_name"]
+				if entry["metadata"] is not None:
+					kwargs.update(entry["metadata"])
+
+				plugin = self._import_plugin_from_module(key, **kwargs)
+				if plugin:
+					plugin.origin = EntryPointOrigin("entry_point", group, module_name, package_name, version)
+					plugin.enabled = False
+
+					# plugin is manageable if its location is writable and OctoPrint
+					# is either not running from a virtual env or the plugin is
+					# installed in that virtual env - the virtual env's pip will not
+					# allow us to uninstall stuff that is installed outside
+					# of the virtual env, so this check is necessary
+					plugin.managable = os.access(plugin.location, os.W_OK) \
+					                   and (not self._python_virtual_env
+					                        or is_sub_path_of(plugin.location, self._python_prefix)
+					                        or is_editable_install(self._python_install_dir,
+					                                               package_name,
+					                                               module_name,
+					                                               plugin.location))
+
+					added[key] = plugin
+			except:
+				self.logger.exception("Error processing entry point {!r} for group {}".format(entry, entry.get("group")))
+
+		return added, found
+
+	def _get_entry_points(self, groups):
+		"""
+		Returns a list of dicts describing all entry points registered for ``groups``, served from the discovery cache
+		if the Python environment didn't change since it was last populated.
+		"""
 
-		# ... including the user's site packages
 		import site
 		import sys
-		if site.ENABLE_USER_SITE:
-			if not site.USER_SITE in working_set.entries:
-				working_set.add_entry(site.USER_SITE)
-			if not site.USER_SITE in sys.path:
-				site.addsitedir(site.USER_SITE)
 
-		if not isinstance(groups, (list, tuple)):
-			groups = [groups]
+		# make sure the user's site packages are importable
+		if site.ENABLE_USER_SITE and not site.USER_SITE in sys.path:
+			site.addsitedir(site.USER_SITE)
+
+		fingerprint = None
+		if self._discovery_cache is not None:
+			paths = list(sys.path)
+			if site.ENABLE_USER_SITE and not site.USER_SITE in paths:
+				paths.append(site.USER_SITE)
+			fingerprint = PluginDiscoveryCache.fingerprint(paths)
+
+			cached = self._discovery_cache.get_entry_points(groups, fingerprint)
+			if cached is not None:
+				self.logger.debug("Using cached entry points for {}".format(", ".join(groups)))
+				return cached
+
+		# let's make sure we have a current working set ...
+		import pkg_resources
+		working_set = pkg_resources.WorkingSet()
+
+		# ... including the user's site packages
+		if site.ENABLE_USER_SITE and not site.USER_SITE in working_set.entries:
+			working_set.add_entry(site.USER_SITE)
 
 		def wrapped(gen):
 			# to protect against some issues in installed packages that make iteration over entry points
@@ -756,59 +1090,39 @@ class PluginManager(object):
 					self.logger.exception("Something went wrong while processing the entry points of a package in the "
 					                      "Python environment - broken entry_points.txt in some package?")
 
+		result = []
 		for group in groups:
 			for entry_point in wrapped(working_set.iter_entry_points(group=group, name=None)):
 				try:
-					key = entry_point.name
-					module_name = entry_point.module_name
-					version = entry_point.dist.version
+					entry = dict(group=group,
+					             name=entry_point.name,
+					             module_name=entry_point.module_name,
+					             version=entry_point.dist.version,
+					             package_name=entry_point.dist.project_name,
+					             metadata=None)
 
-					found.append(key)
-					if key in existing or key in added or (ignore_uninstalled and key in self.marked_plugins["uninstalled"]):
-						# plugin is already defined or marked as uninstalled, ignore it
-						continue
-
-					kwargs = dict(module_name=module_name, version=version)
-					package_name = entry_point.dist.project_name
 					try:
 						entry_point_metadata = EntryPointMetadata(entry_point)
 					except:
-						self.logger.exception("Something went wrong while retrieving metadata for module {}".format(module_name))
+						self.logger.exception("Something went wrong while retrieving metadata for module {}".format(entry_point.module_name))
 					else:
-						kwargs.update(dict(
-							name=entry_point_metadata.name,
-							summary=entry_point_metadata.summary,
-							author=entry_point_metadata.author,
-							url=entry_point_metadata.home_page,
-							license=entry_point_metadata.license
-						))
-
-					plugin = self._import_plugin_from_module(key, **kwargs)
-					if plugin:
-						plugin.origin = EntryPointOrigin("entry_point", group, module_name, package_name, version)
-						plugin.enabled = False
-
-						# plugin is manageable if its location is writable and OctoPrint
-						# is either not running from a virtual env or the plugin is
-						# installed in that virtual env - the virtual env's pip will not
-						# allow us to uninstall stuff that is installed outside
-						# of the virtual env, so this check is necessary
-						plugin.managable = os.access(plugin.location, os.W_OK) \
-						                   and (not self._python_virtual_env
-						                        or is_sub_path_of(plugin.location, self._python_prefix)
-						                        or is_editable_install(self._python_install_dir,
-						                                               package_name,
-						                                               module_name,
-						                                               plugin.location))
-
-						added[key] = plugin
+						entry["metadata"] = dict(name=entry_point_metadata.name,
+						                         summary=entry_point_metadata.summary,
+						                         author=entry_point_metadata.author,
+						                         url=entry_point_metadata.home_page,
+						                         license=entry_point_metadata.license)
+
+					result.append(entry)
 				except:
 					self.logger.exception("Error processing entry point {!r} for group {}".format(entry_point, group))
 
-		return added, found
+		if self._discovery_cache is not None:
+			self._discovery_cache.set_entry_points(groups, fingerprint, result)
+
+		return result
 
 	def _import_plugin_from_module(self, key, folder=None, module_name=None, name=None, version=None, summary=None,
-	                               author=None, url=None, license=None, bundled=False):
+	                               author=None, url=None, license=None, bundled=False, lazy=True):
 		# TODO error handling
 		try:
 			if folder:
@@ -823,7 +1137,7 @@ class PluginManager(object):
 
 		# Create a simple dummy entry first ...
 		plugin = PluginInfo(key, module[1], None, name=name, version=version, description=summary, author=author,
-		                    url=url, license=license)
+		                    url=url, license=license, parsed_metadata=self._get_cached_metadata(key, module[1]))
 		plugin.bundled = bundled
 
 		if self._is_plugin_disabled(key):
@@ -837,14 +1151,125 @@ class PluginManager(object):
 		if not plugin.validate("before_import", additional_validators=self.plugin_validators):
 			return plugin
 
+		provides = self._get_lazy_provides(plugin) if lazy else None
+		if provides is not None:
+			# the plugin told us what it provides, we'll only import it once any of that is actually needed
+			if module[0]:
+				module[0].close()
+
+			plugin.lazy = True
+			plugin.lazy_hooks = dict((hook, LazyPluginHook(self, key, hook)) for hook in provides["hooks"])
+			plugin.lazy_mixins = provides["mixins"]
+			plugin.lazy_import = lambda: self._import_plugin_from_module(key, folder=folder, module_name=module_name,
+			                                                             name=name, version=version, summary=summary,
+			                                                             author=author, url=url, license=license,
+			                                                             bundled=bundled, lazy=False)
+			self.logger.debug("Deferring import of plugin {} until first use".format(key))
+			return plugin
+
 		# ... then create and return the real one
 		return self._import_plugin(key, *module,
 		                           name=name, version=version, summary=summary, author=author, url=url,
 		                           license=license, bundled=bundled, parsed_metadata=plugin.parsed_metadata)
 
+	def _get_lazy_provides(self, plugin):
+		provides = plugin.provides
+		if provides is None:
+			return None
+
+		if not isinstance(provides, dict) \
+				or not all(isinstance(provides.get(key, []), (list, tuple, set, frozenset)) for key in ("hooks", "mixins")):
+			self.logger.warn("Plugin {} has an invalid {}, importing it right away".format(plugin.key,
+			                                                                             PluginInfo.attr_provides))
+			return None
+
+		return dict(hooks=list(provides.get("hooks", [])),
+		            mixins=list(provides.get("mixins", [])))
+
+	def _realize_lazy_plugin(self, name):
+		"""
+		Imports the lazy plugin ``name`` and brings it into the state its placeholder is in, replacing the
+		placeholders of its hooks with the real handlers.
+
+		Returns:
+		    PluginInfo: The plugin, or None if it couldn't be imported
+		"""
+		with self._lazy_lock:
+			plugin = self.plugins.get(name)
+			if plugin is None or not plugin.lazy:
+				return plugin
+
+			self.logger.info("Importing plugin {} on first use".format(name))
+
+			enabled = name in self.enabled_plugins
+			if enabled:
+				self._deactivate_plugin(name, plugin)
+
+			imported = plugin.lazy_import()
+
+			plugin.lazy = False
+			plugin.lazy_hooks = None
+			plugin.lazy_mixins = None
+			plugin.lazy_import = None
+
+			if imported is None or imported.instance is None:
+				self.logger.error("Plugin {} could not be imported, disabling it".format(name))
+				if enabled:
+					del self.enabled_plugins[name]
+					self.disabled_plugins[name] = plugin
+					plugin.enabled = False
+				return None
+
+			plugin.instance = imported.instance
+
+			try:
+				if plugin.loaded and plugin.validate("before_load", additional_validators=self.plugin_validators):
+					start = time.time()
+					plugin.load()
+					self.on_plugin_timing(name, "load", time.time() - start)
+
+					plugin.validate("after_load", additional_validators=self.plugin_validators)
+
+				if enabled:
+					plugin.enable()
+					self._activate_plugin(name, plugin)
+
+					if plugin.implementation:
+						if self._implementations_initialized:
+							self.initialize_implementation_of_plugin(name, plugin)
+						plugin.implementation.on_plugin_enabled()
+			except:
+				self.logger.exception("Error while bringing up plugin {} after importing it".format(name))
+
+			return plugin
+
+	def _realize_lazy_plugins_for(self, types):
+		mixins = set(t.__name__ for t in types)
+		for name, plugin in list(self.enabled_plugins.items()):
+			if plugin.lazy and mixins.intersection(plugin.lazy_mixins):
+				self._realize_lazy_plugin(name)
+
+	def _get_cached_metadata(self, key, location):
+		if self._discovery_cache is None:
+			return None
+
+		info = PluginInfo(key, location, None)
+		path = info.metadata_source
+		if path is None:
+			return None
+
+		metadata = self._discovery_cache.get_parsed_metadata(path)
+		if metadata is None:
+			metadata = info.parsed_metadata
+			self._discovery_cache.set_parsed_metadata(path, metadata)
+		return metadata
+
 	def _import_plugin(self, key, f, filename, description, name=None, version=None, summary=None, author=None, url=None, license=None, bundled=False, parsed_metadata=None):
 		try:
+			start = time.time()
 			instance = imp.load_module(key, f, filename, description)
+			self.on_plugin_timing(key, "import", time.time() - start)
+
 			plugin = PluginInfo(key, filename, instance,
 			                    name=name,
 			                    version=version,
@@ -977,7 +1402,10 @@ class PluginManager(object):
 			if not plugin.validate("before_load", additional_validators=self.plugin_validators):
 				return
 
+			start = time.time()
 			plugin.load()
+			self.on_plugin_timing(name, "load", time.time() - start)
+
 			plugin.validate("after_load", additional_validators=self.plugin_validators)
 			self.on_plugin_loaded(name, plugin)
 			plugin.loaded = True
@@ -1271,6 +1699,7 @@ class PluginManager(object):
 			                                         additional_pre_inits=additional_pre_inits,
 			                                         additional_post_inits=additional_post_inits)
 
+		self._implementations_initialized = True
 		self.logger.info("Initialized {count} plugin implementation(s)".format(count=len(self.plugin_implementations)))
 
 	def initialize_implementation_of_plugin(self, name, plugin, additional_injects=None, additional_inject_factories=None, additional_pre_inits=None, additional_post_inits=None):
@@ -1305,6 +1734,7 @@ class PluginManager(object):
 		post_inits = self.implementation_post_inits
 		post_inits += additional_post_inits
 
+		start = time.time()
 		try:
 			kwargs = dict(injects)
 
@@ -1354,6 +1784,8 @@ class PluginManager(object):
 				return False
 		else:
 			self.on_plugin_implementations_initialized(name, plugin)
+		finally:
+			self.on_plugin_timing(name, "initialize", time.time() - start)
 
 		self.logger.debug("Initialized plugin mixin implementation for plugin {name}".format(**locals()))
 		return True
@@ -1400,6 +1832,10 @@ class PluginManager(object):
 
 		plugin_info = self.get_plugin_info(identifier, require_enabled=require_enabled)
 		if plugin_info is not None:
+			if plugin_info.lazy:
+				plugin_info = self._realize_lazy_plugin(identifier)
+				if plugin_info is None:
+					return None
 			return plugin_info.instance
 		return None
 
@@ -1456,6 +1892,9 @@ class PluginManager(object):
 
 		sorting_context = kwargs.get("sorting_context", None)
 
+		# import any lazy plugins that declared to provide the requested types first
+		self._realize_lazy_plugins_for(types)
+
 		result = None
 
 		for t in types:
@@ -1523,6 +1962,11 @@ class PluginManager(object):
 			return None
 		plugin = self.enabled_plugins[name]
 
+		if plugin.lazy:
+			plugin = self._realize_lazy_plugin(name)
+			if plugin is None:
+				return None
+
 		all_helpers = plugin.helpers
 		if len(helpers):
 			return dict((k, v) for (k, v) in all_helpers.items() if k in helpers)
@@ -1624,6 +2068,35 @@ def is_editable_install(install_dir, package, module, location):
 	return False
 
 
+class LazyPluginHook(object):
+	"""
+	Placeholder registered for a hook declared by a plugin that has not been imported yet. Imports the plugin on its
+	first call and forwards the call to the plugin's actual hook handler.
+	"""
+
+	def __init__(self, plugin_manager, name, hook):
+		self._plugin_manager = plugin_manager
+		self._name = name
+		self._hook = hook
+
+	def __call__(self, *args, **kwargs):
+		plugin = self._plugin_manager._realize_lazy_plugin(self._name)
+		if plugin is None:
+			return None
+
+		definition = plugin.get_hook(self._hook)
+		if definition is None:
+			logging.getLogger(__name__).warn("Plugin {} declared to provide hook {} but doesn't".format(self._name,
+			                                                                                       self._hook))
+			return None
+
+		callback, _ = self._plugin_manager._get_callback_and_order(definition)
+		return callback(*args, **kwargs)
+
+	def __repr__(self):
+		return "LazyPluginHook({!r}, {!r})".format(self._name, self._hook)
+
+
 class EntryPointMetadata(pkginfo.Distribution):
 	def __init__(self, entry_point):
 		self.entry_point = entry_point
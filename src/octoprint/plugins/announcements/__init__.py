@@ -23,6 +23,7 @@ from collections import OrderedDict
 from octoprint.server import admin_permission
 from octoprint.server.util.flask import restricted_access, with_revalidation_checking, check_etag
 from octoprint.util import utmify
+from octoprint.util.upstream_cache import upstream_cache
 from flask_babel import gettext
 from octoprint import __version__ as OCTOPRINT_VERSION
 
@@ -316,8 +317,14 @@ class AnnouncementPlugin(octoprint.plugin.AssetPlugin,
 			data = self._get_channel_data_from_cache(key, config)
 
 		if data is None:
-			# cache not allowed or empty, fetch from network
-			if self._connectivity_checker.online:
+			# cache not allowed or empty, see if the upstream cache has it
+			data = self._get_channel_data_from_upstream_cache(key, config)
+
+		if data is None:
+			# nothing there either, fetch from network
+			if not upstream_cache().may_fetch_directly:
+				self._logger.info("Announcements for channel {} are not available from the upstream cache and fetching them directly is disabled".format(key))
+			elif self._connectivity_checker.online:
 				data = self._get_channel_data_from_network(key, config)
 			else:
 				self._logger.info("Looks like we are offline, can't fetch announcements for channel {} from network".format(key))
@@ -344,6 +351,18 @@ class AnnouncementPlugin(octoprint.plugin.AssetPlugin,
 
 		return None
 
+	def _get_channel_data_from_upstream_cache(self, key, config):
+		"""Fetch channel feed from upstream cache."""
+
+		response = upstream_cache().get(self._get_channel_upstream_cache_key(key), config["url"])
+		if response is None:
+			return None
+
+		channel_path = self._get_channel_cache_path(key)
+		with codecs.open(channel_path, mode="w", encoding="utf-8") as f:
+			f.write(response)
+		return feedparser.parse(response)
+
 	def _get_channel_data_from_network(self, key, config):
 		"""Fetch channel feed from network."""
 
@@ -361,6 +380,8 @@ class AnnouncementPlugin(octoprint.plugin.AssetPlugin,
 			return None
 
 		response = r.text
+		upstream_cache().publish(self._get_channel_upstream_cache_key(key), url, response, r.headers.get("Content-Type"))
+
 		channel_path = self._get_channel_cache_path(key)
 		with codecs.open(channel_path, mode="w", encoding="utf-8") as f:
 			f.write(response)
@@ -409,6 +430,11 @@ class AnnouncementPlugin(octoprint.plugin.AssetPlugin,
 		safe_key = self._slugify(key)
 		return os.path.join(self.get_plugin_data_folder(), "{}.cache".format(safe_key))
 
+	def _get_channel_upstream_cache_key(self, key):
+		"""Retrieve upstream cache key for channel key."""
+
+		return "announcements.channel.{}".format(self._slugify(key))
+
 
 _image_tag_re = re.compile(r'<img.*?/?>')
 def _strip_images(text):
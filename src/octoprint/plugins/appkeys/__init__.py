@@ -13,6 +13,7 @@ from flask_babel import gettext
 
 import octoprint.plugin
 from octoprint.settings import valid_boolean_trues
+from octoprint.server.util import invalidate_user_for_apikey
 from octoprint.server.util.flask import restricted_access, no_firstrun_access
 from octoprint.server import NO_CONTENT, current_user, admin_permission
 from octoprint.util import atomic_write, monotonic_time, ResettableTimer
@@ -87,6 +88,7 @@ class AppKeysPlugin(octoprint.plugin.AssetPlugin,
 		self._ready_lock = threading.RLock()
 
 		self._keys = defaultdict(list)
+		self._keys_by_api_key = dict()
 		self._keys_lock = threading.RLock()
 
 		self._key_path = None
@@ -330,21 +332,27 @@ class AppKeysPlugin(octoprint.plugin.AssetPlugin,
 
 			key = ActiveKey(app_name, self._generate_key(), user_id)
 			self._keys[user_id].append(key)
+			self._keys_by_api_key[key.api_key] = key
 			self._save_keys()
 			return key.api_key
 
 	def _delete_api_key(self, api_key):
 		with self._keys_lock:
-			for user_id, data in self._keys.items():
-				self._keys[user_id] = filter(lambda x: x.api_key != api_key, data)
+			key = self._keys_by_api_key.pop(api_key, None)
+			if key is None:
+				return
+
+			self._keys[key.user_id] = filter(lambda x: x.api_key != api_key, self._keys[key.user_id])
 			self._save_keys()
 
+		invalidate_user_for_apikey(api_key)
+
 	def _user_for_api_key(self, api_key):
-		with self._keys_lock:
-			for user_id, data in self._keys.items():
-				if filter(lambda x: x.api_key == api_key, data):
-					return self._user_manager.findUser(userid=user_id)
-		return None
+		# plain dict lookup, no need to hold the lock - the index only ever gets swapped or updated atomically
+		key = self._keys_by_api_key.get(api_key)
+		if key is None:
+			return None
+		return self._user_manager.findUser(userid=key.user_id)
 
 	def _api_keys_for_user(self, user_id):
 		with self._keys_lock:
@@ -379,6 +387,7 @@ class AppKeysPlugin(octoprint.plugin.AssetPlugin,
 			for user_id, persisted_keys in persisted.items():
 				keys[user_id] = [ActiveKey.for_internal(x, user_id) for x in persisted_keys]
 			self._keys = keys
+			self._keys_by_api_key = dict((key.api_key, key) for data in keys.values() for key in data)
 
 	def _save_keys(self):
 		with self._keys_lock:
@@ -6,11 +6,11 @@ __copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms
 
 import octoprint.plugin
 
-from octoprint.settings import default_settings
+from octoprint.settings import default_settings, valid_boolean_trues
 from octoprint.plugin.core import FolderOrigin
 from octoprint.server import admin_permission, NO_CONTENT
 from octoprint.server.util.flask import restricted_access
-from octoprint.util import is_hidden_path
+from octoprint.util import is_hidden_path, monotonic_time
 from octoprint.util.version import get_octoprint_version_string, get_octoprint_version, get_comparable_version, is_octoprint_compatible
 from octoprint.util.platform import is_os_compatible
 from octoprint.util.pip import LocalPipCaller
@@ -30,6 +30,7 @@ from flask_babel import gettext
 
 import codecs
 import flask
+import io
 import logging
 import os
 import requests
@@ -43,9 +44,22 @@ import json
 import sys
 import traceback
 
+from collections import OrderedDict
+
 
 UNKNOWN_PLUGINS_FILE = "unknown_plugins_from_restore.json"
 
+METADATA_FILE = "metadata.json"
+MANIFEST_FILE = "manifest.json"
+PLUGIN_LIST_FILE = "plugin_list.json"
+
+CHUNK_SIZE = 64 * 1024
+
+UNCOMPRESSED_EXTENSIONS = (".gz", ".tgz", ".bz2", ".xz", ".zip", ".7z", ".whl",
+                           ".jpg", ".jpeg", ".png", ".gif", ".webp",
+                           ".mp4", ".mpg", ".mpeg", ".m4v", ".mkv", ".avi", ".webm", ".flv")
+"""Extensions of already compressed formats, files with these get stored in backups without recompression."""
+
 
 class BackupPlugin(octoprint.plugin.SettingsPlugin,
                    octoprint.plugin.TemplatePlugin,
@@ -60,6 +74,13 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 		self._in_progress = []
 		self._in_progress_lock = threading.RLock()
 
+	##~~ SettingsPlugin
+
+	def get_settings_defaults(self):
+		return dict(workers=2,
+		            io_limit=0,
+		            defer_while_printing=True)
+
 	##~~ StarupPlugin
 
 	def on_after_startup(self):
@@ -121,6 +142,7 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 
 		data = flask.request.json
 		exclude = data.get("exclude", [])
+		incremental = data.get("incremental", False) in valid_boolean_trues
 
 		def on_backup_start(name, temporary_path, exclude):
 			self._logger.info(u"Creating backup zip at {} (excluded: {})...".format(temporary_path,
@@ -149,15 +171,37 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 			                                                       error=u"{}".format(exc_info[1])))
 			self._logger.error(u"Error while creating backup zip", exc_info=exc_info)
 
+		def on_backup_paused(paused):
+			if paused:
+				self._logger.info(u"Pausing creation of backup {} while printing...".format(backup_file))
+			else:
+				self._logger.info(u"... resuming creation of backup {}".format(backup_file))
+			self._send_client_message("backup_paused", payload=dict(name=backup_file,
+			                                                        paused=paused))
+
+		def on_progress(progress):
+			progress["name"] = backup_file
+			self._send_client_message("backup_progress", payload=progress)
+
+		pause = None
+		if self._settings.get_boolean(["defer_while_printing"]):
+			pause = self._printer.is_printing
+
 		thread = threading.Thread(target=self._create_backup,
 		                          args=(backup_file,),
 		                          kwargs=dict(exclude=exclude,
+		                                      incremental=incremental,
 		                                      settings=self._settings,
 		                                      plugin_manager=self._plugin_manager,
 		                                      datafolder=self.get_plugin_data_folder(),
+		                                      workers=self._settings.get_int(["workers"]),
+		                                      throttle=self._get_throttle(self._settings,
+		                                                                  pause=pause,
+		                                                                  on_pause=on_backup_paused),
 		                                      on_backup_start=on_backup_start,
 		                                      on_backup_done=on_backup_done,
-		                                      on_backup_error=on_backup_error))
+		                                      on_backup_error=on_backup_error,
+		                                      on_progress=on_progress))
 		thread.daemon = True
 		thread.start()
 
@@ -175,6 +219,11 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 		if full_path.startswith(backup_folder) \
 			and os.path.exists(full_path) \
 			and not is_hidden_path(full_path):
+			dependents = self._get_dependent_backups(backup_folder, filename)
+			if dependents:
+				return flask.make_response(u"Backup {} is still needed by incremental backup(s) {}, delete those "
+				                           u"first".format(filename, u", ".join(dependents)), 409)
+
 			try:
 				os.remove(full_path)
 			except:
@@ -193,8 +242,12 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 		input_upload_path = input_name + "." + self._settings.global_get(["server", "uploads", "pathSuffix"])
 
 		if input_upload_path in flask.request.values:
-			# file to restore was uploaded
-			path = flask.request.values[input_upload_path]
+			# file to restore was uploaded, take it over before it gets cleaned up with the request
+			archive = tempfile.NamedTemporaryFile(delete=False)
+			archive.close()
+			shutil.move(flask.request.values[input_upload_path], archive.name)
+			path = archive.name
+			remove = True
 
 		elif flask.request.json and "path" in flask.request.json:
 			# existing backup is supposed to be restored
@@ -205,6 +258,9 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 				or is_hidden_path(path):
 				return flask.abort(404)
 
+			# existing backups are read in place and kept
+			remove = False
+
 		else:
 			return flask.make_response(u"Invalid request, neither a file nor a path of a file to restore provided", 400)
 
@@ -271,10 +327,8 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 		def on_invalid_backup(line):
 			on_log_error(line)
 
-		archive = tempfile.NamedTemporaryFile(delete=False)
-		archive.close()
-		shutil.copy(path, archive.name)
-		path = archive.name
+		def on_progress(progress):
+			self._send_client_message("restore_progress", payload=progress)
 
 		# noinspection PyTypeChecker
 		thread = threading.Thread(target=self._restore_backup,
@@ -289,7 +343,11 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 		                                      on_log_error=on_log_error,
 		                                      on_restore_start=on_restore_start,
 		                                      on_restore_done=on_restore_done,
-		                                      on_restore_failed=on_restore_failed))
+		                                      on_restore_failed=on_restore_failed,
+		                                      on_progress=on_progress,
+		                                      workers=self._settings.get_int(["workers"]),
+		                                      throttle=self._get_throttle(self._settings),
+		                                      remove=remove))
 		thread.daemon = True
 		thread.start()
 
@@ -299,7 +357,7 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 
 	def route_hook(self, *args, **kwargs):
 		from octoprint.server.util.tornado import LargeResponseHandler, path_validation_factory
-		from octoprint.util import is_hidden_path
+		from octoprint.util import is_hidden_path, monotonic_time
 		from octoprint.server import app
 		from octoprint.server.util.tornado import access_validation_factory
 		from octoprint.server.util.flask import admin_validator
@@ -325,7 +383,9 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 		@click.option("--exclude", multiple=True,
 		              help="Identifiers of data folders to exclude, e.g. 'uploads' to exclude uploads or "
 		                   "'timelapse' to exclude timelapses.")
-		def backup_command(exclude):
+		@click.option("--incremental", is_flag=True,
+		              help="Only store files that changed since the most recent backup and reference that for the rest.")
+		def backup_command(exclude, incremental):
 			"""
 			Creates a new backup.
 			"""
@@ -340,9 +400,13 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 			click.echo("Creating backup at {}, please wait...".format(backup_file))
 			self._create_backup(backup_file,
 			                    exclude=exclude,
+			                    incremental=incremental,
 			                    settings=settings,
 			                    plugin_manager=cli_group.plugin_manager,
-			                    datafolder=datafolder)
+			                    datafolder=datafolder,
+			                    workers=settings.get_int(["workers"]),
+			                    throttle=self._get_throttle(settings),
+			                    on_progress=self._cli_progress_echo(click.echo))
 			click.echo("Done.")
 
 		@click.command("restore")
@@ -377,11 +441,6 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 				click.echo(u"Backup {} does not exist".format(path), err=True)
 				sys.exit(-1)
 
-			archive = tempfile.NamedTemporaryFile(delete=False)
-			archive.close()
-			shutil.copy(path, archive.name)
-			path = archive.name
-
 			def on_install_plugins(plugins):
 				if not plugins:
 					return
@@ -442,7 +501,11 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 			                        on_report_unknown_plugins=on_report_unknown_plugins,
 			                        on_log_progress=on_log_progress,
 			                        on_log_error=on_log_error,
-			                        on_invalid_backup=on_log_error):
+			                        on_invalid_backup=on_log_error,
+			                        on_progress=self._cli_progress_echo(click.echo),
+			                        workers=settings.get_int(["workers"]),
+			                        throttle=self._get_throttle(settings),
+			                        remove=False):
 				click.echo(u"Restored from {}".format(path))
 			else:
 				click.echo(u"Restoring from {} failed".format(path), err=True)
@@ -451,6 +514,23 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 
 	##~~ helpers
 
+	@classmethod
+	def _get_throttle(cls, settings, pause=None, on_pause=None):
+		io_limit = settings.get_int(["io_limit"])
+		if io_limit is None or io_limit < 0:
+			io_limit = 0
+		return IOThrottle(limit=io_limit * 1024, pause=pause, on_pause=on_pause)
+
+	@classmethod
+	def _cli_progress_echo(cls, echo):
+		def on_progress(progress):
+			if not progress["total"]:
+				return
+			echo(u"{}: {:.0f}% ({:.1f} MB/s)".format(progress["phase"].capitalize(),
+			                                         progress["done"] * 100 / progress["total"],
+			                                         progress["throughput"] / 1024 / 1024))
+		return on_progress
+
 	def _get_backups(self):
 		backups = []
 		for entry in scandir(self.get_plugin_data_folder()):
@@ -461,9 +541,15 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 			if not entry.name.endswith(".zip"):
 				continue
 
+			metadata = self._get_backup_metadata(entry.path)
+			if metadata is None:
+				metadata = dict()
+
 			backups.append(dict(name=entry.name,
 			                    date=entry.stat().st_mtime,
 			                    size=entry.stat().st_size,
+			                    incremental=metadata.get("incremental", False),
+			                    base=metadata.get("base"),
 			                    url=flask.url_for("index") + "plugin/backup/download/" + entry.name))
 		return backups
 
@@ -514,14 +600,350 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 			thread.start()
 
 	@classmethod
-	def _get_disk_size(cls, path):
-		total = 0
-		for entry in scandir(path):
-			if entry.is_dir():
-				total += cls._get_disk_size(entry.path)
-			elif entry.is_file():
-				total += entry.stat().st_size
-		return total
+	def _get_backup_metadata(cls, path):
+		return cls._read_json_from_backup(path, METADATA_FILE)
+
+	@classmethod
+	def _get_backup_manifest(cls, path):
+		return cls._read_json_from_backup(path, MANIFEST_FILE)
+
+	@classmethod
+	def _read_json_from_backup(cls, path, member):
+		try:
+			with zipfile.ZipFile(path, "r") as zip:
+				if not member in zip.namelist():
+					return None
+				return json.loads(zip.read(member))
+		except:
+			logging.getLogger(__name__).exception(u"Error while reading {} from backup {}".format(member, path))
+			return None
+
+	@classmethod
+	def _get_existing_backups(cls, datafolder):
+		"""Names of the backups in ``datafolder``, newest first."""
+		if not os.path.isdir(datafolder):
+			return []
+
+		entries = []
+		for entry in scandir(datafolder):
+			if is_hidden_path(entry.path) or not entry.is_file() or not entry.name.endswith(".zip"):
+				continue
+			entries.append((entry.stat().st_mtime, entry.name))
+		return [name for _, name in sorted(entries, reverse=True)]
+
+	@classmethod
+	def _find_base_backup(cls, datafolder):
+		"""
+		Finds the most recent backup in ``datafolder`` with a manifest to base an incremental backup on.
+
+		Returns a tuple of the backup's name and its manifest, or ``(None, {})`` if there is no such backup.
+		"""
+		for name in cls._get_existing_backups(datafolder):
+			manifest = cls._get_backup_manifest(os.path.join(datafolder, name))
+			if manifest is not None:
+				return name, manifest
+		return None, dict()
+
+	@classmethod
+	def _get_dependent_backups(cls, datafolder, name):
+		"""Names of the incremental backups in ``datafolder`` that reference data stored in backup ``name``."""
+		dependents = []
+		for other in cls._get_existing_backups(datafolder):
+			if other == name:
+				continue
+			metadata = cls._get_backup_metadata(os.path.join(datafolder, other))
+			if metadata and name in metadata.get("references", []):
+				dependents.append(other)
+		return dependents
+
+	@classmethod
+	def _collect_backup_files(cls, settings, exclude, ignored):
+		"""
+		Collects the files to back up as ordered mapping of archive name to a tuple of path and stat result.
+		"""
+		configfile = settings._configfile
+		basedir = settings._basedir
+
+		files = OrderedDict()
+
+		def collect(source, target, ignored=None):
+			if ignored is None:
+				ignored = []
+
+			if source in ignored:
+				return
+
+			if os.path.isdir(source):
+				for entry in scandir(source):
+					collect(entry.path, os.path.join(target, entry.name), ignored=ignored)
+			elif os.path.isfile(source) and not target in files:
+				files[target] = (source, os.stat(source))
+
+		# current config file
+		collect(configfile, "basedir/config.yaml", ignored=ignored)
+
+		# configured folder paths
+		for folder in default_settings["folder"].keys():
+			if folder in exclude:
+				continue
+
+			if folder in ("generated", "logs", "watched",):
+				continue
+
+			collect(settings.global_get_basefolder(folder),
+			        "basedir/" + folder.replace("_", "/"),
+			        ignored=ignored)
+
+		# anything else that might be lying around in our basedir
+		defaults = [os.path.join(basedir, "config.yaml"),] + \
+		           [os.path.join(basedir, folder) for folder in default_settings["folder"].keys()]
+		collect(basedir, "basedir", ignored=defaults + ignored)
+
+		return files
+
+	@classmethod
+	def _hash_files(cls, files, workers=1, throttle=None, progress=None):
+		"""
+		Hashes ``files``, a list of tuples of archive name, path and size, using ``workers`` threads.
+
+		Returns a dict mapping the archive names to the results of :meth:`_hash_file`.
+		"""
+		if not files:
+			return dict()
+
+		def hash_file(entry):
+			arcname, path, _ = entry
+			return arcname, cls._hash_file(path, throttle=throttle, progress=progress)
+
+		if workers <= 1 or len(files) == 1:
+			return dict(map(hash_file, files))
+
+		import concurrent.futures
+		with concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(files))) as executor:
+			return dict(executor.map(hash_file, files))
+
+	@classmethod
+	def _hash_file(cls, path, throttle=None, progress=None):
+		"""
+		Returns the SHA1 of the file at ``path``.
+		"""
+		import hashlib
+
+		sha1 = hashlib.sha1()
+		with io.open(path, "rb") as f:
+			for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+				sha1.update(chunk)
+
+				if throttle is not None:
+					throttle.consume(len(chunk))
+				if progress is not None:
+					progress.update(len(chunk))
+		return sha1.hexdigest()
+
+	@classmethod
+	def _write_files(cls, zip, files, compression=zipfile.ZIP_DEFLATED, workers=1, buffer_folder=None,
+	                 throttle=None, progress=None):
+		"""
+		Stores ``files``, a list of tuples of archive name and path, in the ``zip`` opened for writing.
+
+		Returns a dict mapping the archive names to SHA1 and size of the stored data, see :meth:`_write_file`.
+
+		With more than one worker, members get compressed by ``workers`` threads in parallel into temporary buffers
+		(in memory or in ``buffer_folder`` for larger files) which then get appended to the archive in order. At
+		most ``workers`` members are buffered at any time.
+		"""
+		result = dict()
+		if not files:
+			return result
+
+		if workers <= 1 or len(files) == 1:
+			for arcname, path in files:
+				result[arcname] = cls._write_file(zip, path, arcname,
+				                                  compress_type=cls._compress_type(arcname, compression),
+				                                  throttle=throttle,
+				                                  progress=progress)
+			return result
+
+		def compress(entry):
+			arcname, path = entry
+			buffer = tempfile.SpooledTemporaryFile(max_size=16 * CHUNK_SIZE, dir=buffer_folder)
+			try:
+				zinfo, sha1 = cls._compress_file(path, arcname, buffer,
+				                                 compress_type=cls._compress_type(arcname, compression),
+				                                 throttle=throttle,
+				                                 progress=progress)
+			except:
+				buffer.close()
+				raise
+			return zinfo, sha1, buffer
+
+		import collections
+		import concurrent.futures
+
+		pending = collections.deque()
+		remaining = iter(files)
+		with concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(files))) as executor:
+			try:
+				for entry in remaining:
+					pending.append(executor.submit(compress, entry))
+					if len(pending) >= workers:
+						break
+
+				while pending:
+					zinfo, sha1, buffer = pending.popleft().result()
+					try:
+						cls._append_member(zip, zinfo, buffer)
+					finally:
+						buffer.close()
+					result[zinfo.filename] = (sha1, zinfo.file_size)
+
+					for entry in remaining:
+						pending.append(executor.submit(compress, entry))
+						break
+			except:
+				for future in pending:
+					if not future.cancel() and not future.exception():
+						future.result()[2].close()
+				raise
+
+		return result
+
+	@classmethod
+	def _compress_type(cls, arcname, compression):
+		# files in already compressed formats don't benefit from being deflated again
+		if arcname.lower().endswith(UNCOMPRESSED_EXTENSIONS):
+			return zipfile.ZIP_STORED
+		return compression
+
+	@classmethod
+	def _write_file(cls, zip, path, arcname, compress_type=None, throttle=None, progress=None):
+		"""
+		Stores the file at ``path`` as ``arcname`` in the ``zip`` opened for writing and returns the SHA1 and size of
+		the stored data.
+
+		The data is hashed while it gets written, so the result matches what ends up in the archive even if the file
+		changes in the meantime. Python 2's ``zipfile`` has no API for streaming data into a member, so this mirrors
+		``ZipFile.write``.
+		"""
+		with io.open(path, "rb") as f:
+			zinfo, chunk = cls._member_info(f, path, arcname, compress_type if compress_type is not None else zip.compression)
+			zinfo.header_offset = zip.fp.tell()
+
+			zip._writecheck(zinfo)
+			zip._didModify = True
+
+			# CRC and sizes get written again once known
+			zip64 = zip._allowZip64 and zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+			zip.fp.write(zinfo.FileHeader(zip64))
+
+			sha1 = cls._copy_member(f, chunk, zinfo, zip.fp, throttle=throttle, progress=progress)
+
+		if not zip64 and zip._allowZip64 and max(zinfo.file_size, zinfo.compress_size) > zipfile.ZIP64_LIMIT:
+			raise RuntimeError("File size has increased during compressing")
+
+		position = zip.fp.tell()
+		zip.fp.seek(zinfo.header_offset, 0)
+		zip.fp.write(zinfo.FileHeader(zip64))
+		zip.fp.seek(position, 0)
+
+		zip.filelist.append(zinfo)
+		zip.NameToInfo[zinfo.filename] = zinfo
+
+		return sha1, zinfo.file_size
+
+	@classmethod
+	def _compress_file(cls, path, arcname, output, compress_type=zipfile.ZIP_DEFLATED, throttle=None, progress=None):
+		"""
+		Writes the member data of the file at ``path`` for storing it as ``arcname`` to ``output``.
+
+		Returns the ``ZipInfo`` of the member and the SHA1 of the data, the member can then be added to an archive
+		with :meth:`_append_member`.
+		"""
+		with io.open(path, "rb") as f:
+			zinfo, chunk = cls._member_info(f, path, arcname, compress_type)
+			sha1 = cls._copy_member(f, chunk, zinfo, output, throttle=throttle, progress=progress)
+		return zinfo, sha1
+
+	@classmethod
+	def _append_member(cls, zip, zinfo, data):
+		"""Appends the member ``zinfo`` with its data prepared by :meth:`_compress_file` in ``data`` to ``zip``."""
+		zinfo.header_offset = zip.fp.tell()
+
+		zip._writecheck(zinfo)
+		zip._didModify = True
+
+		zip.fp.write(zinfo.FileHeader(zip._allowZip64 and max(zinfo.file_size, zinfo.compress_size) > zipfile.ZIP64_LIMIT))
+
+		data.seek(0)
+		shutil.copyfileobj(data, zip.fp, CHUNK_SIZE)
+
+		zip.filelist.append(zinfo)
+		zip.NameToInfo[zinfo.filename] = zinfo
+
+	@classmethod
+	def _member_info(cls, f, path, arcname, compress_type):
+		"""
+		Creates the ``ZipInfo`` for storing the file ``f`` opened from ``path`` as ``arcname``.
+
+		Returns it together with the first chunk of the file, which was read to detect gzip compressed data. That
+		doesn't benefit from being deflated again and is stored as is.
+		"""
+		from octoprint.util.compression import GZIP_MAGIC
+
+		st = os.fstat(f.fileno())
+		chunk = f.read(CHUNK_SIZE)
+
+		zinfo = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[0:6])
+		zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+		zinfo.compress_type = zipfile.ZIP_STORED if chunk.startswith(GZIP_MAGIC) else compress_type
+		zinfo.file_size = st.st_size
+		zinfo.flag_bits = 0x00
+		zinfo.CRC = 0
+		zinfo.compress_size = 0
+		return zinfo, chunk
+
+	@classmethod
+	def _copy_member(cls, f, chunk, zinfo, output, throttle=None, progress=None):
+		"""
+		Writes the data of ``f``, starting with the already read ``chunk``, compressed according to ``zinfo`` to
+		``output``, updates CRC and sizes of ``zinfo`` accordingly and returns the SHA1 of the data.
+		"""
+		import hashlib
+
+		if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+			compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+		else:
+			compressor = None
+
+		sha1 = hashlib.sha1()
+		crc = 0
+		file_size = 0
+		compress_size = 0
+		while chunk:
+			sha1.update(chunk)
+			crc = zipfile.crc32(chunk, crc) & 0xffffffff
+			file_size += len(chunk)
+
+			data = compressor.compress(chunk) if compressor is not None else chunk
+			compress_size += len(data)
+			output.write(data)
+
+			if throttle is not None:
+				throttle.consume(len(chunk))
+			if progress is not None:
+				progress.update(len(chunk))
+
+			chunk = f.read(CHUNK_SIZE)
+
+		if compressor is not None:
+			data = compressor.flush()
+			compress_size += len(data)
+			output.write(data)
+
+		zinfo.CRC = crc
+		zinfo.file_size = file_size
+		zinfo.compress_size = compress_size
+		return sha1.hexdigest()
 
 	@classmethod
 	def _free_space(cls, path, size):
@@ -589,71 +1011,137 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 	@classmethod
 	def _create_backup(cls, name,
 	                   exclude=None,
+	                   incremental=False,
 	                   settings=None,
 	                   plugin_manager=None,
 	                   datafolder=None,
+	                   workers=1,
+	                   throttle=None,
 	                   on_backup_start=None,
 	                   on_backup_done=None,
-	                   on_backup_error=None):
+	                   on_backup_error=None,
+	                   on_progress=None):
+		"""
+		Creates the backup ``name`` in ``datafolder``.
+
+		Every backup contains a manifest with size, modification time and SHA1 of all backed up files. If
+		``incremental`` is set, the most recent backup with such a manifest is used as base and only files that
+		aren't already contained in it (or the backups it references) get stored, the others are only referenced.
+
+		Files are hashed and compressed by ``workers`` threads in parallel. Only incremental backups need to analyze
+		the files before writing them, full backups read every file only once. All file I/O goes through
+		``throttle`` if provided, see :class:`IOThrottle`. ``on_progress`` gets called regularly with the current progress, see
+		:class:`ProgressReporter`.
+		"""
 		try:
 			if exclude is None:
 				exclude = []
 
-			configfile = settings._configfile
-			basedir = settings._basedir
+			if throttle is None:
+				throttle = IOThrottle()
 
 			temporary_path = os.path.join(datafolder, ".{}".format(name))
 			final_path = os.path.join(datafolder, name)
 
-			size = cls._get_disk_size(basedir)
-			if not cls._free_space(os.path.dirname(temporary_path), size):
-				raise InsufficientSpace()
-
-			own_folder = datafolder
-			defaults = [os.path.join(basedir, "config.yaml"),] + \
-			           [os.path.join(basedir, folder) for folder in default_settings["folder"].keys()]
-
-			compression = zipfile.ZIP_DEFLATED if zlib else zipfile.ZIP_STORED
-
 			if callable(on_backup_start):
 				on_backup_start(name, temporary_path, exclude)
 
-			with zipfile.ZipFile(temporary_path, mode="w", compression=compression, allowZip64=True) as zip:
-				def add_to_zip(source, target, ignored=None):
-					if ignored is None:
-						ignored = []
+			# don't even start while we are supposed to pause
+			throttle.wait()
+
+			files = cls._collect_backup_files(settings, exclude, [datafolder,])
+
+			base = None
+			base_manifest = dict()
+			if incremental:
+				base, base_manifest = cls._find_base_backup(datafolder)
+
+			# only needed to find content that's already stored, full backups get the hashes while writing
+			hashes = dict()
+			if incremental:
+				# files unchanged since the base backup don't need to be looked at again
+				to_hash = []
+				for arcname, (path, stat) in files.items():
+					previous = base_manifest.get(arcname)
+					if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+						hashes[arcname] = previous["sha1"]
+					else:
+						to_hash.append((arcname, path, stat.st_size))
+
+				progress = ProgressReporter(on_progress, "analyzing", sum(size for _, _, size in to_hash))
+				hashes.update(cls._hash_files(to_hash, workers=workers, throttle=throttle, progress=progress))
+				progress.finish()
+
+			# content already available in the backup chain, sha1 => (backup, arcname), backup None means this one
+			known = dict()
+			for arcname, entry in base_manifest.items():
+				known.setdefault(entry["sha1"], (entry.get("backup", base), entry.get("arcname", arcname)))
+
+			manifest = dict()
+			to_store = []
+			size = 0
+			for arcname, (path, stat) in files.items():
+				sha1 = hashes.get(arcname)
+				entry = dict(size=stat.st_size,
+				             mtime=stat.st_mtime,
+				             sha1=sha1)
+
+				if incremental and sha1 in known:
+					backup, source = known[sha1]
+					if backup is not None:
+						entry["backup"] = backup
+					if source != arcname:
+						entry["arcname"] = source
+				else:
+					to_store.append((arcname, path))
+					known[sha1] = (None, arcname)
+					size += stat.st_size
+
+				manifest[arcname] = entry
 
-					if source in ignored:
-						return
+			if not cls._free_space(os.path.dirname(temporary_path), size):
+				raise InsufficientSpace()
 
-					if os.path.isdir(source):
-						for entry in scandir(source):
-							add_to_zip(entry.path, os.path.join(target, entry.name), ignored=ignored)
-					elif os.path.isfile(source):
-						zip.write(source, arcname=target)
+			compression = zipfile.ZIP_DEFLATED if zlib else zipfile.ZIP_STORED
 
+			progress = ProgressReporter(on_progress, "writing", size)
+			with zipfile.ZipFile(temporary_path, mode="w", compression=compression, allowZip64=True) as zip:
 				# add metadata
+				references = sorted(set(entry["backup"] for entry in manifest.values() if "backup" in entry))
 				metadata = dict(version=get_octoprint_version_string(),
-				                excludes=exclude)
-				zip.writestr("metadata.json", json.dumps(metadata))
-
-				# backup current config file
-				add_to_zip(configfile, "basedir/config.yaml", ignored=[own_folder,])
-
-				# backup configured folder paths
-				for folder in default_settings["folder"].keys():
-					if folder in exclude:
+				                excludes=exclude,
+				                incremental=base is not None,
+				                base=base,
+				                references=references)
+				zip.writestr(METADATA_FILE, json.dumps(metadata))
+
+				def store(to_store):
+					written = cls._write_files(zip, to_store,
+					                           compression=compression,
+					                           workers=workers,
+					                           buffer_folder=os.path.dirname(temporary_path),
+					                           throttle=throttle,
+					                           progress=progress)
+
+					# files might have changed since they were analyzed, the manifest has to match what got stored
+					for arcname, (sha1, file_size) in written.items():
+						manifest[arcname].update(sha1=sha1, size=file_size)
+
+				# add files
+				store(to_store)
+
+				# references to files of this backup whose content changed before it could be stored are
+				# stored themselves instead
+				changed = []
+				for arcname, entry in manifest.items():
+					if "backup" in entry or "arcname" not in entry:
 						continue
+					if manifest[entry["arcname"]]["sha1"] != entry["sha1"]:
+						del entry["arcname"]
+						changed.append((arcname, files[arcname][0]))
+				store(changed)
 
-					if folder in ("generated", "logs", "watched",):
-						continue
-
-					add_to_zip(settings.global_get_basefolder(folder),
-					           "basedir/" + folder.replace("_", "/"),
-					           ignored=[own_folder,])
-
-				# backup anything else that might be lying around in our basedir
-				add_to_zip(basedir, "basedir", ignored=defaults + [own_folder, ])
+				zip.writestr(MANIFEST_FILE, json.dumps(manifest))
 
 				# add list of installed plugins
 				plugins = []
@@ -668,8 +1156,9 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 					                    url=plugin.url))
 
 				if len(plugins):
-					zip.writestr("plugin_list.json", json.dumps(plugins))
+					zip.writestr(PLUGIN_LIST_FILE, json.dumps(plugins))
 
+			progress.finish()
 			os.rename(temporary_path, final_path)
 
 			if callable(on_backup_done):
@@ -695,7 +1184,18 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 	                    on_log_error=None,
 	                    on_restore_start=None,
 	                    on_restore_done=None,
-	                    on_restore_failed=None):
+	                    on_restore_failed=None,
+	                    on_progress=None,
+	                    workers=1,
+	                    throttle=None,
+	                    remove=True):
+		"""
+		Restores the backup at ``path``, using ``workers`` threads for extracting it. Any referenced backups of an
+		incremental backup are looked up in ``datafolder``. All extracted files are verified against the checksums
+		in the backup's manifest.
+
+		The backup gets deleted afterwards unless ``remove`` is ``False``.
+		"""
 		if not is_os_compatible(["!windows"]):
 			if callable(on_log_error):
 				on_log_error(u"Restore is not supported on this operating system")
@@ -722,7 +1222,7 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 			with zipfile.ZipFile(path, "r") as zip:
 				# read metadata
 				try:
-					metadata_zipinfo = zip.getinfo("metadata.json")
+					metadata_zipinfo = zip.getinfo(METADATA_FILE)
 				except KeyError:
 					if callable(on_invalid_backup):
 						on_invalid_backup(u"Not an OctoPrint backup, lacks metadata.json")
@@ -741,16 +1241,37 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 						on_restore_failed(path)
 					return False
 
+				# incremental backups need the backups they reference
+				references = metadata.get("references", [])
+				missing = [reference for reference in references
+				           if not cls._is_local_backup(datafolder, reference)]
+				if missing:
+					if callable(on_invalid_backup):
+						on_invalid_backup(u"Backup is incremental and needs the following backups which are not "
+						                  u"available: {}".format(u", ".join(missing)))
+					if callable(on_restore_failed):
+						on_restore_failed(path)
+					return False
+
+				manifest = None
+				if MANIFEST_FILE in zip.namelist():
+					manifest = json.loads(zip.read(MANIFEST_FILE))
+
 				# unzip to temporary folder
 				temp = tempfile.mkdtemp()
 				try:
 					if callable(on_log_progress):
 						on_log_progress(u"Unpacking backup to {}...".format(temp))
-					abstemp = os.path.abspath(temp)
-					for member in zip.infolist():
-						abspath = os.path.abspath(os.path.join(temp, member.filename))
-						if abspath.startswith(abstemp):
-							zip.extract(member, temp)
+					mismatches = cls._extract_backup(path, manifest, datafolder, temp,
+					                                 workers=workers,
+					                                 throttle=throttle,
+					                                 on_progress=on_progress)
+					if mismatches:
+						if callable(on_invalid_backup):
+							on_invalid_backup(u"Backup is corrupt, checksum mismatch for: {}".format(u", ".join(mismatches)))
+						if callable(on_restore_failed):
+							on_restore_failed(path)
+						return False
 
 					# sanity check
 					configfile = os.path.join(temp, "basedir", "config.yaml")
@@ -779,8 +1300,11 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 						on_log_progress(u"Unpacked")
 
 					# install available plugins
-					with codecs.open(os.path.join(temp, "plugin_list.json"), "r") as f:
-						plugins = json.load(f)
+					plugins = []
+					plugin_list = os.path.join(temp, PLUGIN_LIST_FILE)
+					if os.path.exists(plugin_list):
+						with codecs.open(plugin_list, "r") as f:
+							plugins = json.load(f)
 
 					known_plugins = []
 					unknown_plugins = []
@@ -870,10 +1394,11 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 			return False
 
 		finally:
-			# remove zip
-			if callable(on_log_progress):
-				on_log_progress(u"Removing temporary zip")
-			os.remove(path)
+			if remove:
+				# remove zip
+				if callable(on_log_progress):
+					on_log_progress(u"Removing temporary zip")
+				os.remove(path)
 
 		# restart server
 		if restart_command:
@@ -900,6 +1425,114 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 		return True
 
 
+	@classmethod
+	def _is_local_backup(cls, datafolder, name):
+		path = os.path.realpath(os.path.join(datafolder, name))
+		return os.path.dirname(path) == os.path.realpath(datafolder) \
+		       and os.path.isfile(path) \
+		       and not is_hidden_path(path)
+
+	@classmethod
+	def _extract_backup(cls, path, manifest, datafolder, target, workers=1, throttle=None, on_progress=None):
+		"""
+		Extracts the backup at ``path`` to ``target``, including all files in ``manifest`` that are only referenced
+		and stored in other backups in ``datafolder`` or under another name.
+
+		The work is split between ``workers`` threads, each with its own handles to the involved archives. Every
+		file in ``manifest`` gets verified against its SHA1 while being extracted.
+
+		Returns the list of files with a checksum mismatch.
+		"""
+		if manifest is None:
+			manifest = dict()
+
+		abstarget = os.path.abspath(target)
+
+		# everything to extract as (size, source archive, member, target path, sha1)
+		jobs = []
+		with zipfile.ZipFile(path, "r") as zip:
+			for member in zip.infolist():
+				abspath = os.path.abspath(os.path.join(target, member.filename))
+				if not abspath.startswith(abstarget):
+					continue
+				sha1 = manifest.get(member.filename, dict()).get("sha1")
+				jobs.append((member.file_size, path, member.filename, abspath, sha1))
+
+		for arcname, entry in manifest.items():
+			if not "backup" in entry and not "arcname" in entry:
+				# stored in the backup itself, already covered
+				continue
+
+			abspath = os.path.abspath(os.path.join(target, arcname))
+			if not abspath.startswith(abstarget):
+				continue
+
+			source = os.path.join(datafolder, entry["backup"]) if "backup" in entry else path
+			jobs.append((entry["size"], source, entry.get("arcname", arcname), abspath, entry["sha1"]))
+
+		# distribute the jobs, biggest first, always to the worker with the least work so far
+		buckets = [[] for _ in range(max(1, min(workers, len(jobs))))]
+		loads = [0] * len(buckets)
+		for job in sorted(jobs, key=lambda x: x[0], reverse=True):
+			index = loads.index(min(loads))
+			buckets[index].append(job)
+			loads[index] += job[0]
+
+		progress = ProgressReporter(on_progress, "extracting", sum(loads))
+
+		def extract(bucket):
+			import hashlib
+
+			mismatches = []
+			archives = dict()
+			try:
+				for _, source, member, abspath, expected in bucket:
+					if member.endswith("/"):
+						# directory entry
+						if not os.path.isdir(abspath):
+							os.makedirs(abspath)
+						continue
+
+					if not source in archives:
+						archives[source] = zipfile.ZipFile(source, "r")
+
+					folder = os.path.dirname(abspath)
+					if not os.path.isdir(folder):
+						try:
+							os.makedirs(folder)
+						except OSError:
+							# might have been created by another worker in the meantime
+							if not os.path.isdir(folder):
+								raise
+
+					sha1 = hashlib.sha1()
+					with archives[source].open(member) as s:
+						with io.open(abspath, "wb") as d:
+							for chunk in iter(lambda: s.read(CHUNK_SIZE), b""):
+								d.write(chunk)
+								sha1.update(chunk)
+
+								if throttle is not None:
+									throttle.consume(len(chunk))
+								progress.update(len(chunk))
+
+					if expected is not None and sha1.hexdigest() != expected:
+						mismatches.append(os.path.relpath(abspath, abstarget))
+			finally:
+				for archive in archives.values():
+					archive.close()
+			return mismatches
+
+		if len(buckets) == 1:
+			results = [extract(buckets[0])]
+		else:
+			import concurrent.futures
+			with concurrent.futures.ThreadPoolExecutor(max_workers=len(buckets)) as executor:
+				results = list(executor.map(extract, buckets))
+
+		progress.finish()
+		return sorted(mismatch for result in results for mismatch in result)
+
 	def _send_client_message(self, message, payload=None):
 		if payload is None:
 			payload = dict()
@@ -908,6 +1541,127 @@ class BackupPlugin(octoprint.plugin.SettingsPlugin,
 
 
 
+class IOThrottle(object):
+	"""
+	Throttles backup and restore I/O shared between any number of threads.
+
+	Limits the overall throughput to ``limit`` bytes per second (0 for no limit) and blocks while ``pause`` returns
+	``True``, e.g. while a print job is running. ``on_pause`` gets called with ``True`` when pausing and ``False``
+	when resuming.
+	"""
+
+	pause_check_interval = 1.0
+	"""Interval in seconds in which ``pause`` gets checked."""
+
+	def __init__(self, limit=0, pause=None, on_pause=None):
+		self.limit = limit
+
+		self._pause = pause
+		self._on_pause = on_pause
+
+		self._lock = threading.Lock()
+		self._pause_lock = threading.Lock()
+		self._start = None
+		self._consumed = 0
+		self._last_pause_check = None
+
+	def wait(self):
+		"""Blocks as long as we are supposed to pause."""
+		if not callable(self._pause):
+			return
+
+		with self._pause_lock:
+			self._last_pause_check = monotonic_time()
+
+			paused = False
+			while self._pause():
+				if not paused:
+					paused = True
+					if callable(self._on_pause):
+						self._on_pause(True)
+				time.sleep(self.pause_check_interval)
+
+			if paused:
+				with self._lock:
+					# don't make up for the time we spent pausing
+					self._start = None
+				if callable(self._on_pause):
+					self._on_pause(False)
+
+	def consume(self, amount):
+		"""Accounts for ``amount`` bytes of I/O, blocking as long as necessary to stay within the limits."""
+		if callable(self._pause) and (self._last_pause_check is None
+		                              or monotonic_time() - self._last_pause_check >= self.pause_check_interval):
+			self.wait()
+
+		if not self.limit:
+			return
+
+		with self._lock:
+			now = monotonic_time()
+			if self._start is None:
+				self._start = now
+				self._consumed = 0
+			self._consumed += amount
+			delay = self._start + self._consumed / self.limit - now
+
+		if delay > 0:
+			time.sleep(delay)
+
+
+class ProgressReporter(object):
+	"""
+	Thread safe progress tracking of one phase of a backup or restore.
+
+	Calls ``callback`` with a dict containing ``phase``, the bytes ``done`` and ``total`` and the ``throughput``
+	in bytes per second, at most once per ``interval`` and once more on :meth:`finish`.
+	"""
+
+	def __init__(self, callback, phase, total, interval=1.0):
+		self.phase = phase
+		self.total = total
+		self.interval = interval
+
+		self._callback = callback
+		self._lock = threading.Lock()
+		self._done = 0
+		self._start = monotonic_time()
+		self._last_report = self._start
+
+	def update(self, amount):
+		with self._lock:
+			self._done += amount
+
+			now = monotonic_time()
+			if now - self._last_report < self.interval:
+				return
+			self._last_report = now
+			progress = self._as_dict(now)
+
+		self._report(progress)
+
+	def finish(self):
+		with self._lock:
+			progress = self._as_dict(monotonic_time())
+		self._report(progress)
+
+	def _as_dict(self, now):
+		elapsed = now - self._start
+		return dict(phase=self.phase,
+		            done=self._done,
+		            total=self.total,
+		            throughput=self._done / elapsed if elapsed > 0 else 0)
+
+	def _report(self, progress):
+		if not callable(self._callback):
+			return
+
+		try:
+			self._callback(progress)
+		except:
+			logging.getLogger(__name__).exception(u"Error while reporting progress")
+
+
 class InsufficientSpace(Exception):
 	pass
 
@@ -24,6 +24,17 @@
         return this.base.postJson(this.url + "backup", data, opts);
     };
 
+    OctoPrintBackupClient.prototype.createIncrementalBackup = function(exclude, opts) {
+        exclude = exclude || [];
+
+        var data = {
+            exclude: exclude,
+            incremental: true
+        };
+
+        return this.base.postJson(this.url + "backup", data, opts);
+    };
+
     OctoPrintBackupClient.prototype.deleteBackup = function(backup, opts) {
         return this.base.delete(this.url + "backup/" + backup, opts);
     };
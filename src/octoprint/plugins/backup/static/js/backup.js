@@ -26,6 +26,7 @@ $(function() {
         self.markedForBackupDeletion = ko.observableArray([]);
 
         self.excludeFromBackup = ko.observableArray([]);
+        self.incrementalBackup = ko.observable(false);
         self.backupInProgress = ko.observable(false);
         self.restoreSupported = ko.observable(true);
 
@@ -59,6 +60,37 @@ $(function() {
 
         self.loglines = ko.observableArray([]);
 
+        self.backupProgress = ko.observable(undefined);
+        self.backupPaused = ko.observable(false);
+        self.restoreProgress = ko.observable(undefined);
+
+        self._progressPhases = {
+            analyzing: gettext("Analyzing files"),
+            writing: gettext("Writing backup"),
+            extracting: gettext("Extracting backup")
+        };
+
+        self._formatProgress = function(progress) {
+            if (!progress || !progress.total) return "";
+
+            return _.sprintf(gettext("%(phase)s: %(percentage)d%% (%(throughput)s/s)"), {
+                phase: self._progressPhases[progress.phase] || progress.phase,
+                percentage: Math.round(progress.done * 100 / progress.total),
+                throughput: formatSize(progress.throughput)
+            });
+        };
+
+        self.backupProgressText = ko.pureComputed(function() {
+            if (self.backupPaused()) {
+                return gettext("Paused while printing...");
+            }
+            return self._formatProgress(self.backupProgress());
+        });
+
+        self.restoreProgressText = ko.pureComputed(function() {
+            return self._formatProgress(self.restoreProgress());
+        });
+
         self.requestData = function() {
             OctoPrint.plugins.backup.get()
                 .done(self.fromResponse);
@@ -72,9 +104,16 @@ $(function() {
 
         self.createBackup = function() {
             var excluded = self.excludeFromBackup();
-            OctoPrint.plugins.backup.createBackup(excluded)
+            var request;
+            if (self.incrementalBackup()) {
+                request = OctoPrint.plugins.backup.createIncrementalBackup(excluded);
+            } else {
+                request = OctoPrint.plugins.backup.createBackup(excluded);
+            }
+            request
                 .done(function() {
                     self.excludeFromBackup([]);
+                    self.incrementalBackup(false);
                 })
         };
 
@@ -83,6 +122,14 @@ $(function() {
                 OctoPrint.plugins.backup.deleteBackup(backup)
                     .done(function() {
                         self.requestData();
+                    })
+                    .fail(function(jqXHR) {
+                        new PNotify({
+                            title: gettext("Could not delete backup"),
+                            text: jqXHR.responseText,
+                            type: "error",
+                            hide: false
+                        });
                     });
             };
             showConfirmationDialog(_.sprintf(gettext("You are about to delete backup file \"%(name)s\"."), {name: backup}),
@@ -171,32 +218,47 @@ $(function() {
             if (data.type === "backup_done") {
                 self.requestData();
                 self.backupInProgress(false);
+                self.backupProgress(undefined);
+                self.backupPaused(false);
                 new PNotify({
                     title: gettext("Backup created successfully"),
                     type: "success"
                 });
             } else if (data.type === "backup_started") {
                 self.backupInProgress(true);
+                self.backupProgress(undefined);
+                self.backupPaused(false);
+            } else if (data.type === "backup_progress") {
+                self.backupProgress(data);
+            } else if (data.type === "backup_paused") {
+                self.backupPaused(data.paused);
             } else if (data.type === "backup_error") {
                 self.requestData();
                 self.backupInProgress(false);
+                self.backupProgress(undefined);
+                self.backupPaused(false);
                 new PNotify({
                     title: gettext("Creating the backup failed"),
                     text: _.sprintf(gettext("OctoPrint could not create your backup. Please consult <code>octoprint.log</code> for details. Error: %(error)s"), {error:data.error}),
                     type: "error",
                     hide: false
                 });
+            } else if (data.type === "restore_progress") {
+                self.restoreProgress(data);
             } else if (data.type === "restore_started") {
+                self.restoreProgress(undefined);
                 self.loglines.push({line: gettext("Restoring from backup..."), stream: "message"});
                 self.loglines.push({line: " ", stream: "message"});
             } else if (data.type === "restore_failed") {
                 self.loglines.push({line: " ", stream: "message"});
                 self.loglines.push({line: gettext("Restore failed! Check the above output and octoprint.log for reasons as to why."), stream: "error"});
                 self.restoreInProgress(false);
+                self.restoreProgress(undefined);
             } else if (data.type === "restore_done") {
                 self.loglines.push({line: " ", stream: "message"});
                 self.loglines.push({line: gettext("Restore successful! The server will now be restarted!"), stream: "message"});
                 self.restoreInProgress(false);
+                self.restoreProgress(undefined);
             } else if (data.type === "install_plugin") {
                 self.loglines.push({line: " ", stream: "message"});
                 self.loglines.push({
@@ -14,6 +14,7 @@ from octoprint.settings import valid_boolean_trues
 from octoprint.server.util.flask import restricted_access, with_revalidation_checking, check_etag
 from octoprint.server import admin_permission
 from octoprint.util.pip import LocalPipCaller
+from octoprint.util.upstream_cache import upstream_cache
 from octoprint.util.version import get_octoprint_version_string, get_octoprint_version, is_octoprint_compatible
 from octoprint.util.platform import get_os, is_os_compatible
 
@@ -452,6 +453,8 @@ class PluginManagerPlugin(octoprint.plugin.SimpleApiPlugin,
 			return jsonify(result)
 
 		installed = map(lambda x: x.strip(), result_line[len(success_string):].split(" "))
+
+		self._plugin_manager.invalidate_discovery_cache()
 		all_plugins_after = self._plugin_manager.find_plugins(existing=dict(), ignore_uninstalled=False)
 
 		new_plugin = self._find_installed_plugin(installed, plugins=all_plugins_after)
@@ -550,6 +553,8 @@ class PluginManagerPlugin(octoprint.plugin.SimpleApiPlugin,
 			self._logger.warn(u"Trying to uninstall plugin {plugin} but origin is unknown ({plugin.origin.type})".format(**locals()))
 			return make_response("Could not uninstall plugin, its origin is unknown")
 
+		self._plugin_manager.invalidate_discovery_cache()
+
 		needs_restart = self._plugin_manager.is_restart_needing_plugin(plugin)
 		needs_refresh = plugin.implementation and isinstance(plugin.implementation, octoprint.plugin.ReloadNeedingPlugin)
 		needs_reconnect = self._plugin_manager.has_any_of_hooks(plugin, self._reconnect_hooks) and self._printer.is_operational()
@@ -775,20 +780,28 @@ class PluginManagerPlugin(octoprint.plugin.SimpleApiPlugin,
 		return self._refresh_repository(repo_data=repo_data)
 
 	def _fetch_repository_from_url(self):
-		if not self._connectivity_checker.online:
-			self._logger.info("Looks like we are offline, can't fetch repository from network")
-			return None
-
 		repository_url = self._settings.get(["repository"])
-		try:
-			r = requests.get(repository_url, timeout=30)
-			r.raise_for_status()
-			self._logger.info("Loaded plugin repository data from {}".format(repository_url))
-		except Exception as e:
-			self._logger.exception("Could not fetch plugins from repository at {repository_url}: {message}".format(repository_url=repository_url, message=str(e)))
-			return None
+		repo_data = self._fetch_from_upstream_cache("pluginmanager.repository", repository_url)
 
-		repo_data = r.json()
+		if repo_data is None:
+			if not upstream_cache().may_fetch_directly:
+				self._logger.info("Plugin repository is not available from the upstream cache and fetching it directly is disabled")
+				return None
+
+			if not self._connectivity_checker.online:
+				self._logger.info("Looks like we are offline, can't fetch repository from network")
+				return None
+
+			try:
+				r = requests.get(repository_url, timeout=30)
+				r.raise_for_status()
+				self._logger.info("Loaded plugin repository data from {}".format(repository_url))
+			except Exception as e:
+				self._logger.exception("Could not fetch plugins from repository at {repository_url}: {message}".format(repository_url=repository_url, message=str(e)))
+				return None
+
+			repo_data = r.json()
+			upstream_cache().publish("pluginmanager.repository", repository_url, r.text, r.headers.get("Content-Type"))
 
 		try:
 			import json
@@ -825,20 +838,28 @@ class PluginManagerPlugin(octoprint.plugin.SimpleApiPlugin,
 		return self._refresh_notices(notice_data=notice_data)
 
 	def _fetch_notices_from_url(self):
-		if not self._connectivity_checker.online:
-			self._logger.info("Looks like we are offline, can't fetch notices from network")
-			return None
-
 		notices_url = self._settings.get(["notices"])
-		try:
-			r = requests.get(notices_url, timeout=30)
-			r.raise_for_status()
-			self._logger.info("Loaded plugin notices data from {}".format(notices_url))
-		except Exception as e:
-			self._logger.exception("Could not fetch notices from {notices_url}: {message}".format(notices_url=notices_url, message=str(e)))
-			return None
+		notice_data = self._fetch_from_upstream_cache("pluginmanager.notices", notices_url)
+
+		if notice_data is None:
+			if not upstream_cache().may_fetch_directly:
+				self._logger.info("Plugin notices are not available from the upstream cache and fetching them directly is disabled")
+				return None
+
+			if not self._connectivity_checker.online:
+				self._logger.info("Looks like we are offline, can't fetch notices from network")
+				return None
 
-		notice_data = r.json()
+			try:
+				r = requests.get(notices_url, timeout=30)
+				r.raise_for_status()
+				self._logger.info("Loaded plugin notices data from {}".format(notices_url))
+			except Exception as e:
+				self._logger.exception("Could not fetch notices from {notices_url}: {message}".format(notices_url=notices_url, message=str(e)))
+				return None
+
+			notice_data = r.json()
+			upstream_cache().publish("pluginmanager.notices", notices_url, r.text, r.headers.get("Content-Type"))
 
 		try:
 			import json
@@ -848,6 +869,18 @@ class PluginManagerPlugin(octoprint.plugin.SimpleApiPlugin,
 			self._logger.exception("Error while saving notices to {}: {}".format(self._notices_cache_path, str(e)))
 		return notice_data
 
+	def _fetch_from_upstream_cache(self, key, url):
+		data = upstream_cache().get(key, url)
+		if data is None:
+			return None
+
+		try:
+			import json
+			return json.loads(data)
+		except ValueError:
+			self._logger.warn("Data for {} in upstream cache is not valid JSON, ignoring it".format(key))
+			return None
+
 	def _refresh_notices(self, notice_data=None):
 		if notice_data is None:
 			notice_data = self._fetch_notices_from_url()
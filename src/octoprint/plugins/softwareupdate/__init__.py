@@ -82,6 +82,10 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 		self._version_cache_path = os.path.join(self.get_plugin_data_folder(), "versioncache.yaml")
 		self._load_version_cache()
 
+		# all version checks share one connection pool and response cache for conditional requests
+		version_checks.http.init_client(cache_path=os.path.join(self.get_plugin_data_folder(), "httpcache.json"),
+		                                pool_size=self._get_check_concurrency())
+
 		def refresh_checks(name, plugin):
 			self._refresh_configured_checks = True
 			self._send_client_message("update_versions")
@@ -272,6 +276,7 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 			"check_providers": {},
 
 			"cache_ttl": 24 * 60,
+			"check_concurrency": 5,
 
 			"notify_users": True
 		}
@@ -654,7 +659,7 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 				online = self._connectivity_checker.check_immediately()
 				self._logger.debug("Looks like we are {}".format("online" if online else "offline"))
 
-				with futures.ThreadPoolExecutor(max_workers=5) as executor:
+				with futures.ThreadPoolExecutor(max_workers=self._get_check_concurrency()) as executor:
 					for target, check in checks.items():
 						if not target in check_targets:
 							continue
@@ -726,6 +731,7 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 
 				if self._version_cache_dirty:
 					self._save_version_cache()
+				version_checks.http.client().save()
 
 				self._get_versions_data = information, update_available, update_possible
 				self._get_versions_data_ready.set()
@@ -738,6 +744,12 @@ class SoftwareUpdatePlugin(octoprint.plugin.BlueprintPlugin,
 
 		return information, update_available, update_possible
 
+	def _get_check_concurrency(self):
+		concurrency = self._settings.get_int(["check_concurrency"])
+		if concurrency is None or concurrency < 1:
+			concurrency = 1
+		return concurrency
+
 	def _get_check_hash(self, check):
 		def dict_to_sorted_repr(d):
 			lines = []
@@ -5,7 +5,7 @@ __author__ = "Gina Häußge <osd@foosel.net>"
 __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
 __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
-from . import commandline, git_commit, github_commit, github_release, bitbucket_commit, python_checker, never_current, always_current
+from . import http, commandline, git_commit, github_commit, github_release, bitbucket_commit, python_checker, never_current, always_current
 
 def log_github_ratelimit(logger, r):
 	ratelimit = r.headers["X-RateLimit-Limit"] if "X-RateLimit-Limit" in r.headers else "?"
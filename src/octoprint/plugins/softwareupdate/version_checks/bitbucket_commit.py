@@ -8,6 +8,8 @@ import requests
 import logging
 import base64
 
+from . import http
+
 BRANCH_HEAD_URL = "https://api.bitbucket.org/2.0/repositories/{user}/{repo}/commit/{branch}"
 
 logger = logging.getLogger("octoprint.plugins.softwareupdate.version_checks.bitbucket_commit")
@@ -23,7 +25,7 @@ def _get_latest_commit(user, repo, branch, api_user=None, api_password=None):
 		headers["authorization"] = "Basic {}".format(auth_value)
 
 	try:
-		r = requests.get(url, headers=headers, timeout=(3.05, 30))
+		r = http.get(url, headers=headers)
 	except requests.ConnectionError as exc:
 		raise NetworkError(cause=exc)
 
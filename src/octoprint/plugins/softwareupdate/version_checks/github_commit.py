@@ -8,6 +8,8 @@ __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms
 import requests
 import logging
 
+from . import http
+
 BRANCH_HEAD_URL = "https://api.github.com/repos/{user}/{repo}/git/refs/heads/{branch}"
 
 logger = logging.getLogger("octoprint.plugins.softwareupdate.version_checks.github_commit")
@@ -16,7 +18,7 @@ def _get_latest_commit(user, repo, branch):
 	from ..exceptions import NetworkError
 
 	try:
-		r = requests.get(BRANCH_HEAD_URL.format(user=user, repo=repo, branch=branch), timeout=(3.05, 30))
+		r = http.get(BRANCH_HEAD_URL.format(user=user, repo=repo, branch=branch))
 	except requests.ConnectionError as exc:
 		raise NetworkError(cause=exc)
 
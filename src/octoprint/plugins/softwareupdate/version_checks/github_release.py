@@ -8,6 +8,8 @@ __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms
 import requests
 import logging
 
+from . import http
+
 RELEASE_URL = "https://api.github.com/repos/{user}/{repo}/releases"
 
 logger = logging.getLogger("octoprint.plugins.softwareupdate.version_checks.github_release")
@@ -101,7 +103,7 @@ def _get_latest_release(user, repo, compare_type,
 	nothing = None, None, None
 
 	try:
-		r = requests.get(RELEASE_URL.format(user=user, repo=repo), timeout=(3.05, 30))
+		r = http.get(RELEASE_URL.format(user=user, repo=repo))
 	except requests.ConnectionError as exc:
 		raise NetworkError(cause=exc)
 
@@ -0,0 +1,226 @@
+# coding=utf-8
+"""
+Shared HTTP layer for version checks talking to remote APIs.
+
+All requests go through one pooled session. Successful responses carrying an ``ETag`` or ``Last-Modified`` header are
+kept in a persistent response cache, and subsequent requests for the same URL are made conditional. An unchanged
+resource then only costs a ``304 Not Modified``, which for example doesn't count against GitHub's API rate limit.
+
+Responses to requests without credentials are also shared with other instances through the
+:mod:`~octoprint.util.upstream_cache`.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from octoprint.util import atomic_write
+from octoprint.util.upstream_cache import upstream_cache
+
+DEFAULT_TIMEOUT = (3.05, 30)
+
+
+class CachedResponse(object):
+	"""
+	The result of :meth:`ConditionalHttpClient.get`, providing the parts of :class:`requests.Response` used by the
+	version checks.
+
+	``from_cache`` is ``True`` if the server reported the resource as unchanged and the body was taken from the cache.
+	"""
+
+	def __init__(self, url, status_code, text, headers, from_cache=False):
+		self.url = url
+		self.status_code = status_code
+		self.text = text
+		self.headers = CaseInsensitiveDict(headers)
+		self.from_cache = from_cache
+
+	def json(self):
+		return json.loads(self.text)
+
+
+class ConditionalHttpClient(object):
+	"""
+	HTTP client with a connection pool of ``pool_size`` connections per host and a response cache, persisted to
+	``cache_path`` if set.
+
+	Cache entries that weren't used for ``max_age`` seconds are dropped when saving.
+	"""
+
+	def __init__(self, cache_path=None, pool_size=10, max_age=30 * 24 * 60 * 60):
+		self.cache_path = cache_path
+		self.max_age = max_age
+
+		self._logger = logging.getLogger(__name__)
+
+		self._session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+		self._session.mount("http://", adapter)
+		self._session.mount("https://", adapter)
+
+		self._cache = None
+		self._cache_lock = threading.RLock()
+		self._cache_dirty = False
+
+	def get(self, url, headers=None, timeout=DEFAULT_TIMEOUT):
+		"""
+		Performs a (conditional, if possible) ``GET`` request against ``url``.
+
+		Raises the same exceptions as :func:`requests.get`.
+		"""
+		if headers is None:
+			headers = dict()
+		else:
+			headers = dict(headers)
+
+		# responses to authorized requests are never shared through the upstream cache
+		shareable = not self._authorization(headers)
+		if shareable:
+			text = upstream_cache().get(self._upstream_cache_key(url), url)
+			if text is not None:
+				return CachedResponse(url, requests.codes.ok, text, dict(), from_cache=True)
+
+			if not upstream_cache().may_fetch_directly:
+				raise requests.ConnectionError("{} is not available from the upstream cache and fetching it "
+				                               "directly is disabled".format(url))
+
+		key = self._cache_key(url, headers)
+
+		with self._cache_lock:
+			entry = self._get_cache().get(key)
+
+		if entry is not None:
+			if entry.get("etag"):
+				headers["If-None-Match"] = entry["etag"]
+			if entry.get("last_modified"):
+				headers["If-Modified-Since"] = entry["last_modified"]
+
+		r = self._session.get(url, headers=headers, timeout=timeout)
+
+		if r.status_code == requests.codes.not_modified and entry is not None:
+			self._logger.debug("{} is unchanged, using cached response".format(url))
+			with self._cache_lock:
+				entry["used"] = time.time()
+				self._cache_dirty = True
+			response = CachedResponse(url, entry["status_code"], entry["text"], r.headers, from_cache=True)
+		else:
+			response = CachedResponse(url, r.status_code, r.text, r.headers)
+
+		if shareable and response.status_code == requests.codes.ok:
+			upstream_cache().publish(self._upstream_cache_key(url), url, response.text, response.headers.get("Content-Type"))
+
+		if response.from_cache:
+			return response
+
+		etag = r.headers.get("ETag")
+		last_modified = r.headers.get("Last-Modified")
+		if r.status_code == requests.codes.ok and (etag or last_modified):
+			with self._cache_lock:
+				self._get_cache()[key] = dict(etag=etag,
+				                              last_modified=last_modified,
+				                              status_code=r.status_code,
+				                              text=r.text,
+				                              used=time.time())
+				self._cache_dirty = True
+
+		return response
+
+	def save(self):
+		"""Persists the response cache if it was changed."""
+		if not self.cache_path:
+			return
+
+		with self._cache_lock:
+			if not self._cache_dirty:
+				return
+
+			cutoff = time.time() - self.max_age
+			cache = dict((key, entry) for key, entry in self._get_cache().items() if entry.get("used", 0) >= cutoff)
+			self._cache = cache
+
+			try:
+				with atomic_write(self.cache_path, mode="wb", max_permissions=0o666) as f:
+					json.dump(cache, f)
+				self._cache_dirty = False
+			except:
+				self._logger.exception("Error while saving version check response cache to {}".format(self.cache_path))
+
+	def clear(self):
+		"""Clears the response cache."""
+		with self._cache_lock:
+			self._cache = dict()
+			self._cache_dirty = True
+		self.save()
+
+	def _get_cache(self):
+		if self._cache is None:
+			self._cache = dict()
+			if self.cache_path and os.path.isfile(self.cache_path):
+				try:
+					with io.open(self.cache_path, "rb") as f:
+						cache = json.load(f)
+					if isinstance(cache, dict):
+						self._cache = cache
+				except:
+					self._logger.exception("Error while loading version check response cache from {}, "
+					                       "ignoring it".format(self.cache_path))
+		return self._cache
+
+	@classmethod
+	def _cache_key(cls, url, headers):
+		# responses for different credentials must not be mixed up
+		authorization = cls._authorization(headers)
+		if authorization:
+			return url + "#" + hashlib.sha1(authorization).hexdigest()
+		return url
+
+	@staticmethod
+	def _upstream_cache_key(url):
+		return "softwareupdate.http." + hashlib.sha1(url).hexdigest()
+
+	@staticmethod
+	def _authorization(headers):
+		return headers.get("Authorization", headers.get("authorization"))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def init_client(cache_path=None, pool_size=10):
+	"""Replaces the :class:`ConditionalHttpClient` singleton with one using the provided settings and returns it."""
+	global _client
+
+	with _client_lock:
+		_client = ConditionalHttpClient(cache_path=cache_path, pool_size=pool_size)
+		return _client
+
+
+def client():
+	"""Returns the :class:`ConditionalHttpClient` singleton, creating one without persistence on first call."""
+	global _client
+
+	if _client is None:
+		with _client_lock:
+			if _client is None:
+				_client = ConditionalHttpClient()
+	return _client
+
+
+def get(url, headers=None, timeout=DEFAULT_TIMEOUT):
+	"""Performs a ``GET`` request through the :func:`client`, see :meth:`ConditionalHttpClient.get`."""
+	return client().get(url, headers=headers, timeout=timeout)
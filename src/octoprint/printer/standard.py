@@ -29,6 +29,7 @@ from octoprint.settings import settings
 from octoprint.util import comm as comm
 from octoprint.util import InvariantContainer
 from octoprint.util import to_unicode
+from octoprint.util.profiling import hook_profiler
 
 
 class Printer(PrinterInterface, comm.MachineComPrintCallback):
@@ -220,7 +221,8 @@ class Printer(PrinterInterface, comm.MachineComPrintCallback):
 		def call_plugins(storage, filename, progress):
 			for plugin in self._progressPlugins:
 				try:
-					plugin.on_print_progress(storage, filename, progress)
+					hook_profiler().call("ProgressPlugin.on_print_progress", plugin._identifier, plugin.on_print_progress,
+					                     storage, filename, progress)
 				except:
 					self._logger.exception("Exception while sending print progress to plugin %s" % plugin._identifier)
 
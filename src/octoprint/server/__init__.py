@@ -45,6 +45,7 @@ safe_mode = False
 printer = None
 printerProfileManager = None
 fileManager = None
+resumableUploadManager = None
 slicingManager = None
 analysisQueue = None
 userManager = None
@@ -54,7 +55,9 @@ pluginManager = None
 appSessionManager = None
 pluginLifecycleManager = None
 preemptiveCache = None
+persistentViewCache = None
 connectivityChecker = None
+wsgiMetrics = None
 
 principals = Principal(app)
 admin_permission = Permission(RoleNeed("admin"))
@@ -74,10 +77,12 @@ import octoprint.util
 import octoprint.util.net
 import octoprint.filemanager.storage
 import octoprint.filemanager.analysis
+import octoprint.filemanager.resumable
 import octoprint.slicing
 from octoprint.server.util import enforceApiKeyRequestHandler, loginFromApiKeyRequestHandler, corsRequestHandler, \
 	corsResponseHandler
-from octoprint.server.util.flask import PreemptiveCache
+from octoprint.server.util.flask import PreemptiveCache, PersistentViewCache
+from octoprint.util.profiling import startup_profiler
 
 from . import util
 
@@ -160,6 +165,12 @@ def unauthorized_user():
 
 
 class Server(object):
+
+	_prebuilt_bundles = ["js_libs", "js_client", "js_plugins", "js_core",
+	                     "css_libs", "css_core", "css_plugins",
+	                     "less_core", "less_plugins"]
+	"""Asset bundles referenced by the core templates, built during startup."""
+
 	def __init__(self, settings=None, plugin_manager=None, connectivity_checker=None, environment_detector=None,
 	             event_manager=None, host=None, port=None, debug=False, safe_mode=False, allow_root=False,
 	             octoprint_daemon=None):
@@ -199,6 +210,7 @@ class Server(object):
 		global printer
 		global printerProfileManager
 		global fileManager
+		global resumableUploadManager
 		global slicingManager
 		global analysisQueue
 		global userManager
@@ -208,7 +220,9 @@ class Server(object):
 		global appSessionManager
 		global pluginLifecycleManager
 		global preemptiveCache
+		global persistentViewCache
 		global connectivityChecker
+		global wsgiMetrics
 		global debug
 		global safe_mode
 
@@ -240,6 +254,9 @@ class Server(object):
 		self._setup_heartbeat_logging()
 		pluginManager = self._plugin_manager
 
+		profiler = startup_profiler()
+		profiler.report_path = os.path.join(self._settings.getBaseFolder("data"), "startup_report.json")
+
 		# monkey patch a bunch of stuff
 		util.tornado.fix_json_encode()
 		util.flask.enable_additional_translations(additional_folders=[self._settings.getBaseFolder("translations")])
@@ -268,7 +285,8 @@ class Server(object):
 		### See also issues #2035 and #2090
 
 		# then initialize the plugin manager
-		pluginManager.reload_plugins(startup=True, initialize_implementations=False)
+		with profiler.phase("plugin_reload"):
+			pluginManager.reload_plugins(startup=True, initialize_implementations=False)
 
 		printerProfileManager = PrinterProfileManager()
 		eventManager = self._event_manager
@@ -286,12 +304,22 @@ class Server(object):
 		slicingManager = octoprint.slicing.SlicingManager(self._settings.getBaseFolder("slicingProfiles"), printerProfileManager)
 
 		storage_managers = dict()
-		storage_managers[octoprint.filemanager.FileDestinations.LOCAL] = octoprint.filemanager.storage.LocalFileStorage(self._settings.getBaseFolder("uploads"))
+		history_limit = self._settings.getInt(["server", "uploads", "historyLimit"])
+		compression_level = None
+		if self._settings.getBoolean(["server", "uploads", "compression", "enabled"]):
+			compression_level = self._settings.getInt(["server", "uploads", "compression", "level"])
+		storage_managers[octoprint.filemanager.FileDestinations.LOCAL] = octoprint.filemanager.storage.LocalFileStorage(self._settings.getBaseFolder("uploads"),
+		                                                                                                              history_limit=history_limit,
+		                                                                                                              compression_level=compression_level)
 
 		fileManager = octoprint.filemanager.FileManager(analysisQueue, slicingManager, printerProfileManager, initial_storage_managers=storage_managers)
+		resumableUploadManager = octoprint.filemanager.resumable.ResumableUploadManager(os.path.join(self._settings.getBaseFolder("uploads"), ".resumable"),
+		                                                                                 max_age=self._settings.getInt(["server", "uploads", "resumable", "maxAge"]))
 		appSessionManager = util.flask.AppSessionManager()
 		pluginLifecycleManager = LifecycleManager(pluginManager)
 		preemptiveCache = PreemptiveCache(os.path.join(self._settings.getBaseFolder("data"), "preemptive_cache_config.yaml"))
+		persistentViewCache = PersistentViewCache(os.path.join(self._settings.getBaseFolder("generated"), "views"),
+		                                          self._view_environment_hash)
 
 		connectivityChecker = self._connectivity_checker
 
@@ -349,6 +377,7 @@ class Server(object):
 				userManager = octoprint.users.FilebasedUserManager()
 			finally:
 				userManager.enabled = self._settings.getBoolean(["accessControl", "enabled"])
+		userManager.register_callback(util.on_user_manager_change)
 		components.update(dict(user_manager=userManager))
 
 		# create printer instance
@@ -442,14 +471,17 @@ class Server(object):
 
 		pluginManager.implementation_inject_factories=[octoprint_plugin_inject_factory,
 		                                               settings_plugin_inject_factory]
-		pluginManager.initialize_implementations()
+		with profiler.phase("plugin_initialization"):
+			pluginManager.initialize_implementations()
 
-		settingsPlugins = pluginManager.get_implementations(octoprint.plugin.SettingsPlugin)
-		for implementation in settingsPlugins:
-			try:
-				settings_plugin_config_migration_and_cleanup(implementation._identifier, implementation)
-			except:
-				self._logger.exception("Error while trying to migrate settings for plugin {}, ignoring it".format(implementation._identifier))
+		with profiler.phase("plugin_settings_migration"):
+			settingsPlugins = pluginManager.get_implementations(octoprint.plugin.SettingsPlugin)
+			for implementation in settingsPlugins:
+				try:
+					with profiler.plugin_step(implementation._identifier, "settings_migration"):
+						settings_plugin_config_migration_and_cleanup(implementation._identifier, implementation)
+				except:
+					self._logger.exception("Error while trying to migrate settings for plugin {}, ignoring it".format(implementation._identifier))
 
 		pluginManager.implementation_post_inits=[settings_plugin_config_migration_and_cleanup]
 
@@ -459,7 +491,8 @@ class Server(object):
 		self._environment_detector.log_detected_environment()
 
 		# initialize file manager and register it for changes in the registered plugins
-		fileManager.initialize()
+		with profiler.phase("file_manager"):
+			fileManager.initialize()
 		pluginLifecycleManager.add_callback(["enabled", "disabled"], lambda name, plugin: fileManager.reload_plugins())
 
 		# initialize slicing manager and register it for changes in the registered plugins
@@ -467,14 +500,17 @@ class Server(object):
 		pluginLifecycleManager.add_callback(["enabled", "disabled"], lambda name, plugin: slicingManager.reload_slicers())
 
 		# setup jinja2
-		self._setup_jinja2()
+		with profiler.phase("jinja2"):
+			self._setup_jinja2()
 
 		# setup assets
-		self._setup_assets()
+		with profiler.phase("assets"):
+			self._setup_assets()
 
 		# configure timelapse
 		octoprint.timelapse.valid_timelapse("test")
 		octoprint.timelapse.configure_timelapse()
+		octoprint.timelapse.init_render_scheduler(is_printing=lambda: printer.is_printing() or printer.is_paused())
 
 		# setup command triggers
 		events.CommandTrigger(printer)
@@ -485,7 +521,17 @@ class Server(object):
 		self._setup_login_manager()
 
 		# register API blueprint
-		self._setup_blueprints()
+		with profiler.phase("blueprints"):
+			self._setup_blueprints()
+
+		# build asset bundles now instead of on the first request, needs the plugin blueprints for resolving sources
+		if not assets.debug:
+			with profiler.phase("assets_build"):
+				self._build_assets()
+
+		# restore rendered views persisted during the last run
+		with profiler.phase("view_restore"):
+			self._restore_persisted_views()
 
 		## Tornado initialization starts here
 
@@ -543,6 +589,8 @@ class Server(object):
 
 		util.tornado.RequestlessExceptionLoggingMixin.LOG_REQUEST = debug
 
+		from octoprint.server.util.webassets import is_versioned_output
+
 		server_routes = self._router.urls + [
 			# various downloads
 			# .mpg and .mp4 timelapses:
@@ -552,7 +600,8 @@ class Server(object):
 			                                                                              access_validator)),
 			(r"/downloads/files/local/(.*)", util.tornado.LargeResponseHandler, joined_dict(dict(path=self._settings.getBaseFolder("uploads"),
 			                                                                                     as_attachment=True,
-			                                                                                     name_generator=download_name_generator),
+			                                                                                     name_generator=download_name_generator,
+			                                                                                     decompress=True),
 			                                                                                download_handler_kwargs,
 			                                                                                no_hidden_files_validator,
 			                                                                                additional_mime_types,
@@ -566,7 +615,10 @@ class Server(object):
 			                                                                              as_attachment=True),
 			                                                                         user_validator)),
 			# generated webassets
-			(r"/static/webassets/(.*)", util.tornado.LargeResponseHandler, dict(path=os.path.join(self._settings.getBaseFolder("generated"), "webassets"))),
+			(r"/static/webassets/(.*)", util.tornado.LargeResponseHandler, joined_dict(dict(path=os.path.join(self._settings.getBaseFolder("generated"), "webassets"),
+			                                                                                precompressed=True,
+			                                                                                immutable_check=is_versioned_output),
+			                                                                           no_hidden_files_validator)),
 
 			# online indicators - text file with "online" as content and a transparent gif
 			(r"/online.txt", util.tornado.StaticDataHandler, dict(data="online\n")),
@@ -578,6 +630,14 @@ class Server(object):
 			(r"/api/logs/(.*)", util.tornado.DeprecatedEndpointHandler, dict(url="/plugin/logging/logs/{0}")),
 		]
 
+		# upstream cache mirror, if we are publishing it for other instances
+		from octoprint.util.upstream_cache import upstream_cache
+		if upstream_cache().publishing:
+			server_routes.append((r"/upstream_cache/([^/]*)", util.tornado.LargeResponseHandler, joined_dict(dict(path=upstream_cache().folder,
+			                                                                                                     mime_type_guesser=lambda *args, **kwargs: "application/json"),
+			                                                                                                no_hidden_files_validator,
+			                                                                                                access_validator)))
+
 		# fetch additional routes from plugins
 		for name, hook in pluginManager.get_hooks("octoprint.server.http.routes").items():
 			try:
@@ -603,12 +663,33 @@ class Server(object):
 		headers =         {"X-Robots-Tag": "noindex, nofollow, noimageindex"}
 		removed_headers = ["Server"]
 
-		server_routes.append((r".*", util.tornado.UploadStorageFallbackHandler, dict(fallback=util.tornado.WsgiInputContainer(app.wsgi_app,
-		                                                                                                                      headers=headers,
-		                                                                                                                      removed_headers=removed_headers),
-		                                                                             file_prefix="octoprint-file-upload-",
-		                                                                             file_suffix=".tmp",
-		                                                                             suffixes=upload_suffixes)))
+		wsgi_executor = None
+		wsgi_workers = self._settings.getInt(["server", "wsgi", "workers"])
+		if wsgi_workers > 0:
+			import concurrent.futures
+			wsgi_executor = concurrent.futures.ThreadPoolExecutor(max_workers=wsgi_workers)
+			wsgiMetrics = util.tornado.WsgiRequestMetrics(url_map=app.url_map)
+			self._logger.debug("Running the web application on {} worker threads".format(wsgi_workers))
+
+		wsgi_fallback = util.tornado.WsgiInputContainer(app.wsgi_app,
+		                                                headers=headers,
+		                                                removed_headers=removed_headers,
+		                                                executor=wsgi_executor,
+		                                                metrics=wsgiMetrics,
+		                                                write_timeout=self._settings.getInt(["server", "wsgi", "writeTimeout"]))
+		upload_handler_kwargs = dict(fallback=wsgi_fallback,
+		                             file_prefix="octoprint-file-upload-",
+		                             file_suffix=".tmp",
+		                             suffixes=upload_suffixes)
+
+		# chunks of resumable uploads get streamed directly into the upload, everything else goes to flask
+		from octoprint.server.api.files import resumable_upload_data
+		resumable_upload_kwargs = dict(manager=resumableUploadManager,
+		                               access_validation=util.tornado.flask_request_context_factory(app, util.flask.resumable_upload_validator),
+		                               formatter=util.tornado.flask_request_context_factory(app, lambda request, state: resumable_upload_data(state)))
+		server_routes.append((r"/api/uploads/([^/]+)", util.tornado.ResumableUploadChunkHandler, joined_dict(resumable_upload_kwargs,
+		                                                                                                     upload_handler_kwargs)))
+		server_routes.append((r".*", util.tornado.UploadStorageFallbackHandler, upload_handler_kwargs))
 
 		transforms = [util.tornado.GlobalHeaderTransform.for_headers("OctoPrintGlobalHeaderTransform",
 		                                                             headers=headers,
@@ -618,6 +699,7 @@ class Server(object):
 		                                transforms=transforms)
 		max_body_sizes = [
 			("POST", r"/api/files/([^/]*)", self._settings.getInt(["server", "uploads", "maxSize"])),
+			("PUT", r"/api/uploads/([^/]*)", self._settings.getInt(["server", "uploads", "resumable", "chunkMaxSize"])),
 			("POST", r"/api/languages", 5 * 1024 * 1024)
 		]
 
@@ -688,10 +770,12 @@ class Server(object):
 		observer.start()
 
 		# run our startup plugins
-		octoprint.plugin.call_plugin(octoprint.plugin.StartupPlugin,
-		                             "on_startup",
-		                             args=(self._host, self._port),
-		                             sorting_context="StartupPlugin.on_startup")
+		with profiler.phase("on_startup"):
+			octoprint.plugin.call_plugin(octoprint.plugin.StartupPlugin,
+			                             "on_startup",
+			                             args=(self._host, self._port),
+			                             sorting_context="StartupPlugin.on_startup",
+			                             **profiler.plugin_callbacks("on_startup"))
 
 		def call_on_startup(name, plugin):
 			implementation = plugin.get_implementation(octoprint.plugin.StartupPlugin)
@@ -716,9 +800,11 @@ class Server(object):
 			# create a single use thread in which to perform our after-startup-tasks, start that and hand back
 			# control to the ioloop
 			def work():
-				octoprint.plugin.call_plugin(octoprint.plugin.StartupPlugin,
-				                             "on_after_startup",
-				                             sorting_context="StartupPlugin.on_after_startup")
+				with profiler.phase("on_after_startup"):
+					octoprint.plugin.call_plugin(octoprint.plugin.StartupPlugin,
+					                             "on_after_startup",
+					                             sorting_context="StartupPlugin.on_after_startup",
+					                             **profiler.plugin_callbacks("on_after_startup"))
 
 				def call_on_after_startup(name, plugin):
 					implementation = plugin.get_implementation(octoprint.plugin.StartupPlugin)
@@ -727,6 +813,9 @@ class Server(object):
 					implementation.on_after_startup()
 				pluginLifecycleManager.add_callback("enabled", call_on_after_startup)
 
+				# that's it, the server is fully up
+				profiler.finish()
+
 				# when we are through with that we also run our preemptive cache
 				if settings().getBoolean(["devel", "cache", "preemptive"]):
 					self._execute_preemptive_flask_caching(preemptiveCache)
@@ -768,6 +857,9 @@ class Server(object):
 			ioloop.add_callback_from_signal(shutdown_tornado)
 		signal.signal(signal.SIGTERM, sigterm_handler)
 
+		# the synchronous part of the startup is done, no need to profile the main loop
+		profiler.stop_cprofile()
+
 		try:
 			# this is the main loop - as long as tornado is running, OctoPrint is running
 			ioloop.start()
@@ -1017,53 +1109,62 @@ class Server(object):
 		if not cache_data:
 			return
 
-		def execute_caching():
+		def cache_entry(route, plugin, kwargs):
 			logger = logging.getLogger(__name__ + ".preemptive_cache")
 
-			for route in sorted(cache_data.keys(), key=lambda x: (x.count("/"), x)):
-				entries = reversed(sorted(cache_data[route], key=lambda x: x.get("_count", 0)))
-				for kwargs in entries:
-					plugin = kwargs.get("plugin", None)
-					if plugin:
-						try:
-							plugin_info = pluginManager.get_plugin_info(plugin, require_enabled=True)
-							if plugin_info is None:
-								logger.info("About to preemptively cache plugin {} but it is not installed or enabled, preemptive caching makes no sense".format(plugin))
-								continue
-
-							implementation = plugin_info.implementation
-							if implementation is None or not isinstance(implementation, octoprint.plugin.UiPlugin):
-								logger.info("About to preemptively cache plugin {} but it is not a UiPlugin, preemptive caching makes no sense".format(plugin))
-								continue
-							if not implementation.get_ui_preemptive_caching_enabled():
-								logger.info("About to preemptively cache plugin {} but it has disabled preemptive caching".format(plugin))
-								continue
-						except:
-							logger.exception("Error while trying to check if plugin {} has preemptive caching enabled, skipping entry")
-							continue
+			if plugin:
+				try:
+					plugin_info = pluginManager.get_plugin_info(plugin, require_enabled=True)
+					if plugin_info is None:
+						logger.info("About to preemptively cache plugin {} but it is not installed or enabled, preemptive caching makes no sense".format(plugin))
+						return
 
-					additional_request_data = kwargs.get("_additional_request_data", dict())
-					kwargs = dict((k, v) for k, v in kwargs.items() if not k.startswith("_") and not k == "plugin")
-					kwargs.update(additional_request_data)
+					implementation = plugin_info.implementation
+					if implementation is None or not isinstance(implementation, octoprint.plugin.UiPlugin):
+						logger.info("About to preemptively cache plugin {} but it is not a UiPlugin, preemptive caching makes no sense".format(plugin))
+						return
+					if not implementation.get_ui_preemptive_caching_enabled():
+						logger.info("About to preemptively cache plugin {} but it has disabled preemptive caching".format(plugin))
+						return
+				except:
+					logger.exception("Error while trying to check if plugin {} has preemptive caching enabled, skipping entry")
+					return
 
-					try:
-						start = time.time()
-						if plugin:
-							logger.info("Preemptively caching {} (ui {}) for {!r}".format(route, plugin, kwargs))
-						else:
-							logger.info("Preemptively caching {} (ui _default) for {!r}".format(route, kwargs))
+			additional_request_data = kwargs.get("_additional_request_data", dict())
+			kwargs = dict((k, v) for k, v in kwargs.items() if not k.startswith("_") and not k == "plugin")
+			kwargs.update(additional_request_data)
 
-						headers = kwargs.get("headers", dict())
-						headers["X-Force-View"] = plugin if plugin else "_default"
-						headers["X-Preemptive-Record"] = "no"
-						kwargs["headers"] = headers
+			try:
+				start = time.time()
+				if plugin:
+					logger.info("Preemptively caching {} (ui {}) for {!r}".format(route, plugin, kwargs))
+				else:
+					logger.info("Preemptively caching {} (ui _default) for {!r}".format(route, kwargs))
 
-						builder = EnvironBuilder(**kwargs)
-						app(builder.get_environ(), lambda *a, **kw: None)
+				headers = kwargs.get("headers", dict())
+				headers["X-Force-View"] = plugin if plugin else "_default"
+				headers["X-Preemptive-Record"] = "no"
+				kwargs["headers"] = headers
 
-						logger.info("... done in {:.2f}s".format(time.time() - start))
-					except:
-						logger.exception("Error while trying to preemptively cache {} for {!r}".format(route, kwargs))
+				builder = EnvironBuilder(**kwargs)
+				app(builder.get_environ(), lambda *a, **kw: None)
+
+				logger.info("... done with {} in {:.2f}s".format(route, time.time() - start))
+			except:
+				logger.exception("Error while trying to preemptively cache {} for {!r}".format(route, kwargs))
+
+		def execute_caching():
+			import concurrent.futures
+
+			# entries restored from the persistent view cache are served straight from the cache if their inputs
+			# are still unchanged, only changed entries actually get re-rendered here
+			workers = max(settings().getInt(["server", "preemptiveCache", "workers"]), 1)
+			with startup_profiler().phase("preemptive_cache"):
+				with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+					for route in sorted(cache_data.keys(), key=lambda x: (x.count("/"), x)):
+						entries = reversed(sorted(cache_data[route], key=lambda x: x.get("_count", 0)))
+						for kwargs in entries:
+							executor.submit(cache_entry, route, kwargs.get("plugin", None), kwargs)
 
 		# asynchronous caching
 		import threading
@@ -1071,6 +1172,31 @@ class Server(object):
 		cache_thread.daemon = True
 		cache_thread.start()
 
+	def _view_environment_hash(self):
+		"""Hash over everything besides tracked files that influences rendered views."""
+		import hashlib
+
+		hash = hashlib.sha1()
+		hash.update(octoprint.__version__)
+		hash.update(self._settings.effective_hash)
+		for name, plugin in sorted(pluginManager.enabled_plugins.items()):
+			hash.update("{}:{}".format(name, plugin.version))
+		return hash.hexdigest()
+
+	def _restore_persisted_views(self):
+		if not self._settings.getBoolean(["devel", "cache", "enabled"]):
+			return
+
+		if not self._settings.getBoolean(["devel", "cache", "persistent"]):
+			persistentViewCache.clear()
+			return
+
+		try:
+			restored = util.flask.restore_persisted_views(persistentViewCache)
+			self._logger.info("Restored {} rendered view(s) from the persistent view cache".format(restored))
+		except:
+			self._logger.exception("Error while restoring persisted views, they will be re-rendered on demand")
+
 	def _register_template_plugins(self):
 		template_plugins = pluginManager.get_implementations(octoprint.plugin.TemplatePlugin)
 		for plugin in template_plugins:
@@ -1290,6 +1416,15 @@ class Server(object):
 		assets = CustomDirectoryEnvironment(app)
 		assets.debug = not self._settings.getBoolean(["devel", "webassets", "bundle"])
 
+		# bundles get named after the hash of their content and precompressed right after building, so they can be
+		# served with immutable caching headers and without any compression effort at request time
+		from octoprint.server.util.webassets import PrecompressingHashVersion, available_precompression_encodings
+		precompression = self._settings.get(["devel", "webassets", "precompress"])
+		if not isinstance(precompression, list):
+			precompression = []
+		assets.versions = PrecompressingHashVersion(encodings=available_precompression_encodings(precompression))
+		assets.url_expire = False
+
 		UpdaterType = type(util.flask.SettingsCheckUpdater)(util.flask.SettingsCheckUpdater.__name__,
 		                                                    (util.flask.SettingsCheckUpdater,),
 		                                                    dict(updater=assets.updater))
@@ -1406,37 +1541,37 @@ class Server(object):
 		                                          filters="js_delimiter_bundler")
 
 		js_libs_bundle = Bundle(*js_libs,
-		                        output="webassets/packed_libs.js",
+		                        output="webassets/packed_libs.%(version)s.js",
 		                        filters=",".join(js_filters))
 
 		js_core_bundle = Bundle(*js_core,
-		                        output="webassets/packed_core.js",
+		                        output="webassets/packed_core.%(version)s.js",
 		                        filters=",".join(js_filters))
 
 		if len(js_plugins) == 0:
 			js_plugins_bundle = Bundle(*[])
 		else:
 			js_plugins_bundle = Bundle(*js_plugins.values(),
-			                           output="webassets/packed_plugins.js",
+			                           output="webassets/packed_plugins.%(version)s.js",
 			                           filters=",".join(js_plugin_filters))
 
 		js_app_bundle = Bundle(js_plugins_bundle, js_core_bundle,
-		                       output="webassets/packed_app.js",
+		                       output="webassets/packed_app.%(version)s.js",
 		                       filters=",".join(js_filters))
 
 		js_client_core_bundle = Bundle(*clientjs_core,
-		                               output="webassets/packed_client_core.js",
+		                               output="webassets/packed_client_core.%(version)s.js",
 		                               filters=",".join(js_filters))
 
 		if len(clientjs_plugins) == 0:
 			js_client_plugins_bundle = Bundle(*[])
 		else:
 			js_client_plugins_bundle = Bundle(*clientjs_plugins.values(),
-			                                  output="webassets/packed_client_plugins.js",
+			                                  output="webassets/packed_client_plugins.%(version)s.js",
 			                                  filters=",".join(js_plugin_filters))
 
 		js_client_bundle = Bundle(js_client_core_bundle, js_client_plugins_bundle,
-		                          output="webassets/packed_client.js",
+		                          output="webassets/packed_client.%(version)s.js",
 		                          filters=",".join(js_filters))
 
 		# -- CSS -------------------------------------------------------------------------------------------------------
@@ -1448,25 +1583,25 @@ class Server(object):
 		css_plugins = list(all_assets_for_plugins(dynamic_plugin_assets["external"]["css"]))
 
 		css_libs_bundle = Bundle(*css_libs,
-		                         output="webassets/packed_libs.css",
+		                         output="webassets/packed_libs.%(version)s.css",
 		                         filters=",".join(css_filters))
 
 		if len(css_core) == 0:
 			css_core_bundle = Bundle(*[])
 		else:
 			css_core_bundle = Bundle(*css_core,
-			                         output="webassets/packed_core.css",
+			                         output="webassets/packed_core.%(version)s.css",
 			                         filters=",".join(css_filters))
 
 		if len(css_plugins) == 0:
 			css_plugins_bundle = Bundle(*[])
 		else:
 			css_plugins_bundle = Bundle(*css_plugins,
-			                            output="webassets/packed_plugins.css",
+			                            output="webassets/packed_plugins.%(version)s.css",
 			                            filters=",".join(css_filters))
 
 		css_app_bundle = Bundle(css_core, css_plugins,
-		                        output="webassets/packed_app.css",
+		                        output="webassets/packed_app.%(version)s.css",
 		                        filters=",".join(css_filters))
 
 		# -- LESS ------------------------------------------------------------------------------------------------------
@@ -1481,18 +1616,18 @@ class Server(object):
 			less_core_bundle = Bundle(*[])
 		else:
 			less_core_bundle = Bundle(*less_core,
-			                          output="webassets/packed_core.less",
+			                          output="webassets/packed_core.%(version)s.less",
 			                          filters=",".join(less_filters))
 
 		if len(less_plugins) == 0:
 			less_plugins_bundle = Bundle(*[])
 		else:
 			less_plugins_bundle = Bundle(*less_plugins,
-			                             output="webassets/packed_plugins.less",
+			                             output="webassets/packed_plugins.%(version)s.less",
 			                             filters=",".join(less_filters))
 
 		less_app_bundle = Bundle(less_core, less_plugins,
-		                         output="webassets/packed_app.less",
+		                         output="webassets/packed_app.%(version)s.less",
 		                         filters=",".join(less_filters))
 
 		# -- asset registration ----------------------------------------------------------------------------------------
@@ -1518,6 +1653,22 @@ class Server(object):
 		assets.register("less_plugins", less_plugins_bundle)
 		assets.register("less_app", less_app_bundle)
 
+	def _build_assets(self):
+		from octoprint.server.util.webassets import BundleBuilder
+
+		fingerprint_path = os.path.join(self._settings.getBaseFolder("generated"), "webassets", ".fingerprints.json")
+		builder = BundleBuilder(assets,
+		                        fingerprint_path,
+		                        workers=self._settings.getInt(["devel", "webassets", "build_workers"]))
+
+		with app.app_context():
+			built = builder.build(self._prebuilt_bundles)
+
+		if built:
+			self._logger.info("Built asset bundles {}".format(", ".join(built)))
+		else:
+			self._logger.info("All asset bundles are up to date")
+
 	def _setup_login_manager(self):
 		util.flask.fix_flask_login_remote_address()
 
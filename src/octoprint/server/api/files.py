@@ -9,16 +9,18 @@ from flask import request, jsonify, make_response, url_for
 
 from octoprint.filemanager.destinations import FileDestinations
 from octoprint.settings import settings, valid_boolean_trues
-from octoprint.server import printer, fileManager, slicingManager, eventManager, NO_CONTENT, current_user
+from octoprint.server import printer, fileManager, resumableUploadManager, slicingManager, eventManager, NO_CONTENT, current_user
 from octoprint.server.util.flask import restricted_access, get_json_command_from_request, with_revalidation_checking
 from octoprint.server.api import api
 from octoprint.events import Events
 import octoprint.filemanager
 import octoprint.filemanager.util
 import octoprint.filemanager.storage
+import octoprint.filemanager.resumable
 import octoprint.slicing
 
 import os
+import re
 import psutil
 import hashlib
 import logging
@@ -66,7 +68,7 @@ def _create_lastmodified(path, recursive):
 		return None
 
 
-def _create_etag(path, filter, recursive, lm=None):
+def _create_etag(path, filter, recursive, lm=None, query=None):
 	if lm is None:
 		lm = _create_lastmodified(path, recursive)
 
@@ -77,6 +79,8 @@ def _create_etag(path, filter, recursive, lm=None):
 	hash.update(str(lm))
 	hash.update(str(filter))
 	hash.update(str(recursive))
+	if query:
+		hash.update(repr(sorted(query.items())))
 
 	if path.endswith("/files") or path.endswith("/files/sdcard"):
 		# include sd data in etag
@@ -91,7 +95,8 @@ def _create_etag(path, filter, recursive, lm=None):
 @with_revalidation_checking(etag_factory=lambda lm=None: _create_etag(request.path,
                                                                       request.values.get("filter", False),
                                                                       request.values.get("recursive", False),
-                                                                      lm=lm),
+                                                                      lm=lm,
+                                                                      query=_get_query_values(request.values)),
                             lastmodified_factory=lambda: _create_lastmodified(request.path,
                                                                               request.values.get("recursive", False)),
                             unless=lambda: request.values.get("force", False) or request.values.get("_refresh", False))
@@ -100,10 +105,22 @@ def readGcodeFiles():
 	recursive = request.values.get("recursive", "false") in valid_boolean_trues
 	force = request.values.get("force", "false") in valid_boolean_trues
 
-	files = _getFileList(FileDestinations.LOCAL, filter=filter, recursive=recursive, allow_from_cache=not force)
-	files.extend(_getFileList(FileDestinations.SDCARD))
+	try:
+		query = _get_query(request.values)
+	except ValueError as e:
+		return make_response("Invalid query: {}".format(e), 400)
 
 	usage = psutil.disk_usage(settings().getBaseFolder("uploads", check_writable=False))
+
+	if query is not None:
+		files, pagination = _queryFileList([FileDestinations.LOCAL, FileDestinations.SDCARD], query,
+		                                   filter=filter, recursive=recursive)
+		return jsonify(files=files, pagination=pagination, free=usage.free, total=usage.total)
+
+	fields = _get_fields(request.values)
+	files = _getFileList(FileDestinations.LOCAL, filter=filter, recursive=recursive, allow_from_cache=not force, fields=fields)
+	files.extend(_getFileList(FileDestinations.SDCARD, fields=fields))
+
 	return jsonify(files=files, free=usage.free, total=usage.total)
 
 
@@ -111,7 +128,8 @@ def readGcodeFiles():
 @with_revalidation_checking(etag_factory=lambda lm=None: _create_etag(request.path,
                                                                       request.values.get("filter", False),
                                                                       request.values.get("recursive", False),
-                                                                      lm=lm),
+                                                                      lm=lm,
+                                                                      query=_get_query_values(request.values)),
                             lastmodified_factory=lambda: _create_lastmodified(request.path,
                                                                               request.values.get("recursive", False)),
                             unless=lambda: request.values.get("force", False) or request.values.get("_refresh", False))
@@ -123,13 +141,154 @@ def readGcodeFilesForOrigin(origin):
 	recursive = request.values.get("recursive", "false") in valid_boolean_trues
 	force = request.values.get("force", "false") in valid_boolean_trues
 
-	files = _getFileList(origin, filter=filter, recursive=recursive, allow_from_cache=not force)
+	try:
+		query = _get_query(request.values)
+	except ValueError as e:
+		return make_response("Invalid query: {}".format(e), 400)
+
+	if query is not None:
+		files, pagination = _queryFileList([origin], query, filter=filter, recursive=recursive)
+		result = dict(files=files, pagination=pagination)
+	else:
+		files = _getFileList(origin, filter=filter, recursive=recursive, allow_from_cache=not force,
+		                     fields=_get_fields(request.values))
+		result = dict(files=files)
 
 	if origin == FileDestinations.LOCAL:
 		usage = psutil.disk_usage(settings().getBaseFolder("uploads", check_writable=False))
-		return jsonify(files=files, free=usage.free, total=usage.total)
-	else:
-		return jsonify(files=files)
+		result.update(free=usage.free, total=usage.total)
+
+	return jsonify(**result)
+
+
+_QUERY_PARAMETERS = ("sort", "order", "offset", "limit", "cursor", "prefix", "search", "fields")
+
+
+def _get_query_values(values):
+	return dict((key, values[key]) for key in _QUERY_PARAMETERS if key in values)
+
+
+def _get_fields(values):
+	fields = values.get("fields", None)
+	if not fields:
+		return None
+	return set(field.strip() for field in fields.split(",") if field.strip())
+
+
+def _get_query(values):
+	"""
+	Parses the pagination, sorting and search parameters of a file list request.
+
+	Returns ``None`` if none of them are present, in which case the full file tree should be returned.
+	"""
+	if not any(key in values for key in _QUERY_PARAMETERS if key != "fields"):
+		return None
+
+	sort = values.get("sort", "name")
+	if sort not in octoprint.filemanager.storage.QUERY_SORT_KEYS:
+		raise ValueError("sort must be one of {}".format(", ".join(octoprint.filemanager.storage.QUERY_SORT_KEYS)))
+
+	order = values.get("order", "asc")
+	if order not in ("asc", "desc"):
+		raise ValueError("order must be either asc or desc")
+
+	try:
+		offset = int(values.get("offset", 0))
+		limit = int(values["limit"]) if "limit" in values else None
+	except ValueError:
+		raise ValueError("offset and limit must be integers")
+	if offset < 0 or (limit is not None and limit < 0):
+		raise ValueError("offset and limit must not be negative")
+
+	after = None
+	if "cursor" in values:
+		after = _decode_cursor(values["cursor"])
+
+	return dict(sort=sort,
+	            reverse=order == "desc",
+	            offset=offset,
+	            limit=limit,
+	            after=after,
+	            prefix=values.get("prefix", None),
+	            search=values.get("search", None),
+	            fields=_get_fields(values))
+
+
+def _encode_cursor(entry, sort):
+	import base64
+	import json
+	return base64.urlsafe_b64encode(json.dumps(list(octoprint.filemanager.storage.query_sort_key(entry, sort))))
+
+
+def _decode_cursor(cursor):
+	import base64
+	import json
+	try:
+		after = json.loads(base64.urlsafe_b64decode(str(cursor)))
+	except:
+		raise ValueError("cursor is invalid")
+	if not isinstance(after, list) or len(after) != 2:
+		raise ValueError("cursor is invalid")
+	return tuple(after)
+
+
+def _queryFileList(origins, query, filter=None, recursive=False):
+	sort = query["sort"]
+	reverse = query["reverse"]
+	offset = query["offset"]
+	limit = query["limit"]
+	after = query["after"]
+
+	# one more entry than requested tells us whether there is a next page
+	fetch_limit = limit + 1 if limit is not None else None
+
+	# every origin needs to deliver enough entries to fill the page after merging
+	origin_limit = offset + fetch_limit if fetch_limit is not None and after is None else fetch_limit
+
+	entries = []
+	total = 0
+	for origin in origins:
+		if origin == FileDestinations.SDCARD:
+			candidates = [entry for entry in _getSdFileEntries()
+			              if octoprint.filemanager.storage.matches_query(entry, prefix=query["prefix"], search=query["search"])
+			              and (not filter or octoprint.filemanager.valid_file_type(entry["name"], type=filter))]
+			origin_entries, origin_total = octoprint.filemanager.storage.slice_query_result(candidates,
+			                                                                               sort=sort,
+			                                                                               reverse=reverse,
+			                                                                               limit=origin_limit,
+			                                                                               after=after)
+		else:
+			origin_entries, origin_total = fileManager.query_files(origin,
+			                                                       filter=_get_file_type_filter(filter),
+			                                                       recursive=recursive,
+			                                                       prefix=query["prefix"],
+			                                                       search=query["search"],
+			                                                       sort=sort,
+			                                                       reverse=reverse,
+			                                                       limit=origin_limit,
+			                                                       after=after)
+			for entry in origin_entries:
+				entry["origin"] = origin
+
+		entries += origin_entries
+		total += origin_total
+
+	page, _ = octoprint.filemanager.storage.slice_query_result(entries,
+	                                                           sort=sort,
+	                                                           reverse=reverse,
+	                                                           offset=offset if after is None else 0,
+	                                                           limit=fetch_limit)
+
+	more = limit is not None and len(page) > limit
+	if more:
+		page = page[:limit]
+
+	files = [_analyse_entry(entry, fields=query["fields"]) for entry in page]
+
+	pagination = dict(total=total, offset=offset if after is None else None, limit=limit)
+	if more and page:
+		pagination["next"] = _encode_cursor(page[-1], sort)
+	return files, pagination
 
 
 def _getFileDetails(origin, path, recursive=True):
@@ -143,34 +302,133 @@ def _getFileDetails(origin, path, recursive=True):
 		return None
 
 
-def _getFileList(origin, path=None, filter=None, recursive=False, allow_from_cache=True):
+def _wants_field(field, fields):
+	return fields is None or field in fields
+
+
+def _filter_fields(entry, fields):
+	if fields is None:
+		return entry
+	return dict((key, value) for key, value in entry.items() if key in fields or key == "children")
+
+
+def _analyse_recursively(files, fields=None):
+	result = []
+	for file_or_folder in files:
+		if file_or_folder["type"] == "folder" and "children" in file_or_folder:
+			# make a shallow copy in order to not accidentally modify the cached data
+			file_or_folder = dict(file_or_folder)
+			file_or_folder["children"] = _analyse_recursively(file_or_folder["children"].values(), fields=fields)
+		result.append(_analyse_entry(file_or_folder, fields=fields))
+
+	return result
+
+
+def _analyse_entry(file_or_folder, fields=None):
+	# make a shallow copy in order to not accidentally modify the cached data
+	file_or_folder = dict(file_or_folder)
+
+	file_or_folder["origin"] = file_or_folder.get("origin", FileDestinations.LOCAL)
+
+	if file_or_folder["origin"] == FileDestinations.SDCARD:
+		if _wants_field("refs", fields):
+			file_or_folder["refs"] = dict(resource=url_for(".readGcodeFile", target=FileDestinations.SDCARD, filename=file_or_folder["path"], _external=True))
+		return _filter_fields(file_or_folder, fields)
+
+	if file_or_folder["type"] == "folder":
+		if _wants_field("refs", fields):
+			file_or_folder["refs"] = dict(resource=url_for(".readGcodeFile", target=FileDestinations.LOCAL, filename=file_or_folder["path"], _external=True))
+	else:
+		if "analysis" in file_or_folder and octoprint.filemanager.valid_file_type(file_or_folder["name"], type="gcode"):
+			file_or_folder["gcodeAnalysis"] = file_or_folder["analysis"]
+			del file_or_folder["analysis"]
+
+		# print statistics are aggregated by the storage, the raw history is not part of the file list
+		history = file_or_folder.pop("history", None)
+
+		if not octoprint.filemanager.valid_file_type(file_or_folder["name"], type="gcode") or not _wants_field("prints", fields):
+			file_or_folder.pop("prints", None)
+		elif "prints" not in file_or_folder and history:
+			# storage without print aggregates, fall back to calculating them from the history
+			prints = _prints_from_history(history)
+			if prints:
+				file_or_folder["prints"] = prints
+		elif "prints" in file_or_folder and "last" not in file_or_folder["prints"]:
+			# no prints logged yet
+			del file_or_folder["prints"]
+
+		if _wants_field("refs", fields):
+			file_or_folder["refs"] = dict(resource=url_for(".readGcodeFile", target=FileDestinations.LOCAL, filename=file_or_folder["path"], _external=True),
+			                              download=url_for("index", _external=True) + "downloads/files/" + FileDestinations.LOCAL + "/" + file_or_folder["path"])
+
+	return _filter_fields(file_or_folder, fields)
+
+
+def _prints_from_history(history):
+	success = 0
+	failure = 0
+	last = None
+	for entry in history:
+		success += 1 if "success" in entry and entry["success"] else 0
+		failure += 1 if "success" in entry and not entry["success"] else 0
+		if not last or ("timestamp" in entry and "timestamp" in last and entry["timestamp"] > last["timestamp"]):
+			last = entry
+
+	if not last:
+		return None
+
+	prints = dict(
+		success=success,
+		failure=failure,
+		last=dict(
+			success=last["success"],
+			date=last["timestamp"]
+		)
+	)
+	if "printTime" in last:
+		prints["last"]["printTime"] = last["printTime"]
+	return prints
+
+
+def _getSdFileEntries():
+	sdFileList = printer.get_sd_files()
+
+	files = []
+	if sdFileList is not None:
+		for sdFile, sdSize in sdFileList:
+			type_path = octoprint.filemanager.get_file_type(sdFile)
+			if not type_path:
+				# only supported extensions
+				continue
+			else:
+				file_type = type_path[0]
+
+			file = {
+				"type": file_type,
+				"typePath": type_path,
+				"name": sdFile,
+				"display": sdFile,
+				"path": sdFile,
+				"origin": FileDestinations.SDCARD
+			}
+			if sdSize is not None:
+				file.update({"size": sdSize})
+			files.append(file)
+	return files
+
+
+def _get_file_type_filter(filter):
+	if not filter:
+		return None
+
+	# folders are always included in queries, otherwise matching files in them would get lost
+	return lambda entry, entry_data: entry_data.get("type") == "folder" \
+	                                 or octoprint.filemanager.valid_file_type(entry, type=filter)
+
+
+def _getFileList(origin, path=None, filter=None, recursive=False, allow_from_cache=True, fields=None):
 	if origin == FileDestinations.SDCARD:
-		sdFileList = printer.get_sd_files()
-
-		files = []
-		if sdFileList is not None:
-			for sdFile, sdSize in sdFileList:
-				type_path = octoprint.filemanager.get_file_type(sdFile)
-				if not type_path:
-					# only supported extensions
-					continue
-				else:
-					file_type = type_path[0]
-
-				file = {
-					"type": file_type,
-					"typePath": type_path,
-					"name": sdFile,
-					"display": sdFile,
-					"path": sdFile,
-					"origin": FileDestinations.SDCARD,
-					"refs": {
-						"resource": url_for(".readGcodeFile", target=FileDestinations.SDCARD, filename=sdFile, _external=True)
-					}
-				}
-				if sdSize is not None:
-					file.update({"size": sdSize})
-				files.append(file)
+		files = [_analyse_entry(entry, fields=fields) for entry in _getSdFileEntries()]
 	else:
 		filter_func = None
 		if filter:
@@ -184,60 +442,7 @@ def _getFileList(origin, path=None, filter=None, recursive=False, allow_from_cac
 				lastmodified = fileManager.last_modified(origin, path=path, recursive=recursive)
 				_file_cache[cache_key] = (files, lastmodified)
 
-		def analyse_recursively(files, path=None):
-			if path is None:
-				path = ""
-
-			result = []
-			for file_or_folder in files:
-				# make a shallow copy in order to not accidentally modify the cached data
-				file_or_folder = dict(file_or_folder)
-
-				file_or_folder["origin"] = FileDestinations.LOCAL
-
-				if file_or_folder["type"] == "folder":
-					if "children" in file_or_folder:
-						file_or_folder["children"] = analyse_recursively(file_or_folder["children"].values(), path + file_or_folder["name"] + "/")
-
-					file_or_folder["refs"] = dict(resource=url_for(".readGcodeFile", target=FileDestinations.LOCAL, filename=path + file_or_folder["name"], _external=True))
-				else:
-					if "analysis" in file_or_folder and octoprint.filemanager.valid_file_type(file_or_folder["name"], type="gcode"):
-						file_or_folder["gcodeAnalysis"] = file_or_folder["analysis"]
-						del file_or_folder["analysis"]
-
-					if "history" in file_or_folder and octoprint.filemanager.valid_file_type(file_or_folder["name"], type="gcode"):
-						# convert print log
-						history = file_or_folder["history"]
-						del file_or_folder["history"]
-						success = 0
-						failure = 0
-						last = None
-						for entry in history:
-							success += 1 if "success" in entry and entry["success"] else 0
-							failure += 1 if "success" in entry and not entry["success"] else 0
-							if not last or ("timestamp" in entry and "timestamp" in last and entry["timestamp"] > last["timestamp"]):
-								last = entry
-						if last:
-							prints = dict(
-								success=success,
-								failure=failure,
-								last=dict(
-									success=last["success"],
-									date=last["timestamp"]
-								)
-							)
-							if "printTime" in last:
-								prints["last"]["printTime"] = last["printTime"]
-							file_or_folder["prints"] = prints
-
-					file_or_folder["refs"] = dict(resource=url_for(".readGcodeFile", target=FileDestinations.LOCAL, filename=file_or_folder["path"], _external=True),
-					                              download=url_for("index", _external=True) + "downloads/files/" + FileDestinations.LOCAL + "/" + file_or_folder["path"])
-
-				result.append(file_or_folder)
-
-			return result
-
-		files = analyse_recursively(files)
+		files = _analyse_recursively(files, fields=fields)
 
 	return files
 
@@ -263,158 +468,178 @@ def _isBusy(target, path):
 
 	return any(target == x[0] and fileManager.file_in_path(FileDestinations.LOCAL, path, x[1]) for x in fileManager.get_busy_files())
 
-@api.route("/files/<string:target>", methods=["POST"])
-@restricted_access
-def uploadGcodeFile(target):
-	input_name = "file"
-	input_upload_name = input_name + "." + settings().get(["server", "uploads", "nameSuffix"])
-	input_upload_path = input_name + "." + settings().get(["server", "uploads", "pathSuffix"])
-	if input_upload_name in request.values and input_upload_path in request.values:
-		if not target in [FileDestinations.LOCAL, FileDestinations.SDCARD]:
-			return make_response("Unknown target: %s" % target, 404)
-
-		upload = octoprint.filemanager.util.DiskFileWrapper(request.values[input_upload_name], request.values[input_upload_path])
-
-		# Store any additional user data the caller may have passed.
-		userdata = None
-		if "userdata" in request.values:
-			import json
-			try:
-				userdata = json.loads(request.values["userdata"])
-			except:
-				return make_response("userdata contains invalid JSON", 400)
-
-		if target == FileDestinations.SDCARD and not settings().getBoolean(["feature", "sdSupport"]):
-			return make_response("SD card support is disabled", 404)
-
-		sd = target == FileDestinations.SDCARD
-		selectAfterUpload = "select" in request.values.keys() and request.values["select"] in valid_boolean_trues
-		printAfterSelect = "print" in request.values.keys() and request.values["print"] in valid_boolean_trues
+def _add_upload(target, upload, path=None, selectAfterUpload=False, printAfterSelect=False, userdata=None):
+	"""
+	Adds the uploaded file ``upload`` to ``target``, optionally selecting and/or printing it afterwards and
+	returns the response to send to the client.
 
-		if sd:
-			# validate that all preconditions for SD upload are met before attempting it
-			if not (printer.is_operational() and not (printer.is_printing() or printer.is_paused())):
-				return make_response("Can not upload to SD card, printer is either not operational or already busy", 409)
-			if not printer.is_sd_ready():
-				return make_response("Can not upload to SD card, not yet initialized", 409)
+	Shared by regular and resumable uploads.
+	"""
 
-		# determine future filename of file to be uploaded, abort if it can't be uploaded
-		try:
-			# FileDestinations.LOCAL = should normally be target, but can't because SDCard handling isn't implemented yet
-			canonPath, canonFilename = fileManager.canonicalize(FileDestinations.LOCAL, upload.filename)
-			futurePath = fileManager.sanitize_path(FileDestinations.LOCAL, canonPath)
-			futureFilename = fileManager.sanitize_name(FileDestinations.LOCAL, canonFilename)
-		except:
-			canonFilename = None
-			futurePath = None
-			futureFilename = None
+	if target == FileDestinations.SDCARD and not settings().getBoolean(["feature", "sdSupport"]):
+		return make_response("SD card support is disabled", 404)
 
-		if futureFilename is None:
-			return make_response("Can not upload file %s, wrong format?" % upload.filename, 415)
+	sd = target == FileDestinations.SDCARD
 
-		if "path" in request.values and request.values["path"]:
-			# we currently only support uploads to sdcard via local, so first target is local instead of "target"
-			futurePath = fileManager.sanitize_path(FileDestinations.LOCAL, request.values["path"])
+	if octoprint.filemanager.is_compressed_file_type(upload.filename):
+		# compressed machine code gets decompressed while it's being added, the storage will take care of compressing
+		# it again if so configured
+		upload = octoprint.filemanager.util.DecompressingFileWrapper(upload)
 
-		# prohibit overwriting currently selected file while it's being printed
-		futureFullPath = fileManager.join_path(FileDestinations.LOCAL, futurePath, futureFilename)
-		futureFullPathInStorage = fileManager.path_in_storage(FileDestinations.LOCAL, futureFullPath)
+	if sd:
+		# validate that all preconditions for SD upload are met before attempting it
+		if not (printer.is_operational() and not (printer.is_printing() or printer.is_paused())):
+			return make_response("Can not upload to SD card, printer is either not operational or already busy", 409)
+		if not printer.is_sd_ready():
+			return make_response("Can not upload to SD card, not yet initialized", 409)
 
-		if not printer.can_modify_file(futureFullPathInStorage, sd):
-			return make_response("Trying to overwrite file that is currently being printed: %s" % futureFullPath, 409)
+	# determine future filename of file to be uploaded, abort if it can't be uploaded
+	try:
+		# FileDestinations.LOCAL = should normally be target, but can't because SDCard handling isn't implemented yet
+		canonPath, canonFilename = fileManager.canonicalize(FileDestinations.LOCAL, upload.filename)
+		futurePath = fileManager.sanitize_path(FileDestinations.LOCAL, canonPath)
+		futureFilename = fileManager.sanitize_name(FileDestinations.LOCAL, canonFilename)
+	except:
+		canonFilename = None
+		futurePath = None
+		futureFilename = None
 
-		reselect = printer.is_current_file(futureFullPathInStorage, sd)
+	if futureFilename is None:
+		return make_response("Can not upload file %s, wrong format?" % upload.filename, 415)
 
-		user = current_user.get_name()
+	if path:
+		# we currently only support uploads to sdcard via local, so first target is local instead of "target"
+		futurePath = fileManager.sanitize_path(FileDestinations.LOCAL, path)
 
-		def fileProcessingFinished(filename, absFilename, destination):
-			"""
-			Callback for when the file processing (upload, optional slicing, addition to analysis queue) has
-			finished.
+	# prohibit overwriting currently selected file while it's being printed
+	futureFullPath = fileManager.join_path(FileDestinations.LOCAL, futurePath, futureFilename)
+	futureFullPathInStorage = fileManager.path_in_storage(FileDestinations.LOCAL, futureFullPath)
 
-			Depending on the file's destination triggers either streaming to SD card or directly calls selectAndOrPrint.
-			"""
+	if not printer.can_modify_file(futureFullPathInStorage, sd):
+		return make_response("Trying to overwrite file that is currently being printed: %s" % futureFullPath, 409)
 
-			if destination == FileDestinations.SDCARD and octoprint.filemanager.valid_file_type(filename, "machinecode"):
-				return filename, printer.add_sd_file(filename, absFilename, selectAndOrPrint, tags={"source:api", "api:files.sd"})
-			else:
-				selectAndOrPrint(filename, absFilename, destination)
-				return filename
+	reselect = printer.is_current_file(futureFullPathInStorage, sd)
 
-		def selectAndOrPrint(filename, absFilename, destination):
-			"""
-			Callback for when the file is ready to be selected and optionally printed. For SD file uploads this is only
-			the case after they have finished streaming to the printer, which is why this callback is also used
-			for the corresponding call to addSdFile.
+	user = current_user.get_name()
 
-			Selects the just uploaded file if either selectAfterUpload or printAfterSelect are True, or if the
-			exact file is already selected, such reloading it.
-			"""
-			if octoprint.filemanager.valid_file_type(added_file, "gcode") and (selectAfterUpload or printAfterSelect or reselect):
-				printer.select_file(absFilename, destination == FileDestinations.SDCARD, printAfterSelect, user)
+	def fileProcessingFinished(filename, absFilename, destination):
+		"""
+		Callback for when the file processing (upload, optional slicing, addition to analysis queue) has
+		finished.
 
-		try:
-			added_file = fileManager.add_file(FileDestinations.LOCAL, futureFullPathInStorage, upload,
-			                                  allow_overwrite=True,
-			                                  display=canonFilename)
-		except octoprint.filemanager.storage.StorageError as e:
-			if e.code == octoprint.filemanager.storage.StorageError.INVALID_FILE:
-				return make_response("Could not upload the file \"{}\", invalid type".format(upload.filename), 400)
-			else:
-				return make_response("Could not upload the file \"{}\"".format(upload.filename), 500)
+		Depending on the file's destination triggers either streaming to SD card or directly calls selectAndOrPrint.
+		"""
 
-		if octoprint.filemanager.valid_file_type(added_file, "stl"):
-			filename = added_file
-			done = True
+		if destination == FileDestinations.SDCARD and octoprint.filemanager.valid_file_type(filename, "machinecode"):
+			return filename, printer.add_sd_file(filename, absFilename, selectAndOrPrint, tags={"source:api", "api:files.sd"})
 		else:
-			filename = fileProcessingFinished(added_file, fileManager.path_on_disk(FileDestinations.LOCAL, added_file), target)
-			done = not sd
-
-		if userdata is not None:
-			# upload included userdata, add this now to the metadata
-			fileManager.set_additional_metadata(FileDestinations.LOCAL, added_file, "userdata", userdata)
+			selectAndOrPrint(filename, absFilename, destination)
+			return filename
 
-		sdFilename = None
-		if isinstance(filename, tuple):
-			filename, sdFilename = filename
+	def selectAndOrPrint(filename, absFilename, destination):
+		"""
+		Callback for when the file is ready to be selected and optionally printed. For SD file uploads this is only
+		the case after they have finished streaming to the printer, which is why this callback is also used
+		for the corresponding call to addSdFile.
 
-		eventManager.fire(Events.UPLOAD, {"name": futureFilename,
-		                                  "path": filename,
-		                                  "target": target,
+		Selects the just uploaded file if either selectAfterUpload or printAfterSelect are True, or if the
+		exact file is already selected, such reloading it.
+		"""
+		if octoprint.filemanager.valid_file_type(added_file, "gcode") and (selectAfterUpload or printAfterSelect or reselect):
+			printer.select_file(absFilename, destination == FileDestinations.SDCARD, printAfterSelect, user)
+
+	try:
+		added_file = fileManager.add_file(FileDestinations.LOCAL, futureFullPathInStorage, upload,
+		                                  allow_overwrite=True,
+		                                  display=canonFilename)
+	except octoprint.filemanager.storage.StorageError as e:
+		if e.code == octoprint.filemanager.storage.StorageError.INVALID_FILE:
+			return make_response("Could not upload the file \"{}\", invalid type".format(upload.filename), 400)
+		else:
+			return make_response("Could not upload the file \"{}\"".format(upload.filename), 500)
 
-		                                  # TODO deprecated, remove in 1.4.0
-		                                  "file": filename})
+	if octoprint.filemanager.valid_file_type(added_file, "stl"):
+		filename = added_file
+		done = True
+	else:
+		filename = fileProcessingFinished(added_file, fileManager.path_on_disk(FileDestinations.LOCAL, added_file), target)
+		done = not sd
+
+	if userdata is not None:
+		# upload included userdata, add this now to the metadata
+		fileManager.set_additional_metadata(FileDestinations.LOCAL, added_file, "userdata", userdata)
+
+	sdFilename = None
+	if isinstance(filename, tuple):
+		filename, sdFilename = filename
+
+	eventManager.fire(Events.UPLOAD, {"name": futureFilename,
+	                                  "path": filename,
+	                                  "target": target,
+
+	                                  # TODO deprecated, remove in 1.4.0
+	                                  "file": filename})
+
+	files = {}
+	location = url_for(".readGcodeFile", target=FileDestinations.LOCAL, filename=filename, _external=True)
+	files.update({
+		FileDestinations.LOCAL: {
+			"name": futureFilename,
+			"path": filename,
+			"origin": FileDestinations.LOCAL,
+			"refs": {
+				"resource": location,
+				"download": url_for("index", _external=True) + "downloads/files/" + FileDestinations.LOCAL + "/" + filename
+			}
+		}
+	})
 
-		files = {}
-		location = url_for(".readGcodeFile", target=FileDestinations.LOCAL, filename=filename, _external=True)
+	if sd and sdFilename:
+		location = url_for(".readGcodeFile", target=FileDestinations.SDCARD, filename=sdFilename, _external=True)
 		files.update({
-			FileDestinations.LOCAL: {
-				"name": futureFilename,
-				"path": filename,
-				"origin": FileDestinations.LOCAL,
+			FileDestinations.SDCARD: {
+				"name": sdFilename,
+				"path": sdFilename,
+				"origin": FileDestinations.SDCARD,
 				"refs": {
-					"resource": location,
-					"download": url_for("index", _external=True) + "downloads/files/" + FileDestinations.LOCAL + "/" + filename
+					"resource": location
 				}
 			}
 		})
 
-		if sd and sdFilename:
-			location = url_for(".readGcodeFile", target=FileDestinations.SDCARD, filename=sdFilename, _external=True)
-			files.update({
-				FileDestinations.SDCARD: {
-					"name": sdFilename,
-					"path": sdFilename,
-					"origin": FileDestinations.SDCARD,
-					"refs": {
-						"resource": location
-					}
-				}
-			})
+	r = make_response(jsonify(files=files, done=done), 201)
+	r.headers["Location"] = location
+	return r
 
-		r = make_response(jsonify(files=files, done=done), 201)
-		r.headers["Location"] = location
-		return r
+@api.route("/files/<string:target>", methods=["POST"])
+@restricted_access
+def uploadGcodeFile(target):
+	input_name = "file"
+	input_upload_name = input_name + "." + settings().get(["server", "uploads", "nameSuffix"])
+	input_upload_path = input_name + "." + settings().get(["server", "uploads", "pathSuffix"])
+	if input_upload_name in request.values and input_upload_path in request.values:
+		if not target in [FileDestinations.LOCAL, FileDestinations.SDCARD]:
+			return make_response("Unknown target: %s" % target, 404)
+
+		upload = octoprint.filemanager.util.DiskFileWrapper(request.values[input_upload_name], request.values[input_upload_path])
+
+		# Store any additional user data the caller may have passed.
+		userdata = None
+		if "userdata" in request.values:
+			import json
+			try:
+				userdata = json.loads(request.values["userdata"])
+			except:
+				return make_response("userdata contains invalid JSON", 400)
+
+		selectAfterUpload = "select" in request.values.keys() and request.values["select"] in valid_boolean_trues
+		printAfterSelect = "print" in request.values.keys() and request.values["print"] in valid_boolean_trues
+
+		return _add_upload(target, upload,
+		                   path=request.values.get("path"),
+		                   selectAfterUpload=selectAfterUpload,
+		                   printAfterSelect=printAfterSelect,
+		                   userdata=userdata)
 
 	elif "foldername" in request.values:
 		foldername = request.values["foldername"]
@@ -777,6 +1002,167 @@ def deleteGcodeFile(filename, target):
 
 	return NO_CONTENT
 
+
+#~~ resumable uploads
+
+_SHA256_REGEX = re.compile(r"^[0-9a-fA-F]{64}$")
+
+@api.route("/uploads", methods=["POST"])
+@restricted_access
+def createResumableUpload():
+	content_type = request.headers.get("Content-Type", None)
+	if content_type is None or not "application/json" in content_type:
+		return make_response("Expected content-type JSON", 400)
+
+	data = request.json
+	if data is None:
+		return make_response("Expected content-type JSON", 400)
+
+	for parameter in ("target", "name", "size"):
+		if not parameter in data:
+			return make_response("Mandatory parameter %s missing" % parameter, 400)
+
+	target = data["target"]
+	if not target in [FileDestinations.LOCAL, FileDestinations.SDCARD]:
+		return make_response("Unknown target: %s" % target, 404)
+
+	if target == FileDestinations.SDCARD and not settings().getBoolean(["feature", "sdSupport"]):
+		return make_response("SD card support is disabled", 404)
+
+	name = data["name"]
+	if not octoprint.filemanager.valid_file_type(name) and not octoprint.filemanager.is_compressed_file_type(name):
+		return make_response("Can not upload file %s, wrong format?" % name, 415)
+
+	try:
+		size = int(data["size"])
+	except ValueError:
+		return make_response("size must be an integer", 400)
+	if size < 0:
+		return make_response("size must not be negative", 400)
+	if size > settings().getInt(["server", "uploads", "maxSize"]):
+		return make_response("File is too large", 413)
+
+	sha256 = data.get("sha256")
+	if sha256 is not None and not _SHA256_REGEX.match(sha256):
+		return make_response("sha256 must be a hex encoded SHA256 hash", 400)
+
+	userdata = data.get("userdata")
+	if isinstance(userdata, basestring):
+		import json
+		try:
+			userdata = json.loads(userdata)
+		except:
+			return make_response("userdata contains invalid JSON", 400)
+
+	metadata = dict(select=data.get("select") in valid_boolean_trues,
+	                print=data.get("print") in valid_boolean_trues,
+	                userdata=userdata)
+
+	state = resumableUploadManager.create(target, name, size,
+	                                      path=data.get("path"),
+	                                      sha256=sha256,
+	                                      user=current_user.get_name(),
+	                                      metadata=metadata)
+
+	result = resumable_upload_data(state)
+	r = make_response(jsonify(result), 201)
+	r.headers["Location"] = result["refs"]["resource"]
+	return r
+
+
+@api.route("/uploads/<string:upload_id>", methods=["GET"])
+@restricted_access
+def readResumableUpload(upload_id):
+	state, response = _get_resumable_upload(upload_id)
+	if response is not None:
+		return response
+
+	return jsonify(resumable_upload_data(state))
+
+
+# chunks (PUT requests) are streamed directly into the upload by octoprint.server.util.tornado.ResumableUploadChunkHandler
+
+
+@api.route("/uploads/<string:upload_id>", methods=["POST"])
+@restricted_access
+def resumableUploadCommand(upload_id):
+	state, response = _get_resumable_upload(upload_id)
+	if response is not None:
+		return response
+
+	# valid upload commands, dict mapping command name to mandatory parameters
+	valid_commands = {
+		"finalize": []
+	}
+
+	command, data, response = get_json_command_from_request(request, valid_commands)
+	if response is not None:
+		return response
+
+	if command == "finalize":
+		try:
+			path = resumableUploadManager.finalize(upload_id)
+		except octoprint.filemanager.resumable.ResumableUploadError as e:
+			if e.code == octoprint.filemanager.resumable.ResumableUploadError.DOES_NOT_EXIST:
+				return make_response("Unknown upload: %s" % upload_id, 404)
+			else:
+				return make_response(e.message, 409)
+
+		metadata = state["metadata"]
+		upload = octoprint.filemanager.util.DiskFileWrapper(state["filename"], path)
+		r = _add_upload(state["target"], upload,
+		                path=state["path"],
+		                selectAfterUpload=metadata.get("select", False),
+		                printAfterSelect=metadata.get("print", False),
+		                userdata=metadata.get("userdata"))
+
+		if r.status_code == 201:
+			# data has been moved to its final destination, we are done with this upload
+			resumableUploadManager.remove(upload_id)
+
+		return r
+
+	return NO_CONTENT
+
+
+@api.route("/uploads/<string:upload_id>", methods=["DELETE"])
+@restricted_access
+def deleteResumableUpload(upload_id):
+	state, response = _get_resumable_upload(upload_id)
+	if response is not None:
+		return response
+
+	try:
+		resumableUploadManager.remove(upload_id)
+	except octoprint.filemanager.resumable.ResumableUploadError:
+		# already gone
+		pass
+
+	return NO_CONTENT
+
+def _get_resumable_upload(upload_id):
+	try:
+		state = resumableUploadManager.get(upload_id)
+	except octoprint.filemanager.resumable.ResumableUploadError:
+		return None, make_response("Unknown upload: %s" % upload_id, 404)
+
+	if state["user"] != current_user.get_name() and not current_user.is_admin():
+		# don't leak the existence of uploads of other users
+		return None, make_response("Unknown upload: %s" % upload_id, 404)
+
+	return state, None
+
+def resumable_upload_data(state):
+	return dict(id=state["id"],
+	            target=state["target"],
+	            name=state["filename"],
+	            path=state["path"],
+	            size=state["size"],
+	            received=state["received"],
+	            bytes=state["bytes"],
+	            complete=state["complete"],
+	            refs=dict(resource=url_for("api.readResumableUpload", upload_id=state["id"], _external=True)))
+
 def _getCurrentFile():
 	currentJob = printer.get_current_job()
 	if currentJob is not None and "file" in currentJob.keys() and "path" in currentJob["file"] and "origin" in currentJob["file"]:
@@ -135,6 +135,44 @@ def executeSystemCommand(source, command):
 	return NO_CONTENT
 
 
+@api.route("/system/wsgi", methods=["GET"])
+@restricted_access
+@admin_permission.require(403)
+def retrieveWsgiMetrics():
+	import octoprint.server
+
+	workers = s().getInt(["server", "wsgi", "workers"])
+	if octoprint.server.wsgiMetrics is None:
+		return jsonify(workers=0, routes=dict())
+
+	return jsonify(workers=workers, routes=octoprint.server.wsgiMetrics.as_dict())
+
+
+@api.route("/system/startup", methods=["GET"])
+@restricted_access
+@admin_permission.require(403)
+def retrieveStartupReport():
+	from octoprint.util.profiling import startup_profiler
+	return jsonify(startup_profiler().as_dict())
+
+
+@api.route("/system/hooks", methods=["GET"])
+@restricted_access
+@admin_permission.require(403)
+def retrieveHookProfile():
+	from octoprint.util.profiling import hook_profiler
+	return jsonify(hook_profiler().as_dict())
+
+
+@api.route("/system/hooks", methods=["DELETE"])
+@restricted_access
+@admin_permission.require(403)
+def resetHookProfile():
+	from octoprint.util.profiling import hook_profiler
+	hook_profiler().reset()
+	return NO_CONTENT
+
+
 def _to_client_specs(specs):
 	result = list()
 	for spec in specs.values():
@@ -43,7 +43,8 @@ def _config_for_timelapse(timelapse):
 		return dict(type="timed",
 		            postRoll=timelapse.post_roll,
 		            fps=timelapse.fps,
-		            interval=timelapse.interval)
+		            interval=timelapse.interval,
+		            targetDuration=timelapse.target_duration)
 	else:
 		return dict(type="off")
 
@@ -68,6 +69,8 @@ def _etag(unrendered, lm=None):
 	hash = hashlib.sha1()
 	hash.update(str(lm))
 	hash.update(repr(config))
+	hash.update(repr(octoprint.timelapse.capture_statistics.as_dict()))
+	hash.update(repr(octoprint.timelapse.render_scheduler().get_state()))
 	hash.update(repr(_DATA_FORMAT_VERSION))
 
 	return hash.hexdigest()
@@ -111,6 +114,8 @@ def getTimelapseData():
 		finished_list.append(output)
 
 	result = dict(config=config,
+	              capture=octoprint.timelapse.capture_statistics.as_dict(),
+	              render=octoprint.timelapse.render_scheduler().get_state(),
 	              files=finished_list)
 
 	if unrendered:
@@ -162,9 +167,11 @@ def processUnrenderedTimelapseCommand(name):
 		return response
 
 	if command == "render":
-		if printer.is_printing() or printer.is_paused():
+		if (printer.is_printing() or printer.is_paused()) \
+				and not octoprint.timelapse.render_scheduler().defer_while_printing:
 			return make_response("Printer is currently printing, cannot render timelapse", 409)
-		octoprint.timelapse.render_unrendered_timelapse(name)
+		if not octoprint.timelapse.render_unrendered_timelapse(name):
+			return make_response("Timelapse {} is already queued for rendering".format(name), 409)
 
 	return NO_CONTENT
 
@@ -217,6 +224,17 @@ def setTimelapseConfig():
 				else:
 					return make_response("Invalid value for interval: %d" % interval, 400)
 
+		if "targetDuration" in data:
+			try:
+				targetDuration = int(data["targetDuration"])
+			except ValueError:
+				return make_response("Invalid value for targetDuration: %r" % data["targetDuration"], 400)
+			else:
+				if targetDuration >= 0:
+					config["options"]["targetDuration"] = targetDuration
+				else:
+					return make_response("Invalid value for targetDuration: %d" % targetDuration, 400)
+
 		if "retractionZHop" in data:
 			try:
 				retractionZHop = float(data["retractionZHop"])
@@ -6,13 +6,16 @@ __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agp
 __copyright__ = "Copyright (C) 2014 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
 import base64
+import threading
+
+import pylru
 
 from octoprint.settings import settings
 import octoprint.timelapse
 import octoprint.server
 from octoprint.users import ApiUser
 
-from octoprint.util import deprecated
+from octoprint.util import deprecated, monotonic_time, secure_compare
 from octoprint.plugin import plugin_manager
 
 import flask as _flask
@@ -179,26 +182,90 @@ def optionsAllowOrigin(request):
 	return resp
 
 
+APIKEY_USER_CACHE_SIZE = 32
+"""Number of resolved users to keep in the API key cache."""
+
+APIKEY_USER_CACHE_TTL = 10.0
+"""Maximum time in seconds a resolved user is served from the API key cache."""
+
+# Looking up keys here (and in the API key indices of the user manager and the application keys plugin) is a dict
+# lookup and as such not constant time. Keys only get compared once their hashes match though, so the timing depends
+# on the key's hash and not on how many leading characters of a guessed key are correct.
+_apikey_user_cache = pylru.lrucache(APIKEY_USER_CACHE_SIZE)
+_apikey_user_cache_lock = threading.RLock()
+
+# increased on every invalidation, users resolved while an invalidation happened must not end up in the cache
+_apikey_user_cache_generation = 0
+
+
+def invalidate_user_for_apikey(apikey=None):
+	"""
+	Removes ``apikey`` from the cache of users resolved for API keys, or clears the cache
+	completely if no ``apikey`` is provided.
+
+	Needs to be called whenever an API key is revoked or the user it belongs to changes.
+	"""
+
+	global _apikey_user_cache_generation
+
+	with _apikey_user_cache_lock:
+		_apikey_user_cache_generation += 1
+		if apikey is None:
+			_apikey_user_cache.clear()
+		elif apikey in _apikey_user_cache:
+			del _apikey_user_cache[apikey]
+
+
+def on_user_manager_change(action, user):
+	"""
+	User manager callback which invalidates the API key cache when users got modified, e.g. when API keys were
+	generated or deleted or users removed.
+	"""
+
+	if action == "changed":
+		invalidate_user_for_apikey()
+
+
 def get_user_for_apikey(apikey):
 	if settings().getBoolean(["api", "enabled"]) and apikey is not None:
-		if apikey == settings().get(["api", "key"]) or octoprint.server.appSessionManager.validate(apikey):
+		if secure_compare(apikey, settings().get(["api", "key"])) or octoprint.server.appSessionManager.validate(apikey):
 			# master key or an app session key was used
 			return ApiUser()
 
-		if octoprint.server.userManager.enabled:
-			user = octoprint.server.userManager.findUser(apikey=apikey)
+		now = monotonic_time()
+		with _apikey_user_cache_lock:
+			if apikey in _apikey_user_cache:
+				user, timestamp = _apikey_user_cache[apikey]
+				if timestamp + APIKEY_USER_CACHE_TTL > now:
+					return user
+				del _apikey_user_cache[apikey]
+			generation = _apikey_user_cache_generation
+
+		user = _resolve_user_for_apikey(apikey)
+		if user is not None:
+			with _apikey_user_cache_lock:
+				# the key might have been revoked while we were resolving it
+				if generation == _apikey_user_cache_generation:
+					_apikey_user_cache[apikey] = (user, now)
+		return user
+	return None
+
+
+def _resolve_user_for_apikey(apikey):
+	if octoprint.server.userManager.enabled:
+		user = octoprint.server.userManager.findUser(apikey=apikey)
+		if user is not None:
+			# user key was used
+			return user
+
+	apikey_hooks = plugin_manager().get_hooks("octoprint.accesscontrol.keyvalidator")
+	for name, hook in apikey_hooks.items():
+		try:
+			user = hook(apikey)
 			if user is not None:
-				# user key was used
 				return user
-
-		apikey_hooks = plugin_manager().get_hooks("octoprint.accesscontrol.keyvalidator")
-		for name, hook in apikey_hooks.items():
-			try:
-				user = hook(apikey)
-				if user is not None:
-					return user
-			except:
-				logging.getLogger(__name__).exception("Error running api key validator for plugin {} and key {}".format(name, apikey))
+		except:
+			logging.getLogger(__name__).exception("Error running api key validator for plugin {} and key {}".format(name, apikey))
 	return None
 
 
@@ -655,7 +655,138 @@ class LessSimpleCache(BaseCache):
 
 _cache = LessSimpleCache()
 
-def cached(timeout=5 * 60, key=lambda: "view:%s" % flask.request.path, unless=None, refreshif=None, unless_response=None):
+
+class PersistentViewCache(object):
+	"""
+	On-disk store for rendered views that allows restoring them into the in-memory view cache after a restart.
+
+	Every entry is stored in its own file, together with the cache key it was stored under, the ``UI_API_KEY`` it
+	was rendered with, the fingerprint of its ETag inputs and an environment hash (covering things like plugin
+	versions and settings) that was current at the time of rendering. On restore entries whose environment doesn't
+	match the current one are discarded so that they will get re-rendered.
+
+	Arguments:
+	    folder (str): The folder in which to persist rendered views
+	    environment (callable): Callable returning the current environment hash
+	"""
+
+	def __init__(self, folder, environment):
+		self.folder = folder
+		self.environment = environment
+
+		self._logger = logging.getLogger(__name__ + "." + self.__class__.__name__)
+		self._lock = threading.RLock()
+
+	def store(self, key, response, ui_api_key, fingerprint=None):
+		import pickle
+		from octoprint.util import atomic_write
+
+		entry = dict(key=key,
+		             environment=self.environment(),
+		             fingerprint=fingerprint,
+		             ui_api_key=ui_api_key,
+		             response=response)
+
+		with self._lock:
+			try:
+				if not os.path.isdir(self.folder):
+					os.makedirs(self.folder)
+				with atomic_write(self._path_for(key), "wb") as f:
+					pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+			except:
+				self._logger.exception("Error while persisting rendered view for {}".format(key))
+
+	def remove(self, key):
+		with self._lock:
+			try:
+				os.remove(self._path_for(key))
+			except OSError:
+				pass
+
+	def clear(self):
+		with self._lock:
+			if not os.path.isdir(self.folder):
+				return
+			for entry in scandir(self.folder):
+				if entry.name.endswith(".view"):
+					try:
+						os.remove(entry.path)
+					except OSError:
+						pass
+
+	def restore(self, cache, ui_api_key, etag_factory):
+		"""
+		Restores all persisted views with a matching environment into ``cache``.
+
+		Views that were rendered with a different ``UI_API_KEY`` get the new key substituted and, if they have a
+		fingerprint, their ETag regenerated via ``etag_factory(fingerprint)``.
+
+		Returns:
+		    (int) the number of restored entries
+		"""
+		import pickle
+
+		if not os.path.isdir(self.folder):
+			return 0
+
+		environment = self.environment()
+		restored = 0
+
+		with self._lock:
+			for entry in scandir(self.folder):
+				if not entry.name.endswith(".view"):
+					continue
+
+				try:
+					with open(entry.path, "rb") as f:
+						data = pickle.load(f)
+				except:
+					self._logger.exception("Error while reading persisted view from {}, removing it".format(entry.path))
+					os.remove(entry.path)
+					continue
+
+				if data.get("environment") != environment:
+					self._logger.debug("Environment changed since {} was rendered, removing it".format(data.get("key")))
+					os.remove(entry.path)
+					continue
+
+				response = data["response"]
+				if data["ui_api_key"] != ui_api_key:
+					response.data = response.data.replace(data["ui_api_key"].encode("ascii"),
+					                                      ui_api_key.encode("ascii"))
+					if data["fingerprint"]:
+						response.set_etag(etag_factory(data["fingerprint"]))
+
+				cache.set(data["key"], response, timeout=-1)
+				restored += 1
+
+		return restored
+
+	def _path_for(self, key):
+		import hashlib
+		return os.path.join(self.folder, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".view")
+
+
+def view_etag(fingerprint, ui_api_key=None):
+	"""Generates a view ETag from the fingerprint of its inputs and the ``UI_API_KEY`` it embeds."""
+	import hashlib
+
+	if ui_api_key is None:
+		ui_api_key = octoprint.server.UI_API_KEY
+
+	hash = hashlib.sha1()
+	hash.update(fingerprint)
+	hash.update(ui_api_key)
+	return hash.hexdigest()
+
+
+def restore_persisted_views(persistent_cache, ui_api_key=None):
+	if ui_api_key is None:
+		ui_api_key = octoprint.server.UI_API_KEY
+	return persistent_cache.restore(_cache, ui_api_key, lambda fingerprint: view_etag(fingerprint, ui_api_key=ui_api_key))
+
+
+def cached(timeout=5 * 60, key=lambda: "view:%s" % flask.request.path, unless=None, refreshif=None, unless_response=None, persist=None):
 	def decorator(f):
 		@functools.wraps(f)
 		def decorated_function(*args, **kwargs):
@@ -708,6 +839,13 @@ def cached(timeout=5 * 60, key=lambda: "view:%s" % flask.request.path, unless=No
 			# store it in the cache
 			_cache.set(cache_key, rv, timeout=timeout)
 
+			# and persist it if requested
+			if callable(persist):
+				try:
+					persist(cache_key, rv)
+				except:
+					logger.exception("Error while persisting result for {path} (key: {key})".format(path=flask.request.path, key=cache_key))
+
 			return rv
 
 		return decorated_function
@@ -1094,6 +1232,26 @@ def user_validator(request):
 		raise tornado.web.HTTPError(403)
 
 
+def resumable_upload_validator(request, upload):
+	"""
+	Validates that the given request is made by an authenticated user who either owns the resumable ``upload`` or is
+	an admin, identified either by API key or existing Flask session. Uploads of other users are reported as not
+	existing.
+
+	Must be executed in an existing Flask request context!
+
+	:param request: The Flask request object
+	:param upload: The state of the resumable upload
+	"""
+
+	user = get_flask_user_from_request(request)
+	if user is None or not user.is_authenticated():
+		raise tornado.web.HTTPError(403)
+
+	if upload["user"] != user.get_name() and not user.is_admin():
+		raise tornado.web.HTTPError(404, "%s", "Unknown upload: {}".format(upload["id"]))
+
+
 def get_flask_user_from_request(request):
 	"""
 	Retrieves the current flask user from the request context. Uses API key if available, otherwise the current
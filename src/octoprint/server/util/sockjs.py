@@ -22,6 +22,7 @@ import octoprint.users
 from octoprint.events import Events
 from octoprint.settings import settings
 from octoprint.util.json import JsonEncoding
+from octoprint.util.profiling import hook_profiler
 
 import octoprint.printer
 
@@ -240,6 +241,9 @@ class PrinterStateConnection(octoprint.vendor.sockjs.tornado.SockJSConnection, o
 	def sendTimelapseConfig(self, timelapseConfig):
 		self._emit("timelapse", timelapseConfig)
 
+	def sendTimelapseRenderQueue(self, renderQueue):
+		self._emit("renderQueue", renderQueue)
+
 	def sendSlicingProgress(self, slicer, source_location, source_path, dest_location, dest_path, progress):
 		self._emit("slicingProgress",
 		           dict(slicer=slicer, source_location=source_location, source_path=source_path, dest_location=dest_location, dest_path=dest_path, progress=progress)
@@ -267,7 +271,8 @@ class PrinterStateConnection(octoprint.vendor.sockjs.tornado.SockJSConnection, o
 		proceed = True
 		for name, hook in self._emit_hooks.items():
 			try:
-				proceed = proceed and hook(self, self._user, type, payload)
+				proceed = proceed and hook_profiler().call("octoprint.server.sockjs.emit", name, hook,
+				                                           self, self._user, type, payload)
 			except:
 				self._logger.exception("Error processing emit hook handler from plugin {}".format(name))
 
@@ -308,6 +313,7 @@ class PrinterStateConnection(octoprint.vendor.sockjs.tornado.SockJSConnection, o
 			self._eventManager.subscribe(event, self._onEvent)
 
 		octoprint.timelapse.notify_callbacks(octoprint.timelapse.current)
+		self.sendTimelapseRenderQueue(octoprint.timelapse.render_scheduler().get_state())
 
 		# This is a horrible hack for now to allow displaying a notification that a render job is still
 		# active in the backend on a fresh connect of a client. This needs to be substituted with a proper
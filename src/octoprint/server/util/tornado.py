@@ -9,6 +9,7 @@ import logging
 import os
 import mimetypes
 import re
+import threading
 
 import tornado
 import tornado.web
@@ -19,10 +20,13 @@ import tornado.httpserver
 import tornado.httpclient
 import tornado.http1connection
 import tornado.iostream
+import tornado.ioloop
 import tornado.tcpserver
 import tornado.util
 
 import octoprint.util
+import octoprint.util.compression
+from octoprint.util import monotonic_time
 
 
 
@@ -137,6 +141,12 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 	BODY_METHODS = ("POST", "PATCH", "PUT")
 	""" The request methods that may contain a request body. """
 
+	MAX_MEMORY_BODY_SIZE = 1024 * 1024
+	""" Non multipart request bodies larger than this will be spooled to a temporary file. """
+
+	MAX_PART_HEADER_SIZE = 64 * 1024
+	""" Maximum size of the headers of a single part in a multipart request. """
+
 	def initialize(self, fallback, file_prefix="tmp", file_suffix="", path=None, suffixes=None):
 		if not suffixes:
 			suffixes = dict()
@@ -167,8 +177,17 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		# bytes left to read according to content_length of request body
 		self._bytes_left = 0
 
-		# buffer needed for identifying form data parts
-		self._buffer = b""
+		# buffer needed for identifying form data parts, only ever holds the not yet processed remainder of the
+		# last received chunks
+		self._buffer = bytearray()
+
+		# the multipart delimiter (CRLF + "--" + boundary) and current state of the multipart parser
+		self._delimiter = None
+		self._parser_state = None
+
+		# non multipart bodies, spooled to disk once they get large
+		self._body = None
+		self._body_length = 0
 
 		# buffer for new body
 		self._new_body = b""
@@ -176,6 +195,7 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		# logger
 		self._logger = logging.getLogger(__name__)
 
+	@tornado.gen.coroutine
 	def prepare(self):
 		"""
 		Prepares the processing of the request. If it's a request that may contain a request body (as defined in
@@ -212,7 +232,7 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 					# So no boundary? 400 Bad Request
 					raise tornado.web.HTTPError(400, log_message="No multipart boundary supplied")
 		else:
-			self._fallback(self.request, b"")
+			yield self._fallback(self.request, b"")
 			self._finished = True
 
 	def data_received(self, chunk):
@@ -224,11 +244,17 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		:param chunk: chunk of data received from Tornado
 		"""
 
-		data = self._buffer + chunk
 		if self.is_multipart():
-			self._process_multipart_data(data)
+			self._process_multipart_data(chunk)
 		else:
-			self._buffer = data
+			if self._body is None:
+				import tempfile
+				self._body = tempfile.SpooledTemporaryFile(max_size=UploadStorageFallbackHandler.MAX_MEMORY_BODY_SIZE,
+				                                           prefix=self._file_prefix,
+				                                           suffix=self._file_suffix,
+				                                           dir=self._path)
+			self._body.write(chunk)
+			self._body_length += len(chunk)
 
 	def is_multipart(self):
 		"""Checks whether this request is a ``multipart`` request"""
@@ -238,40 +264,98 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		"""
 		Processes the given data, parsing it for multipart definitions and calling the appropriate methods.
 
+		The data gets appended to an internal buffer which is scanned incrementally. Part data is forwarded to the
+		part handler as soon as it is known not to contain a boundary, so the buffer never holds more than the
+		headers of one part or a potentially incomplete delimiter.
+
 		:param data: the data to process as a string
 		"""
 
-		# check for boundary
-		delimiter = b"--%s" % self._multipart_boundary
-		delimiter_loc = data.find(delimiter)
-		delimiter_len = len(delimiter)
-		end_of_header = None
-		if delimiter_loc != -1:
-			# found the delimiter in the currently available data
-			delimiter_data_end = 0 if delimiter_loc == 0 else delimiter_loc - 2
-			data, self._buffer = data[0:delimiter_data_end], data[delimiter_loc:]
-			end_of_header = self._buffer.find("\r\n\r\n")
-		else:
-			# make sure any boundary (with single or double ==) contained at the end of chunk does not get
-			# truncated by this processing round => save it to the buffer for next round
-			endlen = len(self._multipart_boundary) + 4
-			data, self._buffer = data[0:-endlen], data[-endlen:]
-
-		# stream data to part handler
-		if data and self._current_part:
-				self._on_part_data(self._current_part, data)
-
-		if end_of_header >= 0:
-			self._on_part_header(self._buffer[delimiter_len+2:end_of_header])
-			self._buffer = self._buffer[end_of_header + 4:]
-
-		if delimiter_loc != -1 and self._buffer.strip() == delimiter + "--":
-			# we saw the last boundary and are at the end of our request
-			if self._current_part:
-				self._on_part_finish(self._current_part)
-				self._current_part = None
-			self._buffer = b""
-			self._on_request_body_finish()
+		if self._delimiter is None:
+			self._delimiter = b"\r\n--" + self._multipart_boundary
+			self._parser_state = "preamble"
+
+			# the first delimiter directly follows the (usually empty) preamble without a leading CRLF
+			self._buffer.extend(b"\r\n")
+
+		self._buffer.extend(data)
+
+		delimiter = self._delimiter
+		buf = self._buffer
+		while buf and self._parser_state != "done":
+			if self._parser_state in ("preamble", "data"):
+				pos = buf.find(delimiter)
+				if pos == -1:
+					# forward everything that can't be the start of a delimiter
+					keep = len(delimiter) - 1
+					if len(buf) > keep:
+						if self._parser_state == "data" and self._current_part:
+							self._on_part_data(self._current_part, memoryview(buf)[:len(buf) - keep])
+						del buf[:len(buf) - keep]
+					break
+
+				if self._parser_state == "data" and self._current_part:
+					self._on_part_data(self._current_part, memoryview(buf)[:pos])
+				del buf[:pos + len(delimiter)]
+				self._parser_state = "boundary"
+
+			elif self._parser_state == "boundary":
+				if len(buf) < 2:
+					break
+
+				if buf[:2] == b"--":
+					# we saw the last boundary and are at the end of our request
+					self._finish_multipart()
+					break
+
+				pos = buf.find(b"\r\n")
+				if pos == -1:
+					break
+
+				# skip the CRLF and any transport padding after the delimiter
+				del buf[:pos + 2]
+				self._parser_state = "header"
+
+			elif self._parser_state == "header":
+				if buf[:2] == b"\r\n":
+					# part without any headers
+					pos, header = 0, b""
+				else:
+					pos = buf.find(b"\r\n\r\n")
+					if pos == -1:
+						if len(buf) > UploadStorageFallbackHandler.MAX_PART_HEADER_SIZE:
+							raise tornado.web.HTTPError(400, log_message="Multipart header too large")
+						break
+					header = bytes(buf[:pos])
+					pos += 2
+
+				del buf[:pos + 2]
+				self._on_part_header(header)
+				self._parser_state = "data"
+
+	def _finish_multipart(self):
+		"""
+		Finishes the multipart processing, closing any still open part and creating the new request body.
+		"""
+
+		if self._parser_state == "done":
+			return
+
+		if self._delimiter is None:
+			# we never received any data
+			self._parser_state = "done"
+			return
+
+		if self._current_part:
+			if self._parser_state == "data" and self._buffer:
+				# body ended without a closing delimiter, the rest belongs to the current part
+				self._on_part_data(self._current_part, memoryview(self._buffer))
+			self._on_part_finish(self._current_part)
+			self._current_part = None
+
+		del self._buffer[:]
+		self._parser_state = "done"
+		self._on_request_body_finish()
 
 	def _on_part_header(self, header):
 		"""
@@ -349,7 +433,7 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 
 		* ``name``: name of the part
 		* ``content_type``: content type of the part
-		* ``data``: bytes of the part (initialized to an empty string)
+		* ``data``: bytes of the part (initialized to an empty ``bytearray``)
 
 		:param name: name of the part
 		:param content_type: content type of the part
@@ -367,19 +451,20 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 						file=handle)
 
 		else:
-			return dict(name=tornado.escape.utf8(name), content_type=tornado.escape.utf8(content_type), data=b"")
+			return dict(name=tornado.escape.utf8(name), content_type=tornado.escape.utf8(content_type), data=bytearray())
 
 	def _on_part_data(self, part, data):
 		"""
 		Called when new bytes are received for the given ``part``, takes care of writing them to their storage.
 
 		:param part: part for which data was received
-		:param data: data chunk which was received
+		:param data: data chunk which was received, might be a ``memoryview`` into the parser's buffer which is only valid
+		             for the duration of the call
 		"""
 		if "file" in part:
 			part["file"].write(data)
 		else:
-			part["data"] += data
+			part["data"].extend(data)
 
 	def _on_part_finish(self, part):
 		"""
@@ -401,7 +486,7 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 		logged parts, turning ``file`` parts into new ``data`` parts.
 		"""
 
-		self._new_body = b""
+		body = []
 		for name, part in self._parts.items():
 			if "filename" in part:
 				# add form fields for filename, path, size and content_type for all files contained in the request
@@ -419,21 +504,23 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 				fields = dict((self._suffixes[key], value) for (key, value) in parameters.items())
 				for n, p in fields.items():
 					key = name + "." + n
-					self._new_body += b"--%s\r\n" % self._multipart_boundary
-					self._new_body += b"Content-Disposition: form-data; name=\"%s\"\r\n" % key
-					self._new_body += b"Content-Type: text/plain; charset=utf-8\r\n"
-					self._new_body += b"\r\n"
-					self._new_body += b"%s\r\n" % p
+					body.append(b"--%s\r\n" % self._multipart_boundary)
+					body.append(b"Content-Disposition: form-data; name=\"%s\"\r\n" % key)
+					body.append(b"Content-Type: text/plain; charset=utf-8\r\n")
+					body.append(b"\r\n")
+					body.append(b"%s\r\n" % p)
 			elif "data" in part:
-				self._new_body += b"--%s\r\n" % self._multipart_boundary
+				body.append(b"--%s\r\n" % self._multipart_boundary)
 				value = part["data"]
-				self._new_body += b"Content-Disposition: form-data; name=\"%s\"\r\n" % name
+				body.append(b"Content-Disposition: form-data; name=\"%s\"\r\n" % name)
 				if "content_type" in part and part["content_type"] is not None:
-					self._new_body += b"Content-Type: %s\r\n" % part["content_type"]
-				self._new_body += b"\r\n"
-				self._new_body += value + b"\r\n"
-		self._new_body += b"--%s--\r\n" % self._multipart_boundary
+					body.append(b"Content-Type: %s\r\n" % part["content_type"])
+				body.append(b"\r\n")
+				body.append(bytes(value) + b"\r\n")
+		body.append(b"--%s--\r\n" % self._multipart_boundary)
+		self._new_body = b"".join(body)
 
+	@tornado.gen.coroutine
 	def _handle_method(self, *args, **kwargs):
 		"""
 		Takes care of defining the new request body if necessary and forwarding
@@ -442,29 +529,34 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 
 		# determine which body to supply
 		body = b""
+		body_length = 0
 		if self.is_multipart():
 			# make sure we really processed all data in the buffer
-			while len(self._buffer):
-				self._process_multipart_data(self._buffer)
+			self._finish_multipart()
 
 			# use rewritten body
 			body = self._new_body
+			body_length = len(body)
 
-		elif self.request.method in UploadStorageFallbackHandler.BODY_METHODS:
-			# directly use data from buffer
-			body = self._buffer
+		elif self.request.method in UploadStorageFallbackHandler.BODY_METHODS and self._body is not None:
+			# use the spooled body as stream
+			self._body.seek(0)
+			body = self._body
+			body_length = self._body_length
 
 		# rewrite content length
-		self.request.headers["Content-Length"] = len(body)
+		self.request.headers["Content-Length"] = body_length
 
 		try:
 			# call the configured fallback with request and body to use
-			self._fallback(self.request, body)
+			yield self._fallback(self.request, body)
 			self._headers_written = True
 		finally:
 			# make sure the temporary files are removed again
 			for f in self._files:
 				octoprint.util.silent_remove(f)
+			if self._body is not None:
+				self._body.close()
 
 	# make all http methods trigger _handle_method
 	get = _handle_method
@@ -476,6 +568,162 @@ class UploadStorageFallbackHandler(RequestlessExceptionLoggingMixin):
 	options = _handle_method
 
 
+class ResumableUploadChunkHandler(UploadStorageFallbackHandler):
+	"""
+	Receives the chunks of resumable uploads, sent as ``PUT`` requests with either a ``Content-Range`` header or an
+	``offset`` query parameter, and streams them directly into the upload via
+	:meth:`~octoprint.filemanager.resumable.ResumableUploadManager.open_chunk` while they arrive, instead of spooling
+	them to a temporary file first. Any other request is handled like by :class:`UploadStorageFallbackHandler`.
+
+	The id of the upload is taken from the first path argument.
+
+	Arguments:
+	    manager (octoprint.filemanager.resumable.ResumableUploadManager): the upload manager
+	    access_validation (function): callback taking the request and the upload's state, to be called before any data
+	        is accepted. Should raise a ``tornado.web.HTTPError`` if access to the upload is not allowed.
+	    formatter (function): callback taking the request and the upload's state after the chunk has been written,
+	        returning the data to respond with as JSON
+	"""
+
+	CONTENT_RANGE_REGEX = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+	def initialize(self, manager=None, access_validation=None, formatter=None, **kwargs):
+		UploadStorageFallbackHandler.initialize(self, **kwargs)
+
+		self._manager = manager
+		self._access_validation = access_validation
+		self._formatter = formatter
+
+		self._writer = None
+		self._chunk_error = None
+
+	@tornado.gen.coroutine
+	def prepare(self):
+		if self.request.method != "PUT":
+			yield UploadStorageFallbackHandler.prepare(self)
+			return
+
+		from octoprint.filemanager.resumable import ResumableUploadError
+
+		upload_id = self.path_args[0]
+		try:
+			state = self._manager.get(upload_id)
+		except ResumableUploadError:
+			raise tornado.web.HTTPError(404, "%s", "Unknown upload: {}".format(upload_id))
+
+		if self._access_validation is not None:
+			self._access_validation(self.request, state)
+
+		length = self.request.headers.get("Content-Length")
+		if length is None:
+			raise tornado.web.HTTPError(411, "%s", "Content-Length required")
+		length = int(length)
+
+		content_range = self.request.headers.get("Content-Range")
+		if content_range:
+			match = self.CONTENT_RANGE_REGEX.match(content_range)
+			if not match:
+				raise tornado.web.HTTPError(400, "%s", "Invalid Content-Range: {}".format(content_range))
+
+			start, end, total = match.groups()
+			offset = int(start)
+			if int(end) - offset + 1 != length:
+				raise tornado.web.HTTPError(400, "%s", "Content-Range doesn't match Content-Length")
+			if total != "*" and int(total) != state["size"]:
+				raise tornado.web.HTTPError(400, "%s", "Content-Range doesn't match size of upload")
+
+		elif self.get_query_argument("offset", None) is not None:
+			try:
+				offset = int(self.get_query_argument("offset"))
+			except ValueError:
+				raise tornado.web.HTTPError(400, "%s", "offset must be an integer")
+
+		else:
+			raise tornado.web.HTTPError(400, "%s", "Either Content-Range or offset must be provided")
+
+		try:
+			self._writer = self._manager.open_chunk(upload_id, offset, length)
+		except ResumableUploadError as e:
+			raise self._to_http_error(e)
+
+	def data_received(self, chunk):
+		if self.request.method != "PUT":
+			UploadStorageFallbackHandler.data_received(self, chunk)
+			return
+
+		if self._writer is None:
+			# chunk already failed, discard the rest of the body
+			return
+
+		try:
+			self._writer.write(chunk)
+		except Exception as e:
+			self._chunk_error = e
+			self._close_writer()
+
+	def put(self, *args, **kwargs):
+		from octoprint.filemanager.resumable import ResumableUploadError
+
+		if self._chunk_error is not None:
+			if isinstance(self._chunk_error, ResumableUploadError):
+				raise self._to_http_error(self._chunk_error)
+			raise self._chunk_error
+
+		writer = self._writer
+		self._writer = None
+		try:
+			state = writer.close()
+		except ResumableUploadError as e:
+			raise self._to_http_error(e)
+
+		result = self._formatter(self.request, state) if self._formatter is not None else state
+		self.set_header("Content-Type", "application/json")
+		self.finish(tornado.escape.json_encode(result))
+
+	def on_connection_close(self):
+		# record whatever arrived before the client went away, so the upload can be resumed from there
+		self._close_writer()
+		UploadStorageFallbackHandler.on_connection_close(self)
+
+	def on_finish(self):
+		self._close_writer()
+
+	def write_error(self, status_code, **kwargs):
+		exception = kwargs.get("exc_info", (None, None, None))[1]
+		if isinstance(exception, tornado.web.HTTPError) and exception.log_message:
+			self.set_header("Content-Type", "text/plain; charset=utf-8")
+			self.finish(exception.log_message % exception.args)
+		else:
+			UploadStorageFallbackHandler.write_error(self, status_code, **kwargs)
+
+	def _close_writer(self):
+		from octoprint.filemanager.resumable import ResumableUploadError
+
+		writer = self._writer
+		self._writer = None
+		if writer is None:
+			return
+
+		try:
+			writer.close()
+		except ResumableUploadError:
+			pass
+		except:
+			self._logger.exception("Error while closing chunk of resumable upload {}".format(writer.upload_id))
+
+	@staticmethod
+	def _to_http_error(error):
+		from octoprint.filemanager.resumable import ResumableUploadError
+
+		if error.code == ResumableUploadError.DOES_NOT_EXIST:
+			status = 404
+		elif error.code == ResumableUploadError.INVALID_RANGE:
+			status = 416
+		else:
+			status = 400
+		return tornado.web.HTTPError(status, "%s", error.message)
+
+
 def _parse_header(line, strip_quotes=True):
 	parts = tornado.httputil._parseparam(';' + line)
 	key = next(parts)
@@ -535,10 +783,24 @@ class WsgiInputContainer(object):
 
 	The implementation logic is basically the same as ``tornado.wsgi.WSGIContainer`` but the ``__call__`` and ``environ``
 	methods have been adjusted to allow for an optionally supplied ``body`` argument which is then used for ``wsgi.input``.
+
+	If an ``executor`` (e.g. a ``concurrent.futures.ThreadPoolExecutor``) is supplied, the WSGI application will be
+	run on that instead of the IOLoop, so that slow requests don't block anything else served by the same IOLoop. The
+	response will still be written from the IOLoop. The worker only waits for the client once more than
+	``write_buffer`` bytes of the response are still waiting to be written, and for no longer than ``write_timeout``
+	seconds, after which the connection gets closed. Time spent waiting for a free worker and running the application
+	is then recorded per route in the supplied ``metrics`` (a :class:`WsgiRequestMetrics` instance).
+
+	``__call__`` returns a ``Future`` which resolves once the response has been written.
 	"""
 
-	def __init__(self, wsgi_application, headers=None, forced_headers=None, removed_headers=None):
+	def __init__(self, wsgi_application, headers=None, forced_headers=None, removed_headers=None, executor=None,
+	             metrics=None, write_buffer=1024 * 1024, write_timeout=60):
 		self.wsgi_application = wsgi_application
+		self.executor = executor
+		self.metrics = metrics
+		self.write_buffer = write_buffer
+		self.write_timeout = write_timeout
 
 		if headers is None:
 			headers = dict()
@@ -551,40 +813,149 @@ class WsgiInputContainer(object):
 		self.forced_headers = forced_headers
 		self.removed_headers = removed_headers
 
+	@tornado.gen.coroutine
 	def __call__(self, request, body=None):
 		"""
 		Wraps the call against the WSGI app, deriving the WSGI environment from the supplied Tornado ``HTTPServerRequest``.
 
+		The response is forwarded to the client chunk by chunk as the WSGI application produces it, waiting for each
+		chunk to be flushed to the socket before fetching the next one.
+
 		:param request: the ``tornado.httpserver.HTTPServerRequest`` to derive the WSGI environment from
 		:param body: an optional body  to use as ``wsgi.input`` instead of ``request.body``, can be a string or a stream
 		"""
 
-		data = {}
-		response = []
+		environ = WsgiInputContainer.environ(request, body, multithread=self.executor is not None)
+		state = dict(status_code=None)
+		writer = None
+
+		try:
+			if self.executor is None:
+				# iterate the response right here on the IOLoop, yielding on each write
+				iterator = self._iterate_application(environ)
+				try:
+					for data, chunk, app_response in iterator:
+						yield self._write(request, state, data, chunk, app_response)
+				finally:
+					iterator.close()
+			else:
+				# iterate the response on a worker, the IOLoop writes what it produces in the background
+				route = None
+				if self.metrics is not None:
+					route = self.metrics.route_for(request.path, method=request.method)
+					self.metrics.queued(route)
+				writer = BufferedResponseWriter(tornado.ioloop.IOLoop.current(),
+				                                lambda *args: self._write(request, state, *args),
+				                                max_buffer=self.write_buffer,
+				                                timeout=self.write_timeout)
+				yield self.executor.submit(self._stream_application, environ, writer,
+				                           route=route,
+				                           queued=monotonic_time())
+
+				# the worker is free again, wait for whatever is still buffered to be written
+				yield writer.flushed
+		except tornado.iostream.StreamClosedError:
+			# client went away while the response was being generated, nothing we can do about that
+			logging.getLogger(__name__).debug("Client disconnected before the response to {} {} could be written".format(request.method, request.uri))
+			return
+		except WriteTimeoutError:
+			logging.getLogger(__name__).info("Client stopped reading the response to {} {}, closing the connection".format(request.method, request.uri))
+			request.connection.close()
+			return
+		except Exception as exc:
+			if writer is not None:
+				# don't write anything the worker produced before it failed
+				writer.abort(exc)
+
+			if state["status_code"] is None:
+				# nothing written yet, let the request handler take care of the error
+				raise
+
+			# we can't send an error response anymore at this point, all we can do is to log and close the connection
+			logging.getLogger(__name__).exception("Error while streaming the response to {} {}".format(request.method, request.uri))
+			request.connection.close()
+			return
+
+		request.connection.finish()
+		self._log(state["status_code"], request)
+
+	def _iterate_application(self, environ):
+		"""
+		Runs the WSGI application for ``environ`` and yields tuples of the ``start_response`` data, the next chunk of the
+		response and the response iterable itself, until the response is exhausted. Makes sure to yield at least once.
+		"""
+
+		data = dict()
+		pending = []
 
 		def start_response(status, response_headers, exc_info=None):
 			data["status"] = status
 			data["headers"] = response_headers
-			return response.append
-		app_response = self.wsgi_application(
-			WsgiInputContainer.environ(request, body), start_response)
+			return pending.append
+
+		app_response = self.wsgi_application(environ, start_response)
 		try:
-			response.extend(app_response)
-			body = b"".join(response)
+			produced = False
+			for chunk in app_response:
+				if pending:
+					# data written through the legacy write callable goes first
+					for p in pending:
+						yield data, p, app_response
+					del pending[:]
+				if chunk or not produced:
+					produced = True
+					yield data, chunk, app_response
+
+			if pending or not produced:
+				yield data, b"".join(pending), app_response
 		finally:
 			if hasattr(app_response, "close"):
 				app_response.close()
+
+	def _stream_application(self, environ, writer, route=None, queued=None):
+		"""
+		Iterates the response of the WSGI application for ``environ`` on a worker thread, handing every chunk over to
+		the :class:`BufferedResponseWriter` ``writer``.
+
+		All of the response iteration thus happens on the same worker thread, which is important for things like
+		Flask's ``stream_with_context``.
+		"""
+
+		started = monotonic_time()
+		if self.metrics is not None and route is not None and queued is not None:
+			self.metrics.started(route, started - queued)
+
+		iterator = self._iterate_application(environ)
+		try:
+			for data, chunk, app_response in iterator:
+				writer.put(data, chunk, app_response)
+			writer.close()
+		finally:
+			iterator.close()
+			if self.metrics is not None and route is not None and queued is not None:
+				self.metrics.finished(route, monotonic_time() - started)
+
+	def _write(self, request, state, data, chunk, app_response):
+		"""
+		Writes ``chunk`` to the connection of ``request``, preceded by the response headers if they haven't been
+		written yet. Must be called on the IOLoop. Returns a ``Future`` that resolves once the chunk has been flushed.
+		"""
+
+		chunk = tornado.escape.utf8(chunk)
+		if state["status_code"] is not None:
+			return request.connection.write(chunk)
+
 		if not data:
 			raise Exception("WSGI app did not call start_response")
 
 		status_code, reason = data["status"].split(" ", 1)
 		status_code = int(status_code)
-		headers = data["headers"]
+		headers = list(data["headers"])
 		header_set = set(k.lower() for (k, v) in headers)
-		body = tornado.escape.utf8(body)
 		if status_code != 304:
-			if "content-length" not in header_set:
-				headers.append(("Content-Length", str(len(body))))
+			if "content-length" not in header_set and isinstance(app_response, (list, tuple)):
+				# we know the full length, for anything else we'll fall back to chunked encoding
+				headers.append(("Content-Length", str(sum(len(tornado.escape.utf8(x)) for x in app_response))))
 			if "content-type" not in header_set:
 				headers.append(("Content-Type", "text/html; charset=UTF-8"))
 
@@ -600,12 +971,12 @@ class WsgiInputContainer(object):
 		header_obj = tornado.httputil.HTTPHeaders()
 		for key, value in headers:
 			header_obj.add(key, value)
-		request.connection.write_headers(start_line, header_obj, chunk=body)
-		request.connection.finish()
-		self._log(status_code, request)
+
+		state["status_code"] = status_code
+		return request.connection.write_headers(start_line, header_obj, chunk=chunk)
 
 	@staticmethod
-	def environ(request, body=None):
+	def environ(request, body=None, multithread=False):
 		"""
 		Converts a ``tornado.httputil.HTTPServerRequest`` to a WSGI environment.
 
@@ -614,6 +985,7 @@ class WsgiInputContainer(object):
 
 		:param request: the ``tornado.httpserver.HTTPServerRequest`` to derive the WSGI environment from
 		:param body: an optional body  to use as ``wsgi.input`` instead of ``request.body``, can be a string or a stream
+		:param multithread: whether the WSGI application will be run on a worker thread
 		"""
 		from tornado.wsgi import to_wsgi_str
 		import sys
@@ -649,7 +1021,7 @@ class WsgiInputContainer(object):
 			"wsgi.url_scheme": request.protocol,
 			"wsgi.input": request_body,
 			"wsgi.errors": sys.stderr,
-			"wsgi.multithread": False,
+			"wsgi.multithread": multithread,
 			"wsgi.multiprocess": True,
 			"wsgi.run_once": False,
 		}
@@ -676,6 +1048,190 @@ class WsgiInputContainer(object):
 		log_method("%d %s %.2fms", status_code, summary, request_time)
 
 
+class WriteTimeoutError(Exception):
+	"""Raised when a client didn't read any of the response for longer than the configured write timeout."""
+	pass
+
+
+class BufferedResponseWriter(object):
+	"""
+	Hands the chunks of a response produced on a worker thread over to the IOLoop, which writes them one after the
+	other through ``write``, a callable taking the ``start_response`` data, the chunk and the response iterable and
+	returning a ``Future``.
+
+	:meth:`put` only blocks the worker while more than ``max_buffer`` bytes are waiting to be written, and raises a
+	:class:`WriteTimeoutError` if that doesn't change within ``timeout`` seconds. :attr:`flushed` resolves once
+	everything has been written after :meth:`close`, or with the error that prevented that.
+	"""
+
+	def __init__(self, io_loop, write, max_buffer=1024 * 1024, timeout=60):
+		import collections
+		import tornado.concurrent
+
+		self._io_loop = io_loop
+		self._write = write
+		self._max_buffer = max_buffer
+		self._timeout = timeout
+
+		self._mutex = threading.Condition()
+		self._queue = collections.deque()
+		self._buffered = 0
+		self._error = None
+		self._closed = False
+		self._writing = False
+
+		self.flushed = tornado.concurrent.Future()
+
+	def put(self, data, chunk, app_response):
+		"""Queues ``chunk`` for writing. Must be called from the worker."""
+		chunk = tornado.escape.utf8(chunk)
+
+		deadline = monotonic_time() + self._timeout
+		with self._mutex:
+			while self._error is None and self._buffered and self._buffered + len(chunk) > self._max_buffer:
+				remaining = deadline - monotonic_time()
+				if remaining <= 0:
+					self._error = WriteTimeoutError()
+					break
+				self._mutex.wait(remaining)
+
+			if self._error is not None:
+				error = self._error
+				self._io_loop.add_callback(self._fail, error)
+				raise error
+
+			self._queue.append((data, chunk, app_response))
+			self._buffered += len(chunk)
+		self._io_loop.add_callback(self._write_next)
+
+	def close(self):
+		"""Signals that the response is complete. Must be called from the worker."""
+		with self._mutex:
+			self._closed = True
+		self._io_loop.add_callback(self._write_next)
+
+	def abort(self, error):
+		"""Drops everything not yet written and fails :attr:`flushed` with ``error``. Must be called on the IOLoop."""
+		self._fail(error)
+
+	def _write_next(self):
+		if self._writing or self.flushed.done():
+			return
+
+		with self._mutex:
+			if not self._queue:
+				if self._closed:
+					self.flushed.set_result(None)
+				return
+			data, chunk, app_response = self._queue.popleft()
+
+		self._writing = True
+		try:
+			future = self._write(data, chunk, app_response)
+		except Exception as exc:
+			self._fail(exc)
+			return
+		future.add_done_callback(lambda f: self._on_written(f, len(chunk)))
+
+	def _on_written(self, future, size):
+		self._writing = False
+		with self._mutex:
+			self._buffered -= size
+			self._mutex.notify_all()
+
+		if future.exception() is not None:
+			self._fail(future.exception())
+		else:
+			self._write_next()
+
+	def _fail(self, error):
+		with self._mutex:
+			if self._error is None:
+				self._error = error
+			self._mutex.notify_all()
+
+		if not self.flushed.done():
+			self.flushed.set_exception(error)
+			# mark as retrieved, the worker reports the error too if it's still running
+			self.flushed.exception()
+
+
+class WsgiRequestMetrics(object):
+	"""
+	Thread-safe per route statistics about WSGI requests dispatched to a worker pool by :class:`WsgiInputContainer`.
+
+	For every route the number of handled requests, the number of requests currently waiting for or running on a
+	worker and the total and maximum time spent waiting for a worker and running the application are tracked.
+
+	Routes are the endpoints of the rules in ``url_map`` (a ``werkzeug.routing.Map``, e.g. the one of the Flask app)
+	that requests match, so their number is limited by the application and not by whatever paths clients request.
+	Requests not matching any rule are collected under :attr:`UNMATCHED`.
+	"""
+
+	UNMATCHED = "<unmatched>"
+
+	def __init__(self, url_map=None):
+		self._url_map = url_map
+		self._lock = threading.RLock()
+		self._routes = dict()
+
+	def route_for(self, path, method="GET"):
+		"""
+		Maps a request to the route its statistics are collected under: the endpoint of the matching rule, e.g.
+		``api.readGcodeFilesForOrigin`` for ``GET /api/files/local``, or :attr:`UNMATCHED`.
+		"""
+		if self._url_map is None:
+			return self.UNMATCHED
+
+		from werkzeug.exceptions import HTTPException
+
+		try:
+			endpoint, _ = self._url_map.bind("localhost").match(path, method=method)
+		except HTTPException:
+			# not found, method not allowed or only a redirect
+			return self.UNMATCHED
+		return endpoint
+
+	def _entry(self, route):
+		if not route in self._routes:
+			self._routes[route] = dict(count=0,
+			                           queued=0,
+			                           active=0,
+			                           waitTotal=0.0,
+			                           waitMax=0.0,
+			                           durationTotal=0.0,
+			                           durationMax=0.0)
+		return self._routes[route]
+
+	def queued(self, route):
+		with self._lock:
+			self._entry(route)["queued"] += 1
+
+	def started(self, route, wait):
+		with self._lock:
+			entry = self._entry(route)
+			entry["queued"] = max(entry["queued"] - 1, 0)
+			entry["active"] += 1
+			entry["waitTotal"] += wait
+			entry["waitMax"] = max(entry["waitMax"], wait)
+
+	def finished(self, route, duration):
+		with self._lock:
+			entry = self._entry(route)
+			entry["active"] = max(entry["active"] - 1, 0)
+			entry["count"] += 1
+			entry["durationTotal"] += duration
+			entry["durationMax"] = max(entry["durationMax"], duration)
+
+	def as_dict(self):
+		with self._lock:
+			return dict((route, dict(entry)) for route, entry in self._routes.items())
+
+	def reset(self):
+		with self._lock:
+			self._routes.clear()
+
+
 #~~ customized HTTP1Connection implementation
 
 
@@ -899,11 +1455,23 @@ class LargeResponseHandler(RequestlessExceptionLoggingMixin, tornado.web.StaticF
 	       called with the response handler as parameter. May return ``None`` to prevent the ETag response header
 	       from being set. If not provided the last modified time of the file in question will be used as returned
 	       by ``get_content_version``.
+	   decompress (bool): Whether to transparently decompress gzip compressed files (``True``) or serve them as they
+	       are stored (``False``). Defaults to ``False``.
+	   precompressed (bool): Whether to serve precompressed variants of the requested files (``<file>.br`` or
+	       ``<file>.gz``) with a matching ``Content-Encoding`` header if they exist and the client accepts the
+	       encoding as per its ``Accept-Encoding`` request header (``True``) or not (``False``). Defaults to ``False``.
+	   immutable_check (function): Callback to call with the requested path to determine whether the resource will
+	       never change (e.g. since its name contains a hash of its content). Immutable resources are served with
+	       ``Cache-Control: public, immutable`` and a maximum age of ten years. Defaults to ``None`` and hence no
+	       resource being considered immutable.
 	"""
 
+	PRECOMPRESSED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+	"""Content encodings and file extensions of precompressed variants, in order of preference."""
+
 	def initialize(self, path, default_filename=None, as_attachment=False, allow_client_caching=True,
 	               access_validation=None, path_validation=None, etag_generator=None, name_generator=None,
-	               mime_type_guesser=None):
+	               mime_type_guesser=None, decompress=False, precompressed=False, immutable_check=None):
 		tornado.web.StaticFileHandler.initialize(self, os.path.abspath(path), default_filename)
 		self._as_attachment = as_attachment
 		self._allow_client_caching = allow_client_caching
@@ -912,6 +1480,12 @@ class LargeResponseHandler(RequestlessExceptionLoggingMixin, tornado.web.StaticF
 		self._etag_generator = etag_generator
 		self._name_generator = name_generator
 		self._mime_type_guesser = mime_type_guesser
+		self._decompress = decompress
+		self._compressed = None
+		self._precompressed = precompressed
+		self._immutable_check = immutable_check
+		self._content_encoding = None
+		self._uncompressed_path = None
 
 	def get(self, path, include_body=True):
 		if self._access_validation is not None:
@@ -937,30 +1511,143 @@ class LargeResponseHandler(RequestlessExceptionLoggingMixin, tornado.web.StaticF
 			self.set_header("Content-Disposition", "attachment; filename=\"{}\"; filename*=UTF-8''{}".format(filename,
 			                                                                                                 filename))
 
+		if self._precompressed:
+			self.add_header("Vary", "Accept-Encoding")
+		if self._content_encoding is not None:
+			self.set_header("Content-Encoding", self._content_encoding)
+
+		if self._is_immutable(path):
+			self.set_header("Cache-Control", "public, max-age={}, immutable".format(self.CACHE_MAX_AGE))
+
 		if not self._allow_client_caching:
 			self.set_header("Cache-Control", "max-age=0, must-revalidate, private")
 			self.set_header("Expires", "-1")
 
+	def validate_absolute_path(self, root, absolute_path):
+		absolute_path = tornado.web.StaticFileHandler.validate_absolute_path(self, root, absolute_path)
+
+		self._content_encoding = None
+		self._uncompressed_path = None
+		if absolute_path is None or not self._precompressed:
+			return absolute_path
+
+		accepted = self._accepted_encodings()
+		for encoding, extension in self.PRECOMPRESSED_VARIANTS:
+			if not encoding in accepted:
+				continue
+
+			variant = absolute_path + extension
+			try:
+				if os.stat(variant).st_mtime < os.stat(absolute_path).st_mtime:
+					# outdated, ignore
+					continue
+			except OSError:
+				continue
+
+			self._content_encoding = encoding
+			self._uncompressed_path = absolute_path
+			return variant
+
+		return absolute_path
+
 	def compute_etag(self):
 		if self._etag_generator is not None:
 			return self._etag_generator(self)
-		else:
-			return self.get_content_version(self.absolute_path)
+
+		etag = self.get_content_version(self.absolute_path)
+		if self._content_encoding is not None:
+			# each representation needs its own etag
+			etag = "{}-{}".format(etag, self._content_encoding)
+		return etag
+
+	def get_cache_time(self, path, modified, mime_type):
+		if self._is_immutable(path):
+			return self.CACHE_MAX_AGE
+		return tornado.web.StaticFileHandler.get_cache_time(self, path, modified, mime_type)
 
 	def get_content_type(self):
+		path = self.absolute_path
+		if self._content_encoding is not None:
+			# we need the type of the actual resource, not that of its precompressed variant
+			path = self._uncompressed_path
+
 		if self._mime_type_guesser is not None:
-			type = self._mime_type_guesser(self.absolute_path)
+			type = self._mime_type_guesser(path)
 			if type is not None:
 				return type
 
+		if self._content_encoding is not None:
+			type, _ = mimetypes.guess_type(path)
+			return type if type is not None else "application/octet-stream"
+
 		return tornado.web.StaticFileHandler.get_content_type(self)
 
+	def get_content(self, abspath, start=None, end=None):
+		if not self._is_compressed(abspath):
+			return tornado.web.StaticFileHandler.get_content(abspath, start=start, end=end)
+		return self._get_decompressed_content(abspath, start=start, end=end)
+
+	def get_content_size(self):
+		if not self._is_compressed(self.absolute_path):
+			return tornado.web.StaticFileHandler.get_content_size(self)
+		return octoprint.util.compression.uncompressed_size(self.absolute_path)
+
 	@classmethod
 	def get_content_version(cls, abspath):
 		import os
 		import stat
 		return os.stat(abspath)[stat.ST_MTIME]
 
+	def _is_immutable(self, path):
+		return self._immutable_check is not None and self._immutable_check(path)
+
+	def _accepted_encodings(self):
+		result = set()
+		for entry in self.request.headers.get("Accept-Encoding", "").split(","):
+			parts = [part.strip() for part in entry.split(";")]
+			encoding = parts[0].lower()
+			if not encoding:
+				continue
+
+			quality = 1.0
+			for param in parts[1:]:
+				if param.startswith("q="):
+					try:
+						quality = float(param[2:])
+					except ValueError:
+						quality = 0.0
+
+			if quality > 0:
+				result.add(encoding)
+		return result
+
+	def _is_compressed(self, abspath):
+		if not self._decompress:
+			return False
+		if self._compressed is None:
+			self._compressed = octoprint.util.compression.is_compressed(abspath)
+		return self._compressed
+
+	def _get_decompressed_content(self, abspath, start=None, end=None):
+		with octoprint.util.compression.open_file(abspath) as f:
+			if start is not None:
+				f.seek(start)
+			if end is not None:
+				remaining = end - (start or 0)
+			else:
+				remaining = None
+
+			while remaining is None or remaining > 0:
+				chunk_size = 64 * 1024
+				if remaining is not None and remaining < chunk_size:
+					chunk_size = remaining
+				chunk = f.read(chunk_size)
+				if not chunk:
+					break
+				if remaining is not None:
+					remaining -= len(chunk)
+				yield chunk
+
 
 ##~~ URL Forward Handler for forwarding requests to a preconfigured static URL
 
@@ -1156,6 +1843,25 @@ def access_validation_factory(app, validator, *args):
 			validator(flask.request)
 	return f
 
+def flask_request_context_factory(app, func):
+	"""
+	Creates a wrapper calling ``func`` inside of a Flask request context created for a Tornado request, with the
+	user session of that request loaded.
+
+	:param func: the function to call, with the Flask request and any further arguments passed to the wrapper
+	:return: a function taking the Tornado request and further arguments and returning the result of ``func``
+	"""
+
+	def f(request, *args, **kwargs):
+		import flask
+
+		wsgi_environ = WsgiInputContainer.environ(request)
+		with app.request_context(wsgi_environ):
+			app.session_interface.open_session(app, flask.request)
+			app.login_manager.reload_user()
+			return func(flask.request, *args, **kwargs)
+	return f
+
 def path_validation_factory(path_filter, status_code=404):
 	"""
 	Creates a request path validation wrapper returning the defined status code if the supplied path_filter returns False.
@@ -23,7 +23,8 @@ class GcodeWatchdogHandler(watchdog.events.PatternMatchingEventHandler):
 	"""
 
 	def __init__(self, file_manager, printer):
-		watchdog.events.PatternMatchingEventHandler.__init__(self, patterns=map(lambda x: "*.%s" % x, octoprint.filemanager.get_all_extensions()))
+		extensions = octoprint.filemanager.get_all_extensions() + octoprint.filemanager.get_compressed_extensions()
+		watchdog.events.PatternMatchingEventHandler.__init__(self, patterns=map(lambda x: "*.%s" % x, extensions))
 
 		self._logger = logging.getLogger(__name__)
 
@@ -33,6 +34,8 @@ class GcodeWatchdogHandler(watchdog.events.PatternMatchingEventHandler):
 	def _upload(self, path):
 		try:
 			file_wrapper = octoprint.filemanager.util.DiskFileWrapper(os.path.basename(path), path)
+			if octoprint.filemanager.is_compressed_file_type(file_wrapper.filename):
+				file_wrapper = octoprint.filemanager.util.DecompressingFileWrapper(file_wrapper)
 
 			# determine future filename of file to be uploaded, abort if it can't be uploaded
 			try:
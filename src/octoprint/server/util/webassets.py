@@ -5,18 +5,34 @@ __author__ = "Gina Häußge <gina@octoprint.org>"
 __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
 __copyright__ = "Copyright (C) 2017 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
 import re
+import threading
 
 try:
 	from urllib import parse as urlparse
 except:
 	import urlparse
 
-from webassets.bundle import Bundle
+try:
+	from os import scandir
+except ImportError:
+	from scandir import scandir
+
+from webassets.bundle import Bundle, get_all_bundle_files, has_placeholder, wrap
 from webassets.merge import MemoryHunk, BaseHunk
 from webassets.filter import Filter
 from webassets.filter.cssrewrite.base import PatternRewriter
+from webassets.version import HashVersion
 import webassets.filter.cssrewrite.urlpath as urlpath
+import webassets.utils
+
+from octoprint.util import atomic_write
 
 
 def replace_url(source_url, output_url, url):
@@ -150,3 +166,256 @@ class JsPluginBundle(Bundle):
 		return ChainedHunk(MemoryHunk(_PLUGIN_BUNDLE_WRAPPER_PREFIX.format(plugin=self.plugin)),
 		                   (hunk, lambda x: x.replace("\n", "\n        ")),
 		                   MemoryHunk(_PLUGIN_BUNDLE_WRAPPER_SUFFIX.format(plugin=self.plugin)))
+
+
+##~~ versioning & precompression
+
+VERSION_LENGTH = 8
+"""Length of the content hash included in the file names of built bundles."""
+
+_VERSIONED_OUTPUT = re.compile(r"\.[0-9a-f]{%d}\.[^./]+$" % VERSION_LENGTH)
+
+PRECOMPRESSION_EXTENSIONS = dict(gzip=".gz", br=".br")
+"""File extensions of the precompressed variants of built bundles, by content encoding."""
+
+
+def is_versioned_output(path):
+	"""Whether ``path`` refers to a bundle output file named after the hash of its content."""
+	return _VERSIONED_OUTPUT.search(path) is not None
+
+
+def available_precompression_encodings(encodings):
+	"""
+	Filters the list of content ``encodings`` down to those which are known and for which the necessary
+	compressor is installed (``br`` needs the optional ``brotli`` module).
+	"""
+	result = []
+	for encoding in encodings:
+		if not encoding in PRECOMPRESSION_EXTENSIONS:
+			logging.getLogger(__name__).warn("Unknown precompression encoding {}, ignoring it".format(encoding))
+			continue
+
+		if encoding == "br":
+			try:
+				import brotli
+			except ImportError:
+				logging.getLogger(__name__).info("Brotli is not installed, not precompressing assets with it")
+				continue
+
+		result.append(encoding)
+	return result
+
+
+def precompress(path, encodings):
+	"""Writes precompressed variants of the file at ``path`` next to it, one for each of the content ``encodings``."""
+	with io.open(path, "rb") as f:
+		data = f.read()
+
+	for encoding in encodings:
+		if encoding == "gzip":
+			buf = io.BytesIO()
+			# fixed mtime so that identical content produces identical files
+			with gzip.GzipFile(filename="", mode="wb", fileobj=buf, compresslevel=9, mtime=0) as f:
+				f.write(data)
+			compressed = buf.getvalue()
+		elif encoding == "br":
+			import brotli
+			compressed = brotli.compress(data)
+		else:
+			continue
+
+		with atomic_write(path + PRECOMPRESSION_EXTENSIONS[encoding], mode="wb") as f:
+			f.write(compressed)
+
+
+class PrecompressingHashVersion(HashVersion):
+	"""
+	Versions bundles by their content hash, like webassets' own ``hash`` versioner, and additionally writes
+	precompressed variants of each freshly built bundle right next to it.
+
+	Together with a ``%(version)s`` placeholder in the bundle output this yields immutable files that
+	:class:`~octoprint.server.util.tornado.LargeResponseHandler` can serve with long lived caching headers and
+	without having to compress anything at request time.
+	"""
+
+	id = "precompressing_hash"
+
+	def __init__(self, encodings=None, length=VERSION_LENGTH):
+		HashVersion.__init__(self, length=length)
+		self.encodings = encodings if encodings is not None else []
+
+	def set_version(self, bundle, ctx, filename, version):
+		HashVersion.set_version(self, bundle, ctx, filename, version)
+
+		if not self.encodings:
+			return
+
+		try:
+			precompress(filename, self.encodings)
+		except:
+			logging.getLogger(__name__).exception("Error while precompressing {}".format(filename))
+
+
+##~~ ahead of time building
+
+class BundleBuilder(object):
+	"""
+	Builds registered bundles ahead of time, in parallel across bundles and incrementally: bundles whose definition
+	and source files are unchanged since they were last built are not built again.
+
+	The fingerprints of the built bundles are persisted as JSON to ``fingerprint_path``, which should live next to
+	the generated assets so that it gets removed along with them. Outputs of previous builds of a rebuilt bundle,
+	including their precompressed variants, get removed, so the generated assets don't pile up over time.
+
+	Arguments:
+	    env (webassets.Environment): The environment the bundles are registered with.
+	    fingerprint_path (str): Path of the file to persist the bundle fingerprints in.
+	    workers (int): Maximum number of bundles to build at the same time.
+	"""
+
+	def __init__(self, env, fingerprint_path, workers=4):
+		self._env = env
+		self._fingerprint_path = fingerprint_path
+		self._workers = workers
+
+		self._logger = logging.getLogger(__name__)
+		self._lock = threading.RLock()
+		self._fingerprints = self._load_fingerprints()
+
+	def build(self, names):
+		"""
+		Builds the bundles registered under ``names`` if necessary.
+
+		Returns:
+		    list: The names of the bundles that were actually built.
+		"""
+		bundles = []
+		for name in names:
+			try:
+				bundle = self._env[name]
+			except KeyError:
+				continue
+			if not bundle.output:
+				# nothing to build, e.g. no plugin assets
+				continue
+			bundles.append((name, bundle))
+
+		if not bundles:
+			return []
+
+		if self._workers > 1 and len(bundles) > 1:
+			import concurrent.futures
+			with concurrent.futures.ThreadPoolExecutor(max_workers=min(self._workers, len(bundles))) as executor:
+				results = list(executor.map(lambda entry: self._build_if_necessary(*entry), bundles))
+		else:
+			results = [self._build_if_necessary(name, bundle) for name, bundle in bundles]
+
+		built = [name for (name, _), result in zip(bundles, results) if result]
+		if built:
+			self._save_fingerprints()
+		return built
+
+	def fingerprint(self, bundle):
+		"""Hash over the bundle definition and the paths, sizes and modification times of all its source files."""
+		hash = hashlib.sha1()
+		hash.update(webassets.utils.hash_func(bundle).encode("utf-8"))
+		for path in get_all_bundle_files(bundle):
+			try:
+				stat = os.stat(path)
+				entry = "{}:{}:{}".format(path, stat.st_size, stat.st_mtime)
+			except OSError:
+				entry = "{}:missing".format(path)
+			hash.update(entry.encode("utf-8"))
+		return hash.hexdigest()
+
+	def _build_if_necessary(self, name, bundle):
+		try:
+			fingerprint = self.fingerprint(bundle)
+
+			with self._lock:
+				stored = self._fingerprints.get(name)
+
+			if stored and stored.get("fingerprint") == fingerprint and self._restore_version(bundle, stored.get("version")):
+				self._logger.debug("Bundle {} is up to date".format(name))
+				return False
+
+			self._logger.debug("Building bundle {}...".format(name))
+			bundle.build(force=True)
+
+			with self._lock:
+				self._fingerprints[name] = dict(fingerprint=fingerprint,
+				                                version=bundle.version)
+
+			self._remove_previous_versions(bundle)
+			return True
+		except:
+			self._logger.exception("Error while building bundle {}, it will be built on first use".format(name))
+			return False
+
+	def _restore_version(self, bundle, version):
+		"""Makes the environment aware of the already built ``version`` of ``bundle``, if its output still exists."""
+		if not version:
+			return False
+
+		ctx = wrap(self._env, bundle)
+		if not os.path.isfile(bundle.resolve_output(ctx, version=version)):
+			return False
+
+		bundle.version = version
+		if ctx.manifest:
+			ctx.manifest.remember(bundle, ctx, version)
+		return True
+
+	def _remove_previous_versions(self, bundle):
+		"""Removes all outputs of ``bundle`` (and their precompressed variants) other than its current version."""
+		if not bundle.version or not has_placeholder(bundle.output):
+			return
+
+		ctx = wrap(self._env, bundle)
+		folder, template = os.path.split(bundle.resolve_output(ctx, version="%(version)s"))
+		prefix, suffix = template.split("%(version)s", 1)
+		extensions = "|".join(re.escape(extension) for extension in PRECOMPRESSION_EXTENSIONS.values())
+		pattern = re.compile(r"^{}(?P<version>[0-9a-f]{{{}}}){}({})?$".format(re.escape(prefix),
+		                                                                     VERSION_LENGTH,
+		                                                                     re.escape(suffix),
+		                                                                     extensions))
+
+		try:
+			entries = scandir(folder)
+		except OSError:
+			return
+
+		for entry in entries:
+			match = pattern.match(entry.name)
+			if not match or match.group("version") == bundle.version:
+				continue
+
+			try:
+				os.remove(entry.path)
+				self._logger.debug("Removed previous version {} of bundle output".format(entry.path))
+			except OSError:
+				self._logger.exception("Error while removing previous version {} of bundle output".format(entry.path))
+
+	def _load_fingerprints(self):
+		if not os.path.isfile(self._fingerprint_path):
+			return dict()
+
+		try:
+			with io.open(self._fingerprint_path, "rb") as f:
+				data = json.loads(f.read().decode("utf-8"))
+			if isinstance(data, dict):
+				return data
+		except:
+			self._logger.exception("Error while loading bundle fingerprints from {}, "
+			                       "building all bundles".format(self._fingerprint_path))
+		return dict()
+
+	def _save_fingerprints(self):
+		try:
+			with self._lock:
+				data = json.dumps(self._fingerprints, indent=2, sort_keys=True)
+
+			with atomic_write(self._fingerprint_path, mode="wb") as f:
+				f.write(data.encode("utf-8"))
+		except:
+			self._logger.exception("Error while persisting bundle fingerprints to {}".format(self._fingerprint_path))
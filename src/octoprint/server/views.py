@@ -8,6 +8,7 @@ __copyright__ = "Copyright (C) 2015 The OctoPrint Project - Released under terms
 import os
 import datetime
 import codecs
+import time
 
 from past.builtins import basestring
 
@@ -18,10 +19,11 @@ import octoprint.plugin
 
 from octoprint.server import app, userManager, pluginManager, gettext, \
 	debug, LOCALES, VERSION, DISPLAY_VERSION, UI_API_KEY, BRANCH, preemptiveCache, \
-	NOT_MODIFIED
+	persistentViewCache, NOT_MODIFIED
 from octoprint.settings import settings
-from octoprint.filemanager import get_all_extensions
+from octoprint.filemanager import get_all_extensions, get_compressed_extensions
 from octoprint.util import to_unicode
+from octoprint.util.profiling import startup_profiler
 
 import re
 import base64
@@ -271,15 +273,7 @@ def index():
 				files = collect_files()
 			return _compute_date(files)
 
-		def compute_etag(files=None, lastmodified=None, additional=None):
-			if callable(custom_etag):
-				try:
-					etag = custom_etag()
-					if etag:
-						return etag
-				except:
-					_logger.exception("Error while trying to retrieve custom ETag value for plugin {}".format(key))
-
+		def compute_fingerprint(files=None, lastmodified=None, additional=None):
 			if files is None:
 				files = collect_files()
 			if lastmodified is None:
@@ -293,7 +287,6 @@ def index():
 			import hashlib
 			hash = hashlib.sha1()
 			hash.update(octoprint.__version__)
-			hash.update(octoprint.server.UI_API_KEY)
 			hash.update(",".join(sorted(files)))
 			if lastmodified:
 				hash.update(lastmodified)
@@ -301,13 +294,42 @@ def index():
 				hash.update(str(add))
 			return hash.hexdigest()
 
+		def compute_custom_etag():
+			if callable(custom_etag):
+				try:
+					return custom_etag()
+				except:
+					_logger.exception("Error while trying to retrieve custom ETag value for plugin {}".format(key))
+			return None
+
+		def compute_etag(files=None, lastmodified=None, additional=None):
+			etag = compute_custom_etag()
+			if etag:
+				return etag
+
+			return util.flask.view_etag(compute_fingerprint(files=files,
+			                                                lastmodified=lastmodified,
+			                                                additional=additional))
+
+		def persist_view(k, response):
+			if not settings().getBoolean(["devel", "cache", "persistent"]):
+				return
+
+			# custom ETags are left alone on restore, so no fingerprint needed for those
+			fingerprint = None
+			if not compute_custom_etag():
+				fingerprint = compute_fingerprint(additional=[k] + additional_etag)
+
+			persistentViewCache.store(k, response, UI_API_KEY, fingerprint=fingerprint)
+
 		decorated_view = view
 		decorated_view = util.flask.lastmodified(lambda _: compute_lastmodified())(decorated_view)
 		decorated_view = util.flask.etagged(lambda _: compute_etag(additional=[cache_key()] + additional_etag))(decorated_view)
 		decorated_view = util.flask.cached(timeout=-1,
 		                                   refreshif=validate_cache,
 		                                   key=cache_key,
-		                                   unless_response=lambda response: util.flask.cache_check_response_headers(response) or util.flask.cache_check_status_code(response, _valid_status_for_cache))(decorated_view)
+		                                   unless_response=lambda response: util.flask.cache_check_response_headers(response) or util.flask.cache_check_status_code(response, _valid_status_for_cache),
+		                                   persist=persist_view)(decorated_view)
 		decorated_view = util.flask.conditional(check_etag_and_lastmodified, NOT_MODIFIED)(decorated_view)
 		return decorated_view
 
@@ -421,7 +443,7 @@ def _get_render_kwargs(templates, plugin_names, plugin_vars, now):
 
 	first_run = settings().getBoolean(["server", "firstRun"])
 	locales = dict((l.language, dict(language=l.language, display=l.display_name, english=l.english_name)) for l in LOCALES)
-	extensions = map(lambda ext: ".{}".format(ext), get_all_extensions())
+	extensions = map(lambda ext: ".{}".format(ext), get_all_extensions() + get_compressed_extensions())
 
 	#~~ prepare full set of template vars for rendering
 
@@ -448,6 +470,7 @@ def fetch_template_data(refresh=False):
 	if not refresh and _templates.get(locale) is not None and _plugin_names is not None and _plugin_vars is not None:
 		return _templates[locale], _plugin_names, _plugin_vars
 
+	start = time.time()
 	first_run = settings().getBoolean(["server", "firstRun"])
 
 	##~~ prepare templates
@@ -747,6 +770,10 @@ def fetch_template_data(refresh=False):
 			templates[t]["entries"].update(template_sorting[t]["custom_insert_entries"](sorted_missing))
 			templates[t]["order"] = template_sorting[t]["custom_insert_order"](templates[t]["order"], sorted_missing)
 
+	if not _templates:
+		# the very first template collection is part of getting the server up
+		startup_profiler().record_phase("templates", start, time.time() - start)
+
 	_templates[locale] = templates
 	_plugin_names = plugin_names
 	_plugin_vars = plugin_vars
@@ -174,7 +174,20 @@ default_settings = {
 		"uploads": {
 			"maxSize":  1 * 1024 * 1024 * 1024, # 1GB
 			"nameSuffix": "name",
-			"pathSuffix": "path"
+			"pathSuffix": "path",
+			"historyLimit": 100,
+			"compression": {
+				"enabled": False,
+				"level": 6
+			},
+			"resumable": {
+				"chunkMaxSize": 16 * 1024 * 1024, # 16MB
+				"maxAge": 24 * 60 * 60 # 1d
+			}
+		},
+		"wsgi": {
+			"workers": 4,
+			"writeTimeout": 60
 		},
 		"maxSize": 100 * 1024, # 100 KB
 		"commands": {
@@ -193,13 +206,28 @@ default_settings = {
 			"url": "https://plugins.octoprint.org/blacklist.json",
 			"ttl": 15 * 60 # 15 min
 		},
+		"pluginDiscoveryCache": {
+			"enabled": True
+		},
+		"hookProfiling": {
+			"enabled": True,
+			"slowThreshold": None
+		},
+		"upstreamCache": {
+			"mode": "off",
+			"url": None,
+			"folder": None,
+			"maxAge": 48 * 60, # 48h
+			"fallback": True
+		},
 		"diskspace": {
 			"warning": 500 * 1024 * 1024, # 500 MB
 			"critical": 200 * 1024 * 1024, # 200 MB
 		},
 		"preemptiveCache": {
 			"exceptions": [],
-			"until": 7
+			"until": 7,
+			"workers": 2
 		},
 		"ipCheck": {
 			"enabled": True,
@@ -213,8 +241,23 @@ default_settings = {
 		"snapshot": None,
 		"snapshotTimeout": 5,
 		"snapshotSslValidation": True,
+		"capture": {
+			"mode": "snapshot",
+			"maxFrameAge": 2.0
+		},
 		"ffmpeg": None,
 		"ffmpegThreads": 1,
+		"incremental": {
+			"enabled": False,
+			"segmentFrames": 250,
+			"nice": 10
+		},
+		"render": {
+			"concurrency": 1,
+			"nice": 10,
+			"ionice": None,
+			"deferWhilePrinting": False
+		},
 		"bitrate": "5000k",
 		"watermark": True,
 		"flipH": False,
@@ -326,7 +369,22 @@ default_settings = {
 		"localNetworks": ["127.0.0.0/8"],
 		"autologinAs": None,
 		"trustBasicAuthentication": False,
-		"checkBasicAuthenticationPassword": True
+		"checkBasicAuthenticationPassword": True,
+		"passwordHashing": {
+			"algorithm": "pbkdf2_sha256",
+			"pbkdf2": {
+				"iterations": 25000
+			},
+			"scrypt": {
+				"n": 16384,
+				"r": 8,
+				"p": 1
+			},
+			"cache": {
+				"size": 32,
+				"ttl": 300
+			}
+		}
 	},
 	"slicing": {
 		"enabled": True,
@@ -373,11 +431,14 @@ default_settings = {
 		"stylesheet": "css",
 		"cache": {
 			"enabled": True,
-			"preemptive": True
+			"preemptive": True,
+			"persistent": True
 		},
 		"webassets": {
 			"bundle": True,
-			"clean_on_startup": True
+			"clean_on_startup": True,
+			"precompress": ["gzip", "br"],
+			"build_workers": 4
 		},
 		"useFrozenDictForPrinterState": True,
 		"virtualPrinter": {
@@ -336,6 +336,12 @@ function DataUpdater(allViewModels, connectCallback, disconnectCallback) {
         })
     };
 
+    self._onRenderQueue = function(event) {
+        self._ifInitialized(function() {
+            callViewModels(self.allViewModels, "fromTimelapseRenderQueue", [event.data]);
+        })
+    };
+
     self._onPluginMessage = function(event) {
         self._ifInitialized(function() {
             callViewModels(self.allViewModels, "onDataUpdaterPluginMessage", [event.data.plugin, event.data.data]);
@@ -378,6 +384,7 @@ function DataUpdater(allViewModels, connectCallback, disconnectCallback) {
         .onMessage("slicingProgress", self._onSlicingProgress)
         .onMessage("event", self._onEvent)
         .onMessage("timelapse", self._onTimelapse)
+        .onMessage("renderQueue", self._onRenderQueue)
         .onMessage("plugin", self._onPluginMessage)
         .onMessage("reauthRequired", self._onReauthMessage);
 }
@@ -9,11 +9,13 @@ $(function() {
         self.defaultFps = 25;
         self.defaultPostRoll = 0;
         self.defaultInterval = 10;
+        self.defaultTargetDuration = 0;
         self.defaultRetractionZHop = 0;
         self.defaultMinDelay = 5.0;
 
         self.timelapseType = ko.observable(undefined);
         self.timelapseTimedInterval = ko.observable(self.defaultInterval);
+        self.timelapseTargetDuration = ko.observable(self.defaultTargetDuration);
         self.timelapsePostRoll = ko.observable(self.defaultPostRoll);
         self.timelapseFps = ko.observable(self.defaultFps);
         self.timelapseRetractionZHop = ko.observable(self.defaultRetractionZHop);
@@ -62,6 +64,9 @@ $(function() {
         self.timelapseTimedInterval.subscribe(function() {
             self.isDirty(true);
         });
+        self.timelapseTargetDuration.subscribe(function() {
+            self.isDirty(true);
+        });
         self.timelapsePostRoll.subscribe(function() {
             self.isDirty(true);
         });
@@ -171,6 +176,12 @@ $(function() {
                 self.timelapseTimedInterval(self.defaultInterval);
             }
 
+            if (config.type === "timed" && config.targetDuration !== undefined && config.targetDuration >= 0) {
+                self.timelapseTargetDuration(config.targetDuration);
+            } else {
+                self.timelapseTargetDuration(self.defaultTargetDuration);
+            }
+
             if (config.type === "zchange" && config.retractionZHop !== undefined && config.retractionZHop > 0) {
                 self.timelapseRetractionZHop(config.retractionZHop);
             } else {
@@ -375,6 +386,7 @@ $(function() {
 
             if (self.timelapseType() === "timed") {
                 payload["interval"] = self.timelapseTimedInterval();
+                payload["targetDuration"] = self.timelapseTargetDuration();
             }
 
             if (self.timelapseType() === "zchange") {
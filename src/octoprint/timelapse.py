@@ -3,6 +3,8 @@ from __future__ import absolute_import, division, print_function
 __author__ = "Gina Häußge <osd@foosel.net>"
 __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
 
+import io
+import json
 import logging
 import os
 import threading
@@ -11,6 +13,7 @@ import fnmatch
 import datetime
 import sys
 import shutil
+import tempfile
 try:
 	import queue
 except ImportError:
@@ -25,6 +28,7 @@ from octoprint.plugin import plugin_manager
 from octoprint.util import monotonic_time
 
 import sarge
+import psutil
 import collections
 
 import re
@@ -44,6 +48,7 @@ current_render_job = None
 # filename formats
 _capture_format = "{prefix}-%d.jpg"
 _output_format = "{prefix}.mpg"
+_segment_format = "{prefix}-seg{index}.mpg"
 
 # old capture format, needed to delete old left-overs from
 # versions <1.2.9
@@ -61,9 +66,24 @@ _cleanup_lock = threading.RLock()
 # lock for timelapse job
 _job_lock = threading.RLock()
 
+# segment encoders of timelapses that have not been rendered yet, by prefix
+_segment_encoders = dict()
+
+# render job scheduler, see render_scheduler()
+_render_scheduler = None
+_render_scheduler_lock = threading.Lock()
+
 # cached valid timelapse extensions
 _extensions = None
 
+# index of unrendered timelapses, see unrendered_index()
+_unrendered_index = None
+_unrendered_index_lock = threading.Lock()
+
+# when old unrendered timelapses were last cleaned up, see get_unrendered_timelapses()
+_last_cleanup = None
+_cleanup_interval = 60 * 60
+
 def valid_timelapse(path):
 	global _extensions
 
@@ -125,36 +145,29 @@ def get_finished_timelapses():
 def get_unrendered_timelapses():
 	global _job_lock
 	global current
+	global _last_cleanup
 
-	delete_old_unrendered_timelapses()
-
-	basedir = settings().getBaseFolder("timelapse_tmp", check_writable=False)
-	jobs = collections.defaultdict(lambda: dict(count=0, size=None, bytes=0, date=None, timestamp=None))
-
-	for entry in scandir(basedir):
-		if not fnmatch.fnmatch(entry.name, "*.jpg"):
-			continue
-
-		prefix = _extract_prefix(entry.name)
-		if prefix is None:
-			continue
+	now = monotonic_time()
+	if _last_cleanup is None or _last_cleanup + _cleanup_interval < now:
+		delete_old_unrendered_timelapses()
+		_last_cleanup = now
 
-		jobs[prefix]["count"] += 1
-		jobs[prefix]["bytes"] += entry.stat().st_size
-		if jobs[prefix]["timestamp"] is None or entry.stat().st_mtime < jobs[prefix]["timestamp"]:
-			jobs[prefix]["timestamp"] = entry.stat().st_mtime
+	jobs = unrendered_index().get()
 
 	with _job_lock:
 		global current_render_job
 
+		scheduler = render_scheduler()
+
 		def finalize_fields(prefix, job):
 			currently_recording = current is not None and current.prefix == prefix
-			currently_rendering = current_render_job is not None and current_render_job["prefix"] == prefix
+			currently_rendering = scheduler.is_rendering(prefix)
 
 			job["size"] = util.get_formatted_size(job["bytes"])
 			job["date"] = util.get_formatted_datetime(datetime.datetime.fromtimestamp(job["timestamp"]))
 			job["recording"] = currently_recording
 			job["rendering"] = currently_rendering
+			job["queued"] = scheduler.is_queued(prefix)
 			job["processing"] = currently_recording or currently_rendering
 			del job["timestamp"]
 
@@ -166,13 +179,24 @@ def get_unrendered_timelapses():
 def delete_unrendered_timelapse(name):
 	global _cleanup_lock
 
-	pattern = "{}*.jpg".format(util.glob_escape(name))
+	if _render_scheduler is not None:
+		_render_scheduler.cancel(name)
+
+	unrendered_index().remove(name)
+
+	with _job_lock:
+		encoder = _segment_encoders.pop(name, None)
+	if encoder is not None:
+		encoder.cancel()
+
+	patterns = ["{}*.jpg".format(util.glob_escape(name)),
+	            "{}-seg*".format(util.glob_escape(name))]
 
 	basedir = settings().getBaseFolder("timelapse_tmp")
 	with _cleanup_lock:
 		for entry in scandir(basedir):
 			try:
-				if fnmatch.fnmatch(entry.name, pattern):
+				if any(fnmatch.fnmatch(entry.name, pattern) for pattern in patterns):
 					os.remove(entry.path)
 			except:
 				if logging.getLogger(__name__).isEnabledFor(logging.DEBUG):
@@ -180,6 +204,43 @@ def delete_unrendered_timelapse(name):
 
 
 def render_unrendered_timelapse(name, gcode=None, postfix=None, fps=None):
+	"""Queues rendering of the unrendered timelapse ``name``, returns False if it already is queued or rendering."""
+	return render_scheduler().enqueue(name, gcode=gcode, postfix=postfix, fps=fps)
+
+
+def render_scheduler():
+	with _render_scheduler_lock:
+		if _render_scheduler is None:
+			_init_render_scheduler()
+		return _render_scheduler
+
+
+def init_render_scheduler(is_printing=None):
+	"""
+	Initializes the render scheduler, ``is_printing`` is used to determine whether to defer render jobs.
+	"""
+	with _render_scheduler_lock:
+		if _render_scheduler is None:
+			_init_render_scheduler(is_printing=is_printing)
+
+			for event in (Events.PRINT_STARTED, Events.PRINT_DONE, Events.PRINT_FAILED, Events.PRINT_CANCELLED):
+				eventManager().subscribe(event, lambda *args, **kwargs: _render_scheduler.wakeup())
+		else:
+			_render_scheduler.is_printing = is_printing
+
+
+def _init_render_scheduler(is_printing=None):
+	global _render_scheduler
+
+	queue_file = os.path.join(settings().getBaseFolder("timelapse_tmp"), ".renderqueue.json")
+	_render_scheduler = TimelapseRenderScheduler(queue_file,
+	                                             concurrency=settings().getInt(["webcam", "render", "concurrency"]),
+	                                             defer_while_printing=settings().getBoolean(["webcam", "render", "deferWhilePrinting"]),
+	                                             is_printing=is_printing,
+	                                             on_change=notify_render_queue_callbacks)
+
+
+def _create_render_job(name, gcode=None, postfix=None, fps=None):
 	capture_dir = settings().getBaseFolder("timelapse_tmp")
 	output_dir = settings().getBaseFolder("timelapse")
 
@@ -187,17 +248,167 @@ def render_unrendered_timelapse(name, gcode=None, postfix=None, fps=None):
 		fps = settings().getInt(["webcam", "timelapse", "fps"])
 	threads = settings().get(["webcam", "ffmpegThreads"])
 
-	job = TimelapseRenderJob(capture_dir, output_dir, name,
-	                         postfix=postfix,
-	                         capture_format=_capture_format,
-	                         output_format=_output_format,
-	                         fps=fps,
-	                         threads=threads,
-	                         on_start=_create_render_start_handler(name, gcode=gcode),
-	                         on_success=_create_render_success_handler(name, gcode=gcode),
-	                         on_fail=_create_render_fail_handler(name, gcode=gcode),
-	                         on_always=_create_render_always_handler(name, gcode=gcode))
-	job.process()
+	with _job_lock:
+		segment_encoder = _segment_encoders.pop(name, None)
+
+	return TimelapseRenderJob(capture_dir, output_dir, name,
+	                          postfix=postfix,
+	                          capture_format=_capture_format,
+	                          output_format=_output_format,
+	                          segment_format=_segment_format,
+	                          segment_encoder=segment_encoder,
+	                          fps=fps,
+	                          threads=threads,
+	                          nice=settings().getInt(["webcam", "render", "nice"]),
+	                          ionice=settings().get(["webcam", "render", "ionice"]),
+	                          on_start=_create_render_start_handler(name, gcode=gcode),
+	                          on_success=_create_render_success_handler(name, gcode=gcode),
+	                          on_fail=_create_render_fail_handler(name, gcode=gcode),
+	                          on_always=_create_render_always_handler(name, gcode=gcode),
+	                          on_progress=_create_render_progress_handler(name))
+
+
+class UnrenderedTimelapseIndex(object):
+	"""
+	Per prefix statistics about the frames of unrendered timelapses in ``folder``.
+
+	Updated whenever a frame is captured or a timelapse deleted, so listing the unrendered timelapses doesn't
+	require scanning and stat'ing every single frame. The folder is only scanned again if its modification date or
+	its number of entries shows that it was changed by something else.
+	"""
+
+	def __init__(self, folder):
+		self._logger = logging.getLogger(__name__)
+		self._folder = folder
+		self._mutex = threading.RLock()
+		self._entries = None
+		self._state = None
+
+	@property
+	def folder(self):
+		return self._folder
+
+	def get(self):
+		"""
+		Returns a dict of prefix to ``count``, ``bytes`` and ``timestamp`` (oldest mtime). Hardlinked frames (like
+		the post roll) only count once towards ``bytes``.
+		"""
+		with self._mutex:
+			self._ensure()
+			return dict((prefix, dict(count=entry["count"], bytes=entry["bytes"], timestamp=entry["timestamp"]))
+			            for prefix, entry in self._entries.items())
+
+	def add_frame(self, path, stat=None):
+		name = os.path.basename(path)
+		prefix, number = _parse_capture_name(name)
+		if prefix is None:
+			return
+
+		with self._mutex:
+			if self._entries is None:
+				# will be included once we scan
+				return
+
+			entry = self._entries[prefix]
+			if entry["last"] is not None and number <= entry["last"]:
+				# already included through a scan
+				return
+
+			try:
+				if stat is None:
+					stat = os.stat(path)
+			except OSError:
+				return
+
+			self._add(entry, number, stat)
+			self._touch()
+
+	def remove(self, prefix):
+		with self._mutex:
+			if self._entries is not None:
+				self._entries.pop(prefix, None)
+				self._touch()
+
+	def invalidate(self):
+		with self._mutex:
+			self._entries = None
+
+	def _ensure(self):
+		if self._entries is not None and self._state is not None and self._state == self._folder_state():
+			return
+		self._scan()
+
+	def _scan(self):
+		entries = self._new_entries()
+		for entry in scandir(self._folder):
+			prefix, number = _parse_capture_name(entry.name)
+			if prefix is None:
+				continue
+			try:
+				self._add(entries[prefix], number, entry.stat())
+			except OSError:
+				# deleted in the meantime
+				pass
+
+		self._entries = entries
+		self._touch()
+
+	def _touch(self):
+		self._state = self._folder_state()
+
+	def _folder_state(self):
+		# the mtime alone might not change on file systems with a coarse resolution, listing the folder is still
+		# a lot cheaper than stat'ing every frame
+		try:
+			return os.stat(self._folder).st_mtime, len(os.listdir(self._folder))
+		except OSError:
+			return None
+
+	@staticmethod
+	def _new_entries():
+		return collections.defaultdict(lambda: dict(count=0, bytes=0, timestamp=None, last=None, inodes=set()))
+
+	@staticmethod
+	def _add(entry, number, stat):
+		entry["count"] += 1
+
+		# post roll frames are hardlinks of the last capture, they only take up space once (no inode numbers
+		# available on Windows though, so every frame counts there)
+		inode = (stat.st_dev, stat.st_ino) if stat.st_ino else None
+		if inode is None or inode not in entry["inodes"]:
+			if inode is not None:
+				entry["inodes"].add(inode)
+			entry["bytes"] += stat.st_size
+		if entry["timestamp"] is None or stat.st_mtime < entry["timestamp"]:
+			entry["timestamp"] = stat.st_mtime
+		if entry["last"] is None or number > entry["last"]:
+			entry["last"] = number
+
+
+def unrendered_index():
+	global _unrendered_index
+
+	folder = settings().getBaseFolder("timelapse_tmp", check_writable=False)
+	with _unrendered_index_lock:
+		if _unrendered_index is None or _unrendered_index.folder != folder:
+			_unrendered_index = UnrenderedTimelapseIndex(folder)
+		return _unrendered_index
+
+
+def _parse_capture_name(name):
+	"""
+	>>> _parse_capture_name("some_file_20181018120000-12.jpg")
+	('some_file_20181018120000', 12)
+	>>> _parse_capture_name("some_file_20181018120000-seg0.mpg")
+	(None, None)
+	"""
+	match = _capture_name_re.match(name)
+	if match is None:
+		return None, None
+	return match.group("prefix"), int(match.group("number"))
+
+
+_capture_name_re = re.compile(r"^(?P<prefix>.+)-(?P<number>\d+)\.jpg$")
 
 
 def delete_old_unrendered_timelapses():
@@ -235,6 +446,23 @@ def delete_old_unrendered_timelapses():
 			logging.getLogger(__name__).info("Deleted old unrendered timelapse {}".format(prefix))
 
 
+def _get_render_settings():
+	watermark = None
+	if settings().getBoolean(["webcam", "watermark"]):
+		watermark = os.path.join(os.path.dirname(__file__), "static", "img", "watermark.png")
+		if sys.platform == "win32":
+			# Because ffmpeg hiccups on windows' drive letters and backslashes we have to give the watermark
+			# path a special treatment. Yeah, I couldn't believe it either...
+			watermark = watermark.replace("\\", "/").replace(":", "\\\\:")
+
+	return dict(ffmpeg=settings().get(["webcam", "ffmpeg"]),
+	            bitrate=settings().get(["webcam", "bitrate"]),
+	            hflip=settings().getBoolean(["webcam", "flipH"]),
+	            vflip=settings().getBoolean(["webcam", "flipV"]),
+	            rotate=settings().getBoolean(["webcam", "rotate90"]),
+	            watermark=watermark)
+
+
 def _create_render_start_handler(name, gcode=None):
 	def f(movie):
 		global _job_lock
@@ -281,10 +509,51 @@ def _create_render_always_handler(name, gcode=None):
 		global current_render_job
 		global _job_lock
 		with _job_lock:
-			current_render_job = None
+			if current_render_job is not None and current_render_job["prefix"] == name:
+				current_render_job = None
+	return f
+
+
+def _create_render_progress_handler(name):
+	def f(progress):
+		render_scheduler().update_progress(name, progress)
 	return f
 
 
+def _low_priority_command(command_str, nice=None, ionice=None):
+	"""Prefixes ``command_str`` to run with the given niceness and IO scheduling class, where supported."""
+	if sys.platform == "win32":
+		return command_str
+
+	if ionice in _ionice_classes and sys.platform.startswith("linux"):
+		command_str = "ionice {} {}".format(_ionice_classes[ionice], command_str)
+	if nice:
+		command_str = "nice -n {} {}".format(nice, command_str)
+	return command_str
+
+
+_ionice_classes = {
+	"idle": "-c 3",
+	"best-effort": "-c 2 -n 7"
+}
+
+
+def _suspend_process(process):
+	"""Stops ``process`` (SIGSTOP on POSIX) until it gets resumed again, ignores already finished processes."""
+	try:
+		psutil.Process(process.pid).suspend()
+	except psutil.NoSuchProcess:
+		pass
+
+
+def _resume_process(process):
+	"""Continues a ``process`` previously stopped via :func:`_suspend_process` (SIGCONT on POSIX)."""
+	try:
+		psutil.Process(process.pid).resume()
+	except psutil.NoSuchProcess:
+		pass
+
+
 def register_callback(callback):
 	if not callback in _update_callbacks:
 		_update_callbacks.append(callback)
@@ -305,6 +574,12 @@ def notify_callbacks(timelapse):
 		except: logging.getLogger(__name__).exception("Exception while pushing timelapse configuration")
 
 
+def notify_render_queue_callbacks(state):
+	for callback in _update_callbacks:
+		try: callback.sendTimelapseRenderQueue(state)
+		except: logging.getLogger(__name__).exception("Exception while pushing timelapse render queue")
+
+
 def configure_timelapse(config=None, persist=False):
 	global current
 
@@ -361,7 +636,11 @@ def configure_timelapse(config=None, persist=False):
 			if "options" in config and "interval" in config["options"] and config["options"]["interval"] > 0:
 				interval = config["options"]["interval"]
 
-			current = TimedTimelapse(post_roll=postRoll, interval=interval, fps=fps)
+			targetDuration = 0
+			if "options" in config and "targetDuration" in config["options"] and config["options"]["targetDuration"] > 0:
+				targetDuration = config["options"]["targetDuration"]
+
+			current = TimedTimelapse(post_roll=postRoll, interval=interval, fps=fps, target_duration=targetDuration)
 
 	notify_callbacks(current)
 
@@ -370,6 +649,711 @@ def configure_timelapse(config=None, persist=False):
 		settings().save()
 
 
+class CaptureStatistics(object):
+	"""
+	Keeps track of how long capturing individual timelapse frames takes.
+
+	Latencies are reported in milliseconds. The 95th percentile is calculated over the last ``window`` successful
+	captures, everything else over all captures since the last :func:`reset`.
+	"""
+
+	def __init__(self, window=100):
+		self._lock = threading.Lock()
+		self._window = collections.deque(maxlen=window)
+		self.reset()
+
+	def reset(self):
+		with self._lock:
+			self._window.clear()
+			self._count = 0
+			self._errors = 0
+			self._sources = collections.defaultdict(int)
+			self._last = None
+			self._total = 0.0
+			self._min = None
+			self._max = None
+
+	def record(self, latency, source=None):
+		with self._lock:
+			self._count += 1
+			self._last = latency
+			self._total += latency
+			self._min = latency if self._min is None else min(self._min, latency)
+			self._max = latency if self._max is None else max(self._max, latency)
+			self._window.append(latency)
+			if source is not None:
+				self._sources[source] += 1
+
+	def record_error(self):
+		with self._lock:
+			self._errors += 1
+
+	def as_dict(self):
+		def to_ms(value):
+			if value is None:
+				return None
+			return round(value * 1000.0, 1)
+
+		with self._lock:
+			p95 = None
+			if self._window:
+				ordered = sorted(self._window)
+				p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+			return dict(count=self._count,
+			            errors=self._errors,
+			            sources=dict(self._sources),
+			            latency=dict(last=to_ms(self._last),
+			                         avg=to_ms(self._total / self._count if self._count else None),
+			                         min=to_ms(self._min),
+			                         max=to_ms(self._max),
+			                         p95=to_ms(p95)))
+
+
+capture_statistics = CaptureStatistics()
+
+
+class SnapshotCapture(object):
+	"""
+	Captures frames by fetching the snapshot URL.
+
+	Uses a persistent HTTP session so that subsequent captures reuse the already established (TLS) connection to the
+	webcam server instead of opening a new one per frame, and writes each frame to disk in one go.
+	"""
+
+	mode = "snapshot"
+
+	def __init__(self, snapshot_url, timeout=5, validate_ssl=True):
+		self._logger = logging.getLogger(__name__)
+
+		self._snapshot_url = snapshot_url
+		self._timeout = timeout
+		self._validate_ssl = validate_ssl
+
+		self._session = self._create_session()
+
+	@property
+	def url(self):
+		return self._snapshot_url
+
+	def start(self):
+		pass
+
+	def stop(self):
+		pass
+
+	def close(self):
+		self.stop()
+		self._session.close()
+
+	def capture(self, filename):
+		"""
+		Captures a frame into ``filename``. Returns the source of the frame, ``snapshot`` in this case.
+		"""
+		r = self._session.get(self._snapshot_url,
+		                      timeout=self._timeout,
+		                      verify=self._validate_ssl)
+		try:
+			r.raise_for_status()
+			_write_frame(filename, r.content)
+		finally:
+			r.close()
+		return "snapshot"
+
+	@staticmethod
+	def _create_session():
+		session = requests.Session()
+		adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=2)
+		session.mount("http://", adapter)
+		session.mount("https://", adapter)
+		return session
+
+
+class StreamCapture(SnapshotCapture):
+	"""
+	Captures frames from the MJPEG webcam stream.
+
+	While started, keeps the stream open in a background thread and remembers the most recent frame, captures then
+	simply write that frame to disk. Falls back to fetching the snapshot URL if no frame younger than
+	``max_frame_age`` seconds is available, e.g. because the stream is (re)connecting.
+	"""
+
+	mode = "stream"
+
+	def __init__(self, stream_url, snapshot_url, timeout=5, validate_ssl=True, max_frame_age=2.0):
+		SnapshotCapture.__init__(self, snapshot_url, timeout=timeout, validate_ssl=validate_ssl)
+
+		self._stream_url = stream_url
+		self._max_frame_age = max_frame_age
+
+		self._frame = None
+		self._frame_time = None
+		self._frame_mutex = threading.Lock()
+
+		self._stream_session = self._create_session()
+		self._stream_response = None
+		self._stream_stop = None
+		self._stream_thread = None
+
+	def start(self):
+		if self._stream_stop is not None and not self._stream_stop.is_set():
+			return
+
+		self._stream_stop = threading.Event()
+		self._stream_thread = threading.Thread(target=self._stream_worker,
+		                                       name="TimelapseStreamCapture",
+		                                       args=(self._stream_stop,))
+		self._stream_thread.daemon = True
+		self._stream_thread.start()
+
+	def stop(self):
+		if self._stream_stop is not None:
+			self._stream_stop.set()
+
+		response = self._stream_response
+		if response is not None:
+			try:
+				response.close()
+			except:
+				pass
+
+		with self._frame_mutex:
+			self._frame = self._frame_time = None
+
+	def close(self):
+		SnapshotCapture.close(self)
+		self._stream_session.close()
+
+	def capture(self, filename):
+		frame = self.latest_frame()
+		if frame is None:
+			self._logger.debug("No recent frame from the stream available, falling back to snapshot")
+			return SnapshotCapture.capture(self, filename)
+
+		_write_frame(filename, frame)
+		return "stream"
+
+	def latest_frame(self):
+		with self._frame_mutex:
+			if self._frame is None or monotonic_time() - self._frame_time > self._max_frame_age:
+				return None
+			return self._frame
+
+	def _set_frame(self, frame):
+		with self._frame_mutex:
+			self._frame = frame
+			self._frame_time = monotonic_time()
+
+	def _stream_worker(self, stop_event):
+		backoff = 1.0
+		while not stop_event.is_set():
+			response = None
+			try:
+				self._logger.debug("Connecting to webcam stream at {}".format(self._stream_url))
+				response = self._stream_session.get(self._stream_url,
+				                                    stream=True,
+				                                    timeout=self._timeout,
+				                                    verify=self._validate_ssl)
+				self._stream_response = response
+				response.raise_for_status()
+
+				# small chunks, reads block until the full chunk size has arrived
+				parser = MjpegStreamParser()
+				for chunk in response.iter_content(chunk_size=4096):
+					frames = parser.feed(chunk)
+					if stop_event.is_set():
+						break
+
+					if frames:
+						# only the most recent frame is of interest
+						self._set_frame(frames[-1])
+						backoff = 1.0
+			except:
+				if not stop_event.is_set():
+					self._logger.exception("Error while reading frames from the webcam stream at {}, "
+					                       "reconnecting in {}s".format(self._stream_url, backoff))
+			finally:
+				if response is not None:
+					if self._stream_response is response:
+						self._stream_response = None
+					try:
+						response.close()
+					except:
+						pass
+
+			if not stop_event.wait(backoff):
+				backoff = min(backoff * 2, 30.0)
+
+
+class MjpegStreamParser(object):
+	"""
+	Incrementally extracts JPEG frames from a ``multipart/x-mixed-replace`` MJPEG stream.
+
+	Uses the ``Content-Length`` header of the individual parts if present and otherwise looks for the JPEG end of
+	image marker.
+	"""
+
+	MAX_HEADER_SIZE = 16 * 1024
+	MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+	JPEG_SOI = b"\xff\xd8"
+	JPEG_EOI = b"\xff\xd9"
+
+	_content_length = re.compile(br"^content-length:\s*(\d+)\s*$", re.IGNORECASE | re.MULTILINE)
+
+	def __init__(self):
+		self._buffer = bytearray()
+		self._in_body = False
+		self._length = None
+
+	def feed(self, data):
+		"""Feeds ``data`` to the parser, returns a list of all frames completed by it."""
+		self._buffer += data
+
+		frames = []
+		while True:
+			if not self._in_body:
+				end = self._buffer.find(b"\r\n\r\n")
+				if end < 0:
+					if len(self._buffer) > self.MAX_HEADER_SIZE:
+						# garbage, start over
+						del self._buffer[:-3]
+					break
+
+				match = self._content_length.search(bytes(self._buffer[:end]))
+				self._length = int(match.group(1)) if match else None
+				self._in_body = True
+				del self._buffer[:end + 4]
+
+			if self._length is not None:
+				if len(self._buffer) < self._length:
+					break
+				frame = bytes(self._buffer[:self._length])
+				del self._buffer[:self._length]
+
+			else:
+				start = self._buffer.find(self.JPEG_SOI)
+				end = self._buffer.find(self.JPEG_EOI, start + 2) if start >= 0 else -1
+				if end < 0:
+					if len(self._buffer) > self.MAX_FRAME_SIZE:
+						del self._buffer[:]
+						self._in_body = False
+					break
+				frame = bytes(self._buffer[start:end + 2])
+				del self._buffer[:end + 2]
+
+			self._in_body = False
+			if frame.startswith(self.JPEG_SOI):
+				frames.append(frame)
+
+		return frames
+
+
+def _read_ffmpeg_progress(path):
+	"""Returns the number of the last frame ffmpeg reported in its progress output at ``path``, if any."""
+	try:
+		with io.open(path, "rb") as f:
+			f.seek(0, os.SEEK_END)
+			f.seek(max(0, f.tell() - 1024))
+			data = f.read()
+	except:
+		return None
+
+	frames = _ffmpeg_progress_frame.findall(data)
+	if not frames:
+		return None
+	return int(frames[-1])
+
+
+_ffmpeg_progress_frame = re.compile(br"^frame=\s*(\d+)\s*$", re.MULTILINE)
+
+
+def _write_frame(filename, data):
+	with io.open(filename, "wb") as f:
+		f.write(data)
+
+
+def create_capture(mode=None):
+	"""Creates the frame capture backend for timelapses as configured."""
+	if mode is None:
+		mode = settings().get(["webcam", "capture", "mode"])
+
+	snapshot_url = settings().get(["webcam", "snapshot"])
+	stream_url = settings().get(["webcam", "stream"])
+	timeout = settings().getInt(["webcam", "snapshotTimeout"])
+	validate_ssl = settings().getBoolean(["webcam", "snapshotSslValidation"])
+
+	if mode == StreamCapture.mode:
+		if stream_url and stream_url.lower().startswith(("http://", "https://")):
+			return StreamCapture(stream_url, snapshot_url,
+			                     timeout=timeout,
+			                     validate_ssl=validate_ssl,
+			                     max_frame_age=settings().getFloat(["webcam", "capture", "maxFrameAge"]))
+		logging.getLogger(__name__).warn("Capture mode stream configured but no absolute HTTP(S) stream URL set, "
+		                                 "falling back to snapshot capture")
+
+	return SnapshotCapture(snapshot_url, timeout=timeout, validate_ssl=validate_ssl)
+
+
+class TimelapseSegmentEncoder(object):
+	"""
+	Encodes the frames of a timelapse into movie segments in the background while it is still being recorded.
+
+	Every time ``segment_frames`` new frames have been captured, they get encoded into a segment by a single low
+	priority ffmpeg process. When the timelapse is rendered, only the frames after the last segment then need to be
+	encoded before all segments are concatenated into the final movie.
+	"""
+
+	def __init__(self, capture_dir, prefix, fps, segment_frames=250, nice=10,
+	             capture_format=_capture_format, segment_format=_segment_format):
+		self._logger = logging.getLogger(__name__)
+
+		self._capture_dir = capture_dir
+		self._prefix = prefix
+		self._fps = fps
+		self._segment_frames = segment_frames
+		self._nice = nice
+		self._capture_format = capture_format
+		self._segment_format = segment_format
+
+		self._render_settings = _get_render_settings()
+
+		self._next_frame = 0
+		self._segments = []
+		self._failed = False
+		self._finished = False
+
+		self._queue = queue.Queue()
+		self._thread = threading.Thread(target=self._worker,
+		                                name="TimelapseSegmentEncoder_{}".format(prefix))
+		self._thread.daemon = True
+		self._thread.start()
+
+	@property
+	def prefix(self):
+		return self._prefix
+
+	def frame_captured(self):
+		"""
+		To be called after every successful capture, queues the next segments for encoding once all of their frames
+		are available.
+		"""
+		if self._finished or self._failed:
+			return
+
+		# a segment's frames are final once the frame after it has been captured too
+		end = self._next_frame + self._segment_frames
+		while os.path.exists(self._frame_path(end)):
+			self._queue.put((self._next_frame, self._segment_frames))
+			self._next_frame = end
+			end = self._next_frame + self._segment_frames
+
+	def finish(self, fps=None):
+		"""
+		Waits for all queued segments to be encoded.
+
+		Returns:
+		    (list or None): list of ``(path, frame count)`` tuples of the encoded segments, in order, or None if the
+		        segments cannot be used for rendering the timelapse with ``fps`` and the current render settings,
+		        in which case they will have been deleted.
+		"""
+		self._stop()
+
+		if self._failed or (fps is not None and fps != self._fps) or self._render_settings != _get_render_settings():
+			self._logger.info("Can't use pre-encoded segments of {}, the whole timelapse will be "
+			                  "rendered".format(self._prefix))
+			self.delete()
+			return None
+
+		return list(self._segments)
+
+	def cancel(self):
+		"""Stops encoding and deletes all encoded segments."""
+		self._stop()
+		self.delete()
+
+	def delete(self):
+		for path, _ in self._segments:
+			try:
+				os.remove(path)
+			except:
+				self._logger.exception("Error while deleting segment {}".format(path))
+		self._segments = []
+
+	def _stop(self):
+		if not self._finished:
+			self._finished = True
+			self._queue.put(None)
+		self._thread.join()
+
+	def _frame_path(self, number):
+		return os.path.join(self._capture_dir, self._capture_format.format(prefix=self._prefix) % number)
+
+	def _worker(self):
+		while True:
+			entry = self._queue.get(block=True)
+			if entry is None:
+				break
+
+			if self._failed:
+				continue
+
+			start, count = entry
+			segment = os.path.join(self._capture_dir, self._segment_format.format(prefix=self._prefix,
+			                                                                       index=len(self._segments)))
+			input = os.path.join(self._capture_dir, self._capture_format.format(prefix=self._prefix))
+
+			command_str = TimelapseRenderJob._create_ffmpeg_command_string(self._render_settings["ffmpeg"],
+			                                                               self._fps,
+			                                                               self._render_settings["bitrate"],
+			                                                               1,
+			                                                               input,
+			                                                               segment,
+			                                                               hflip=self._render_settings["hflip"],
+			                                                               vflip=self._render_settings["vflip"],
+			                                                               rotate=self._render_settings["rotate"],
+			                                                               watermark=self._render_settings["watermark"],
+			                                                               start_number=start,
+			                                                               frames=count)
+			command_str = _low_priority_command(command_str, nice=self._nice)
+			self._logger.debug("Encoding frames {} to {} of {} into segment: {}".format(start, start + count - 1,
+			                                                                            self._prefix, command_str))
+
+			try:
+				p = sarge.run(command_str, stdout=sarge.Capture(), stderr=sarge.Capture())
+				if p.returncode == 0:
+					self._segments.append((segment, count))
+				else:
+					self._logger.warn("Could not encode segment of {}, got return code {!r}: "
+					                  "{}".format(self._prefix, p.returncode, p.stderr.text))
+					self._failed = True
+			except:
+				self._logger.exception("Could not encode segment of {} due to unknown error".format(self._prefix))
+				self._failed = True
+
+
+class TimelapseRenderScheduler(object):
+	"""
+	Queues timelapse render jobs and processes them with a limited number of workers.
+
+	The queue is persisted to ``queue_file`` so that jobs that were queued or being rendered get picked up again
+	after a restart. If ``defer_while_printing`` is set, no new render jobs are started while ``is_printing``
+	returns True, and jobs already rendering get paused until the print is over.
+	"""
+
+	def __init__(self, queue_file, concurrency=1, defer_while_printing=False, is_printing=None, job_factory=None,
+	             on_change=None):
+		self._logger = logging.getLogger(__name__)
+
+		self._queue_file = queue_file
+		self._concurrency = max(1, concurrency)
+		self._defer_while_printing = defer_while_printing
+		self._is_printing = is_printing
+		self._job_factory = job_factory if job_factory is not None else _create_render_job
+		self._on_change = on_change
+
+		self._queue = []
+		self._active = collections.OrderedDict()
+		self._condition = threading.Condition()
+
+		self._load()
+
+		self._workers = []
+		for i in range(self._concurrency):
+			worker = threading.Thread(target=self._worker, name="TimelapseRenderWorker{}".format(i))
+			worker.daemon = True
+			worker.start()
+			self._workers.append(worker)
+
+	@property
+	def defer_while_printing(self):
+		return self._defer_while_printing
+
+	@property
+	def is_printing(self):
+		return self._is_printing
+
+	@is_printing.setter
+	def is_printing(self, value):
+		with self._condition:
+			self._is_printing = value
+			self._condition.notify_all()
+			self._update_paused()
+
+	def enqueue(self, prefix, gcode=None, postfix=None, fps=None):
+		"""Queues rendering of ``prefix``, returns False if it is already queued or being rendered."""
+		with self._condition:
+			if self._find(prefix) is not None or prefix in self._active:
+				return False
+
+			self._queue.append(dict(prefix=prefix,
+			                        gcode=gcode,
+			                        postfix=postfix,
+			                        fps=fps,
+			                        queued=time.time()))
+			self._save()
+			self._condition.notify()
+
+		self._logger.info("Queued rendering of timelapse {}".format(prefix))
+		self._notify_change()
+		return True
+
+	def cancel(self, prefix):
+		"""Removes ``prefix`` from the queue if it hasn't started rendering yet."""
+		with self._condition:
+			entry = self._find(prefix)
+			if entry is None:
+				return False
+			self._queue.remove(entry)
+			self._save()
+
+		self._notify_change()
+		return True
+
+	def is_queued(self, prefix):
+		with self._condition:
+			return self._find(prefix) is not None
+
+	def is_rendering(self, prefix):
+		with self._condition:
+			return prefix in self._active
+
+	def update_progress(self, prefix, progress):
+		with self._condition:
+			entry = self._active.get(prefix)
+			if entry is None or entry.get("progress") == progress:
+				return
+			entry["progress"] = progress
+
+		self._notify_change()
+
+	def get_state(self):
+		with self._condition:
+			def to_output(entry):
+				return dict((key, entry.get(key)) for key in ("prefix", "gcode", "queued", "started", "progress", "paused")
+				            if key in entry)
+
+			return dict(deferred=self._is_deferred(),
+			            concurrency=self._concurrency,
+			            rendering=[to_output(entry) for entry in self._active.values()],
+			            queued=[to_output(entry) for entry in self._queue])
+
+	def wakeup(self):
+		"""
+		Re-checks whether queued jobs can be started and whether running jobs need to be paused or resumed, e.g.
+		after a print started or finished.
+		"""
+		with self._condition:
+			self._condition.notify_all()
+			self._update_paused()
+		self._notify_change()
+
+	def _find(self, prefix):
+		for entry in self._queue:
+			if entry["prefix"] == prefix:
+				return entry
+		return None
+
+	def _is_deferred(self):
+		if not self._defer_while_printing or self._is_printing is None:
+			return False
+
+		try:
+			return self._is_printing()
+		except:
+			self._logger.exception("Error while checking whether the printer is printing")
+			return False
+
+	def _update_paused(self):
+		paused = self._is_deferred()
+		for entry in self._active.values():
+			job = entry.get("job")
+			if job is None or entry["paused"] == paused:
+				continue
+
+			try:
+				if paused:
+					job.pause()
+					self._logger.info("Paused rendering of timelapse {} while printing".format(entry["prefix"]))
+				else:
+					job.resume()
+					self._logger.info("Resumed rendering of timelapse {}".format(entry["prefix"]))
+				entry["paused"] = paused
+			except:
+				self._logger.exception("Error while pausing or resuming rendering of timelapse {}".format(entry["prefix"]))
+
+	def _worker(self):
+		while True:
+			with self._condition:
+				while not self._queue or self._is_deferred():
+					# poll while deferred, printing state changes are not signalled to us
+					self._condition.wait(5.0 if self._queue else None)
+
+				entry = self._queue.pop(0)
+				entry["started"] = time.time()
+				entry["progress"] = 0
+				entry["paused"] = False
+				self._active[entry["prefix"]] = entry
+				self._save()
+
+			self._notify_change()
+
+			try:
+				job = self._job_factory(entry["prefix"], gcode=entry["gcode"], postfix=entry["postfix"],
+				                        fps=entry["fps"])
+				with self._condition:
+					entry["job"] = job
+					self._update_paused()
+				job.render()
+			except:
+				self._logger.exception("Error while rendering timelapse {}".format(entry["prefix"]))
+			finally:
+				with self._condition:
+					self._active.pop(entry["prefix"], None)
+					self._save()
+
+				self._notify_change()
+
+	def _notify_change(self):
+		if callable(self._on_change):
+			try:
+				self._on_change(self.get_state())
+			except:
+				self._logger.exception("Error while notifying about render queue changes")
+
+	def _save(self):
+		entries = [dict((key, entry[key]) for key in ("prefix", "gcode", "postfix", "fps", "queued"))
+		           for entry in list(self._active.values()) + self._queue]
+		try:
+			with util.atomic_write(self._queue_file, "wb") as f:
+				json.dump(entries, f)
+		except:
+			self._logger.exception("Could not persist timelapse render queue to {}".format(self._queue_file))
+
+	def _load(self):
+		if not os.path.exists(self._queue_file):
+			return
+
+		try:
+			with io.open(self._queue_file, "rb") as f:
+				entries = json.load(f)
+		except:
+			self._logger.exception("Could not load timelapse render queue from {}".format(self._queue_file))
+			return
+
+		for entry in entries:
+			if not isinstance(entry, dict) or not entry.get("prefix"):
+				continue
+			self._queue.append(dict(prefix=entry["prefix"],
+			                        gcode=entry.get("gcode"),
+			                        postfix=entry.get("postfix"),
+			                        fps=entry.get("fps"),
+			                        queued=entry.get("queued")))
+
+		if self._queue:
+			self._logger.info("Restored {} queued timelapse render jobs".format(len(self._queue)))
+
+
 class Timelapse(object):
 	QUEUE_ENTRY_TYPE_CAPTURE = "capture"
 	QUEUE_ENTRY_TYPE_CALLBACK = "callback"
@@ -390,9 +1374,8 @@ class Timelapse(object):
 
 		self._capture_dir = settings().getBaseFolder("timelapse_tmp")
 		self._movie_dir = settings().getBaseFolder("timelapse")
-		self._snapshot_url = settings().get(["webcam", "snapshot"])
-		self._snapshot_timeout = settings().getInt(["webcam", "snapshotTimeout"])
-		self._snapshot_validate_ssl = settings().getBoolean(["webcam", "snapshotSslValidation"])
+		self._capture = create_capture()
+		self._segment_encoder = None
 
 		self._fps = fps
 
@@ -436,6 +1419,8 @@ class Timelapse(object):
 		for (event, callback) in self.event_subscriptions():
 			eventManager().unsubscribe(event, callback)
 
+		self._capture.close()
+
 	def on_print_started(self, event, payload):
 		"""
 		Override this to perform additional actions upon start of a print job.
@@ -487,6 +1472,11 @@ class Timelapse(object):
 		self._gcode_file = os.path.basename(gcodeFile)
 		self._file_prefix = "{}_{}".format(os.path.splitext(self._gcode_file)[0], time.strftime("%Y%m%d%H%M%S"))
 
+		capture_statistics.reset()
+		self._capture.start()
+
+		self._start_segment_encoder()
+
 	def stop_timelapse(self, do_create_movie=True, success=True):
 		self._logger.debug("Stopping timelapse")
 
@@ -494,6 +1484,8 @@ class Timelapse(object):
 
 		def reset_image_number():
 			self._image_number = None
+			self._segment_encoder = None
+			self._capture.stop()
 
 		def create_movie():
 			render_unrendered_timelapse(self._file_prefix,
@@ -607,32 +1599,31 @@ class Timelapse(object):
 	def _perform_capture(self, filename, onerror=None):
 		eventManager().fire(Events.CAPTURE_START, dict(file=filename))
 		try:
-			self._logger.debug("Going to capture {} from {}".format(filename, self._snapshot_url))
-			r = requests.get(self._snapshot_url,
-			                 stream=True,
-			                 timeout=self._snapshot_timeout,
-			                 verify=self._snapshot_validate_ssl)
-			r.raise_for_status()
-
-			with open (filename, "wb") as f:
-				for chunk in r.iter_content(chunk_size=1024):
-					if chunk:
-						f.write(chunk)
-						f.flush()
-
-			self._logger.debug("Image {} captured from {}".format(filename, self._snapshot_url))
+			self._logger.debug("Going to capture {} via {}".format(filename, self._capture.mode))
+			start = monotonic_time()
+			source = self._capture.capture(filename)
+			capture_statistics.record(monotonic_time() - start, source=source)
+			self._logger.debug("Image {} captured from {}".format(filename, source))
 		except Exception as e:
-			self._logger.exception("Could not capture image {} from {}".format(filename, self._snapshot_url))
+			self._logger.exception("Could not capture image {} from {}".format(filename, self._capture.url))
+			capture_statistics.record_error()
 			if callable(onerror):
 				onerror()
 			eventManager().fire(Events.CAPTURE_FAILED, dict(file=filename,
 			                                                error=str(e),
-			                                                url=self._snapshot_url))
+			                                                url=self._capture.url))
 			self._capture_errors += 1
 			return False
 		else:
 			eventManager().fire(Events.CAPTURE_DONE, dict(file=filename))
 			self._capture_success += 1
+
+			unrendered_index().add_frame(filename)
+
+			encoder = self._segment_encoder
+			if encoder is not None:
+				encoder.frame_captured()
+
 			return True
 
 	def _copying_postroll(self):
@@ -642,11 +1633,49 @@ class Timelapse(object):
 			self._image_number += 1
 
 		if self._perform_capture(filename):
+			# hardlink the post roll frames to the last capture where possible instead of writing full copies
+			link = hasattr(os, "link")
 			for _ in range(self._post_roll * self._fps):
 				newFile = os.path.join(self._capture_dir,
 				                       _capture_format.format(prefix=self._file_prefix) % self._image_number)
 				self._image_number += 1
-				shutil.copyfile(filename, newFile)
+
+				if link:
+					try:
+						os.link(filename, newFile)
+					except OSError:
+						self._logger.info("Could not create hardlinks in {}, copying post roll frames "
+						                  "instead".format(self._capture_dir))
+						link = False
+				if not link:
+					shutil.copyfile(filename, newFile)
+
+				unrendered_index().add_frame(newFile)
+
+	def _start_segment_encoder(self):
+		if not settings().getBoolean(["webcam", "incremental", "enabled"]):
+			return
+
+		encoder = TimelapseSegmentEncoder(self._capture_dir, self._file_prefix, self._fps,
+		                                  segment_frames=settings().getInt(["webcam", "incremental", "segmentFrames"]),
+		                                  nice=settings().getInt(["webcam", "incremental", "nice"]))
+		with _job_lock:
+			_segment_encoders[self._file_prefix] = encoder
+		self._segment_encoder = encoder
+
+		# picks up any frames already captured
+		encoder.frame_captured()
+
+	def _discard_segment_encoder(self):
+		encoder = self._segment_encoder
+		if encoder is None:
+			return
+
+		self._segment_encoder = None
+		with _job_lock:
+			if _segment_encoders.get(encoder.prefix) is encoder:
+				del _segment_encoders[encoder.prefix]
+		encoder.cancel()
 
 	def clean_capture_dir(self):
 		if not os.path.isdir(self._capture_dir):
@@ -714,11 +1743,14 @@ class ZTimelapse(Timelapse):
 
 
 class TimedTimelapse(Timelapse):
-	def __init__(self, interval=1, post_roll=0, fps=25):
+	def __init__(self, interval=1, post_roll=0, fps=25, target_duration=0):
 		Timelapse.__init__(self, post_roll=post_roll, fps=fps)
 		self._interval = interval
 		if self._interval < 1:
 			self._interval = 1 # force minimum interval of 1s
+		self._target_duration = max(0, target_duration)
+		self._current_interval = self._interval
+		self._decimation_pending = False
 		self._timer = None
 		self._logger.debug("TimedTimelapse initialized")
 
@@ -726,11 +1758,23 @@ class TimedTimelapse(Timelapse):
 	def interval(self):
 		return self._interval
 
+	@property
+	def target_duration(self):
+		return self._target_duration
+
+	@property
+	def max_frames(self):
+		"""Maximum number of frames to keep of the print, None if unlimited."""
+		if not self._target_duration:
+			return None
+		return max(2, self._target_duration * self._fps)
+
 	def config_data(self):
 		return {
 			"type": "timed",
 			"options": {
-				"interval": self._interval
+				"interval": self._interval,
+				"targetDuration": self._target_duration
 			}
 		}
 
@@ -739,9 +1783,12 @@ class TimedTimelapse(Timelapse):
 		if self._timer is not None:
 			return
 
+		self._current_interval = self._interval
+		self._decimation_pending = False
+
 		self._logger.debug("Starting timer for interval based timelapse")
 		from octoprint.util import RepeatedTimer
-		self._timer = RepeatedTimer(self._interval, self._timer_task,
+		self._timer = RepeatedTimer(self._timer_interval, self._timer_task,
 		                            run_first=True, condition=self._timer_active,
 		                            on_finish=self._on_timer_finished)
 		self._timer.start()
@@ -751,12 +1798,62 @@ class TimedTimelapse(Timelapse):
 		self._copying_postroll()
 		self.post_roll_finished()
 
+	def _timer_interval(self):
+		return self._current_interval
+
 	def _timer_active(self):
 		return self._in_timelapse
 
 	def _timer_task(self):
+		if self._decimation_pending:
+			# frames are being renumbered, skip this one
+			return
+
 		self.capture_image()
 
+		max_frames = self.max_frames
+		if max_frames is not None and self._image_number is not None and self._image_number >= max_frames:
+			# thin out the frames once all captures so far are done
+			self._decimation_pending = True
+			self._capture_queue.put(dict(type=self.__class__.QUEUE_ENTRY_TYPE_CALLBACK, callback=self._decimate))
+
+	def _decimate(self):
+		"""
+		Drops every other frame captured so far and renumbers the remaining ones, then doubles the capture
+		interval, keeping the number of frames bounded by ``max_frames`` for prints of any length.
+		"""
+		try:
+			with self._capture_mutex:
+				if self._image_number is None:
+					return
+
+				count = self._image_number
+				for number in range(1, count):
+					path = os.path.join(self._capture_dir, _capture_format.format(prefix=self._file_prefix) % number)
+					try:
+						if number % 2:
+							os.remove(path)
+						else:
+							os.rename(path, os.path.join(self._capture_dir,
+							                             _capture_format.format(prefix=self._file_prefix) % (number // 2)))
+					except OSError:
+						self._logger.exception("Error while thinning out frame {}".format(path))
+
+				self._image_number = (count + 1) // 2
+				self._current_interval *= 2
+
+			# frames were renumbered, pre-encoded segments are useless now, start over with the remaining frames
+			if self._segment_encoder is not None:
+				self._discard_segment_encoder()
+				if self._in_timelapse:
+					self._start_segment_encoder()
+			unrendered_index().invalidate()
+
+			self._logger.info("Thinned out timelapse {} from {} to {} frames, capturing every {}s "
+			                  "now".format(self._file_prefix, count, self._image_number, self._current_interval))
+		finally:
+			self._decimation_pending = False
+
 	def _on_timer_finished(self):
 		# timer is done, delete it
 		self._timer = None
@@ -767,8 +1864,9 @@ class TimelapseRenderJob(object):
 	render_job_lock = threading.RLock()
 
 	def __init__(self, capture_dir, output_dir, prefix, postfix=None, capture_glob="{prefix}-*.jpg",
-	             capture_format="{prefix}-%d.jpg", output_format="{prefix}{postfix}.mpg", fps=25, threads=1,
-	             on_start=None, on_success=None, on_fail=None, on_always=None):
+	             capture_format="{prefix}-%d.jpg", output_format="{prefix}{postfix}.mpg",
+	             segment_format="{prefix}-seg{index}.mpg", segment_encoder=None, fps=25, threads=1, nice=None,
+	             ionice=None, on_start=None, on_success=None, on_fail=None, on_always=None, on_progress=None):
 		self._capture_dir = capture_dir
 		self._output_dir = output_dir
 		self._prefix = prefix
@@ -776,30 +1874,66 @@ class TimelapseRenderJob(object):
 		self._capture_glob = capture_glob
 		self._capture_format = capture_format
 		self._output_format = output_format
+		self._segment_format = segment_format
+		self._segment_encoder = segment_encoder
 		self._fps = fps
 		self._threads = threads
+		self._nice = nice
+		self._ionice = ionice
 		self._on_start = on_start
 		self._on_success = on_success
 		self._on_fail = on_fail
 		self._on_always = on_always
+		self._on_progress = on_progress
 
 		self._thread = None
 		self._logger = logging.getLogger(__name__)
 
+		self._process = None
+		self._process_lock = threading.RLock()
+		self._paused = False
+
 	def process(self):
-		"""Processes the job."""
+		"""Processes the job in a new thread, serialized with all other jobs processed this way."""
+
+		def run():
+			with self.render_job_lock:
+				self.render()
 
-		self._thread = threading.Thread(target=self._render,
+		self._thread = threading.Thread(target=run,
 		                                name="TimelapseRenderJob_{prefix}_{postfix}".format(prefix=self._prefix,
 		                                                                                    postfix=self._postfix))
 		self._thread.daemon = True
 		self._thread.start()
 
-	def _render(self):
-		"""Rendering runnable."""
+	def pause(self):
+		"""Stops the running ffmpeg process, and any started after it, until :meth:`resume` is called."""
+		with self._process_lock:
+			if self._paused:
+				return
+			self._paused = True
+			if self._process is not None:
+				_suspend_process(self._process)
+
+	def resume(self):
+		"""Continues rendering after :meth:`pause`."""
+		with self._process_lock:
+			if not self._paused:
+				return
+			self._paused = False
+			if self._process is not None:
+				_resume_process(self._process)
+
+	def render(self):
+		"""Renders the timelapse in the current thread."""
+
+		segments = None
+		if self._segment_encoder is not None:
+			segments = self._segment_encoder.finish(fps=self._fps)
 
-		ffmpeg = settings().get(["webcam", "ffmpeg"])
-		bitrate = settings().get(["webcam", "bitrate"])
+		render_settings = _get_render_settings()
+		ffmpeg = render_settings["ffmpeg"]
+		bitrate = render_settings["bitrate"]
 		if ffmpeg is None or bitrate is None:
 			self._logger.warn("Cannot create movie, path to ffmpeg or desired bitrate is unset")
 			return
@@ -819,44 +1953,164 @@ class TimelapseRenderJob(object):
 			self._notify_callback("fail", output, returncode=0, stdout="", stderr="", reason="no_frames")
 			return
 
-		hflip = settings().getBoolean(["webcam", "flipH"])
-		vflip = settings().getBoolean(["webcam", "flipV"])
-		rotate = settings().getBoolean(["webcam", "rotate90"])
-
-		watermark = None
-		if settings().getBoolean(["webcam", "watermark"]):
-			watermark = os.path.join(os.path.dirname(__file__), "static", "img", "watermark.png")
-			if sys.platform == "win32":
-				# Because ffmpeg hiccups on windows' drive letters and backslashes we have to give the watermark
-				# path a special treatment. Yeah, I couldn't believe it either...
-				watermark = watermark.replace("\\", "/").replace(":", "\\\\:")
-
-		# prepare ffmpeg command
-		command_str = self._create_ffmpeg_command_string(ffmpeg, self._fps, bitrate, self._threads, input, output,
-		                                                 hflip=hflip, vflip=vflip, rotate=rotate, watermark=watermark)
+		filter_kwargs = dict(hflip=render_settings["hflip"],
+		                     vflip=render_settings["vflip"],
+		                     rotate=render_settings["rotate"],
+		                     watermark=render_settings["watermark"])
+
+		try:
+			self._notify_callback("start", output)
+
+			p = None
+			if segments:
+				p = self._render_from_segments(segments, ffmpeg, bitrate, input, output, **filter_kwargs)
+				if p.returncode != 0:
+					self._logger.warn("Could not render movie from pre-encoded segments, got return code %r, "
+					                  "rendering all frames instead: %s" % (p.returncode, p.stderr.text))
+					p = None
+
+			if p is None:
+				p = self._run_ffmpeg(lambda progress: self._create_ffmpeg_command_string(ffmpeg, self._fps, bitrate,
+				                                                                          self._threads, input, output,
+				                                                                          progress=progress,
+				                                                                          **filter_kwargs),
+				                     frames=self._count_frames())
+
+			if p.returncode == 0:
+				self._notify_callback("success", output)
+			else:
+				returncode = p.returncode
+				stdout_text = p.stdout.text
+				stderr_text = p.stderr.text
+				self._logger.warn("Could not render movie, got return code %r: %s" % (returncode, stderr_text))
+				self._notify_callback("fail", output, returncode=returncode, stdout=stdout_text, stderr=stderr_text, reason="returncode")
+		except:
+			self._logger.exception("Could not render movie due to unknown error")
+			self._notify_callback("fail", output, reason="unknown")
+		finally:
+			self._delete_segment_files(segments)
+			self._notify_callback("always", output)
+
+	def _render_from_segments(self, segments, ffmpeg, bitrate, input, output, **filter_kwargs):
+		"""
+		Encodes the frames not yet covered by ``segments`` into a final segment, then concatenates all segments
+		into ``output``. Returns the result of the last ffmpeg run.
+		"""
+
+		paths = [path for path, _ in segments]
+		encoded = sum(count for _, count in segments)
+
+		if os.path.exists(input % encoded):
+			tail = self._segment_path(len(segments))
+			p = self._run_ffmpeg(lambda progress: self._create_ffmpeg_command_string(ffmpeg, self._fps, bitrate,
+			                                                                          self._threads, input, tail,
+			                                                                          start_number=encoded,
+			                                                                          progress=progress,
+			                                                                          **filter_kwargs),
+			                     frames=self._count_frames() - encoded)
+			if p.returncode != 0:
+				return p
+			paths.append(tail)
+
+		segment_list = self._segment_list_path()
+		with io.open(segment_list, "wt", encoding="utf-8") as f:
+			for path in paths:
+				f.write(u"file '{}'\n".format(path.replace("'", "'\\''")))
+
+		return self._run_ffmpeg(lambda progress: self._create_ffmpeg_concat_command_string(ffmpeg, segment_list, output))
+
+	def _run_ffmpeg(self, command_factory, frames=None):
+		"""
+		Runs the ffmpeg command created by ``command_factory`` with the configured priority.
+
+		If the number of input ``frames`` is known, ffmpeg's progress is reported to the progress callback while it
+		runs. ``command_factory`` gets passed the file ffmpeg should write its progress to, or None.
+		"""
+
+		progress_file = None
+		if frames and self._on_progress is not None:
+			handle, progress_file = tempfile.mkstemp(prefix="timelapse-", suffix=".progress")
+			os.close(handle)
+
+		command_str = _low_priority_command(command_factory(progress_file), nice=self._nice, ionice=self._ionice)
 		self._logger.debug("Executing command: {}".format(command_str))
 
-		with self.render_job_lock:
+		if progress_file is None:
+			return self._run_command(command_str)
+
+		# ffmpeg outputs at 25fps regardless of the input framerate
+		output_frames = max(1, int(frames * 25 / self._fps))
+		done = threading.Event()
+
+		def poll():
+			while not done.wait(1.0):
+				frame = _read_ffmpeg_progress(progress_file)
+				if frame is not None:
+					self._notify_callback("progress", min(100, int(frame * 100 / output_frames)))
+
+		poller = threading.Thread(target=poll, name="TimelapseRenderProgress_{}".format(self._prefix))
+		poller.daemon = True
+		poller.start()
+
+		try:
+			return self._run_command(command_str)
+		finally:
+			done.set()
+			poller.join()
 			try:
-				self._notify_callback("start", output)
-				p = sarge.run(command_str, stdout=sarge.Capture(), stderr=sarge.Capture())
-				if p.returncode == 0:
-					self._notify_callback("success", output)
-				else:
-					returncode = p.returncode
-					stdout_text = p.stdout.text
-					stderr_text = p.stderr.text
-					self._logger.warn("Could not render movie, got return code %r: %s" % (returncode, stderr_text))
-					self._notify_callback("fail", output, returncode=returncode, stdout=stdout_text, stderr=stderr_text, reason="returncode")
+				os.remove(progress_file)
 			except:
-				self._logger.exception("Could not render movie due to unknown error")
-				self._notify_callback("fail", output, reason="unknown")
-			finally:
-				self._notify_callback("always", output)
+				pass
+
+	def _run_command(self, command_str):
+		p = sarge.run(command_str, async_=True, stdout=sarge.Capture(), stderr=sarge.Capture())
+		while len(p.commands) == 0:
+			# see octoprint.util.commandline, we can't rely on the events being set if sarge fails
+			time.sleep(0.01)
+		p.commands[0].process_ready.wait()
+
+		process = p.commands[0].process
+		if not process:
+			raise RuntimeError("Error while trying to run command {}".format(command_str))
+
+		with self._process_lock:
+			self._process = process
+			if self._paused:
+				_suspend_process(process)
+
+		try:
+			p.wait()
+		finally:
+			with self._process_lock:
+				self._process = None
+		return p
+
+	def _count_frames(self):
+		pattern = self._capture_glob.format(prefix=util.glob_escape(self._prefix))
+		return len([entry for entry in scandir(self._capture_dir) if fnmatch.fnmatch(entry.name, pattern)])
+
+	def _delete_segment_files(self, segments):
+		if not segments:
+			return
+
+		paths = [path for path, _ in segments] + [self._segment_path(len(segments)), self._segment_list_path()]
+		for path in paths:
+			try:
+				if os.path.exists(path):
+					os.remove(path)
+			except:
+				self._logger.exception("Error while deleting segment file {}".format(path))
+
+	def _segment_path(self, index):
+		return os.path.join(self._capture_dir, self._segment_format.format(prefix=self._prefix, index=index))
+
+	def _segment_list_path(self):
+		return os.path.splitext(self._segment_path("list"))[0] + ".txt"
 
 	@classmethod
 	def _create_ffmpeg_command_string(cls, ffmpeg, fps, bitrate, threads, input, output, hflip=False, vflip=False,
-	                                  rotate=False, watermark=None, pixfmt="yuv420p"):
+	                                  rotate=False, watermark=None, pixfmt="yuv420p", start_number=None, frames=None,
+	                                  progress=None):
 		"""
 		Create ffmpeg command string based on input parameters.
 
@@ -872,6 +2126,9 @@ class TimelapseRenderJob(object):
 		    rotate (bool): Perform 90° CCW rotation on input material.
 		    watermark (str): Path to watermark to apply to lower left corner.
 		    pixfmt (str): Pixel format to use for output. Default of yuv420p should usually fit the bill.
+		    start_number (int): Number of the first input file to use, defaults to the first one found.
+		    frames (int): Number of input files to use, defaults to all of them.
+		    progress (str): Path of a file to have ffmpeg write its progress to.
 
 		Returns:
 		    (str): Prepared command string to render `input` to `output` using ffmpeg.
@@ -881,10 +2138,18 @@ class TimelapseRenderJob(object):
 
 		logger = logging.getLogger(__name__)
 
-		command = [
-			ffmpeg, '-framerate', str(fps), '-loglevel', 'error', '-i', '"{}"'.format(input), '-vcodec', 'mpeg2video',
+		command = [ffmpeg, '-framerate', str(fps), '-loglevel', 'error']
+		if progress is not None:
+			command.extend(['-progress', '"{}"'.format(progress)])
+		if start_number is not None:
+			command.extend(['-start_number', str(start_number)])
+		if frames is not None:
+			# limit the input duration to end half a frame after the last one we want
+			command.extend(['-t', "{:.6f}".format((frames - 0.5) / fps)])
+		command.extend([
+			'-i', '"{}"'.format(input), '-vcodec', 'mpeg2video',
 			'-threads', str(threads), '-r', "25", '-y', '-b', str(bitrate),
-			'-f', 'vob']
+			'-f', 'vob'])
 
 		filter_string = cls._create_filter_string(hflip=hflip,
 		                                          vflip=vflip,
@@ -901,6 +2166,31 @@ class TimelapseRenderJob(object):
 
 		return " ".join(command)
 
+	@classmethod
+	def _create_ffmpeg_concat_command_string(cls, ffmpeg, segment_list, output, progress=None):
+		"""
+		Create ffmpeg command string for concatenating the segments listed in ``segment_list`` into ``output``.
+
+		Arguments:
+		    ffmpeg (str): Path to ffmpeg
+		    segment_list (str): Absolute path to ffmpeg concat list of segments
+		    output (str): Absolute path to output file
+		    progress (str): Path of a file to have ffmpeg write its progress to.
+
+		Returns:
+		    (str): Prepared command string to concatenate the segments without re-encoding.
+		"""
+
+		### See unit tests in test/timelapse/test_timelapse_renderjob.py
+
+		command = [ffmpeg, '-loglevel', 'error']
+		if progress is not None:
+			command.extend(['-progress', '"{}"'.format(progress)])
+		command.extend([
+			'-f', 'concat', '-safe', '0', '-i', '"{}"'.format(segment_list),
+			'-c', 'copy', '-y', '-f', 'vob', '"{}"'.format(output)])
+		return " ".join(command)
+
 	@classmethod
 	def _create_filter_string(cls, hflip=False, vflip=False, rotate=False, watermark=None, pixfmt="yuv420p"):
 		"""
@@ -9,9 +9,14 @@ from flask_login import UserMixin
 from flask_principal import Identity
 from werkzeug.local import LocalProxy
 import hashlib
+import hmac
 import os
+import threading
 import yaml
 import uuid
+import warnings
+
+import pylru
 
 import wrapt
 
@@ -20,7 +25,239 @@ from builtins import range, bytes
 
 from octoprint.settings import settings
 
-from octoprint.util import atomic_write, to_str, deprecated
+from octoprint.util import atomic_write, to_str, deprecated, secure_compare, monotonic_time
+
+##~~ Password hashing
+
+LEGACY_SALT = "mvBUTvwzBzD3yPwvnJ4E4tXNf3CGJvvW"
+
+class PasswordHasher(object):
+	"""
+	Creates and verifies password hashes of the form ``<name>$<parameters>$<salt>$<hash>``.
+	"""
+
+	name = None
+
+	def hash(self, password):
+		raise NotImplementedError()
+
+	def verify(self, password, password_hash):
+		raise NotImplementedError()
+
+	def needs_rehash(self, password_hash):
+		"""Whether ``password_hash`` was created with different parameters than this hasher is configured for."""
+		return True
+
+	def handles(self, password_hash):
+		return password_hash is not None and password_hash.startswith(self.name + "$")
+
+	@staticmethod
+	def _generate_salt():
+		return "".join("%02x" % c for c in bytearray(os.urandom(16)))
+
+
+class LegacyPasswordHasher(PasswordHasher):
+	"""
+	SHA-512 over password and the global salt as used up to now. Only used for verifying existing hashes,
+	matching passwords get migrated to the configured hasher on login.
+	"""
+
+	name = "sha512"
+
+	def hash(self, password, salt=None):
+		if not salt:
+			salt = settings().get(["accessControl", "salt"])
+			if salt is None:
+				import string
+				from random import choice
+				chars = string.ascii_lowercase + string.ascii_uppercase + string.digits
+				salt = "".join(choice(chars) for _ in range(32))
+				settings().set(["accessControl", "salt"], salt)
+				settings().save()
+
+		return hashlib.sha512(to_str(password, encoding="utf-8", errors="replace") + to_str(salt)).hexdigest()
+
+	def verify(self, password, password_hash):
+		for salt in (settings().get(["accessControl", "salt"]), LEGACY_SALT):
+			if salt and secure_compare(self.hash(password, salt=salt), password_hash):
+				return True
+		return False
+
+	def handles(self, password_hash):
+		return password_hash is not None and "$" not in password_hash
+
+
+class Pbkdf2PasswordHasher(PasswordHasher):
+	name = "pbkdf2_sha256"
+
+	def __init__(self, iterations=25000):
+		self.iterations = iterations
+
+	def hash(self, password, salt=None, iterations=None):
+		if salt is None:
+			salt = self._generate_salt()
+		if iterations is None:
+			iterations = self.iterations
+
+		digest = _pbkdf2_sha256(to_str(password, encoding="utf-8", errors="replace"), to_str(salt), iterations)
+		return "{}${}${}${}".format(self.name, iterations, salt, digest)
+
+	def verify(self, password, password_hash):
+		try:
+			_, iterations, salt, _ = password_hash.split("$")
+			iterations = int(iterations)
+		except ValueError:
+			return False
+		return secure_compare(self.hash(password, salt=salt, iterations=iterations), password_hash)
+
+	def needs_rehash(self, password_hash):
+		try:
+			return not self.handles(password_hash) or int(password_hash.split("$")[1]) != self.iterations
+		except ValueError:
+			return True
+
+
+class ScryptPasswordHasher(PasswordHasher):
+	"""
+	scrypt based hasher, only available if the Python runtime provides :func:`hashlib.scrypt`.
+	"""
+
+	name = "scrypt"
+
+	def __init__(self, n=16384, r=8, p=1):
+		self.n = n
+		self.r = r
+		self.p = p
+
+	@classmethod
+	def available(cls):
+		return hasattr(hashlib, "scrypt")
+
+	def hash(self, password, salt=None, n=None, r=None, p=None):
+		if salt is None:
+			salt = self._generate_salt()
+		n = n or self.n
+		r = r or self.r
+		p = p or self.p
+
+		digest = hashlib.scrypt(to_str(password, encoding="utf-8", errors="replace"),
+		                        salt=to_str(salt), n=n, r=r, p=p,
+		                        maxmem=128 * n * r * p + 1024 * 1024)
+		return "{}${}${}${}${}${}".format(self.name, n, r, p, salt, "".join("%02x" % c for c in bytearray(digest)))
+
+	def verify(self, password, password_hash):
+		if not self.available():
+			return False
+
+		try:
+			_, n, r, p, salt, _ = password_hash.split("$")
+			n, r, p = int(n), int(r), int(p)
+		except ValueError:
+			return False
+		return secure_compare(self.hash(password, salt=salt, n=n, r=r, p=p), password_hash)
+
+	def needs_rehash(self, password_hash):
+		try:
+			return not self.handles(password_hash) or [int(x) for x in password_hash.split("$")[1:4]] != [self.n, self.r, self.p]
+		except ValueError:
+			return True
+
+
+def _pbkdf2_sha256(password, salt, iterations):
+	if hasattr(hashlib, "pbkdf2_hmac"):
+		return "".join("%02x" % c for c in bytearray(hashlib.pbkdf2_hmac("sha256", password, salt, iterations)))
+
+	# Python < 2.7.8, single block suffices since the derived key has the length of the digest
+	import struct
+	mac = hmac.new(password, digestmod=hashlib.sha256)
+	def prf(data):
+		h = mac.copy()
+		h.update(data)
+		return bytearray(h.digest())
+
+	u = prf(salt + struct.pack(b">I", 1))
+	result = bytearray(u)
+	for _ in range(iterations - 1):
+		u = prf(bytes(u))
+		for i in range(len(result)):
+			result[i] ^= u[i]
+	return "".join("%02x" % c for c in result)
+
+
+def get_password_hasher():
+	"""
+	Returns the :class:`PasswordHasher` configured via ``accessControl.passwordHashing`` for new password hashes.
+	"""
+
+	algorithm = settings().get(["accessControl", "passwordHashing", "algorithm"])
+	if algorithm == ScryptPasswordHasher.name:
+		if ScryptPasswordHasher.available():
+			return ScryptPasswordHasher(n=settings().getInt(["accessControl", "passwordHashing", "scrypt", "n"]),
+			                            r=settings().getInt(["accessControl", "passwordHashing", "scrypt", "r"]),
+			                            p=settings().getInt(["accessControl", "passwordHashing", "scrypt", "p"]))
+		logging.getLogger(__name__).warn("scrypt is not supported by this Python runtime, falling back to {}".format(Pbkdf2PasswordHasher.name))
+	elif algorithm != Pbkdf2PasswordHasher.name:
+		logging.getLogger(__name__).warn("Unknown password hashing algorithm {}, falling back to {}".format(algorithm, Pbkdf2PasswordHasher.name))
+
+	return Pbkdf2PasswordHasher(iterations=settings().getInt(["accessControl", "passwordHashing", "pbkdf2", "iterations"]))
+
+
+def verify_password_hash(password, password_hash):
+	"""
+	Verifies ``password`` against ``password_hash``, regardless of the algorithm it was created with.
+	"""
+
+	for hasher in (Pbkdf2PasswordHasher(), ScryptPasswordHasher(), LegacyPasswordHasher()):
+		if hasher.handles(password_hash):
+			return hasher.verify(password, password_hash)
+	return False
+
+
+class PasswordVerificationCache(object):
+	"""
+	Short-lived, size-bounded cache of successful password verifications.
+
+	Clients using Basic Authentication send their password along with every request, which would mean
+	running the (deliberately slow) password hash for each of them. Only a keyed HMAC of the password is kept,
+	entries are bound to the stored password hash and thus invalidated by any password change.
+	"""
+
+	def __init__(self, size=32, ttl=300):
+		self._ttl = ttl
+		self._key = os.urandom(32)
+		self._entries = pylru.lrucache(max(size, 1))
+		self._enabled = size > 0 and ttl > 0
+		self._lock = threading.RLock()
+
+	def _digest(self, password):
+		return hmac.new(self._key, to_str(password, encoding="utf-8", errors="replace"), hashlib.sha256).hexdigest()
+
+	def check(self, username, password, password_hash):
+		if not self._enabled:
+			return False
+
+		key = (username, password_hash)
+		with self._lock:
+			if not key in self._entries:
+				return False
+			digest, timestamp = self._entries[key]
+			if timestamp + self._ttl < monotonic_time():
+				del self._entries[key]
+				return False
+		return secure_compare(self._digest(password), digest)
+
+	def add(self, username, password, password_hash):
+		if not self._enabled:
+			return
+
+		with self._lock:
+			self._entries[(username, password_hash)] = (self._digest(password), monotonic_time())
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+##~~ UserManager
 
 class UserManager(object):
 	valid_roles = ["user", "admin"]
@@ -33,6 +270,9 @@ class UserManager(object):
 
 		self._callbacks = []
 
+		self._password_cache = PasswordVerificationCache(size=settings().getInt(["accessControl", "passwordHashing", "cache", "size"]),
+		                                                 ttl=settings().getInt(["accessControl", "passwordHashing", "cache", "ttl"]))
+
 	@property
 	def enabled(self):
 		return self._enabled
@@ -82,11 +322,7 @@ class UserManager(object):
 
 		self._logger.debug("Logged in user: %r" % user)
 
-		for callback in self._callbacks:
-			try:
-				callback("login", user)
-			except:
-				self._logger.exception("Error while calling login callback {!r}".format(callback))
+		self._trigger_callbacks("login", user)
 
 		return user
 
@@ -114,11 +350,14 @@ class UserManager(object):
 
 		self._logger.debug("Logged out user: %r" % user)
 
+		self._trigger_callbacks("logout", user)
+
+	def _trigger_callbacks(self, action, user):
 		for callback in self._callbacks:
 			try:
-				callback("logout", user)
+				callback(action, user)
 			except:
-				self._logger.exception("Error while calling logout callback {!r}".format(callback))
+				self._logger.exception("Error while calling {} callback {!r}".format(action, callback))
 
 	def _cleanup_sessions(self):
 		import time
@@ -130,37 +369,33 @@ class UserManager(object):
 
 	@staticmethod
 	def createPasswordHash(password, salt=None):
-		if not salt:
-			salt = settings().get(["accessControl", "salt"])
-			if salt is None:
-				import string
-				from random import choice
-				chars = string.ascii_lowercase + string.ascii_uppercase + string.digits
-				salt = "".join(choice(chars) for _ in range(32))
-				settings().set(["accessControl", "salt"], salt)
-				settings().save()
+		"""
+		Creates a hash for ``password`` using the configured password hasher, with a fresh per-password salt.
 
-		return hashlib.sha512(to_str(password, encoding="utf-8", errors="replace") + to_str(salt)).hexdigest()
+		If a ``salt`` is provided, a legacy SHA-512 hash over password and that salt is returned instead.
+		"""
+		if salt:
+			return LegacyPasswordHasher().hash(password, salt=salt)
+		return get_password_hasher().hash(password)
 
 	def checkPassword(self, username, password):
 		user = self.findUser(username)
 		if not user:
 			return False
 
-		hash = UserManager.createPasswordHash(password)
-		if user.check_password(hash):
-			# new hash matches, correct password
+		password_hash = user._passwordHash
+		if self._password_cache.check(username, password, password_hash):
 			return True
+
+		if not verify_password_hash(password, password_hash):
+			return False
+
+		if get_password_hasher().needs_rehash(password_hash):
+			# correct password but outdated hash, we migrate the stored password hash to the current hasher
+			self.changeUserPassword(username, password)
 		else:
-			# new hash doesn't match, but maybe the old one does, so check that!
-			oldHash = UserManager.createPasswordHash(password, salt="mvBUTvwzBzD3yPwvnJ4E4tXNf3CGJvvW")
-			if user.check_password(oldHash):
-				# old hash matches, we migrate the stored password hash to the new one and return True since it's the correct password
-				self.changeUserPassword(username, password)
-				return True
-			else:
-				# old hash doesn't match either, wrong password
-				return False
+			self._password_cache.add(username, password, password_hash)
+		return True
 
 	def addUser(self, username, password, active, roles, overwrite=False):
 		pass
@@ -225,6 +460,7 @@ class FilebasedUserManager(UserManager):
 			userfile = os.path.join(settings().getBaseFolder("base"), "users.yaml")
 		self._userfile = userfile
 		self._users = {}
+		self._users_by_apikey = {}
 		self._dirty = False
 
 		self._customized = None
@@ -247,9 +483,21 @@ class FilebasedUserManager(UserManager):
 					for sessionid in self._sessionids_by_userid.get(name, set()):
 						if sessionid in self._session_users_by_session:
 							self._session_users_by_session[sessionid].update_user(self._users[name])
+			self._rebuild_apikey_index()
 		else:
 			self._customized = False
 
+	def _rebuild_apikey_index(self):
+		self._users_by_apikey = dict((user._apikey, user) for user in self._users.values() if user._apikey)
+
+	def _index_apikey(self, user):
+		if user._apikey:
+			self._users_by_apikey[user._apikey] = user
+
+	def _unindex_apikey(self, user):
+		if user._apikey and self._users_by_apikey.get(user._apikey) is user:
+			del self._users_by_apikey[user._apikey]
+
 	def _save(self, force=False):
 		if not self._dirty and not force:
 			return
@@ -270,6 +518,9 @@ class FilebasedUserManager(UserManager):
 			self._dirty = False
 		self._load()
 
+		# users have been reloaded, anything holding on to resolved user instances needs to refresh them
+		self._trigger_callbacks("changed", None)
+
 	def addUser(self, username, password, active=False, roles=None, apikey=None, overwrite=False):
 		if not roles:
 			roles = ["user"]
@@ -277,7 +528,10 @@ class FilebasedUserManager(UserManager):
 		if username in self._users.keys() and not overwrite:
 			raise UserAlreadyExists(username)
 
+		if username in self._users:
+			self._unindex_apikey(self._users[username])
 		self._users[username] = User(username, UserManager.createPasswordHash(password), active, roles, apikey=apikey)
+		self._index_apikey(self._users[username])
 		self._dirty = True
 		self._save()
 
@@ -328,12 +582,10 @@ class FilebasedUserManager(UserManager):
 		if not username in self._users.keys():
 			raise UnknownUser(username)
 
-		passwordHash = UserManager.createPasswordHash(password)
 		user = self._users[username]
-		if user._passwordHash != passwordHash:
-			user._passwordHash = passwordHash
-			self._dirty = True
-			self._save()
+		user._passwordHash = UserManager.createPasswordHash(password)
+		self._dirty = True
+		self._save()
 
 	def changeUserSetting(self, username, key, value):
 		if not username in self._users.keys():
@@ -376,7 +628,9 @@ class FilebasedUserManager(UserManager):
 			raise UnknownUser(username)
 
 		user = self._users[username]
+		self._unindex_apikey(user)
 		user._apikey = ''.join('%02X' % z for z in bytes(uuid.uuid4().bytes))
+		self._index_apikey(user)
 		self._dirty = True
 		self._save()
 		return user._apikey
@@ -386,6 +640,7 @@ class FilebasedUserManager(UserManager):
 			raise UnknownUser(username)
 
 		user = self._users[username]
+		self._unindex_apikey(user)
 		user._apikey = None
 		self._dirty = True
 		self._save()
@@ -396,7 +651,7 @@ class FilebasedUserManager(UserManager):
 		if not username in self._users.keys():
 			raise UnknownUser(username)
 
-		del self._users[username]
+		self._unindex_apikey(self._users.pop(username))
 		self._dirty = True
 		self._save()
 
@@ -412,10 +667,7 @@ class FilebasedUserManager(UserManager):
 			return self._users[userid]
 
 		elif apikey is not None:
-			for user in self._users.values():
-				if apikey == user._apikey:
-					return user
-			return None
+			return self._users_by_apikey.get(apikey)
 
 		else:
 			return None
@@ -464,8 +716,19 @@ class User(UserMixin):
 			"settings": self._settings
 		}
 
-	def check_password(self, passwordHash):
-		return self._passwordHash == passwordHash
+	def check_password(self, password):
+		"""
+		Verifies ``password`` against the user's password hash.
+
+		Passing a password hash instead of the password is no longer supported and never matches, the stored hash
+		must not be usable as a password.
+		"""
+		if any(hasher.handles(password) for hasher in (Pbkdf2PasswordHasher(), ScryptPasswordHasher())):
+			warnings.warn("Passing a password hash to User.check_password is deprecated and can't match salted "
+			              "password hashes, pass the password instead", DeprecationWarning, stacklevel=2)
+			return False
+
+		return verify_password_hash(password, self._passwordHash)
 
 	def get_id(self):
 		return self.get_name()
@@ -571,7 +834,7 @@ class DummyUser(User):
 	def __init__(self):
 		User.__init__(self, "dummy", "", True, UserManager.valid_roles)
 
-	def check_password(self, passwordHash):
+	def check_password(self, password):
 		return True
 
 class DummyIdentity(Identity):
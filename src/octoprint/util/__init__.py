@@ -449,6 +449,35 @@ def to_unicode(s_or_u, encoding="utf-8", errors="strict"):
 		return s_or_u
 
 
+def secure_compare(a, b):
+	"""
+	Compares the two strings ``a`` and ``b`` in constant time (with regards to their content).
+
+	Uses :func:`hmac.compare_digest` if available and falls back to a manual
+	implementation on older Python versions.
+
+	Returns:
+	    boolean: True if both strings are equal, False otherwise
+	"""
+	if a is None or b is None:
+		return False
+
+	a = to_str(a)
+	b = to_str(b)
+
+	import hmac
+	if hasattr(hmac, "compare_digest"):
+		return hmac.compare_digest(a, b)
+
+	if len(a) != len(b):
+		return False
+
+	result = 0
+	for x, y in zip(a, b):
+		result |= ord(x) ^ ord(y)
+	return result == 0
+
+
 def chunks(l, n):
 	"""
 	Yield successive n-sized chunks from l.
@@ -26,6 +26,7 @@ import serial
 import wrapt
 
 import octoprint.plugin
+import octoprint.util.compression
 
 from collections import deque
 
@@ -37,7 +38,8 @@ from octoprint.events import eventManager, Events
 from octoprint.filemanager import valid_file_type
 from octoprint.filemanager.destinations import FileDestinations
 from octoprint.util import get_exception_string, sanitize_ascii, filter_non_ascii, CountedEvent, RepeatedTimer, \
-	to_unicode, bom_aware_open, TypedQueue, PrependableQueue, TypeAlreadyInQueue, chunks, ResettableTimer
+	to_unicode, TypedQueue, PrependableQueue, TypeAlreadyInQueue, chunks, ResettableTimer
+from octoprint.util.profiling import hook_profiler
 
 try:
 	import _winreg
@@ -492,6 +494,7 @@ class MachineCom(object):
 		# hooks
 		self._pluginManager = octoprint.plugin.plugin_manager()
 
+		self._hook_profiler = hook_profiler()
 		self._gcode_hooks = dict(
 			queuing=self._pluginManager.get_hooks("octoprint.comm.protocol.gcode.queuing"),
 			queued=self._pluginManager.get_hooks("octoprint.comm.protocol.gcode.queued"),
@@ -2623,7 +2626,7 @@ class MachineCom(object):
 
 		for name, hook in self._received_message_hooks.items():
 			try:
-				ret = hook(self, ret)
+				ret = self._hook_profiler.call("octoprint.comm.protocol.gcode.received", name, hook, self, ret)
 			except:
 				self._logger.exception("Error while processing hook {name}:".format(**locals()))
 			else:
@@ -3078,11 +3081,14 @@ class MachineCom(object):
 			return results
 
 		# send it through the phase specific handlers provided by plugins
+		hook_name = "octoprint.comm.protocol.gcode." + phase
 		for name, hook in self._gcode_hooks[phase].items():
 			new_results = []
 			for command, command_type, gcode, subcode, tags in results:
 				try:
-					hook_results = hook(self, phase, command, command_type, gcode, subcode=subcode, tags=tags)
+					hook_results = self._hook_profiler.call(hook_name, name, hook,
+					                                        self, phase, command, command_type, gcode,
+					                                        subcode=subcode, tags=tags)
 				except:
 					self._logger.exception("Error while processing hook {name} for phase {phase} and command {command}:".format(**locals()))
 				else:
@@ -3767,7 +3773,9 @@ class PrintingGcodeFileInformation(PrintingFileInformation):
 
 		if not os.path.exists(self._filename) or not os.path.isfile(self._filename):
 			raise IOError("File %s does not exist" % self._filename)
-		self._size = os.stat(self._filename).st_size
+
+		# file might be stored compressed, size and positions are always those of the uncompressed contents
+		self._size = octoprint.util.compression.uncompressed_size(self._filename)
 		self._pos = 0
 		self._read_lines = 0
 
@@ -3786,7 +3794,7 @@ class PrintingGcodeFileInformation(PrintingFileInformation):
 		"""
 		PrintingFileInformation.start(self)
 		with self._handle_mutex:
-			self._handle = bom_aware_open(self._filename, encoding="utf-8", errors="replace")
+			self._handle = octoprint.util.compression.open_text(self._filename, encoding="utf-8", errors="replace")
 			self._pos = self._handle.tell()
 			if self._handle.encoding.endswith("-sig"):
 				# Apparently we found an utf-8 bom in the file.
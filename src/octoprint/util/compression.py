@@ -0,0 +1,402 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import bisect
+import codecs
+import io
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+
+from octoprint.util import bom_aware_open
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+DEFAULT_LEVEL = 6
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+READ_SIZE = 64 * 1024
+
+# Compressed files are written as a series of independent gzip members ("blocks"), each holding at most block_size
+# bytes of uncompressed data. The header of each member carries an extra field "OP" with the member's total
+# compressed size and its uncompressed size. That allows to build an index of the file by only hopping over the
+# member headers, and to seek to any uncompressed position by decompressing a single member. The result is still a
+# regular gzip file that can be decompressed with any gzip tool.
+#
+# Regular gzip files without that extra field can still be read, but only sequentially.
+
+_FLAG_EXTRA = 0x04
+_EXTRA_ID = b"OP"
+_EXTRA_FORMAT = b"<II"
+_EXTRA_LENGTH = struct.calcsize(_EXTRA_FORMAT)
+
+# ID1+ID2, CM, FLG, MTIME, XFL, OS, XLEN, SI1+SI2, SLEN
+_HEADER_FORMAT = b"<2sBBIBBH2sH"
+_HEADER_LENGTH = struct.calcsize(_HEADER_FORMAT) + _EXTRA_LENGTH
+
+# CRC32, ISIZE
+_TRAILER_FORMAT = b"<II"
+_TRAILER_LENGTH = struct.calcsize(_TRAILER_FORMAT)
+
+
+def is_compressed(path):
+	"""Whether the file at ``path`` is gzip compressed."""
+	with io.open(path, "rb") as f:
+		return f.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+
+def compress(source, target, level=DEFAULT_LEVEL, block_size=DEFAULT_BLOCK_SIZE):
+	"""
+	Compresses everything read from the stream ``source`` into the stream ``target``, as seekable gzip.
+	"""
+	written = False
+	while True:
+		data = _read_fully(source, block_size)
+		if not data and written:
+			break
+
+		for chunk in _compress_block(data, level):
+			target.write(chunk)
+		written = True
+
+		if len(data) < block_size:
+			break
+
+
+def compress_file(path, level=DEFAULT_LEVEL, block_size=DEFAULT_BLOCK_SIZE):
+	"""
+	Compresses the file at ``path`` in place as seekable gzip.
+	"""
+	folder, name = os.path.split(path)
+	temp = tempfile.NamedTemporaryFile(mode="wb", dir=folder, prefix=".{}.".format(name), suffix=".tmp", delete=False)
+	try:
+		with io.open(path, "rb") as source:
+			compress(source, temp, level=level, block_size=block_size)
+		temp.close()
+		shutil.copymode(path, temp.name)
+		shutil.move(temp.name, path)
+	except:
+		temp.close()
+		try:
+			os.remove(temp.name)
+		except OSError:
+			pass
+		raise
+
+
+def open_file(path):
+	"""
+	Opens the file at ``path`` for reading binary data, transparently decompressing it if it's gzip compressed.
+
+	Positions (``tell``, ``seek``) are always in terms of the uncompressed data.
+	"""
+	f = io.open(path, "rb")
+	try:
+		compressed = f.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+		f.seek(0)
+	except:
+		f.close()
+		raise
+
+	if compressed:
+		return io.BufferedReader(CompressedFile(f), buffer_size=READ_SIZE)
+	return f
+
+
+def open_text(path, encoding="utf-8", errors="strict"):
+	"""
+	Like :func:`octoprint.util.bom_aware_open` in read mode, but transparently decompresses gzip compressed files.
+	"""
+	if not is_compressed(path):
+		return bom_aware_open(path, encoding=encoding, mode="r", errors=errors)
+
+	codec = codecs.lookup(encoding)
+	encoding = codec.name
+
+	handle = open_file(path)
+
+	potential_bom_attribute = "BOM_" + codec.name.replace("utf-", "utf").upper()
+	if hasattr(codecs, potential_bom_attribute):
+		# these encodings might have a BOM, so let's see if there is one
+		bom = getattr(codecs, potential_bom_attribute)
+
+		header = handle.read(4)
+		handle.seek(0)
+
+		if header.startswith(bom):
+			encoding += "-sig"
+			codec = codecs.lookup(encoding)
+
+	result = codecs.StreamReaderWriter(handle, codec.streamreader, codec.streamwriter, errors)
+	result.encoding = encoding
+	return result
+
+
+def uncompressed_size(path):
+	"""
+	Returns the size of the uncompressed contents of the file at ``path``, which for files that are not compressed
+	is simply their size.
+	"""
+	with io.open(path, "rb") as f:
+		if f.read(len(GZIP_MAGIC)) != GZIP_MAGIC:
+			return os.fstat(f.fileno()).st_size
+		f.seek(0)
+
+		compressed = CompressedFile(f, close_fileobj=False)
+		if compressed.size is not None:
+			return compressed.size
+
+		# no index available, we'll have to decompress everything
+		size = 0
+		while True:
+			data = compressed.read(READ_SIZE)
+			if not data:
+				break
+			size += len(data)
+		return size
+
+
+class CompressedFile(io.RawIOBase):
+	"""
+	Read only file like object for the uncompressed contents of a gzip compressed file.
+
+	If the file was written by :func:`compress`, seeking to arbitrary positions only requires decompressing a single
+	block. Other gzip files are decompressed sequentially, seeking backwards then means starting over.
+
+	Arguments:
+	    fileobj: the file object of the compressed file
+	    close_fileobj (bool): whether to close ``fileobj`` on :meth:`close`
+	"""
+
+	def __init__(self, fileobj, close_fileobj=True):
+		io.RawIOBase.__init__(self)
+		self._fileobj = fileobj
+		self._close_fileobj = close_fileobj
+
+		self._fileobj_seekable = _is_seekable(fileobj)
+
+		self._index = None
+		self._offsets = None
+		self._size = None
+		if self._fileobj_seekable:
+			index = _read_index(fileobj)
+			fileobj.seek(0)
+			if index is not None:
+				self._index, self._size = index
+				self._offsets = [entry[0] for entry in self._index]
+
+		# position in the uncompressed data
+		self._pos = 0
+
+		# currently decompressed data and its position in the uncompressed data
+		self._buffer = b""
+		self._buffer_start = 0
+
+		# state for sequential decompression
+		self._decompressor = None
+		self._eof = False
+
+	@property
+	def size(self):
+		"""The size of the uncompressed data, ``None`` if it can't be determined without decompressing everything."""
+		return self._size
+
+	def read(self, n=-1):
+		if n is None or n < 0:
+			chunks = []
+			while True:
+				chunk = self.read(READ_SIZE)
+				if not chunk:
+					break
+				chunks.append(chunk)
+			return b"".join(chunks)
+
+		if n == 0 or not self._fill():
+			return b""
+
+		offset = self._pos - self._buffer_start
+		data = self._buffer[offset:offset + n]
+		self._pos += len(data)
+		return data
+
+	def readinto(self, b):
+		data = self.read(len(b))
+		b[:len(data)] = data
+		return len(data)
+
+	def seek(self, offset, whence=io.SEEK_SET):
+		if whence == io.SEEK_CUR:
+			offset += self._pos
+		elif whence == io.SEEK_END:
+			if self._size is None:
+				raise IOError("Can't seek relative to the end of a compressed file without index")
+			offset += self._size
+
+		if offset < 0:
+			raise ValueError("Negative seek position {}".format(offset))
+
+		if self._index is None and offset < self._buffer_start:
+			# sequential decompression can only go forward, start over
+			if not self._fileobj_seekable:
+				raise IOError("Can't seek backwards in a compressed stream")
+			self._fileobj.seek(0)
+			self._decompressor = None
+			self._eof = False
+			self._buffer = b""
+			self._buffer_start = 0
+
+		self._pos = offset
+		return self._pos
+
+	def tell(self):
+		return self._pos
+
+	def close(self):
+		if self.closed:
+			return
+
+		self._buffer = b""
+		if self._close_fileobj:
+			self._fileobj.close()
+		io.RawIOBase.close(self)
+
+	def readable(self, *args, **kwargs):
+		return True
+
+	def seekable(self, *args, **kwargs):
+		return self._index is not None or self._fileobj_seekable
+
+	def writable(self, *args, **kwargs):
+		return False
+
+	##~~ helpers
+
+	def _fill(self):
+		"""Makes sure the buffer contains the current position, returns False if it is beyond the end of the data."""
+		if self._buffer_start <= self._pos < self._buffer_start + len(self._buffer):
+			return True
+
+		if self._index is not None:
+			if self._pos >= self._size:
+				return False
+
+			block = bisect.bisect_right(self._offsets, self._pos) - 1
+			self._buffer_start, self._buffer = self._read_block(block)
+			return True
+
+		while self._pos >= self._buffer_start + len(self._buffer):
+			if self._eof:
+				return False
+			self._buffer_start += len(self._buffer)
+			self._buffer = self._decompress_next()
+		return True
+
+	def _read_block(self, block):
+		start, offset, size = self._index[block]
+
+		self._fileobj.seek(offset)
+		member = self._fileobj.read(size)
+
+		data = zlib.decompress(member[_HEADER_LENGTH:-_TRAILER_LENGTH], -zlib.MAX_WBITS)
+
+		crc, length = struct.unpack(_TRAILER_FORMAT, member[-_TRAILER_LENGTH:])
+		if crc != zlib.crc32(data) & 0xffffffff or length != len(data) & 0xffffffff:
+			raise IOError("Corrupt compressed block at offset {}".format(offset))
+
+		return start, data
+
+	def _decompress_next(self):
+		while True:
+			data = self._fileobj.read(READ_SIZE)
+			if not data:
+				self._eof = True
+				if self._decompressor is not None:
+					return self._decompressor.flush()
+				return b""
+
+			if self._decompressor is None:
+				self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+			result = self._decompressor.decompress(data)
+			while self._decompressor.unused_data:
+				# a gzip member ended, the next one starts right after it
+				unused = self._decompressor.unused_data
+				self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+				result += self._decompressor.decompress(unused)
+
+			if result:
+				return result
+
+
+def _read_fully(stream, size):
+	chunks = []
+	remaining = size
+	while remaining > 0:
+		chunk = stream.read(remaining)
+		if not chunk:
+			break
+		chunks.append(chunk)
+		remaining -= len(chunk)
+	return b"".join(chunks)
+
+
+def _compress_block(data, level):
+	compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+	deflated = compressor.compress(data) + compressor.flush()
+
+	member_size = _HEADER_LENGTH + len(deflated) + _TRAILER_LENGTH
+	header = struct.pack(_HEADER_FORMAT, GZIP_MAGIC, 8, _FLAG_EXTRA, 0, 0, 255, 4 + _EXTRA_LENGTH, _EXTRA_ID, _EXTRA_LENGTH) \
+	         + struct.pack(_EXTRA_FORMAT, member_size, len(data))
+	trailer = struct.pack(_TRAILER_FORMAT, zlib.crc32(data) & 0xffffffff, len(data) & 0xffffffff)
+
+	return header, deflated, trailer
+
+
+def _read_index(fileobj):
+	"""
+	Builds the block index of a file written by :func:`compress` by hopping from member header to member header.
+
+	Returns a tuple of a list of ``(uncompressed offset, compressed offset, member size)`` entries and the uncompressed
+	size, or ``None`` if the file wasn't written by :func:`compress`.
+	"""
+	fileobj.seek(0, io.SEEK_END)
+	total = fileobj.tell()
+
+	index = []
+	compressed_offset = uncompressed_offset = 0
+	while compressed_offset < total:
+		fileobj.seek(compressed_offset)
+		header = fileobj.read(_HEADER_LENGTH)
+		if len(header) < _HEADER_LENGTH:
+			return None
+
+		magic, method, flags, _, _, _, extra_length, extra_id, extra_field_length = struct.unpack(_HEADER_FORMAT, header[:-_EXTRA_LENGTH])
+		if magic != GZIP_MAGIC or method != 8 or flags != _FLAG_EXTRA or extra_length != 4 + _EXTRA_LENGTH \
+				or extra_id != _EXTRA_ID or extra_field_length != _EXTRA_LENGTH:
+			return None
+
+		member_size, size = struct.unpack(_EXTRA_FORMAT, header[-_EXTRA_LENGTH:])
+		if member_size < _HEADER_LENGTH + _TRAILER_LENGTH or compressed_offset + member_size > total:
+			return None
+
+		index.append((uncompressed_offset, compressed_offset, member_size))
+		compressed_offset += member_size
+		uncompressed_offset += size
+
+	if not index:
+		return None
+	return index, uncompressed_offset
+
+
+def _is_seekable(fileobj):
+	try:
+		return fileobj.seekable()
+	except AttributeError:
+		return hasattr(fileobj, "seek") and hasattr(fileobj, "tell")
+	except:
+		return False
@@ -12,6 +12,8 @@ import zlib
 import logging
 import codecs
 
+import octoprint.util.compression
+
 
 class Vector3D(object):
 	"""
@@ -198,9 +200,9 @@ class gcode(object):
 	def load(self, filename, throttle=None, speedx=6000, speedy=6000, offsets=None, max_extruders=10, g90_extruder=False):
 		if os.path.isfile(filename):
 			self.filename = filename
-			self._fileSize = os.stat(filename).st_size
+			self._fileSize = octoprint.util.compression.uncompressed_size(filename)
 
-			with codecs.open(filename, encoding="utf-8", errors="replace") as f:
+			with octoprint.util.compression.open_text(filename, encoding="utf-8", errors="replace") as f:
 				self._load(f, throttle=throttle, speedx=speedx, speedy=speedy, offsets=offsets, max_extruders=max_extruders, g90_extruder=g90_extruder)
 
 	def abort(self, reenqueue=True):
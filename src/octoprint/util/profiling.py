@@ -0,0 +1,331 @@
+# coding=utf-8
+"""
+This module contains the instrumentation used to figure out where the time goes while OctoPrint starts up.
+
+.. autoclass:: StartupProfiler
+   :members:
+
+.. autofunction:: startup_profiler
+
+.. autoclass:: HookProfiler
+   :members:
+
+.. autofunction:: hook_profiler
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+
+import contextlib
+import logging
+import threading
+import time
+
+from collections import OrderedDict
+
+from octoprint.util import monotonic_time
+
+
+class StartupProfiler(object):
+	"""
+	Records how long the individual phases of the server startup and the individual startup steps of every plugin
+	(import, load, initialize, ``on_startup``, ``on_after_startup``) take.
+
+	Once startup is finished (see :meth:`finish`) a summary gets logged and the full report is written as JSON
+	to :attr:`report_path` if set.
+
+	If ``cprofile_path`` is provided, a ``cProfile`` profiler is enabled for the thread that created the
+	:class:`StartupProfiler` and its stats are dumped to that path by :meth:`stop_cprofile`.
+
+	Arguments:
+	    cprofile_path (str): Path to which to dump ``cProfile`` stats for the startup, optional.
+	"""
+
+	top = 10
+	"""Number of most expensive plugins to include in the logged summary."""
+
+	def __init__(self, cprofile_path=None):
+		self.report_path = None
+
+		self._logger = logging.getLogger(__name__)
+		self._lock = threading.RLock()
+
+		self._started = time.time()
+		self._finished = None
+
+		self._phases = []
+		self._plugins = OrderedDict()
+
+		self._cprofile = None
+		self._cprofile_path = cprofile_path
+		if cprofile_path:
+			import cProfile
+			self._cprofile = cProfile.Profile()
+			self._cprofile.enable()
+
+	@property
+	def finished(self):
+		return self._finished is not None
+
+	@contextlib.contextmanager
+	def phase(self, name):
+		"""Context manager timing the startup phase ``name``."""
+		start = time.time()
+		try:
+			yield
+		finally:
+			self.record_phase(name, start, time.time() - start)
+
+	@contextlib.contextmanager
+	def plugin_step(self, key, step):
+		"""Context manager timing the startup step ``step`` of plugin ``key``."""
+		start = time.time()
+		try:
+			yield
+		finally:
+			self.record_plugin(key, step, time.time() - start)
+
+	def plugin_callbacks(self, step):
+		"""
+		Creates ``callback`` and ``error_callback`` arguments for :func:`~octoprint.plugin.call_plugin` which record
+		the time spent in each called plugin as ``step``.
+
+		Since :func:`~octoprint.plugin.call_plugin` calls plugins one after the other, the duration of each call is
+		the time passed since the previous callback (or since creation of the callbacks for the first one).
+		"""
+		last = [time.time()]
+
+		def callback(name, *args):
+			now = time.time()
+			self.record_plugin(name, step, now - last[0])
+			last[0] = now
+
+		return dict(callback=callback, error_callback=callback)
+
+	def record_phase(self, name, start, duration):
+		with self._lock:
+			self._phases.append(dict(name=name,
+			                         start=start - self._started,
+			                         duration=duration))
+			finished = self.finished
+
+		if finished:
+			# phase completed after startup (e.g. preemptive cache warmup), update the report
+			self._logger.info("Startup phase {} took {:.2f}s".format(name, duration))
+			self._save()
+
+	def record_plugin(self, key, step, duration):
+		with self._lock:
+			if not key in self._plugins:
+				self._plugins[key] = OrderedDict()
+			self._plugins[key][step] = self._plugins[key].get(step, 0.0) + duration
+
+	def finish(self):
+		"""Marks the startup as finished, logs a summary and persists the report."""
+		with self._lock:
+			if self.finished:
+				return
+			self._finished = time.time()
+
+		self.log_summary()
+		self._save()
+
+	def stop_cprofile(self):
+		"""Stops the ``cProfile`` profiler, if enabled, and dumps its stats. Must be called from the creating thread."""
+		with self._lock:
+			profile = self._cprofile
+			self._cprofile = None
+
+		if profile is None:
+			return
+
+		profile.disable()
+		try:
+			profile.dump_stats(self._cprofile_path)
+			self._logger.info("Dumped cProfile stats of the startup to {}".format(self._cprofile_path))
+		except:
+			self._logger.exception("Error while dumping cProfile stats of the startup to {}".format(self._cprofile_path))
+
+	def as_dict(self):
+		with self._lock:
+			now = self._finished if self._finished is not None else time.time()
+
+			plugins = []
+			for key, steps in self._plugins.items():
+				plugins.append(dict(key=key,
+				                    steps=dict(steps),
+				                    total=sum(steps.values())))
+			plugins.sort(key=lambda x: x["total"], reverse=True)
+
+			return dict(started=self._started,
+			            finished=self._finished,
+			            total=now - self._started,
+			            phases=[dict(phase) for phase in self._phases],
+			            plugins=plugins)
+
+	def log_summary(self):
+		from octoprint.logging import get_divider_line
+
+		report = self.as_dict()
+
+		lines = [get_divider_line("-", "Startup timings")]
+		lines.append("Startup took {:.2f}s".format(report["total"]))
+		for phase in report["phases"]:
+			lines.append("| {name}: {duration:.2f}s".format(**phase))
+
+		if report["plugins"]:
+			lines.append("Most expensive plugins:")
+			for plugin in report["plugins"][:self.top]:
+				steps = ", ".join("{}: {:.2f}s".format(step, duration) for step, duration in sorted(plugin["steps"].items()))
+				lines.append("| {}: {:.2f}s ({})".format(plugin["key"], plugin["total"], steps))
+		lines.append(get_divider_line("-"))
+
+		self._logger.info("\n".join(lines))
+
+	def _save(self):
+		if not self.report_path:
+			return
+
+		import json
+		from octoprint.util import atomic_write
+
+		try:
+			with atomic_write(self.report_path, mode="wb") as f:
+				json.dump(self.as_dict(), f, indent=2, sort_keys=True)
+		except:
+			self._logger.exception("Error while writing startup report to {}".format(self.report_path))
+
+
+_startup_profiler = None
+_startup_profiler_lock = threading.Lock()
+
+
+def startup_profiler(cprofile_path=None):
+	"""
+	Returns the :class:`StartupProfiler` singleton, creating it on first call. The startup timings are relative to
+	that first call, so it should happen as early as possible.
+
+	Arguments:
+	    cprofile_path (str): Path to which to dump ``cProfile`` stats, only evaluated on the first call.
+	"""
+	global _startup_profiler
+
+	with _startup_profiler_lock:
+		if _startup_profiler is None:
+			_startup_profiler = StartupProfiler(cprofile_path=cprofile_path)
+		return _startup_profiler
+
+
+class HookProfiler(object):
+	"""
+	Always on accounting of the time plugins spend in hook handlers and mixin methods called from OctoPrint's hot
+	code paths, like the processing of sent and received lines, push messages and events.
+
+	For every combination of hook (or mixin method) and plugin the number of calls and the total and maximum time
+	spent are tracked. If ``slow_threshold`` is set, calls taking longer than that are counted separately and
+	logged as warnings, at most once per :attr:`warning_interval` for every combination.
+
+	Arguments:
+	    enabled (bool): Whether to record anything at all.
+	    slow_threshold (float): Duration in seconds above which a call is considered slow, optional.
+	"""
+
+	warning_interval = 60.0
+	"""Minimum interval in seconds between two slow call warnings for the same hook and plugin."""
+
+	def __init__(self, enabled=True, slow_threshold=None):
+		self.enabled = enabled
+		self.slow_threshold = slow_threshold
+
+		self._logger = logging.getLogger(__name__ + ".hooks")
+		self._lock = threading.Lock()
+		self._entries = dict()
+		self._since = time.time()
+
+	def call(self, hook, plugin, callback, *args, **kwargs):
+		"""Calls ``callback`` with the provided arguments and records the time it took as ``hook`` of ``plugin``."""
+		if not self.enabled:
+			return callback(*args, **kwargs)
+
+		start = monotonic_time()
+		try:
+			return callback(*args, **kwargs)
+		finally:
+			self.record(hook, plugin, monotonic_time() - start)
+
+	def record(self, hook, plugin, duration):
+		if not self.enabled:
+			return
+
+		slow = self.slow_threshold is not None and 0 < self.slow_threshold < duration
+		warn = False
+
+		with self._lock:
+			key = (hook, plugin)
+			entry = self._entries.get(key)
+			if entry is None:
+				entry = self._entries[key] = dict(count=0,
+				                                  slow=0,
+				                                  durationTotal=0.0,
+				                                  durationMax=0.0,
+				                                  lastWarning=None)
+
+			entry["count"] += 1
+			entry["durationTotal"] += duration
+			if duration > entry["durationMax"]:
+				entry["durationMax"] = duration
+
+			if slow:
+				entry["slow"] += 1
+				now = monotonic_time()
+				if entry["lastWarning"] is None or now - entry["lastWarning"] >= self.warning_interval:
+					entry["lastWarning"] = now
+					warn = True
+
+		if warn:
+			self._logger.warn("Plugin {} took {:.0f}ms in {}, that is above the threshold of {:.0f}ms and might "
+			                  "slow down OctoPrint".format(plugin, duration * 1000, hook, self.slow_threshold * 1000))
+
+	def reset(self):
+		with self._lock:
+			self._entries.clear()
+			self._since = time.time()
+
+	def as_dict(self):
+		with self._lock:
+			plugins = dict()
+			for (hook, plugin), entry in self._entries.items():
+				if not plugin in plugins:
+					plugins[plugin] = dict(key=plugin,
+					                       count=0,
+					                       durationTotal=0.0,
+					                       hooks=dict())
+				plugins[plugin]["count"] += entry["count"]
+				plugins[plugin]["durationTotal"] += entry["durationTotal"]
+				plugins[plugin]["hooks"][hook] = dict(count=entry["count"],
+				                                      slow=entry["slow"],
+				                                      durationTotal=entry["durationTotal"],
+				                                      durationMax=entry["durationMax"])
+			since = self._since
+
+		return dict(since=since,
+		            slowThreshold=self.slow_threshold,
+		            plugins=sorted(plugins.values(), key=lambda x: x["durationTotal"], reverse=True))
+
+
+_hook_profiler = None
+_hook_profiler_lock = threading.Lock()
+
+
+def hook_profiler():
+	"""Returns the :class:`HookProfiler` singleton, creating it on first call."""
+	global _hook_profiler
+
+	if _hook_profiler is None:
+		with _hook_profiler_lock:
+			if _hook_profiler is None:
+				_hook_profiler = HookProfiler()
+	return _hook_profiler
@@ -0,0 +1,205 @@
+# coding=utf-8
+"""
+This module contains the upstream cache that allows a farm of OctoPrint instances to share datasets fetched from the
+internet, like the plugin repository, plugin notices, announcement feeds and the responses of version checks.
+
+One instance is configured to *publish*: it fetches the datasets as usual and additionally writes every one of them
+into a mirror folder, which it also serves under ``/upstream_cache/``. The other instances are configured to
+*consume*: they first look for a dataset in the mirror, either via HTTP from the publishing peer or any other web
+server, or directly from a (shared) folder, and only fetch it themselves if it's missing or stale there.
+
+Every dataset is stored as a JSON file named after its key, containing an envelope in the following standard format:
+
+.. code-block:: json
+
+   {
+     "format": 1,
+     "key": "pluginmanager.repository",
+     "url": "https://plugins.octoprint.org/plugins.json",
+     "fetched": 1539900000.0,
+     "content_type": "application/json",
+     "data": "<the unaltered body fetched from url>"
+   }
+
+.. autoclass:: UpstreamCache
+   :members:
+
+.. autofunction:: upstream_cache
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+FORMAT_VERSION = 1
+
+MODE_OFF = "off"
+MODE_PUBLISH = "publish"
+MODE_CONSUME = "consume"
+
+_valid_key = re.compile(r"^[A-Za-z0-9_.\-]+$")
+
+
+class UpstreamCache(object):
+	"""
+	Arguments:
+	    mode (str): One of ``off``, ``publish`` and ``consume``.
+	    url (str): Where consumers read the mirror from, either an ``http(s)://`` or ``file://`` URL or a local path.
+	        Defaults to ``folder``.
+	    folder (str): The mirror folder publishers write to.
+	    max_age (int): Age in seconds after which a dataset in the mirror is considered stale and ignored.
+	    fallback (bool): Whether consumers may fetch datasets directly if they aren't available from the mirror.
+	    timeout (float): Timeout for reading from an HTTP mirror.
+	"""
+
+	def __init__(self, mode=MODE_OFF, url=None, folder=None, max_age=48 * 60 * 60, fallback=True, timeout=10):
+		self.mode = mode
+		self.url = url
+		self.folder = folder
+		self.max_age = max_age
+		self.fallback = fallback
+		self.timeout = timeout
+
+		self._logger = logging.getLogger(__name__)
+
+	@property
+	def publishing(self):
+		return self.mode == MODE_PUBLISH and self.folder is not None
+
+	@property
+	def consuming(self):
+		return self.mode == MODE_CONSUME and bool(self.url or self.folder)
+
+	@property
+	def may_fetch_directly(self):
+		"""Whether the dataset may be fetched from its original source if :meth:`get` didn't return anything."""
+		return not self.consuming or self.fallback
+
+	def get(self, key, url):
+		"""
+		Returns the data of dataset ``key`` fetched from ``url`` from the mirror, if consuming and it's available there
+		and not stale. Returns ``None`` otherwise.
+		"""
+		if not self.consuming:
+			return None
+
+		entry = self.get_entry(key)
+		if entry is None:
+			return None
+
+		if entry.get("url") != url:
+			self._logger.info(u"Upstream cache has {} from {}, but we need it from {}, "
+			                  u"ignoring it".format(key, entry.get("url"), url))
+			return None
+
+		self._logger.info(u"Loaded {} from upstream cache".format(key))
+		return entry["data"]
+
+	def get_entry(self, key):
+		"""Returns the envelope of dataset ``key`` from the mirror, or ``None`` if it's missing, invalid or stale."""
+		try:
+			raw = self._read(self.filename(key))
+		except:
+			self._logger.exception(u"Error while reading {} from upstream cache at {}".format(key, self._source))
+			return None
+
+		if raw is None:
+			return None
+
+		try:
+			entry = json.loads(raw)
+		except ValueError:
+			self._logger.warn(u"Entry for {} in upstream cache at {} is not valid JSON, ignoring it".format(key, self._source))
+			return None
+
+		if not isinstance(entry, dict) \
+				or entry.get("format") != FORMAT_VERSION \
+				or not isinstance(entry.get("fetched"), (int, float)) \
+				or not "data" in entry:
+			self._logger.warn(u"Entry for {} in upstream cache at {} has an unknown format, ignoring it".format(key, self._source))
+			return None
+
+		age = time.time() - entry["fetched"]
+		if age > self.max_age:
+			self._logger.info(u"Entry for {} in upstream cache is stale ({:.0f}min old), ignoring it".format(key, age / 60))
+			return None
+
+		return entry
+
+	def publish(self, key, url, data, content_type=None):
+		"""Writes the dataset ``key`` fetched from ``url`` to the mirror folder, if publishing."""
+		if not self.publishing:
+			return
+
+		from octoprint.util import atomic_write
+
+		entry = dict(format=FORMAT_VERSION,
+		             key=key,
+		             url=url,
+		             fetched=time.time(),
+		             content_type=content_type,
+		             data=data)
+
+		try:
+			if not os.path.isdir(self.folder):
+				os.makedirs(self.folder)
+
+			with atomic_write(os.path.join(self.folder, self.filename(key)), mode="wb", max_permissions=0o666) as f:
+				json.dump(entry, f)
+		except:
+			self._logger.exception(u"Error while publishing {} to upstream cache at {}".format(key, self.folder))
+
+	@staticmethod
+	def filename(key):
+		if not _valid_key.match(key):
+			raise ValueError(u"Invalid upstream cache key: {}".format(key))
+		return key + ".json"
+
+	@property
+	def _source(self):
+		return self.url if self.url else self.folder
+
+	def _read(self, filename):
+		source = self._source
+
+		if source.startswith("http://") or source.startswith("https://"):
+			import requests
+			r = requests.get(source.rstrip("/") + "/" + filename, timeout=self.timeout)
+			if r.status_code == requests.codes.not_found:
+				return None
+			r.raise_for_status()
+			return r.content
+
+		if source.startswith("file://"):
+			source = source[len("file://"):]
+
+		path = os.path.join(source, filename)
+		if not os.path.isfile(path):
+			return None
+
+		with io.open(path, "rb") as f:
+			return f.read()
+
+
+_upstream_cache = None
+_upstream_cache_lock = threading.Lock()
+
+
+def upstream_cache():
+	"""Returns the :class:`UpstreamCache` singleton, creating it on first call. It's off until configured."""
+	global _upstream_cache
+
+	if _upstream_cache is None:
+		with _upstream_cache_lock:
+			if _upstream_cache is None:
+				_upstream_cache = UpstreamCache()
+	return _upstream_cache
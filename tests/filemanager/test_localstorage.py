@@ -79,6 +79,32 @@ class LocalStorageTest(unittest.TestCase):
 
 		self._add_and_verify_file("bp_case.stl", "bp_case.stl", FILE_BP_CASE_STL, overwrite=True)
 
+	def test_add_file_compressed(self):
+		import octoprint.util.compression
+
+		self.storage = LocalFileStorage(self.basefolder, compression_level=6)
+		gcode_name = self._add_and_verify_file("bp_case.gcode", "bp_case.gcode", FILE_BP_CASE_GCODE)
+
+		path = self.storage.path_on_disk(gcode_name)
+		self.assertTrue(octoprint.util.compression.is_compressed(path))
+		self.assertLess(os.stat(path).st_size, os.stat(FILE_BP_CASE_GCODE.path).st_size)
+
+		with octoprint.util.compression.open_file(path) as stored:
+			with open(FILE_BP_CASE_GCODE.path, "rb") as original:
+				self.assertEqual(original.read(), stored.read())
+
+		# listed with the size of the contents, not the size on disk
+		size = os.stat(FILE_BP_CASE_GCODE.path).st_size
+		self.assertEqual(size, self.storage.list_files()[gcode_name]["size"])
+		entries, _ = self.storage.query_files()
+		self.assertEqual([size], [entry["size"] for entry in entries])
+
+		# stored uncompressed again
+		self.storage = LocalFileStorage(self.basefolder)
+		self._add_and_verify_file("bp_case.gcode", "bp_case.gcode", FILE_BP_CASE_GCODE, overwrite=True)
+		self.assertNotIn("size", self.storage.get_metadata(gcode_name))
+		self.assertEqual(size, self.storage.list_files()[gcode_name]["size"])
+
 	def test_add_file_with_display(self):
 		stl_name = self._add_and_verify_file("bp_case.stl", "bp_case.stl", FILE_BP_CASE_STL, display=u"bp_cäse.stl")
 		stl_metadata = self.storage.get_metadata(stl_name)
@@ -458,6 +484,114 @@ class LocalStorageTest(unittest.TestCase):
 		self.assertEqual("folder", file_list["empty"]["type"])
 		self.assertEqual(0, len(file_list["empty"]["children"]))
 
+	def test_query(self):
+		self._add_and_verify_file("bp_case.stl", "bp_case.stl", FILE_BP_CASE_STL)
+		self._add_and_verify_file("bp_case.gcode", "bp_case.gcode", FILE_BP_CASE_GCODE)
+
+		content_folder = self._add_and_verify_folder("content", "content")
+		self._add_and_verify_file((content_folder, "crazyradio.stl"), content_folder + "/crazyradio.stl", FILE_CRAZYRADIO_STL)
+
+		entries, total = self.storage.query_files(recursive=True, sort="path")
+		self.assertEqual(4, total)
+		self.assertEqual(["bp_case.gcode", "bp_case.stl", "content", "content/crazyradio.stl"],
+		                 [entry["path"] for entry in entries])
+		self.assertFalse("children" in entries[2])
+		self.assertEqual(FILE_BP_CASE_GCODE.hash, entries[0]["hash"])
+
+		entries, total = self.storage.query_files(recursive=True, sort="path", offset=1, limit=2)
+		self.assertEqual(4, total)
+		self.assertEqual(["bp_case.stl", "content"], [entry["path"] for entry in entries])
+
+		entries, total = self.storage.query_files(recursive=True, sort="path", reverse=True, limit=2)
+		self.assertEqual(["content/crazyradio.stl", "content"], [entry["path"] for entry in entries])
+
+		entries, _ = self.storage.query_files(recursive=True, sort="path", after=("bp_case.stl", "bp_case.stl"))
+		self.assertEqual(["content", "content/crazyradio.stl"], [entry["path"] for entry in entries])
+
+	def test_query_prefix_and_search(self):
+		self._add_and_verify_file("bp_case.stl", "bp_case.stl", FILE_BP_CASE_STL)
+
+		content_folder = self._add_and_verify_folder("content", "content")
+		self._add_and_verify_file((content_folder, "crazyradio.stl"), content_folder + "/crazyradio.stl", FILE_CRAZYRADIO_STL)
+
+		entries, total = self.storage.query_files(recursive=True, prefix="content/")
+		self.assertEqual(1, total)
+		self.assertEqual("content/crazyradio.stl", entries[0]["path"])
+
+		entries, total = self.storage.query_files(recursive=True, search="RADIO")
+		self.assertEqual(1, total)
+		self.assertEqual("crazyradio.stl", entries[0]["name"])
+
+		entries, total = self.storage.query_files(recursive=False)
+		self.assertEqual(["bp_case.stl", "content"], [entry["path"] for entry in entries])
+
+	def test_history_aggregates(self):
+		gcode_name = self._add_and_verify_file("bp_case.gcode", "bp_case.gcode", FILE_BP_CASE_GCODE)
+
+		self.storage.add_history(gcode_name, dict(timestamp=1, success=True, printTime=10, printerProfile="_default"))
+		self.storage.add_history(gcode_name, dict(timestamp=2, success=False, printerProfile="_default"))
+		self.storage.add_history(gcode_name, dict(timestamp=3, success=True, printTime=20, printerProfile="_default"))
+
+		metadata = self.storage.get_metadata(gcode_name)
+		self.assertDictEqual(dict(success=2, failure=1, last=dict(success=True, date=3, printTime=20)), metadata["prints"])
+		self.assertDictEqual(dict(averagePrintTime=dict(_default=15.0), lastPrintTime=dict(_default=20)), metadata["statistics"])
+
+		# removing the last print needs to restore the one before it
+		self.storage.remove_history(gcode_name, 2)
+
+		metadata = self.storage.get_metadata(gcode_name)
+		self.assertDictEqual(dict(success=1, failure=1, last=dict(success=False, date=2)), metadata["prints"])
+		self.assertDictEqual(dict(averagePrintTime=dict(_default=10.0), lastPrintTime=dict(_default=10)), metadata["statistics"])
+
+		self.storage.update_history(gcode_name, 1, dict(success=True, printTime=30))
+
+		metadata = self.storage.get_metadata(gcode_name)
+		self.assertDictEqual(dict(success=2, failure=0, last=dict(success=True, date=2, printTime=30)), metadata["prints"])
+		self.assertDictEqual(dict(averagePrintTime=dict(_default=20.0), lastPrintTime=dict(_default=30)), metadata["statistics"])
+
+	def test_history_aggregates_returned(self):
+		gcode_name = self._add_and_verify_file("bp_case.gcode", "bp_case.gcode", FILE_BP_CASE_GCODE)
+		self.storage.add_history(gcode_name, dict(timestamp=1, success=True, printTime=10, printerProfile="_default"))
+
+		# aggregation working data stays internal
+		metadata = self.storage.get_metadata(gcode_name)
+		self.assertNotIn("printTimeTotals", metadata)
+		self.assertEqual(1, len(metadata["history"]))
+
+		# listings only carry the aggregates
+		entries, _ = self.storage.query_files()
+		for entry in (self.storage.list_files()[gcode_name], entries[0]):
+			self.assertNotIn("printTimeTotals", entry)
+			self.assertNotIn("history", entry)
+			self.assertEqual(1, entry["prints"]["success"])
+			self.assertEqual(10.0, entry["statistics"]["averagePrintTime"]["_default"])
+
+		# ... which are still maintained
+		self.storage.add_history(gcode_name, dict(timestamp=2, success=True, printTime=20, printerProfile="_default"))
+		self.assertEqual(15.0, self.storage.get_metadata(gcode_name)["statistics"]["averagePrintTime"]["_default"])
+
+	def test_history_limit(self):
+		self.storage = LocalFileStorage(self.basefolder, history_limit=2)
+		gcode_name = self._add_and_verify_file("bp_case.gcode", "bp_case.gcode", FILE_BP_CASE_GCODE)
+
+		for timestamp in range(5):
+			self.storage.add_history(gcode_name, dict(timestamp=timestamp, success=True, printTime=10, printerProfile="_default"))
+
+		metadata = self.storage.get_metadata(gcode_name)
+		self.assertEqual([3, 4], [entry["timestamp"] for entry in metadata["history"]])
+		self.assertEqual(5, metadata["prints"]["success"])
+		self.assertEqual(10.0, metadata["statistics"]["averagePrintTime"]["_default"])
+
+	def test_history_limit_keeps_order(self):
+		self.storage = LocalFileStorage(self.basefolder, history_limit=3)
+		gcode_name = self._add_and_verify_file("bp_case.gcode", "bp_case.gcode", FILE_BP_CASE_GCODE)
+
+		for timestamp in (5, 1, 7, 3):
+			self.storage.add_history(gcode_name, dict(timestamp=timestamp, success=True, printTime=10, printerProfile="_default"))
+
+		metadata = self.storage.get_metadata(gcode_name)
+		self.assertEqual([5, 7, 3], [entry["timestamp"] for entry in metadata["history"]])
+
 	def test_add_link_model(self):
 		stl_name = self._add_and_verify_file("bp_case.stl", "bp_case.stl", FILE_BP_CASE_STL)
 		gcode_name = self._add_and_verify_file("bp_case.gcode", "bp_case.gcode", FILE_BP_CASE_GCODE)
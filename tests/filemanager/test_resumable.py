@@ -0,0 +1,214 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from ddt import ddt, unpack, data
+
+from octoprint.filemanager.resumable import ResumableUploadManager, ResumableUploadError, _merge_ranges
+
+DATA = os.urandom(300 * 1024 + 17)
+DATA_HASH = hashlib.sha256(DATA).hexdigest()
+
+
+@ddt
+class ResumableUploadManagerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basefolder = os.path.realpath(os.path.abspath(tempfile.mkdtemp()))
+		self.folder = os.path.join(self.basefolder, ".resumable")
+		self.manager = ResumableUploadManager(self.folder)
+
+	def tearDown(self):
+		shutil.rmtree(self.basefolder)
+
+	def _write(self, upload_id, start, end, manager=None):
+		if manager is None:
+			manager = self.manager
+		return manager.write(upload_id, start, io.BytesIO(DATA[start:end]), end - start)
+
+	def _read(self, path):
+		with io.open(path, "rb") as f:
+			return f.read()
+
+	def test_create(self):
+		state = self.manager.create("local", "test.gcode", len(DATA), path="folder", sha256=DATA_HASH.upper(), user="user")
+
+		self.assertEqual("local", state["target"])
+		self.assertEqual("test.gcode", state["filename"])
+		self.assertEqual("folder", state["path"])
+		self.assertEqual(len(DATA), state["size"])
+		self.assertEqual(DATA_HASH, state["sha256"])
+		self.assertEqual([], state["received"])
+		self.assertEqual(0, state["bytes"])
+		self.assertFalse(state["complete"])
+
+		self.assertTrue(os.path.isfile(os.path.join(self.folder, state["id"] + ".part")))
+		self.assertTrue(os.path.isfile(os.path.join(self.folder, state["id"] + ".json")))
+
+	@data(
+		(64 * 1024, False),
+		(100 * 1024 + 3, False),
+		(64 * 1024, True),
+		(100 * 1024 + 3, True),
+	)
+	@unpack
+	def test_upload(self, chunk_size, reverse):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA), sha256=DATA_HASH)["id"]
+
+		offsets = list(range(0, len(DATA), chunk_size))
+		if reverse:
+			offsets.reverse()
+
+		for offset in offsets:
+			state = self._write(upload_id, offset, min(offset + chunk_size, len(DATA)))
+
+		self.assertTrue(state["complete"])
+		self.assertEqual([[0, len(DATA)]], state["received"])
+		self.assertEqual(len(DATA), state["bytes"])
+
+		path = self.manager.finalize(upload_id)
+		self.assertEqual(DATA, self._read(path))
+
+	def test_received_ranges(self):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA))["id"]
+
+		self._write(upload_id, 0, 1000)
+		state = self._write(upload_id, 2000, 3000)
+		self.assertEqual([[0, 1000], [2000, 3000]], state["received"])
+		self.assertEqual(2000, state["bytes"])
+
+		state = self._write(upload_id, 500, 2500)
+		self.assertEqual([[0, 3000]], state["received"])
+		self.assertEqual(state, self.manager.get(upload_id))
+
+	def test_write_outside_of_size(self):
+		upload_id = self.manager.create("local", "test.gcode", 100)["id"]
+
+		try:
+			self.manager.write(upload_id, 50, io.BytesIO(b"x" * 51), 51)
+			self.fail("Expected an exception")
+		except ResumableUploadError as e:
+			self.assertEqual(ResumableUploadError.INVALID_RANGE, e.code)
+
+	def test_write_short_chunk(self):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA))["id"]
+
+		try:
+			self.manager.write(upload_id, 0, io.BytesIO(DATA[:100]), 200)
+			self.fail("Expected an exception")
+		except ResumableUploadError as e:
+			self.assertEqual(ResumableUploadError.INCOMPLETE, e.code)
+
+		# what was received is kept
+		self.assertEqual([[0, 100]], self.manager.get(upload_id)["received"])
+
+	def test_open_chunk(self):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA), sha256=DATA_HASH)["id"]
+
+		writer = self.manager.open_chunk(upload_id, 0, len(DATA))
+		for start in range(0, len(DATA), 10000):
+			writer.write(DATA[start:start + 10000])
+		self.assertEqual(0, writer.remaining)
+
+		state = writer.close()
+		self.assertTrue(state["complete"])
+		self.assertEqual(DATA, self._read(self.manager.finalize(upload_id)))
+
+	def test_open_chunk_short(self):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA))["id"]
+
+		writer = self.manager.open_chunk(upload_id, 100, 200)
+		writer.write(DATA[100:150])
+
+		try:
+			writer.close()
+			self.fail("Expected an exception")
+		except ResumableUploadError as e:
+			self.assertEqual(ResumableUploadError.INCOMPLETE, e.code)
+
+		# what was received is kept
+		self.assertEqual([[100, 150]], self.manager.get(upload_id)["received"])
+
+	def test_open_chunk_overlong(self):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA))["id"]
+
+		writer = self.manager.open_chunk(upload_id, 0, 100)
+		try:
+			writer.write(DATA[:101])
+			self.fail("Expected an exception")
+		except ResumableUploadError as e:
+			self.assertEqual(ResumableUploadError.INVALID_RANGE, e.code)
+
+	def test_finalize_incomplete(self):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA))["id"]
+		self._write(upload_id, 0, 1000)
+
+		try:
+			self.manager.finalize(upload_id)
+			self.fail("Expected an exception")
+		except ResumableUploadError as e:
+			self.assertEqual(ResumableUploadError.INCOMPLETE, e.code)
+
+	def test_finalize_hash_mismatch(self):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA), sha256="0" * 64)["id"]
+		self._write(upload_id, 0, len(DATA))
+
+		try:
+			self.manager.finalize(upload_id)
+			self.fail("Expected an exception")
+		except ResumableUploadError as e:
+			self.assertEqual(ResumableUploadError.HASH_MISMATCH, e.code)
+
+	def test_resume_after_restart(self):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA), sha256=DATA_HASH)["id"]
+		self._write(upload_id, 0, 1000)
+
+		manager = ResumableUploadManager(self.folder)
+		self.assertEqual([[0, 1000]], manager.get(upload_id)["received"])
+
+		self._write(upload_id, 1000, len(DATA), manager=manager)
+		path = manager.finalize(upload_id)
+		self.assertEqual(DATA, self._read(path))
+
+	def test_remove(self):
+		upload_id = self.manager.create("local", "test.gcode", len(DATA))["id"]
+		self.manager.remove(upload_id)
+
+		self.assertEqual([], os.listdir(self.folder))
+		try:
+			self.manager.get(upload_id)
+			self.fail("Expected an exception")
+		except ResumableUploadError as e:
+			self.assertEqual(ResumableUploadError.DOES_NOT_EXIST, e.code)
+
+	def test_cleanup(self):
+		manager = ResumableUploadManager(self.folder, max_age=10)
+		stale = manager.create("local", "stale.gcode", len(DATA))["id"]
+		fresh = manager.create("local", "fresh.gcode", len(DATA))["id"]
+		manager._sessions[stale]["updated"] = time.time() - 20
+
+		manager.cleanup()
+
+		self.assertEqual([fresh + ".json", fresh + ".part"], sorted(os.listdir(self.folder)))
+
+	@data(
+		([], 0, 10, [[0, 10]]),
+		([[0, 10], [20, 30]], 10, 20, [[0, 30]]),
+		([[0, 10], [20, 30]], 12, 15, [[0, 10], [12, 15], [20, 30]]),
+		([[5, 10]], 0, 7, [[0, 10]]),
+		([[0, 10]], 2, 5, [[0, 10]]),
+		([[10, 20]], 0, 5, [[0, 5], [10, 20]]),
+	)
+	@unpack
+	def test_merge_ranges(self, ranges, start, end, expected):
+		self.assertEqual(expected, _merge_ranges(ranges, start, end))
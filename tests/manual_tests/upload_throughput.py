@@ -0,0 +1,62 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+"""
+Benchmark for the multipart parser of UploadStorageFallbackHandler. Run with OctoPrint's source on the path:
+
+  python tests/manual_tests/upload_throughput.py [size in MB] [chunk size in KB]
+
+Feeds a generated upload of the given size (default 100MB) to the handler in chunks of the given size
+(default 64KB), as tornado would while receiving it, and reports the throughput.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import mock
+
+from octoprint.server.util.tornado import UploadStorageFallbackHandler
+
+BOUNDARY = b"----WebKitFormBoundarypYiSUx63abAmhT5C"
+
+
+def benchmark(size, chunk_size):
+	path = tempfile.mkdtemp()
+	try:
+		handler = UploadStorageFallbackHandler.__new__(UploadStorageFallbackHandler)
+		handler.initialize(mock.MagicMock(), path=path)
+		handler._content_type = "multipart/form-data; boundary=" + BOUNDARY
+		handler._multipart_boundary = BOUNDARY
+
+		head = b"--" + BOUNDARY + b"\r\n" \
+		       b"Content-Disposition: form-data; name=\"file\"; filename=\"test.gcode\"\r\n" \
+		       b"Content-Type: application/octet-stream\r\n" \
+		       b"\r\n"
+		tail = b"\r\n--" + BOUNDARY + b"--\r\n"
+		chunk = os.urandom(chunk_size)
+
+		start = time.time()
+		handler.data_received(head)
+		for _ in range(size // chunk_size):
+			handler.data_received(chunk)
+		handler.data_received(tail)
+		handler._finish_multipart()
+		duration = time.time() - start
+
+		assert os.stat(handler._parts["file"]["path"]).st_size == size // chunk_size * chunk_size
+		return duration
+	finally:
+		shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+	size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else 100 * 1024 * 1024
+	chunk_size = int(sys.argv[2]) * 1024 if len(sys.argv) > 2 else 64 * 1024
+
+	duration = benchmark(size, chunk_size)
+	print("Upload throughput: {:.1f} MB/s ({}MB in {:.2f}s)".format(size / duration / 1024 / 1024,
+	                                                               size // 1024 // 1024,
+	                                                               duration))
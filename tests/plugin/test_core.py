@@ -70,6 +70,22 @@ class PluginTestCase(unittest.TestCase):
 		self.plugin_manager.reload_plugins(startup=True, initialize_implementations=False)
 		self.plugin_manager.initialize_implementations()
 
+	def test_plugin_timing(self):
+		plugin_manager = octoprint.plugin.core.PluginManager([self.plugin_folder],
+		                                                     [octoprint.plugin.OctoPrintPlugin],
+		                                                     None,
+		                                                     plugin_disabled_list=[],
+		                                                     logging_prefix="logging_prefix.")
+		plugin_manager.on_plugin_timing = mock.MagicMock()
+		plugin_manager.reload_plugins(startup=True, initialize_implementations=False)
+		plugin_manager.initialize_implementations()
+
+		steps = [(call[0][0], call[0][1]) for call in plugin_manager.on_plugin_timing.call_args_list]
+		self.assertIn(("mixed_plugin", "import"), steps)
+		self.assertIn(("mixed_plugin", "load"), steps)
+		self.assertIn(("mixed_plugin", "initialize"), steps)
+		self.assertNotIn(("hook_plugin", "initialize"), steps)
+
 	def test_plugin_loading(self):
 		self.assertEqual(7, len(self.plugin_manager.enabled_plugins))
 		self.assertEqual(2, len(self.plugin_manager.plugin_hooks))
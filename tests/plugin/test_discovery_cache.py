@@ -0,0 +1,173 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import mock
+import os
+import shutil
+import tempfile
+
+import octoprint.plugin
+import octoprint.plugin.core
+from octoprint.plugin.core import PluginDiscoveryCache, PluginInfo
+
+
+class PluginDiscoveryCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.cache_path = os.path.join(self.folder, "plugin_discovery.json")
+		self.plugin_folder = os.path.join(os.path.dirname(os.path.realpath(__file__)), "_plugins")
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def _create_plugin_manager(self, plugin_folders=None, plugin_entry_points=None):
+		if plugin_folders is None:
+			plugin_folders = [self.plugin_folder]
+		return octoprint.plugin.core.PluginManager(plugin_folders,
+		                                           [octoprint.plugin.OctoPrintPlugin],
+		                                           plugin_entry_points,
+		                                           plugin_disabled_list=[],
+		                                           logging_prefix="logging_prefix.",
+		                                           plugin_discovery_cache=self.cache_path)
+
+	def _mock_working_set(self, working_set_class):
+		dist = mock.MagicMock()
+		dist.version = "1.0.0"
+		dist.project_name = "OctoPrint-Dummy"
+		dist.get_metadata.return_value = "Metadata-Version: 1.1\nName: OctoPrint-Dummy\nVersion: 1.0.0\nSummary: A dummy\n"
+
+		entry_point = mock.MagicMock()
+		entry_point.name = "dummy"
+		entry_point.module_name = "octoprint_dummy"
+		entry_point.dist = dist
+
+		working_set = working_set_class.return_value
+		working_set.entries = []
+		working_set.iter_entry_points.return_value = [entry_point]
+
+	def test_parsed_metadata_cached(self):
+		plugin_manager = self._create_plugin_manager()
+		plugin_manager.find_plugins()
+		self.assertTrue(os.path.isfile(self.cache_path))
+
+		with mock.patch.object(PluginInfo, "_parse_metadata") as parse_metadata:
+			plugin_manager = self._create_plugin_manager()
+			added = plugin_manager.find_plugins()
+
+			self.assertFalse(parse_metadata.called)
+			self.assertEqual("Mixed Plugin", added["mixed_plugin"].parsed_metadata.get(PluginInfo.attr_name))
+
+	def test_parsed_metadata_changed_source(self):
+		plugin_folder = os.path.join(self.folder, "plugins")
+		os.mkdir(plugin_folder)
+		plugin_file = os.path.join(plugin_folder, "some_plugin.py")
+		with open(plugin_file, "w") as f:
+			f.write("__plugin_name__ = 'Before'\n")
+
+		plugin_manager = self._create_plugin_manager(plugin_folders=[plugin_folder])
+		added = plugin_manager.find_plugins()
+		self.assertEqual("Before", added["some_plugin"].parsed_metadata.get(PluginInfo.attr_name))
+
+		with open(plugin_file, "w") as f:
+			f.write("__plugin_name__ = 'After the change'\n")
+
+		plugin_manager = self._create_plugin_manager(plugin_folders=[plugin_folder])
+		added = plugin_manager.find_plugins()
+		self.assertEqual("After the change", added["some_plugin"].parsed_metadata.get(PluginInfo.attr_name))
+
+	@mock.patch("pkg_resources.WorkingSet")
+	@mock.patch.object(PluginDiscoveryCache, "fingerprint", return_value="fingerprint")
+	def test_entry_points_cached(self, fingerprint, working_set_class):
+		self._mock_working_set(working_set_class)
+
+		plugin_manager = self._create_plugin_manager(plugin_entry_points=["octoprint.plugin"])
+		plugin_manager.find_plugins()
+		self.assertEqual(1, working_set_class.call_count)
+
+		# new manager, same environment -> served from the cache
+		plugin_manager = self._create_plugin_manager(plugin_entry_points=["octoprint.plugin"])
+		entries = plugin_manager._get_entry_points(["octoprint.plugin"])
+		self.assertEqual(1, working_set_class.call_count)
+		self.assertEqual(1, len(entries))
+		self.assertEqual("dummy", entries[0]["name"])
+		self.assertEqual("octoprint_dummy", entries[0]["module_name"])
+		self.assertEqual("OctoPrint-Dummy", entries[0]["package_name"])
+		self.assertEqual("A dummy", entries[0]["metadata"]["summary"])
+
+		# environment changed -> rebuilt
+		fingerprint.return_value = "changed"
+		plugin_manager._get_entry_points(["octoprint.plugin"])
+		self.assertEqual(2, working_set_class.call_count)
+
+	@mock.patch("pkg_resources.WorkingSet")
+	@mock.patch.object(PluginDiscoveryCache, "fingerprint", return_value="fingerprint")
+	def test_invalidate(self, fingerprint, working_set_class):
+		self._mock_working_set(working_set_class)
+
+		plugin_manager = self._create_plugin_manager(plugin_entry_points=["octoprint.plugin"])
+		plugin_manager.find_plugins()
+		self.assertTrue(os.path.isfile(self.cache_path))
+
+		plugin_manager.invalidate_discovery_cache()
+		self.assertFalse(os.path.isfile(self.cache_path))
+
+		plugin_manager._get_entry_points(["octoprint.plugin"])
+		self.assertEqual(2, working_set_class.call_count)
+
+	def test_parsed_metadata_with_sets(self):
+		plugin_file = os.path.join(self.folder, "some_plugin.py")
+		with open(plugin_file, "w") as f:
+			f.write("__plugin_name__ = 'Some Plugin'\n")
+
+		cache = PluginDiscoveryCache(self.cache_path)
+		cache.set_parsed_metadata(plugin_file, {PluginInfo.attr_provides: {"hooks": {"octoprint.test.b", "octoprint.test.a"},
+		                                                                   "mixins": ("StartupPlugin",)}})
+		cache.save()
+		self.assertTrue(os.path.isfile(self.cache_path))
+
+		cache = PluginDiscoveryCache(self.cache_path)
+		self.assertEqual({PluginInfo.attr_provides: dict(hooks=["octoprint.test.a", "octoprint.test.b"],
+		                                                 mixins=["StartupPlugin"])},
+		                 cache.get_parsed_metadata(plugin_file))
+
+	def test_parsed_metadata_not_serializable(self):
+		plugin_file = os.path.join(self.folder, "some_plugin.py")
+		with open(plugin_file, "w") as f:
+			f.write("__plugin_name__ = 'Some Plugin'\n")
+
+		cache = PluginDiscoveryCache(self.cache_path)
+		cache.set_parsed_metadata(plugin_file, {PluginInfo.attr_name: "Some Plugin",
+		                                        PluginInfo.attr_provides: {"hooks": [1j]}})
+		cache.save()
+
+		cache = PluginDiscoveryCache(self.cache_path)
+		self.assertEqual({PluginInfo.attr_name: "Some Plugin"}, cache.get_parsed_metadata(plugin_file))
+
+	def test_fingerprint(self):
+		site_packages = os.path.join(self.folder, "site-packages")
+		os.mkdir(site_packages)
+		os.mkdir(os.path.join(site_packages, "some_module"))
+
+		before = PluginDiscoveryCache.fingerprint([site_packages])
+		self.assertEqual(before, PluginDiscoveryCache.fingerprint([site_packages]))
+
+		os.mkdir(os.path.join(site_packages, "OctoPrint_Dummy-1.0.0.dist-info"))
+		self.assertNotEqual(before, PluginDiscoveryCache.fingerprint([site_packages]))
+
+	def test_corrupt_cache(self):
+		with open(self.cache_path, "w") as f:
+			f.write("{ not json")
+
+		cache = PluginDiscoveryCache(self.cache_path)
+		self.assertIsNone(cache.get_entry_points(["octoprint.plugin"], "fingerprint"))
+
+		cache.set_entry_points(["octoprint.plugin"], "fingerprint", [])
+		cache.save()
+
+		cache = PluginDiscoveryCache(self.cache_path)
+		self.assertEqual([], cache.get_entry_points(["octoprint.plugin"], "fingerprint"))
@@ -0,0 +1,112 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+import octoprint.plugin
+import octoprint.plugin.core
+
+LAZY_HOOK_PLUGIN = """
+__plugin_name__ = "Lazy Hook Plugin"
+__plugin_provides__ = {"hooks": ["octoprint.test.lazy"]}
+
+def double(value):
+	return value * 2
+
+__plugin_hooks__ = {"octoprint.test.lazy": double}
+"""
+
+LAZY_MIXIN_PLUGIN = """
+import octoprint.plugin
+
+class LazyStartupPlugin(octoprint.plugin.StartupPlugin):
+	def initialize(self):
+		self.initialized = True
+
+__plugin_name__ = "Lazy Mixin Plugin"
+__plugin_provides__ = {"mixins": ["StartupPlugin"]}
+__plugin_implementation__ = LazyStartupPlugin()
+"""
+
+INVALID_PROVIDES_PLUGIN = """
+__plugin_name__ = "Invalid Provides Plugin"
+__plugin_provides__ = {"hooks": "octoprint.test.invalid"}
+"""
+
+
+class LazyPluginTest(unittest.TestCase):
+
+	plugins = dict(lazy_hook_plugin=LAZY_HOOK_PLUGIN,
+	               lazy_mixin_plugin=LAZY_MIXIN_PLUGIN,
+	               invalid_provides_plugin=INVALID_PROVIDES_PLUGIN)
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		for key, source in self.plugins.items():
+			with open(os.path.join(self.folder, key + ".py"), "w") as f:
+				f.write(source)
+
+		self.plugin_manager = octoprint.plugin.core.PluginManager([self.folder],
+		                                                          [octoprint.plugin.OctoPrintPlugin],
+		                                                          None,
+		                                                          plugin_disabled_list=[],
+		                                                          logging_prefix="logging_prefix.")
+		self.plugin_manager.reload_plugins(startup=True, initialize_implementations=False)
+		self.plugin_manager.initialize_implementations()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+		for key in self.plugins:
+			sys.modules.pop(key, None)
+
+	def test_not_imported_on_startup(self):
+		self.assertEqual(3, len(self.plugin_manager.enabled_plugins))
+
+		for key in ("lazy_hook_plugin", "lazy_mixin_plugin"):
+			self.assertNotIn(key, sys.modules)
+			self.assertTrue(self.plugin_manager.enabled_plugins[key].lazy)
+
+		self.assertEqual("Lazy Hook Plugin", self.plugin_manager.enabled_plugins["lazy_hook_plugin"].name)
+
+	def test_invalid_provides_imported_right_away(self):
+		self.assertIn("invalid_provides_plugin", sys.modules)
+		self.assertFalse(self.plugin_manager.enabled_plugins["invalid_provides_plugin"].lazy)
+
+	def test_hook_imports_on_call(self):
+		hooks = self.plugin_manager.get_hooks("octoprint.test.lazy")
+		self.assertEqual(["lazy_hook_plugin"], list(hooks.keys()))
+		self.assertNotIn("lazy_hook_plugin", sys.modules)
+
+		self.assertEqual(4, hooks["lazy_hook_plugin"](2))
+		self.assertIn("lazy_hook_plugin", sys.modules)
+
+		plugin = self.plugin_manager.enabled_plugins["lazy_hook_plugin"]
+		self.assertFalse(plugin.lazy)
+
+		# the placeholder got replaced by the actual handler
+		hooks = self.plugin_manager.get_hooks("octoprint.test.lazy")
+		self.assertEqual(plugin.instance.double, hooks["lazy_hook_plugin"])
+
+	def test_mixin_imports_on_request(self):
+		self.assertEqual([], self.plugin_manager.get_implementations(octoprint.plugin.SettingsPlugin))
+		self.assertNotIn("lazy_mixin_plugin", sys.modules)
+
+		implementations = self.plugin_manager.get_implementations(octoprint.plugin.StartupPlugin)
+		self.assertEqual(1, len(implementations))
+		self.assertIn("lazy_mixin_plugin", sys.modules)
+
+		implementation = implementations[0]
+		self.assertEqual("lazy_mixin_plugin", implementation._identifier)
+		self.assertTrue(implementation.initialized)
+
+	def test_get_plugin_imports(self):
+		module = self.plugin_manager.get_plugin("lazy_hook_plugin")
+		self.assertIsNotNone(module)
+		self.assertEqual(6, module.double(3))
@@ -0,0 +1,346 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+import mock
+
+from octoprint.plugins.backup import BackupPlugin, IOThrottle, ProgressReporter
+
+
+class FakeSettings(object):
+	def __init__(self, basedir):
+		self._basedir = basedir
+		self._configfile = os.path.join(basedir, "config.yaml")
+
+	def global_get_basefolder(self, folder):
+		return os.path.join(self._basedir, folder)
+
+	def global_get(self, path):
+		return None
+
+
+class BackupTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.basedir = os.path.join(self.folder, "basedir")
+		self.datafolder = os.path.join(self.basedir, "data", "backup")
+		os.makedirs(self.datafolder)
+
+		self._write("config.yaml", b"accessControl:\n  enabled: false\n")
+		self._write("uploads/model.gcode", b"G28\nG1 X10 Y10\n" * 100)
+		self._write("timelapse/print.mp4", b"\x00\x00\x00\x18ftypmp42" * 100)
+		self._write("some_file.txt", b"Some file")
+
+		self.settings = FakeSettings(self.basedir)
+		self.plugin_manager = mock.MagicMock()
+		self.plugin_manager.plugins = dict()
+
+		free_space = mock.patch.object(BackupPlugin, "_free_space", return_value=True)
+		free_space.start()
+		self.addCleanup(free_space.stop)
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def _write(self, path, content):
+		path = os.path.join(self.basedir, path)
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with io.open(path, "wb") as f:
+			f.write(content)
+
+	def _create_backup(self, name, incremental=False, **kwargs):
+		BackupPlugin._create_backup(name,
+		                            incremental=incremental,
+		                            settings=self.settings,
+		                            plugin_manager=self.plugin_manager,
+		                            datafolder=self.datafolder,
+		                            **kwargs)
+		return os.path.join(self.datafolder, name)
+
+	def _restore_backup(self, name, **kwargs):
+		# restores work on a copy of the backup, just like the API and the CLI do
+		path = os.path.join(self.folder, "restore.zip")
+		shutil.copy(os.path.join(self.datafolder, name), path)
+
+		with mock.patch.object(BackupPlugin, "_get_plugin_repository_data", return_value=dict()):
+			return BackupPlugin._restore_backup(path,
+			                                    settings=self.settings,
+			                                    plugin_manager=self.plugin_manager,
+			                                    datafolder=self.datafolder,
+			                                    **kwargs)
+
+	def test_full_backup(self):
+		path = self._create_backup("full.zip")
+
+		with zipfile.ZipFile(path) as zip:
+			metadata = json.loads(zip.read("metadata.json"))
+			manifest = json.loads(zip.read("manifest.json"))
+
+			self.assertIsNone(zip.testzip())
+			self.assertFalse(metadata["incremental"])
+			self.assertEqual([], metadata["references"])
+
+			self.assertEqual(set(["basedir/config.yaml",
+			                      "basedir/uploads/model.gcode",
+			                      "basedir/timelapse/print.mp4",
+			                      "basedir/some_file.txt"]),
+			                 set(manifest.keys()))
+			for arcname, entry in manifest.items():
+				self.assertNotIn("backup", entry)
+				self.assertEqual(entry["size"], zip.getinfo(arcname).file_size)
+
+			self.assertEqual(zipfile.ZIP_DEFLATED, zip.getinfo("basedir/uploads/model.gcode").compress_type)
+			self.assertEqual(zipfile.ZIP_STORED, zip.getinfo("basedir/timelapse/print.mp4").compress_type)
+
+	def test_full_backup_without_analysis(self):
+		import gzip
+		with gzip.open(os.path.join(self.basedir, "uploads", "compressed.gcode"), "wb") as f:
+			f.write(b"G28\n" * 100)
+
+		with mock.patch.object(BackupPlugin, "_hash_files") as hash_files:
+			path = self._create_backup("full.zip")
+			self.assertFalse(hash_files.called)
+
+		with zipfile.ZipFile(path) as zip:
+			self.assertIsNone(zip.testzip())
+
+			# gzip compressed data gets detected while writing and isn't deflated again
+			self.assertEqual(zipfile.ZIP_STORED, zip.getinfo("basedir/uploads/compressed.gcode").compress_type)
+
+	def test_incremental_backup(self):
+		self._create_backup("full.zip")
+
+		self._write("some_file.txt", b"Some changed file")
+		self._write("uploads/copy.gcode", b"G28\nG1 X10 Y10\n" * 100)
+
+		path = self._create_backup("incremental.zip", incremental=True)
+
+		with zipfile.ZipFile(path) as zip:
+			metadata = json.loads(zip.read("metadata.json"))
+			manifest = json.loads(zip.read("manifest.json"))
+
+			self.assertTrue(metadata["incremental"])
+			self.assertEqual("full.zip", metadata["base"])
+			self.assertEqual(["full.zip"], metadata["references"])
+
+			# only the changed file got stored
+			stored = set(name for name in zip.namelist() if name.startswith("basedir/"))
+			self.assertEqual(set(["basedir/some_file.txt"]), stored)
+
+			self.assertEqual("full.zip", manifest["basedir/timelapse/print.mp4"]["backup"])
+			self.assertEqual(dict(backup="full.zip", arcname="basedir/uploads/model.gcode"),
+			                 dict((key, manifest["basedir/uploads/copy.gcode"][key]) for key in ("backup", "arcname")))
+
+		# incremental backups based on incremental backups reference where the data actually is
+		path = self._create_backup("second.zip", incremental=True)
+		with zipfile.ZipFile(path) as zip:
+			metadata = json.loads(zip.read("metadata.json"))
+			self.assertEqual("incremental.zip", metadata["base"])
+			self.assertEqual(["full.zip", "incremental.zip"], metadata["references"])
+
+		self.assertEqual(["incremental.zip", "second.zip"],
+		                 sorted(BackupPlugin._get_dependent_backups(self.datafolder, "full.zip")))
+		self.assertEqual([], BackupPlugin._get_dependent_backups(self.datafolder, "second.zip"))
+
+	def test_restore_incremental_backup(self):
+		self._create_backup("full.zip")
+		self._write("some_file.txt", b"Some changed file")
+		self._write("uploads/copy.gcode", b"G28\nG1 X10 Y10\n" * 100)
+		self._create_backup("incremental.zip", incremental=True)
+
+		# the backups are part of the basedir that gets moved away, keep them around for the restore
+		datafolder = os.path.join(self.folder, "backups")
+		shutil.copytree(self.datafolder, datafolder)
+		self.datafolder = datafolder
+
+		self._write("some_file.txt", b"Changed after the backup")
+		os.remove(os.path.join(self.basedir, "timelapse", "print.mp4"))
+
+		self.assertTrue(self._restore_backup("incremental.zip", workers=3))
+
+		def read(path):
+			with io.open(os.path.join(self.basedir, path), "rb") as f:
+				return f.read()
+
+		self.assertEqual(b"Some changed file", read("some_file.txt"))
+		self.assertEqual(b"\x00\x00\x00\x18ftypmp42" * 100, read("timelapse/print.mp4"))
+		self.assertEqual(read("uploads/model.gcode"), read("uploads/copy.gcode"))
+
+	def test_restore_missing_reference(self):
+		self._create_backup("full.zip")
+		self._create_backup("incremental.zip", incremental=True)
+		os.remove(os.path.join(self.datafolder, "full.zip"))
+
+		on_invalid_backup = mock.MagicMock()
+		self.assertFalse(self._restore_backup("incremental.zip", on_invalid_backup=on_invalid_backup))
+		self.assertTrue(on_invalid_backup.called)
+		self.assertTrue(os.path.exists(os.path.join(self.basedir, "some_file.txt")))
+
+	def test_parallel_backup(self):
+		# large enough to get buffered on disk
+		self._write("uploads/large.gcode", b"".join(b"G1 X%d\n" % i for i in range(300000)))
+
+		path = self._create_backup("parallel.zip", workers=3)
+
+		with zipfile.ZipFile(path) as zip:
+			self.assertIsNone(zip.testzip())
+			manifest = json.loads(zip.read("manifest.json"))
+			infos = dict((info.filename, (info.compress_type, info.CRC, info.compress_size))
+			             for info in zip.infolist())
+
+		self._create_backup("sequential.zip")
+		with zipfile.ZipFile(os.path.join(self.datafolder, "sequential.zip")) as zip:
+			self.assertEqual(manifest, json.loads(zip.read("manifest.json")))
+			for arcname in manifest:
+				info = zip.getinfo(arcname)
+				self.assertEqual(infos[arcname], (info.compress_type, info.CRC, info.compress_size))
+
+		self._write("some_file.txt", b"Some changed file")
+		on_progress = mock.MagicMock()
+		self._create_backup("incremental.zip", incremental=True, workers=3, on_progress=on_progress)
+
+		# final progress of both phases got reported
+		reported = dict((args[0]["phase"], args[0]) for args, _ in on_progress.call_args_list)
+		self.assertEqual(["analyzing", "writing"], sorted(reported.keys()))
+		for progress in reported.values():
+			self.assertEqual(progress["total"], progress["done"])
+
+	def test_restore_checksum_mismatch(self):
+		path = self._create_backup("full.zip")
+
+		# tamper with the manifest
+		corrupt = os.path.join(self.datafolder, "corrupt.zip")
+		with zipfile.ZipFile(path) as source:
+			with zipfile.ZipFile(corrupt, "w") as target:
+				for info in source.infolist():
+					data = source.read(info)
+					if info.filename == "manifest.json":
+						manifest = json.loads(data)
+						manifest["basedir/some_file.txt"]["sha1"] = "0" * 40
+						data = json.dumps(manifest)
+					target.writestr(info, data)
+
+		on_invalid_backup = mock.MagicMock()
+		self.assertFalse(self._restore_backup("corrupt.zip", on_invalid_backup=on_invalid_backup))
+		self.assertIn("basedir/some_file.txt", on_invalid_backup.call_args[0][0])
+		self.assertTrue(os.path.exists(os.path.join(self.basedir, "some_file.txt")))
+
+	def test_files_changed_during_backup(self):
+		self._write("uploads/copy.gcode", b"G28\nG1 X10 Y10\n" * 100)
+
+		hash_files = BackupPlugin._hash_files
+		def change_after_analysis(*args, **kwargs):
+			result = hash_files(*args, **kwargs)
+			self._write("some_file.txt", b"Changed while backing up")
+			self._write("uploads/model.gcode", b"G28\n")
+			self._write("uploads/copy.gcode", b"G28\nG1 X20 Y20\n")
+			return result
+
+		with mock.patch.object(BackupPlugin, "_hash_files", side_effect=change_after_analysis):
+			path = self._create_backup("full.zip", incremental=True)
+
+		with zipfile.ZipFile(path) as zip:
+			manifest = json.loads(zip.read("manifest.json"))
+			for arcname in ("basedir/some_file.txt", "basedir/uploads/model.gcode", "basedir/uploads/copy.gcode"):
+				self.assertNotIn("arcname", manifest[arcname])
+				self.assertEqual(manifest[arcname]["size"], zip.getinfo(arcname).file_size)
+
+		# the backups are part of the basedir that gets moved away, keep them around for the restore
+		datafolder = os.path.join(self.folder, "backups")
+		shutil.copytree(self.datafolder, datafolder)
+		self.datafolder = datafolder
+
+		self.assertTrue(self._restore_backup("full.zip"))
+
+		def read(path):
+			with io.open(os.path.join(self.basedir, path), "rb") as f:
+				return f.read()
+
+		self.assertEqual(b"Changed while backing up", read("some_file.txt"))
+		self.assertEqual(b"G28\n", read("uploads/model.gcode"))
+		self.assertEqual(b"G28\nG1 X20 Y20\n", read("uploads/copy.gcode"))
+
+	def test_restore_keeps_backup(self):
+		self._create_backup("full.zip")
+
+		path = os.path.join(self.folder, "kept.zip")
+		shutil.copy(os.path.join(self.datafolder, "full.zip"), path)
+
+		with mock.patch.object(BackupPlugin, "_get_plugin_repository_data", return_value=dict()):
+			self.assertTrue(BackupPlugin._restore_backup(path,
+			                                             settings=self.settings,
+			                                             plugin_manager=self.plugin_manager,
+			                                             datafolder=self.datafolder,
+			                                             remove=False))
+		self.assertTrue(os.path.exists(path))
+
+
+class IOThrottleTest(unittest.TestCase):
+
+	@mock.patch("time.sleep")
+	@mock.patch("octoprint.plugins.backup.monotonic_time", return_value=10.0)
+	def test_limit(self, monotonic_time, sleep):
+		throttle = IOThrottle(limit=1000)
+
+		throttle.consume(500)
+		sleep.assert_called_once_with(0.5)
+		sleep.reset_mock()
+
+		# time passed, within the limit
+		monotonic_time.return_value = 12.0
+		throttle.consume(1000)
+		self.assertFalse(sleep.called)
+
+	@mock.patch("time.sleep")
+	def test_no_limit(self, sleep):
+		throttle = IOThrottle()
+		throttle.consume(1024 * 1024 * 1024)
+		self.assertFalse(sleep.called)
+
+	@mock.patch("time.sleep")
+	def test_pause(self, sleep):
+		pause = mock.MagicMock(side_effect=[True, True, False])
+		on_pause = mock.MagicMock()
+
+		throttle = IOThrottle(pause=pause, on_pause=on_pause)
+		throttle.consume(100)
+
+		self.assertEqual(3, pause.call_count)
+		self.assertEqual(2, sleep.call_count)
+		self.assertEqual([mock.call(True), mock.call(False)], on_pause.call_args_list)
+
+
+class ProgressReporterTest(unittest.TestCase):
+
+	@mock.patch("octoprint.plugins.backup.monotonic_time")
+	def test_progress(self, monotonic_time):
+		callback = mock.MagicMock()
+
+		monotonic_time.return_value = 0.0
+		progress = ProgressReporter(callback, "writing", 1000, interval=1.0)
+
+		monotonic_time.return_value = 0.5
+		progress.update(100)
+		self.assertFalse(callback.called)
+
+		monotonic_time.return_value = 2.0
+		progress.update(300)
+		callback.assert_called_once_with(dict(phase="writing", done=400, total=1000, throughput=200.0))
+
+		monotonic_time.return_value = 2.5
+		progress.update(600)
+		progress.finish()
+		self.assertEqual(2, callback.call_count)
+		self.assertEqual(1000, callback.call_args[0][0]["done"])
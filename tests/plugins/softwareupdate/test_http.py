@@ -0,0 +1,176 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import mock
+import requests
+
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+from octoprint.plugins.softwareupdate.version_checks.http import ConditionalHttpClient
+from octoprint.util.upstream_cache import UpstreamCache
+
+
+RELEASES = json.dumps([dict(name="1.0.0", tag_name="1.0.0")])
+ETAG = '"releases-1"'
+
+UPSTREAM_CACHE = "octoprint.plugins.softwareupdate.version_checks.http.upstream_cache"
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+
+	def do_GET(self):
+		self.server.requests.append((self.path, dict(self.headers)))
+
+		if self.path == "/etag":
+			if self.headers.get("If-None-Match") == ETAG:
+				self.send_response(304)
+				self.end_headers()
+				return
+			self._send(RELEASES, ETag=ETAG)
+
+		elif self.path == "/modified":
+			if self.headers.get("If-Modified-Since") == "Mon, 01 Oct 2018 00:00:00 GMT":
+				self.send_response(304)
+				self.end_headers()
+				return
+			self._send(RELEASES, **{"Last-Modified": "Mon, 01 Oct 2018 00:00:00 GMT"})
+
+		elif self.path == "/uncacheable":
+			self._send(RELEASES)
+
+		else:
+			self.send_response(404)
+			self.end_headers()
+
+	def _send(self, body, **headers):
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		for key, value in headers.items():
+			self.send_header(key, value)
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args, **kwargs):
+		pass
+
+
+class ConditionalHttpClientTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.cache_path = os.path.join(self.folder, "httpcache.json")
+
+		self.server = HTTPServer(("127.0.0.1", 0), FakeApiHandler)
+		self.server.requests = []
+		self.thread = threading.Thread(target=self.server.serve_forever)
+		self.thread.daemon = True
+		self.thread.start()
+
+		self.base_url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+		shutil.rmtree(self.folder)
+
+	def test_etag(self):
+		client = ConditionalHttpClient(cache_path=self.cache_path)
+
+		r = client.get(self.base_url + "/etag")
+		self.assertEqual(200, r.status_code)
+		self.assertFalse(r.from_cache)
+		self.assertEqual("1.0.0", r.json()[0]["tag_name"])
+
+		r = client.get(self.base_url + "/etag")
+		self.assertEqual(200, r.status_code)
+		self.assertTrue(r.from_cache)
+		self.assertEqual("1.0.0", r.json()[0]["tag_name"])
+		self.assertEqual(ETAG, self.server.requests[-1][1].get("if-none-match"))
+
+	def test_last_modified(self):
+		client = ConditionalHttpClient()
+
+		client.get(self.base_url + "/modified")
+		r = client.get(self.base_url + "/modified")
+		self.assertTrue(r.from_cache)
+		self.assertEqual("1.0.0", r.json()[0]["tag_name"])
+
+	def test_uncacheable(self):
+		client = ConditionalHttpClient()
+
+		client.get(self.base_url + "/uncacheable")
+		r = client.get(self.base_url + "/uncacheable")
+		self.assertFalse(r.from_cache)
+		self.assertNotIn("if-none-match", self.server.requests[-1][1])
+
+	def test_errors_not_cached(self):
+		client = ConditionalHttpClient()
+
+		client.get(self.base_url + "/missing")
+		r = client.get(self.base_url + "/missing")
+		self.assertEqual(404, r.status_code)
+		self.assertFalse(r.from_cache)
+
+	def test_persistence(self):
+		client = ConditionalHttpClient(cache_path=self.cache_path)
+		client.get(self.base_url + "/etag")
+		client.save()
+		self.assertTrue(os.path.isfile(self.cache_path))
+
+		# new client, e.g. after a restart, still only needs a conditional request
+		client = ConditionalHttpClient(cache_path=self.cache_path)
+		r = client.get(self.base_url + "/etag")
+		self.assertTrue(r.from_cache)
+
+	def test_expiry(self):
+		client = ConditionalHttpClient(cache_path=self.cache_path, max_age=-1)
+		client.get(self.base_url + "/etag")
+		client.save()
+
+		client = ConditionalHttpClient(cache_path=self.cache_path)
+		r = client.get(self.base_url + "/etag")
+		self.assertFalse(r.from_cache)
+
+	def test_credentials_separated(self):
+		client = ConditionalHttpClient()
+
+		client.get(self.base_url + "/etag", headers=dict(authorization="Basic Zm9vOmJhcg=="))
+		r = client.get(self.base_url + "/etag")
+		self.assertFalse(r.from_cache)
+
+	def test_upstream_cache(self):
+		mirror = os.path.join(self.folder, "mirror")
+		url = self.base_url + "/uncacheable"
+
+		with mock.patch(UPSTREAM_CACHE, return_value=UpstreamCache(mode="publish", folder=mirror)):
+			ConditionalHttpClient().get(url)
+			ConditionalHttpClient().get(self.base_url + "/etag", headers=dict(authorization="Basic Zm9vOmJhcg=="))
+		self.assertEqual(2, len(self.server.requests))
+
+		# credentials are never shared
+		self.assertEqual(1, len(os.listdir(mirror)))
+
+		with mock.patch(UPSTREAM_CACHE, return_value=UpstreamCache(mode="consume", url=mirror)):
+			r = ConditionalHttpClient().get(url)
+		self.assertEqual(200, r.status_code)
+		self.assertTrue(r.from_cache)
+		self.assertEqual(json.loads(RELEASES), r.json())
+		self.assertEqual(2, len(self.server.requests))
+
+	def test_upstream_cache_no_fallback(self):
+		mirror = os.path.join(self.folder, "mirror")
+
+		with mock.patch(UPSTREAM_CACHE, return_value=UpstreamCache(mode="consume", url=mirror, fallback=False)):
+			self.assertRaises(requests.ConnectionError, ConditionalHttpClient().get, self.base_url + "/uncacheable")
+		self.assertEqual(0, len(self.server.requests))
@@ -0,0 +1,91 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import io
+import os
+import shutil
+import tempfile
+
+import mock
+
+from octoprint.filemanager.destinations import FileDestinations
+from octoprint.filemanager.storage import LocalFileStorage
+from octoprint.server.api.files import _get_query, _getFileList, _queryFileList
+
+FIELDS = "name,path,type"
+
+
+class FileListTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basefolder = tempfile.mkdtemp()
+		self.storage = LocalFileStorage(self.basefolder)
+
+		for path in ("a.gcode", "b.stl", os.path.join("sub", "c.gcode"), os.path.join("sub", "d.stl")):
+			full_path = os.path.join(self.basefolder, path)
+			if not os.path.isdir(os.path.dirname(full_path)):
+				os.makedirs(os.path.dirname(full_path))
+			with io.open(full_path, "wb") as f:
+				f.write(b"G28\n")
+
+		storage = self.storage
+		file_manager = mock.MagicMock()
+		file_manager.query_files.side_effect = lambda origin, **kwargs: storage.query_files(**kwargs)
+		file_manager.list_files.side_effect = lambda origin, **kwargs: {origin: storage.list_files(**kwargs)}
+		file_manager.last_modified.side_effect = lambda origin, **kwargs: storage.last_modified(**kwargs)
+
+		self.file_manager_patcher = mock.patch("octoprint.server.api.files.fileManager", file_manager)
+		self.file_manager_patcher.start()
+
+		# no plugins providing additional file types
+		self.plugin_manager_patcher = mock.patch("octoprint.plugin.plugin_manager")
+		self.plugin_manager_patcher.start().return_value.get_hooks.return_value = dict()
+
+	def tearDown(self):
+		self.plugin_manager_patcher.stop()
+		self.file_manager_patcher.stop()
+		shutil.rmtree(self.basefolder)
+
+	def _query(self, **values):
+		values["fields"] = FIELDS
+		return _queryFileList([FileDestinations.LOCAL], _get_query(values), filter="gcode", recursive=True)
+
+	def test_filtered_query_keeps_folders(self):
+		files, pagination = self._query(sort="path")
+
+		self.assertEqual(["a.gcode", "sub", "sub/c.gcode"], [entry["path"] for entry in files])
+		self.assertEqual(3, pagination["total"])
+
+	def test_filtered_file_list(self):
+		# the full listing applies the filter to folders as well, unlike queries
+		tree = _getFileList(FileDestinations.LOCAL, filter="gcode", recursive=True, allow_from_cache=False,
+		                    fields=set(FIELDS.split(",")))
+		self.assertEqual(["a.gcode"], [entry["path"] for entry in tree])
+
+	def test_filtered_query_paginated(self):
+		files, pagination = self._query(sort="path", limit="2")
+		self.assertEqual(["a.gcode", "sub"], [entry["path"] for entry in files])
+		self.assertEqual(3, pagination["total"])
+		self.assertTrue("next" in pagination)
+
+		files, pagination = self._query(sort="path", limit="2", cursor=pagination["next"])
+		self.assertEqual(["sub/c.gcode"], [entry["path"] for entry in files])
+		self.assertFalse("next" in pagination)
+
+	def test_query_exactly_full_last_page(self):
+		files, pagination = self._query(sort="path", limit="3")
+		self.assertEqual(3, len(files))
+		self.assertFalse("next" in pagination)
+
+		files, pagination = self._query(sort="path", limit="2", offset="1")
+		self.assertEqual(["sub", "sub/c.gcode"], [entry["path"] for entry in files])
+		self.assertFalse("next" in pagination)
+
+		files, pagination = self._query(sort="path", limit="1")
+		files, pagination = self._query(sort="path", limit="2", cursor=pagination["next"])
+		self.assertEqual(["sub", "sub/c.gcode"], [entry["path"] for entry in files])
+		self.assertFalse("next" in pagination)
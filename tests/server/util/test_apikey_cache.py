@@ -0,0 +1,74 @@
+# coding=utf-8
+"""
+Unit tests for the API key user cache in ``octoprint.server.util``.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+
+import unittest
+import mock
+
+import octoprint.server.util
+from octoprint.server.util import get_user_for_apikey, invalidate_user_for_apikey, on_user_manager_change
+
+
+class ApiKeyUserCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		settings_patcher = mock.patch("octoprint.server.util.settings")
+		self.addCleanup(settings_patcher.stop)
+		settings = settings_patcher.start()
+		settings.return_value.getBoolean.return_value = True
+		settings.return_value.get.return_value = "masterkey"
+
+		app_session_manager_patcher = mock.patch("octoprint.server.appSessionManager", create=True)
+		self.addCleanup(app_session_manager_patcher.stop)
+		app_session_manager_patcher.start().validate.return_value = False
+
+		self.user = mock.MagicMock()
+		resolve_patcher = mock.patch("octoprint.server.util._resolve_user_for_apikey", return_value=self.user)
+		self.addCleanup(resolve_patcher.stop)
+		self.resolve = resolve_patcher.start()
+
+		invalidate_user_for_apikey()
+		self.addCleanup(invalidate_user_for_apikey)
+
+	def test_cached(self):
+		self.assertEqual(self.user, get_user_for_apikey("userkey"))
+		self.assertEqual(self.user, get_user_for_apikey("userkey"))
+		self.assertEqual(1, self.resolve.call_count)
+
+	def test_ttl(self):
+		with mock.patch("octoprint.server.util.monotonic_time", return_value=100.0):
+			get_user_for_apikey("userkey")
+		with mock.patch("octoprint.server.util.monotonic_time",
+		                return_value=100.0 + octoprint.server.util.APIKEY_USER_CACHE_TTL):
+			get_user_for_apikey("userkey")
+		self.assertEqual(2, self.resolve.call_count)
+
+	def test_evicted_on_user_manager_change(self):
+		get_user_for_apikey("userkey")
+
+		# e.g. the key got deleted
+		on_user_manager_change("changed", None)
+		self.resolve.return_value = None
+
+		self.assertIsNone(get_user_for_apikey("userkey"))
+		self.assertEqual(2, self.resolve.call_count)
+
+	def test_not_cached_if_changed_while_resolving(self):
+		def resolve_and_revoke(apikey):
+			# the key gets revoked while it is still being resolved
+			on_user_manager_change("changed", None)
+			return self.user
+		self.resolve.side_effect = resolve_and_revoke
+
+		self.assertEqual(self.user, get_user_for_apikey("userkey"))
+
+		self.resolve.side_effect = None
+		self.resolve.return_value = None
+		self.assertIsNone(get_user_for_apikey("userkey"))
@@ -14,7 +14,8 @@ import unittest
 import mock
 from ddt import ddt, data, unpack
 
-from octoprint.server.util.flask import ReverseProxiedEnvironment, OctoPrintFlaskRequest, OctoPrintFlaskResponse
+from octoprint.server.util.flask import ReverseProxiedEnvironment, OctoPrintFlaskRequest, OctoPrintFlaskResponse, \
+	PersistentViewCache, LessSimpleCache, view_etag
 
 standard_environ = {
 	"HTTP_HOST": "localhost:5000",
@@ -610,3 +611,53 @@ class OctoPrintFlaskResponseTest(unittest.TestCase):
 					# implemented to ensure any old cookies from before introduction of the suffixes and path handling
 					# are deleted as well
 					set_cookie_mock.assert_called_once_with(response, "some_key", expires=0, max_age=0, path=expected_path_delete, domain=None)
+
+
+class PersistentViewCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		import tempfile
+		self.folder = tempfile.mkdtemp()
+		self.environment = "env1"
+		self.persistent = PersistentViewCache(self.folder, lambda: self.environment)
+
+	def tearDown(self):
+		import shutil
+		shutil.rmtree(self.folder)
+
+	def test_restore(self):
+		response = OctoPrintFlaskResponse("var UI_API_KEY = \"OLDKEY\";")
+		response.set_etag(view_etag("fingerprint", ui_api_key="OLDKEY"))
+		self.persistent.store("ui:_default:http://localhost/:en", response, "OLDKEY", fingerprint="fingerprint")
+
+		cache = LessSimpleCache()
+		restored = self.persistent.restore(cache, "NEWKEY", lambda fp: view_etag(fp, ui_api_key="NEWKEY"))
+
+		self.assertEqual(1, restored)
+		cached = cache.get("ui:_default:http://localhost/:en")
+		self.assertEqual("var UI_API_KEY = \"NEWKEY\";", cached.data)
+		self.assertEqual(view_etag("fingerprint", ui_api_key="NEWKEY"), cached.get_etag()[0])
+
+	def test_restore_custom_etag(self):
+		response = OctoPrintFlaskResponse("var UI_API_KEY = \"OLDKEY\";")
+		response.set_etag("custom")
+		self.persistent.store("ui:custom:http://localhost/:en", response, "OLDKEY")
+
+		cache = LessSimpleCache()
+		self.persistent.restore(cache, "NEWKEY", lambda fp: view_etag(fp, ui_api_key="NEWKEY"))
+
+		self.assertEqual("custom", cache.get("ui:custom:http://localhost/:en").get_etag()[0])
+
+	def test_restore_changed_environment(self):
+		import os
+
+		response = OctoPrintFlaskResponse("content")
+		self.persistent.store("ui:_default:http://localhost/:en", response, "KEY", fingerprint="fingerprint")
+
+		self.environment = "env2"
+		cache = LessSimpleCache()
+		restored = self.persistent.restore(cache, "KEY", lambda fp: view_etag(fp, ui_api_key="KEY"))
+
+		self.assertEqual(0, restored)
+		self.assertFalse("ui:_default:http://localhost/:en" in cache)
+		self.assertEqual([], os.listdir(self.folder))
@@ -93,3 +93,462 @@ class ExtendedHeaderValueTest(unittest.TestCase):
 		actual = _extended_header_value(value)
 
 		self.assertEqual(expected, actual)
+
+
+##~~ WsgiInputContainer
+
+import threading
+
+import tornado.gen
+import tornado.ioloop
+import tornado.iostream
+import tornado.testing
+import tornado.web
+
+_STREAM_CHUNK = b"x" * 64 * 1024
+_STREAM_CHUNKS = 400
+_stream_state = dict(produced=0)
+_blocking_state = dict(entered=threading.Semaphore(0), release=threading.Event())
+
+def _wsgi_app(environ, start_response):
+	if environ["PATH_INFO"] == "/stream":
+		def generate():
+			for i in range(_STREAM_CHUNKS):
+				_stream_state["produced"] = i + 1
+				yield _STREAM_CHUNK
+
+		start_response(b"200 OK", [(b"Content-Type", b"application/octet-stream")])
+		return generate()
+
+	if environ["PATH_INFO"] == "/blocking":
+		_blocking_state["entered"].release()
+		_blocking_state["release"].wait(10)
+	start_response(b"200 OK", [(b"Content-Type", b"text/plain")])
+	return [b"done"]
+
+
+class WsgiInputContainerWorkerTest(tornado.testing.AsyncHTTPTestCase):
+
+	def setUp(self):
+		import concurrent.futures
+		from octoprint.server.util.tornado import WsgiRequestMetrics
+		from werkzeug.routing import Map, Rule
+
+		self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+		self.metrics = WsgiRequestMetrics(url_map=Map([Rule("/blocking", endpoint="blocking")]))
+		super(WsgiInputContainerWorkerTest, self).setUp()
+
+	def tearDown(self):
+		super(WsgiInputContainerWorkerTest, self).tearDown()
+		self.executor.shutdown()
+
+	def get_app(self):
+		from octoprint.server.util.tornado import UploadStorageFallbackHandler, WsgiInputContainer
+
+		container = WsgiInputContainer(_wsgi_app, executor=self.executor, metrics=self.metrics)
+		return tornado.web.Application([(r".*", UploadStorageFallbackHandler, dict(fallback=container))])
+
+	@tornado.testing.gen_test(timeout=10)
+	def test_ioloop_responsive_with_requests_in_flight(self):
+		"""Blocked requests must not block anything else scheduled on the IOLoop, e.g. push messages."""
+
+		entered = _blocking_state["entered"] = threading.Semaphore(0)
+		release = _blocking_state["release"] = threading.Event()
+
+		futures = [self.http_client.fetch(self.get_url("/blocking")) for _ in range(4)]
+		try:
+			# wait until every worker is blocked inside a request, the IOLoop keeps running these sleeps meanwhile
+			for _ in range(4):
+				while not entered.acquire(False):
+					yield tornado.gen.sleep(0.01)
+
+			called = []
+			self.io_loop.add_callback(lambda: called.append(True))
+			yield tornado.gen.moment
+
+			self.assertEqual([True], called)
+			self.assertFalse(any(future.done() for future in futures))
+		finally:
+			release.set()
+
+		responses = yield futures
+		for response in responses:
+			self.assertEqual(b"done", response.body)
+
+		metrics = self.metrics.as_dict()
+		self.assertEqual(4, metrics["blocking"]["count"])
+		self.assertEqual(0, metrics["blocking"]["queued"])
+		self.assertEqual(0, metrics["blocking"]["active"])
+
+	@tornado.testing.gen_test(timeout=30)
+	def test_streamed_response(self):
+		"""Streamed responses must be forwarded chunk by chunk instead of being buffered in full first."""
+
+		state = dict(received=0, produced_at_first_chunk=None)
+
+		def streaming_callback(chunk):
+			if state["produced_at_first_chunk"] is None:
+				state["produced_at_first_chunk"] = _stream_state["produced"]
+			state["received"] += len(chunk)
+
+		response = yield self.http_client.fetch(self.get_url("/stream"), streaming_callback=streaming_callback)
+
+		self.assertEqual(200, response.code)
+		self.assertNotIn("Content-Length", response.headers)
+		self.assertEqual(len(_STREAM_CHUNK) * _STREAM_CHUNKS, state["received"])
+		self.assertLess(state["produced_at_first_chunk"], _STREAM_CHUNKS)
+
+
+class BufferedResponseWriterTest(unittest.TestCase):
+
+	def setUp(self):
+		import tornado.concurrent
+
+		self.writes = []
+
+		def write(data, chunk, app_response):
+			future = tornado.concurrent.Future()
+			self.writes.append((chunk, future))
+			return future
+
+		# runs callbacks right away instead of on an IOLoop
+		io_loop = mock.MagicMock()
+		io_loop.add_callback.side_effect = lambda callback, *args: callback(*args)
+
+		self.io_loop = io_loop
+		self.write = write
+
+	def _writer(self, **kwargs):
+		from octoprint.server.util.tornado import BufferedResponseWriter
+		return BufferedResponseWriter(self.io_loop, self.write, **kwargs)
+
+	def test_put_doesnt_wait_for_client(self):
+		writer = self._writer(max_buffer=100)
+		for chunk in (b"a" * 10, b"b" * 10, b"c" * 10):
+			writer.put(None, chunk, None)
+		writer.close()
+
+		# one write at a time
+		self.assertEqual([b"a" * 10], [chunk for chunk, _ in self.writes])
+
+		for index in range(3):
+			self.assertFalse(writer.flushed.done())
+			self.writes[index][1].set_result(None)
+
+		self.assertEqual([b"a" * 10, b"b" * 10, b"c" * 10], [chunk for chunk, _ in self.writes])
+		self.assertTrue(writer.flushed.done())
+		self.assertIsNone(writer.flushed.exception())
+
+	def test_put_timeout(self):
+		from octoprint.server.util.tornado import WriteTimeoutError
+
+		writer = self._writer(max_buffer=10, timeout=0.01)
+		writer.put(None, b"a" * 10, None)
+
+		# client doesn't read, buffer stays full
+		self.assertRaises(WriteTimeoutError, writer.put, None, b"b", None)
+		self.assertIsInstance(writer.flushed.exception(), WriteTimeoutError)
+
+	def test_write_error(self):
+		writer = self._writer()
+		writer.put(None, b"a", None)
+		self.writes[0][1].set_exception(tornado.iostream.StreamClosedError())
+
+		self.assertIsInstance(writer.flushed.exception(), tornado.iostream.StreamClosedError)
+		self.assertRaises(tornado.iostream.StreamClosedError, writer.put, None, b"b", None)
+		self.assertEqual(1, len(self.writes))
+
+
+@ddt
+class WsgiRequestMetricsTest(unittest.TestCase):
+
+	@data(
+		("/", "GET", "index"),
+		("/api/files/local", "GET", "api.files"),
+		("/api/files/local/some/file.gco", "GET", "api.file"),
+		("/api/files/local/some/file.gco", "DELETE", "<unmatched>"),
+		("/api/files/local/", "GET", "<unmatched>"),
+		("/plugin/foo/bar", "GET", "<unmatched>"),
+		("/some/random/path/{}".format("x" * 100), "GET", "<unmatched>")
+	)
+	@unpack
+	def test_route_for(self, path, method, expected):
+		from octoprint.server.util.tornado import WsgiRequestMetrics
+		from werkzeug.routing import Map, Rule
+
+		url_map = Map([Rule("/", endpoint="index"),
+		               Rule("/api/files/<string:origin>", endpoint="api.files", methods=["GET"]),
+		               Rule("/api/files/<string:origin>/<path:path>", endpoint="api.file", methods=["GET"])])
+		self.assertEqual(expected, WsgiRequestMetrics(url_map=url_map).route_for(path, method=method))
+
+	def test_route_for_without_url_map(self):
+		from octoprint.server.util.tornado import WsgiRequestMetrics
+		self.assertEqual("<unmatched>", WsgiRequestMetrics().route_for("/api/files"))
+
+
+##~~ UploadStorageFallbackHandler
+
+import os
+import shutil
+import tempfile
+
+_BOUNDARY = b"----WebKitFormBoundarypYiSUx63abAmhT5C"
+
+def _multipart_body(file_data):
+	return b"".join([
+		b"--" + _BOUNDARY + b"\r\n",
+		b"Content-Disposition: form-data; name=\"file\"; filename=\"test.gcode\"\r\n",
+		b"Content-Type: application/octet-stream\r\n",
+		b"\r\n",
+		file_data + b"\r\n",
+		b"--" + _BOUNDARY + b"\r\n",
+		b"Content-Disposition: form-data; name=\"select\"\r\n",
+		b"\r\n",
+		b"true\r\n",
+		b"--" + _BOUNDARY + b"--\r\n"
+	])
+
+
+@ddt
+class UploadStorageFallbackHandlerTest(unittest.TestCase):
+
+	def setUp(self):
+		from octoprint.server.util.tornado import UploadStorageFallbackHandler
+
+		self.path = tempfile.mkdtemp()
+
+		self.handler = UploadStorageFallbackHandler.__new__(UploadStorageFallbackHandler)
+		self.handler.initialize(mock.MagicMock(), path=self.path)
+		self.handler._content_type = "multipart/form-data; boundary=" + _BOUNDARY
+		self.handler._multipart_boundary = _BOUNDARY
+
+	def tearDown(self):
+		shutil.rmtree(self.path)
+
+	def _feed(self, body, chunk_size):
+		for offset in range(0, len(body), chunk_size):
+			self.handler.data_received(body[offset:offset + chunk_size])
+		self.handler._finish_multipart()
+
+	@data(1, 2, 7, 38, 39, 40, 41, 42, 100, 4096, 1024 * 1024)
+	def test_multipart(self, chunk_size):
+		file_data = b"G28\r\n--" + _BOUNDARY[:-1] + b"\r\nG1 X10\r\n" + os.urandom(10000)
+
+		self._feed(_multipart_body(file_data), chunk_size)
+
+		parts = self.handler._parts
+		self.assertEqual(set(["file", "select"]), set(parts.keys()))
+		self.assertEqual(b"true", bytes(parts["select"]["data"]))
+		self.assertEqual(b"test.gcode", parts["file"]["filename"])
+		with open(parts["file"]["path"], "rb") as f:
+			self.assertEqual(file_data, f.read())
+
+		new_body = self.handler._new_body
+		self.assertIn(b"name=\"file.path\"", new_body)
+		self.assertIn(b"name=\"select\"\r\n\r\ntrue\r\n", new_body)
+		self.assertTrue(new_body.endswith(b"--" + _BOUNDARY + b"--\r\n"))
+
+	def test_multipart_bounded_buffer(self):
+		file_data = os.urandom(1024 * 1024)
+		body = _multipart_body(file_data)
+
+		max_buffer = 0
+		for offset in range(0, len(body), 65536):
+			self.handler.data_received(body[offset:offset + 65536])
+			max_buffer = max(max_buffer, len(self.handler._buffer))
+		self.handler._finish_multipart()
+
+		self.assertLess(max_buffer, 1024)
+		with open(self.handler._parts["file"]["path"], "rb") as f:
+			self.assertEqual(file_data, f.read())
+
+
+##~~ ResumableUploadChunkHandler
+
+import json
+
+_CHUNK_DATA = os.urandom(100 * 1024 + 17)
+
+class ResumableUploadChunkHandlerTest(tornado.testing.AsyncHTTPTestCase):
+
+	def setUp(self):
+		from octoprint.filemanager.resumable import ResumableUploadManager
+
+		self.folder = tempfile.mkdtemp()
+		self.manager = ResumableUploadManager(self.folder)
+		self.upload_id = self.manager.create("local", "test.gcode", len(_CHUNK_DATA), user="user")["id"]
+
+		tornado.testing.AsyncHTTPTestCase.setUp(self)
+
+	def tearDown(self):
+		tornado.testing.AsyncHTTPTestCase.tearDown(self)
+		shutil.rmtree(self.folder)
+
+	def get_app(self):
+		from octoprint.server.util.tornado import ResumableUploadChunkHandler
+
+		def access_validation(request, state):
+			if state["user"] != request.headers.get("X-User"):
+				raise tornado.web.HTTPError(404)
+
+		return tornado.web.Application([
+			(r"/uploads/([^/]+)", ResumableUploadChunkHandler, dict(manager=self.manager,
+			                                                        access_validation=access_validation,
+			                                                        formatter=lambda request, state: dict(bytes=state["bytes"]),
+			                                                        fallback=mock.MagicMock()))
+		])
+
+	def _put(self, path, body, **headers):
+		headers["X-User"] = headers.get("X-User", "user")
+		return self.fetch(path, method="PUT", body=body, headers=headers)
+
+	def test_content_range(self):
+		response = self._put("/uploads/" + self.upload_id, _CHUNK_DATA[:50000],
+		                     **{"Content-Range": "bytes 0-49999/{}".format(len(_CHUNK_DATA))})
+		self.assertEqual(200, response.code)
+		self.assertEqual(dict(bytes=50000), json.loads(response.body))
+
+		response = self._put("/uploads/{}?offset=50000".format(self.upload_id), _CHUNK_DATA[50000:])
+		self.assertEqual(200, response.code)
+		self.assertEqual(dict(bytes=len(_CHUNK_DATA)), json.loads(response.body))
+
+		with open(self.manager.finalize(self.upload_id), "rb") as f:
+			self.assertEqual(_CHUNK_DATA, f.read())
+
+	def test_invalid_range(self):
+		response = self._put("/uploads/{}?offset={}".format(self.upload_id, len(_CHUNK_DATA) - 10), b"x" * 20)
+		self.assertEqual(416, response.code)
+		self.assertEqual(0, self.manager.get(self.upload_id)["bytes"])
+
+	def test_missing_offset(self):
+		response = self._put("/uploads/" + self.upload_id, b"x" * 20)
+		self.assertEqual(400, response.code)
+
+	def test_unknown_upload(self):
+		response = self._put("/uploads/unknown?offset=0", b"x" * 20)
+		self.assertEqual(404, response.code)
+
+	def test_access_denied(self):
+		response = self._put("/uploads/{}?offset=0".format(self.upload_id), b"x" * 20, **{"X-User": "other"})
+		self.assertEqual(404, response.code)
+		self.assertEqual(0, self.manager.get(self.upload_id)["bytes"])
+
+
+##~~ LargeResponseHandler
+
+_DOWNLOAD_DATA = b"".join(b"G1 X%d Y%d\n" % (i, i) for i in range(20000))
+
+class LargeResponseHandlerDecompressTest(tornado.testing.AsyncHTTPTestCase):
+
+	def setUp(self):
+		import octoprint.util.compression
+
+		self.folder = tempfile.mkdtemp()
+		with open(os.path.join(self.folder, "test.gcode"), "wb") as f:
+			f.write(_DOWNLOAD_DATA)
+		octoprint.util.compression.compress_file(os.path.join(self.folder, "test.gcode"), block_size=16 * 1024)
+
+		tornado.testing.AsyncHTTPTestCase.setUp(self)
+
+	def tearDown(self):
+		tornado.testing.AsyncHTTPTestCase.tearDown(self)
+		shutil.rmtree(self.folder)
+
+	def get_app(self):
+		from octoprint.server.util.tornado import LargeResponseHandler
+		return tornado.web.Application([
+			(r"/decompressed/(.*)", LargeResponseHandler, dict(path=self.folder, decompress=True)),
+			(r"/raw/(.*)", LargeResponseHandler, dict(path=self.folder))
+		])
+
+	def test_decompressed(self):
+		response = self.fetch("/decompressed/test.gcode")
+		self.assertEqual(200, response.code)
+		self.assertEqual(str(len(_DOWNLOAD_DATA)), response.headers["Content-Length"])
+		self.assertEqual(_DOWNLOAD_DATA, response.body)
+
+	def test_decompressed_range(self):
+		response = self.fetch("/decompressed/test.gcode", headers={"Range": "bytes=50000-59999"})
+		self.assertEqual(206, response.code)
+		self.assertEqual(_DOWNLOAD_DATA[50000:60000], response.body)
+
+	def test_raw(self):
+		response = self.fetch("/raw/test.gcode")
+		self.assertEqual(200, response.code)
+		with open(os.path.join(self.folder, "test.gcode"), "rb") as f:
+			self.assertEqual(f.read(), response.body)
+
+
+_ASSET_DATA = b"".join(b"console.log(%d);\n" % i for i in range(5000))
+
+class LargeResponseHandlerPrecompressedTest(tornado.testing.AsyncHTTPTestCase):
+
+	def setUp(self):
+		from octoprint.server.util.webassets import precompress
+
+		self.folder = tempfile.mkdtemp()
+		self.path = os.path.join(self.folder, "packed_core.0123abcd.js")
+		with open(self.path, "wb") as f:
+			f.write(_ASSET_DATA)
+		precompress(self.path, ["gzip"])
+
+		tornado.testing.AsyncHTTPTestCase.setUp(self)
+
+	def tearDown(self):
+		tornado.testing.AsyncHTTPTestCase.tearDown(self)
+		shutil.rmtree(self.folder)
+
+	def get_app(self):
+		from octoprint.server.util.tornado import LargeResponseHandler
+		from octoprint.server.util.webassets import is_versioned_output
+		return tornado.web.Application([
+			(r"/webassets/(.*)", LargeResponseHandler, dict(path=self.folder,
+			                                                precompressed=True,
+			                                                immutable_check=is_versioned_output))
+		])
+
+	def _fetch(self, accept_encoding):
+		headers = dict()
+		if accept_encoding is not None:
+			headers["Accept-Encoding"] = accept_encoding
+		return self.fetch("/webassets/packed_core.0123abcd.js", headers=headers, decompress_response=False)
+
+	def test_gzip(self):
+		import gzip
+		import io
+
+		response = self._fetch("gzip, deflate")
+		self.assertEqual(200, response.code)
+		self.assertEqual("gzip", response.headers["Content-Encoding"])
+		self.assertEqual("Accept-Encoding", response.headers["Vary"])
+		self.assertIn("javascript", response.headers["Content-Type"])
+		self.assertEqual(str(os.stat(self.path + ".gz").st_size), response.headers["Content-Length"])
+		self.assertLess(len(response.body), len(_ASSET_DATA))
+
+		with gzip.GzipFile(fileobj=io.BytesIO(response.body)) as f:
+			self.assertEqual(_ASSET_DATA, f.read())
+
+	def test_identity(self):
+		for accept_encoding in (None, "identity", "gzip;q=0", "br"):
+			response = self._fetch(accept_encoding)
+			self.assertEqual(200, response.code)
+			self.assertNotIn("Content-Encoding", response.headers)
+			self.assertEqual(_ASSET_DATA, response.body)
+
+	def test_outdated_variant_ignored(self):
+		stat = os.stat(self.path)
+		os.utime(self.path + ".gz", (stat.st_atime, stat.st_mtime - 10))
+
+		response = self._fetch("gzip")
+		self.assertNotIn("Content-Encoding", response.headers)
+		self.assertEqual(_ASSET_DATA, response.body)
+
+	def test_etag_per_representation(self):
+		compressed = self._fetch("gzip")
+		uncompressed = self._fetch(None)
+		self.assertNotEqual(compressed.headers["Etag"], uncompressed.headers["Etag"])
+
+	def test_immutable(self):
+		response = self._fetch("gzip")
+		self.assertIn("immutable", response.headers["Cache-Control"])
+		self.assertIn("public", response.headers["Cache-Control"])
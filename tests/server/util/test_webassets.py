@@ -28,3 +28,170 @@ class UrlReplaceTest(unittest.TestCase):
 	def test_replace_url(self, source_url, output_url, url, expected):
 		actual = replace_url(source_url, output_url, url)
 		self.assertEqual(actual, expected)
+
+
+@ddt.ddt
+class PrecompressingHashVersionTest(unittest.TestCase):
+
+	def setUp(self):
+		import tempfile
+		self.folder = tempfile.mkdtemp()
+
+	def tearDown(self):
+		import shutil
+		shutil.rmtree(self.folder)
+
+	def test_build(self):
+		import gzip
+		import io
+		import os
+
+		from webassets import Bundle, Environment
+		from octoprint.server.util.webassets import PrecompressingHashVersion, is_versioned_output
+
+		with io.open(os.path.join(self.folder, "source.js"), "w") as f:
+			f.write(u"var foo = 'bar';\n" * 100)
+
+		env = Environment(self.folder, "/static")
+		env.versions = PrecompressingHashVersion(encodings=["gzip"])
+		env.manifest = "json:{}".format(os.path.join(self.folder, "manifest.json"))
+		env.url_expire = False
+
+		bundle = Bundle("source.js", output="packed.%(version)s.js")
+		env.register("js", bundle)
+
+		urls = bundle.urls()
+		self.assertEqual(1, len(urls))
+		self.assertTrue(is_versioned_output(urls[0]))
+
+		output = os.path.join(self.folder, os.path.basename(urls[0]))
+		self.assertTrue(os.path.isfile(output))
+		self.assertTrue(os.path.isfile(output + ".gz"))
+
+		with io.open(output, "rb") as f:
+			expected = f.read()
+		with gzip.GzipFile(output + ".gz") as f:
+			self.assertEqual(expected, f.read())
+
+	@ddt.data(
+		("packed_core.0123abcd.js", True),
+		("packed_core.0123abcd.js.gz", False),
+		("packed_core.js", False),
+		("some/folder.0123abcd/packed_core.js", False)
+	)
+	@ddt.unpack
+	def test_is_versioned_output(self, path, expected):
+		from octoprint.server.util.webassets import is_versioned_output
+		self.assertEqual(expected, is_versioned_output(path))
+
+
+class BundleBuilderTest(unittest.TestCase):
+
+	def setUp(self):
+		import io
+		import os
+		import tempfile
+
+		from webassets import Bundle, Environment
+		from octoprint.server.util.webassets import PrecompressingHashVersion
+
+		self.folder = tempfile.mkdtemp()
+		self.fingerprint_path = os.path.join(self.folder, ".fingerprints.json")
+
+		for name in ("first.js", "second.js"):
+			with io.open(os.path.join(self.folder, name), "w") as f:
+				f.write(u"// {}\n".format(name))
+
+		self.env = Environment(self.folder, "/static")
+		self.env.versions = PrecompressingHashVersion()
+		self.env.manifest = "json:{}".format(os.path.join(self.folder, "manifest.json"))
+		self.env.url_expire = False
+
+		self.env.register("first", Bundle("first.js", output="first.%(version)s.js"))
+		self.env.register("second", Bundle("second.js", output="second.%(version)s.js"))
+		self.env.register("empty", Bundle())
+
+	def tearDown(self):
+		import shutil
+		shutil.rmtree(self.folder)
+
+	def _builder(self):
+		from octoprint.server.util.webassets import BundleBuilder
+		return BundleBuilder(self.env, self.fingerprint_path, workers=2)
+
+	def test_build(self):
+		import os
+
+		built = self._builder().build(["first", "second", "empty", "unknown"])
+		self.assertEqual(["first", "second"], built)
+		self.assertTrue(os.path.isfile(self.fingerprint_path))
+
+		for name in ("first", "second"):
+			bundle = self.env[name]
+			self.assertTrue(os.path.isfile(bundle.resolve_output(version=bundle.version)))
+
+	def test_incremental(self):
+		import io
+		import os
+		import time
+
+		self._builder().build(["first", "second"])
+		versions = dict((name, self.env[name].version) for name in ("first", "second"))
+
+		# nothing changed -> nothing to build, versions are restored from the fingerprints
+		self.env["first"].version = self.env["second"].version = None
+		self.assertEqual([], self._builder().build(["first", "second"]))
+		self.assertEqual(versions["first"], self.env["first"].version)
+		self.assertEqual(versions["second"], self.env["second"].version)
+
+		# changed source -> only its bundle gets rebuilt
+		path = os.path.join(self.folder, "second.js")
+		with io.open(path, "w") as f:
+			f.write(u"// changed\n")
+		stat = os.stat(path)
+		os.utime(path, (stat.st_atime, time.time() + 10))
+
+		self.assertEqual(["second"], self._builder().build(["first", "second"]))
+		self.assertNotEqual(versions["second"], self.env["second"].version)
+
+	def test_missing_output_rebuilt(self):
+		import os
+
+		self._builder().build(["first"])
+		bundle = self.env["first"]
+		os.remove(bundle.resolve_output(version=bundle.version))
+
+		self.assertEqual(["first"], self._builder().build(["first"]))
+
+	def test_previous_versions_removed(self):
+		import io
+		import os
+		import time
+
+		self.env.versions.encodings = ["gzip"]
+
+		self._builder().build(["first", "second"])
+		previous = self.env["first"].resolve_output(version=self.env["first"].version)
+		unrelated = os.path.join(self.folder, "first.0123abcd.txt")
+		with io.open(unrelated, "w") as f:
+			f.write(u"unrelated\n")
+
+		path = os.path.join(self.folder, "first.js")
+		with io.open(path, "w") as f:
+			f.write(u"// changed\n")
+		stat = os.stat(path)
+		os.utime(path, (stat.st_atime, time.time() + 10))
+
+		self.assertEqual(["first"], self._builder().build(["first", "second"]))
+
+		current = self.env["first"].resolve_output(version=self.env["first"].version)
+		self.assertNotEqual(previous, current)
+		self.assertFalse(os.path.exists(previous))
+		self.assertFalse(os.path.exists(previous + ".gz"))
+		self.assertTrue(os.path.isfile(current))
+		self.assertTrue(os.path.isfile(current + ".gz"))
+
+		# other bundles and files are left alone
+		second = self.env["second"]
+		self.assertTrue(os.path.isfile(second.resolve_output(version=second.version)))
+		self.assertTrue(os.path.isfile(unrelated))
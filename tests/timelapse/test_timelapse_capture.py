@@ -0,0 +1,136 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import mock
+import io
+import os
+import shutil
+import tempfile
+
+from ddt import ddt, data
+
+from octoprint.timelapse import CaptureStatistics, MjpegStreamParser, SnapshotCapture, StreamCapture
+
+FRAME_1 = b"\xff\xd8" + b"first frame" + b"\xff\xd9"
+FRAME_2 = b"\xff\xd8" + b"second \xff\xd9 frame" + b"\xff\xd9"
+
+
+def _part(frame, content_length=True):
+	headers = b"--boundary\r\nContent-Type: image/jpeg\r\n"
+	if content_length:
+		headers += b"Content-Length: " + str(len(frame)).encode("ascii") + b"\r\n"
+	return headers + b"\r\n" + frame + b"\r\n"
+
+
+@ddt
+class MjpegStreamParserTest(unittest.TestCase):
+
+	@data(1, 7, 1024)
+	def test_content_length(self, chunk_size):
+		stream = _part(FRAME_1) + _part(FRAME_2)
+
+		parser = MjpegStreamParser()
+		frames = []
+		for offset in range(0, len(stream), chunk_size):
+			frames += parser.feed(stream[offset:offset + chunk_size])
+
+		# content length allows for EOI markers within the frame
+		self.assertEqual([FRAME_1, FRAME_2], frames)
+
+	@data(1, 7, 1024)
+	def test_markers(self, chunk_size):
+		stream = _part(FRAME_1, content_length=False) + _part(FRAME_1, content_length=False)
+
+		parser = MjpegStreamParser()
+		frames = []
+		for offset in range(0, len(stream), chunk_size):
+			frames += parser.feed(stream[offset:offset + chunk_size])
+
+		self.assertEqual([FRAME_1, FRAME_1], frames)
+
+	def test_garbage(self):
+		parser = MjpegStreamParser()
+		self.assertEqual([], parser.feed(b"x" * (MjpegStreamParser.MAX_HEADER_SIZE + 1)))
+		self.assertEqual([FRAME_2], parser.feed(b"\r\n" + _part(FRAME_2)))
+
+
+class CaptureStatisticsTest(unittest.TestCase):
+
+	def test_empty(self):
+		stats = CaptureStatistics().as_dict()
+		self.assertEqual(0, stats["count"])
+		self.assertEqual(dict(last=None, avg=None, min=None, max=None, p95=None), stats["latency"])
+
+	def test_record(self):
+		stats = CaptureStatistics(window=20)
+		for latency in range(1, 21):
+			stats.record(latency / 1000.0, source="snapshot")
+		stats.record_error()
+
+		result = stats.as_dict()
+		self.assertEqual(20, result["count"])
+		self.assertEqual(1, result["errors"])
+		self.assertEqual(dict(snapshot=20), result["sources"])
+		self.assertEqual(dict(last=20.0, avg=10.5, min=1.0, max=20.0, p95=19.0), result["latency"])
+
+		stats.reset()
+		self.assertEqual(0, stats.as_dict()["count"])
+
+
+class CaptureTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.filename = os.path.join(self.folder, "capture.jpg")
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def _mock_session(self, capture):
+		response = mock.MagicMock()
+		response.content = FRAME_2
+		session = mock.MagicMock()
+		session.get.return_value = response
+		capture._session = session
+		return session
+
+	def test_snapshot(self):
+		capture = SnapshotCapture("http://example.com/snapshot", timeout=3, validate_ssl=False)
+		session = self._mock_session(capture)
+
+		self.assertEqual("snapshot", capture.capture(self.filename))
+		self.assertEqual("snapshot", capture.capture(self.filename))
+
+		# same session for all captures
+		self.assertEqual(2, session.get.call_count)
+		session.get.assert_called_with("http://example.com/snapshot", timeout=3, verify=False)
+		with io.open(self.filename, "rb") as f:
+			self.assertEqual(FRAME_2, f.read())
+
+	def test_stream(self):
+		capture = StreamCapture("http://example.com/stream", "http://example.com/snapshot")
+		session = self._mock_session(capture)
+		capture._set_frame(FRAME_1)
+
+		self.assertEqual("stream", capture.capture(self.filename))
+		self.assertEqual(0, session.get.call_count)
+		with io.open(self.filename, "rb") as f:
+			self.assertEqual(FRAME_1, f.read())
+
+	@mock.patch("octoprint.timelapse.monotonic_time")
+	def test_stream_stale_frame(self, mock_time):
+		capture = StreamCapture("http://example.com/stream", "http://example.com/snapshot", max_frame_age=2.0)
+		session = self._mock_session(capture)
+
+		mock_time.return_value = 100.0
+		capture._set_frame(FRAME_1)
+		mock_time.return_value = 103.0
+
+		self.assertEqual("snapshot", capture.capture(self.filename))
+		self.assertEqual(1, session.get.call_count)
+		with io.open(self.filename, "rb") as f:
+			self.assertEqual(FRAME_2, f.read())
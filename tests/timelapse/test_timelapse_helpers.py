@@ -12,7 +12,8 @@ import os
 import time
 
 from collections import namedtuple, OrderedDict
-_stat = namedtuple("StatResult", "st_size, st_ctime, st_mtime")
+_stat = namedtuple("StatResult", "st_size, st_ctime, st_mtime, st_dev, st_ino")
+_stat.__new__.__defaults__ = (0, 0)
 _entry = namedtuple("DirEntry", "name, path, is_file, is_dir, stat")
 
 import octoprint.plugin
@@ -182,6 +183,22 @@ class TimelapseTest(unittest.TestCase):
 		self.assertEqual(result[1]["count"], 2)
 		self.assertEqual(result[1]["bytes"], 9)
 
+	@mock.patch("octoprint.timelapse.eventManager")
+	@mock.patch("octoprint.timelapse.TimelapseRenderScheduler")
+	@mock.patch("octoprint.timelapse._render_scheduler", None)
+	def test_init_render_scheduler_subscribes_once(self, mock_scheduler, mock_event_manager):
+		## prepare
+		self.settings.getBaseFolder.return_value = "/path/to/timelapse/tmp"
+		is_printing = lambda: False
+
+		## test
+		octoprint.timelapse.init_render_scheduler(is_printing=is_printing)
+		octoprint.timelapse.init_render_scheduler(is_printing=is_printing)
+
+		## verify
+		self.assertEqual(1, mock_scheduler.call_count)
+		self.assertEqual(4, mock_event_manager.return_value.subscribe.call_count)
+
 	def _generate_scandir(self, path, files):
 		result = OrderedDict()
 
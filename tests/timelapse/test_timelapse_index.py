@@ -0,0 +1,239 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import mock
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+import octoprint.timelapse
+from octoprint.timelapse import UnrenderedTimelapseIndex
+
+
+class UnrenderedTimelapseIndexTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def _write(self, name, size=10):
+		path = os.path.join(self.folder, name)
+		with io.open(path, "wb") as f:
+			f.write(b"x" * size)
+		return path
+
+	def test_scan(self):
+		self._write("one-0.jpg", size=1)
+		self._write("one-1.jpg", size=2)
+		self._write("two-0.jpg", size=3)
+		self._write("two-seg0.mpg")
+		self._write(".renderqueue.json")
+
+		result = UnrenderedTimelapseIndex(self.folder).get()
+
+		self.assertEqual(["one", "two"], sorted(result.keys()))
+		self.assertEqual(2, result["one"]["count"])
+		self.assertEqual(3, result["one"]["bytes"])
+		self.assertEqual(1, result["two"]["count"])
+
+	def test_add_frame_without_rescan(self):
+		index = UnrenderedTimelapseIndex(self.folder)
+
+		self._write("one-0.jpg", size=1)
+		with mock.patch.object(index, "_scan", wraps=index._scan) as scan:
+			self.assertEqual(1, index.get()["one"]["count"])
+			self.assertEqual(1, scan.call_count)
+
+			index.add_frame(self._write("one-1.jpg", size=2))
+			index.add_frame(self._write("one-2.jpg", size=4))
+
+			result = index.get()
+			self.assertEqual(3, result["one"]["count"])
+			self.assertEqual(7, result["one"]["bytes"])
+
+			# no additional scan necessary
+			self.assertEqual(1, scan.call_count)
+
+	def test_add_frame_already_scanned(self):
+		index = UnrenderedTimelapseIndex(self.folder)
+		index.get()
+
+		# frame was written, then picked up by a scan triggered by some external change, then added
+		path = self._write("one-0.jpg")
+		index.invalidate()
+		index.get()
+		index.add_frame(path)
+
+		self.assertEqual(1, index.get()["one"]["count"])
+
+	def test_external_change(self):
+		index = UnrenderedTimelapseIndex(self.folder)
+		self._write("one-0.jpg")
+		self.assertEqual(1, index.get()["one"]["count"])
+
+		# make sure the folder's mtime differs
+		self._write("one-1.jpg")
+		os.utime(self.folder, (0, 0))
+
+		self.assertEqual(2, index.get()["one"]["count"])
+
+	def test_external_change_same_mtime(self):
+		index = UnrenderedTimelapseIndex(self.folder)
+		self._write("one-0.jpg")
+		self.assertEqual(1, index.get()["one"]["count"])
+
+		# file system with a coarse mtime resolution
+		stat = os.stat(self.folder)
+		self._write("one-1.jpg")
+		os.utime(self.folder, (stat.st_atime, stat.st_mtime))
+
+		self.assertEqual(2, index.get()["one"]["count"])
+
+	def test_hardlinks(self):
+		if not hasattr(os, "link"):
+			return
+
+		index = UnrenderedTimelapseIndex(self.folder)
+		index.add_frame(self._write("one-0.jpg", size=10))
+		self.assertEqual(10, index.get()["one"]["bytes"])
+
+		for number in range(1, 4):
+			path = os.path.join(self.folder, "one-{}.jpg".format(number))
+			os.link(os.path.join(self.folder, "one-0.jpg"), path)
+			index.add_frame(path)
+
+		result = index.get()
+		self.assertEqual(4, result["one"]["count"])
+		self.assertEqual(10, result["one"]["bytes"])
+
+		index.invalidate()
+		self.assertEqual(result, index.get())
+
+	def test_remove(self):
+		self._write("one-0.jpg")
+		self._write("two-0.jpg")
+
+		index = UnrenderedTimelapseIndex(self.folder)
+		index.get()
+		index.remove("one")
+
+		self.assertEqual(["two"], list(index.get().keys()))
+
+
+class TimedTimelapseTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+		self.settings_patcher = mock.patch("octoprint.timelapse.settings")
+		settings = self.settings_patcher.start()
+		settings.return_value.getBaseFolder.return_value = self.folder
+		settings.return_value.getBoolean.return_value = False
+
+		self.event_manager_patcher = mock.patch("octoprint.timelapse.eventManager")
+		self.event_manager_patcher.start()
+
+		def capture(filename):
+			with io.open(filename, "wb") as f:
+				f.write(os.path.basename(filename).encode("utf-8"))
+			return "snapshot"
+
+		self.capture_patcher = mock.patch("octoprint.timelapse.create_capture")
+		create_capture = self.capture_patcher.start()
+		create_capture.return_value.capture.side_effect = capture
+
+	def tearDown(self):
+		self.settings_patcher.stop()
+		self.event_manager_patcher.stop()
+		self.capture_patcher.stop()
+		shutil.rmtree(self.folder)
+
+	def test_post_roll(self):
+		timelapse = octoprint.timelapse.TimedTimelapse(post_roll=2, fps=5)
+		timelapse.start_timelapse("test.gcode")
+
+		# index already loaded, frames get added to it as they are created
+		index = octoprint.timelapse.unrendered_index()
+		index.get()
+
+		timelapse._copying_postroll()
+
+		files = sorted(os.listdir(self.folder))
+		self.assertEqual(11, len(files))
+
+		stats = [os.stat(os.path.join(self.folder, name)) for name in files]
+		if hasattr(os, "link"):
+			# all post roll frames are the same file
+			self.assertEqual(1, len(set(stat.st_ino for stat in stats)))
+			self.assertEqual(11, stats[0].st_nlink)
+
+		result = index.get()
+		self.assertEqual(11, result[timelapse.prefix]["count"])
+		if hasattr(os, "link"):
+			# linked frames only take up space once
+			self.assertEqual(stats[0].st_size, result[timelapse.prefix]["bytes"])
+
+		# same result after a rescan
+		index.invalidate()
+		self.assertEqual(result, index.get())
+
+	def _wait_for_captures(self, timelapse):
+		done = threading.Event()
+		timelapse._capture_queue.put(dict(type=timelapse.QUEUE_ENTRY_TYPE_CALLBACK, callback=done.set))
+		self.assertTrue(done.wait(5))
+
+	def test_decimate(self):
+		timelapse = octoprint.timelapse.TimedTimelapse(interval=1, fps=2, target_duration=3)
+		self.assertEqual(6, timelapse.max_frames)
+
+		timelapse.start_timelapse("test.gcode")
+		for _ in range(6):
+			timelapse._timer_task()
+		self._wait_for_captures(timelapse)
+
+		# every other frame dropped, rest renumbered
+		frames = []
+		for number in range(3):
+			with io.open(os.path.join(self.folder, "{}-{}.jpg".format(timelapse.prefix, number)), "rb") as f:
+				frames.append(f.read().decode("utf-8"))
+		self.assertEqual(["{}-{}.jpg".format(timelapse.prefix, number) for number in (0, 2, 4)], frames)
+		self.assertEqual(3, len(os.listdir(self.folder)))
+
+		self.assertEqual(2, timelapse._timer_interval())
+		self.assertEqual(3, octoprint.timelapse.unrendered_index().get()[timelapse.prefix]["count"])
+
+		# captures continue after the remaining frames
+		self.assertEqual(os.path.join(self.folder, "{}-3.jpg".format(timelapse.prefix)), timelapse.capture_image())
+		self._wait_for_captures(timelapse)
+
+	@mock.patch("octoprint.timelapse.TimelapseSegmentEncoder")
+	def test_decimate_restarts_segment_encoding(self, encoder_class):
+		encoder_class.side_effect = lambda *args, **kwargs: mock.MagicMock()
+		octoprint.timelapse.settings.return_value.getBoolean.return_value = True
+
+		timelapse = octoprint.timelapse.TimedTimelapse(interval=1, fps=2, target_duration=3)
+		timelapse.start_timelapse("test.gcode")
+		first = timelapse._segment_encoder
+
+		for _ in range(6):
+			timelapse._timer_task()
+		self._wait_for_captures(timelapse)
+
+		# old segments are gone, encoding starts over on the renumbered frames
+		self.assertTrue(first.cancel.called)
+		self.assertEqual(2, encoder_class.call_count)
+
+		second = timelapse._segment_encoder
+		self.assertIsNot(first, second)
+		self.assertTrue(second.frame_captured.called)
+		self.assertIs(second, octoprint.timelapse._segment_encoders[timelapse.prefix])
+
+		timelapse.stop_timelapse(do_create_movie=False)
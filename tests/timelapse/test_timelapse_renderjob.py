@@ -5,10 +5,22 @@ __license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agp
 __copyright__ = "Copyright (C) 2016 The OctoPrint Project - Released under terms of the AGPLv3 License"
 
 import unittest
+import mock
+import io
+import json
+import os
+import psutil
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 
 from ddt import ddt, data, unpack
 
-from octoprint.timelapse import TimelapseRenderJob
+import octoprint.timelapse
+from octoprint.timelapse import TimelapseRenderJob, TimelapseRenderScheduler, TimelapseSegmentEncoder
 
 @ddt
 class TimelapseRenderJobTest(unittest.TestCase):
@@ -64,3 +76,315 @@ class TimelapseRenderJobTest(unittest.TestCase):
 	def test_create_filter_string(self, kwargs, expected):
 		actual = TimelapseRenderJob._create_filter_string(**kwargs)
 		self.assertEquals(actual, expected)
+
+	def test_create_ffmpeg_command_string_range(self):
+		actual = TimelapseRenderJob._create_ffmpeg_command_string("/path/to/ffmpeg", 25, "10000k", 1,
+		                                                          "/path/to/input/files_%d.jpg", "/path/to/seg0.mpg",
+		                                                          start_number=250, frames=250)
+		self.assertEquals(actual, '/path/to/ffmpeg -framerate 25 -loglevel error -start_number 250 -t 9.980000 -i "/path/to/input/files_%d.jpg" -vcodec mpeg2video -threads 1 -r 25 -y -b 10000k -f vob -vf \'[in] format=yuv420p [out]\' "/path/to/seg0.mpg"')
+
+	def test_create_ffmpeg_concat_command_string(self):
+		actual = TimelapseRenderJob._create_ffmpeg_concat_command_string("/path/to/ffmpeg", "/path/to/seglist.txt", "/path/to/output.mpg")
+		self.assertEquals(actual, '/path/to/ffmpeg -loglevel error -f concat -safe 0 -i "/path/to/seglist.txt" -c copy -y -f vob "/path/to/output.mpg"')
+
+
+class TimelapseSegmentsTest(unittest.TestCase):
+
+	def setUp(self):
+		self.capture_dir = tempfile.mkdtemp()
+		self.output_dir = tempfile.mkdtemp()
+
+		self.settings_patcher = mock.patch("octoprint.timelapse._get_render_settings")
+		self.render_settings = self.settings_patcher.start()
+		self.render_settings.return_value = dict(ffmpeg="/path/to/ffmpeg", bitrate="10000k", hflip=False,
+		                                         vflip=False, rotate=False, watermark=None)
+
+		self.sarge_patcher = mock.patch("octoprint.timelapse.sarge.run")
+		self.sarge_run = self.sarge_patcher.start()
+		self.commands = []
+
+		def run(command, **kwargs):
+			self.commands.append(command)
+			output = command.rsplit(" ", 1)[1].strip('"')
+			with io.open(output, "wb") as f:
+				f.write(b"movie")
+			return mock.MagicMock(returncode=0, commands=[mock.MagicMock()])
+		self.sarge_run.side_effect = run
+
+	def tearDown(self):
+		self.settings_patcher.stop()
+		self.sarge_patcher.stop()
+		shutil.rmtree(self.capture_dir)
+		shutil.rmtree(self.output_dir)
+
+	def _capture(self, encoder, count):
+		for _ in range(count):
+			with io.open(os.path.join(self.capture_dir, "test-{}.jpg".format(self.frames)), "wb") as f:
+				f.write(b"frame")
+			self.frames += 1
+			encoder.frame_captured()
+
+	def _render(self, encoder, fps=25, job=None):
+		on_success = mock.MagicMock()
+		if job is None:
+			job = self._job(encoder, fps=fps)
+		job._on_success = on_success
+		job.render()
+		self.assertTrue(on_success.called)
+
+	def _job(self, encoder, fps=25):
+		return TimelapseRenderJob(self.capture_dir, self.output_dir, "test",
+		                          output_format="{prefix}.mpg",
+		                          segment_encoder=encoder,
+		                          fps=fps)
+
+	def test_segments(self):
+		self.frames = 0
+		encoder = TimelapseSegmentEncoder(self.capture_dir, "test", 25, segment_frames=10, nice=0)
+		self._capture(encoder, 25)
+
+		self._render(encoder)
+
+		# two segments of ten frames in the background, the remaining five during rendering, then concatenation
+		self.assertEqual(4, len(self.commands))
+		self.assertIn("-start_number 0 -t 0.380000", self.commands[0])
+		self.assertIn("-start_number 10 -t 0.380000", self.commands[1])
+		self.assertIn("-start_number 20 -i", self.commands[2])
+		self.assertIn("-f concat", self.commands[3])
+
+		# only frames remain
+		self.assertEqual(25, len(os.listdir(self.capture_dir)))
+
+	def test_segments_existing_frames(self):
+		self.frames = 0
+		encoder = TimelapseSegmentEncoder(self.capture_dir, "test", 25, segment_frames=10, nice=0)
+		self._capture(mock.MagicMock(), 25)
+
+		# e.g. restarted after decimation, picks up all complete segments at once
+		encoder.frame_captured()
+		self._render(encoder)
+
+		self.assertEqual(4, len(self.commands))
+		self.assertIn("-start_number 0 -t 0.380000", self.commands[0])
+		self.assertIn("-start_number 10 -t 0.380000", self.commands[1])
+		self.assertIn("-start_number 20 -i", self.commands[2])
+
+	def test_segments_fps_changed(self):
+		self.frames = 0
+		encoder = TimelapseSegmentEncoder(self.capture_dir, "test", 25, segment_frames=10, nice=0)
+		self._capture(encoder, 25)
+
+		self._render(encoder, fps=30)
+
+		# segments were discarded, full render
+		self.assertEqual(3, len(self.commands))
+		self.assertIn("-framerate 30 -loglevel error -i", self.commands[2])
+		self.assertEqual(25, len(os.listdir(self.capture_dir)))
+
+	@mock.patch("octoprint.timelapse._resume_process")
+	@mock.patch("octoprint.timelapse._suspend_process")
+	def test_paused(self, suspend_process, resume_process):
+		self.frames = 0
+		self._capture(mock.MagicMock(), 25)
+
+		# every ffmpeg started while paused gets suspended right away
+		job = self._job(None)
+		job.pause()
+		self._render(None, job=job)
+		self.assertEqual(1, suspend_process.call_count)
+
+		# nothing running anymore, nothing to resume
+		job.resume()
+		self.assertFalse(resume_process.called)
+
+
+class TimelapseRenderSchedulerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.queue_file = os.path.join(self.folder, ".renderqueue.json")
+
+		self.rendered = []
+		self.release = threading.Event()
+		self.release.set()
+
+	def tearDown(self):
+		self.release.set()
+		shutil.rmtree(self.folder)
+
+	def _job_factory(self, prefix, **kwargs):
+		job = mock.MagicMock()
+
+		def render():
+			self.release.wait(5)
+			self.rendered.append(prefix)
+		job.render.side_effect = render
+
+		return job
+
+	def _wait_for(self, condition):
+		deadline = time.time() + 5
+		while not condition() and time.time() < deadline:
+			time.sleep(0.01)
+		self.assertTrue(condition())
+
+	def _wait_for_idle(self, scheduler):
+		self.release.set()
+		self._wait_for(lambda: not scheduler.get_state()["rendering"] and not scheduler.get_state()["queued"])
+
+	def test_enqueue(self):
+		self.release.clear()
+		scheduler = TimelapseRenderScheduler(self.queue_file, job_factory=self._job_factory)
+
+		self.assertTrue(scheduler.enqueue("one", gcode="one.gcode"))
+		self.assertTrue(scheduler.enqueue("two"))
+		self.assertFalse(scheduler.enqueue("two"))
+
+		self._wait_for(lambda: scheduler.is_rendering("one"))
+		self.assertTrue(scheduler.is_queued("two"))
+
+		state = scheduler.get_state()
+		self.assertEqual(["one"], [entry["prefix"] for entry in state["rendering"]])
+		self.assertEqual(["two"], [entry["prefix"] for entry in state["queued"]])
+
+		# active and queued jobs are persisted
+		with io.open(self.queue_file, "rb") as f:
+			self.assertEqual(["one", "two"], [entry["prefix"] for entry in json.load(f)])
+
+		self._wait_for_idle(scheduler)
+		self.assertEqual(["one", "two"], self.rendered)
+
+		with io.open(self.queue_file, "rb") as f:
+			self.assertEqual([], json.load(f))
+
+	def test_cancel(self):
+		self.release.clear()
+		scheduler = TimelapseRenderScheduler(self.queue_file, job_factory=self._job_factory)
+		scheduler.enqueue("one")
+		scheduler.enqueue("two")
+		self._wait_for(lambda: scheduler.is_rendering("one"))
+
+		self.assertTrue(scheduler.cancel("two"))
+		self.assertFalse(scheduler.cancel("one"))
+
+		self._wait_for_idle(scheduler)
+		self.assertEqual(["one"], self.rendered)
+
+	def test_concurrency(self):
+		self.release.clear()
+		scheduler = TimelapseRenderScheduler(self.queue_file, concurrency=2, job_factory=self._job_factory)
+		for prefix in ("one", "two", "three"):
+			scheduler.enqueue(prefix)
+
+		self._wait_for(lambda: len(scheduler.get_state()["rendering"]) == 2)
+		self.assertTrue(scheduler.is_queued("three"))
+
+		self._wait_for_idle(scheduler)
+		self.assertEqual(3, len(self.rendered))
+
+	def test_defer_while_printing(self):
+		printing = [True]
+		on_change = mock.MagicMock()
+		scheduler = TimelapseRenderScheduler(self.queue_file, defer_while_printing=True,
+		                                     is_printing=lambda: printing[0], job_factory=self._job_factory,
+		                                     on_change=on_change)
+		scheduler.enqueue("one")
+
+		time.sleep(0.1)
+		self.assertEqual([], self.rendered)
+		self.assertTrue(scheduler.get_state()["deferred"])
+		self.assertTrue(on_change.called)
+
+		printing[0] = False
+		scheduler.wakeup()
+		self._wait_for_idle(scheduler)
+		self.assertEqual(["one"], self.rendered)
+
+	def test_pause_while_printing(self):
+		self.release.clear()
+		printing = [False]
+		jobs = []
+
+		def job_factory(prefix, **kwargs):
+			job = self._job_factory(prefix, **kwargs)
+			jobs.append(job)
+			return job
+
+		scheduler = TimelapseRenderScheduler(self.queue_file, defer_while_printing=True,
+		                                     is_printing=lambda: printing[0], job_factory=job_factory)
+		scheduler.enqueue("one")
+		self._wait_for(lambda: len(jobs) == 1 and scheduler.get_state()["rendering"])
+		self.assertFalse(scheduler.get_state()["rendering"][0]["paused"])
+
+		# print started while rendering
+		printing[0] = True
+		scheduler.wakeup()
+		self.assertTrue(jobs[0].pause.called)
+		self.assertTrue(scheduler.get_state()["rendering"][0]["paused"])
+
+		printing[0] = False
+		scheduler.wakeup()
+		self.assertTrue(jobs[0].resume.called)
+		self.assertFalse(scheduler.get_state()["rendering"][0]["paused"])
+
+		self._wait_for_idle(scheduler)
+		self.assertEqual(["one"], self.rendered)
+
+	def test_restore(self):
+		with io.open(self.queue_file, "wb") as f:
+			json.dump([dict(prefix="one", gcode="one.gcode", postfix=None, fps=30, queued=0)], f)
+
+		factory = mock.MagicMock(side_effect=self._job_factory)
+		scheduler = TimelapseRenderScheduler(self.queue_file, job_factory=factory)
+
+		self._wait_for_idle(scheduler)
+		self.assertEqual(["one"], self.rendered)
+		factory.assert_called_once_with("one", gcode="one.gcode", postfix=None, fps=30)
+
+
+class TimelapseRenderHelpersTest(unittest.TestCase):
+
+	def test_read_ffmpeg_progress(self):
+		handle, path = tempfile.mkstemp()
+		try:
+			with os.fdopen(handle, "wb") as f:
+				f.write(b"frame=10\nfps=25.0\nprogress=continue\nframe=42\nfps=25.0\nprogress=continue\n")
+			self.assertEqual(42, octoprint.timelapse._read_ffmpeg_progress(path))
+		finally:
+			os.remove(path)
+
+		self.assertIsNone(octoprint.timelapse._read_ffmpeg_progress(path))
+
+	@unittest.skipIf(sys.platform == "win32", "needs a POSIX sleep command")
+	def test_suspend_process(self):
+		def wait_for_status(stopped):
+			deadline = time.time() + 5
+			while (status() == psutil.STATUS_STOPPED) != stopped and time.time() < deadline:
+				time.sleep(0.01)
+			self.assertEqual(stopped, status() == psutil.STATUS_STOPPED)
+
+		process = subprocess.Popen(["sleep", "5"])
+		status = lambda: psutil.Process(process.pid).status()
+		try:
+			octoprint.timelapse._suspend_process(process)
+			wait_for_status(True)
+
+			octoprint.timelapse._resume_process(process)
+			wait_for_status(False)
+		finally:
+			process.kill()
+			process.wait()
+
+		# already finished processes are ignored
+		octoprint.timelapse._suspend_process(process)
+		octoprint.timelapse._resume_process(process)
+
+	@mock.patch("octoprint.timelapse.sys")
+	def test_low_priority_command(self, mock_sys):
+		mock_sys.platform = "linux2"
+		self.assertEqual("nice -n 10 ionice -c 3 ffmpeg",
+		                 octoprint.timelapse._low_priority_command("ffmpeg", nice=10, ionice="idle"))
+		self.assertEqual("ffmpeg", octoprint.timelapse._low_priority_command("ffmpeg", nice=0, ionice="unknown"))
+
+		mock_sys.platform = "win32"
+		self.assertEqual("ffmpeg", octoprint.timelapse._low_priority_command("ffmpeg", nice=10, ionice="idle"))
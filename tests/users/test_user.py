@@ -77,8 +77,11 @@ class UserTestCase(unittest.TestCase):
 		self.assertEqual(expected_returnvalue, returnvalue)
 
 	def test_check_password(self):
-		self.assertTrue(self.user.check_password("passwordHash"))
-		self.assertFalse(self.user.check_password("notThePasswordHash"))
+		password_hash = octoprint.users.Pbkdf2PasswordHasher(iterations=1000).hash("password")
+		user = octoprint.users.User("user", password_hash, True, ("user",))
+
+		self.assertTrue(user.check_password("password"))
+		self.assertFalse(user.check_password("notThePassword"))
 
 	@ddt.data(
 		("user", "User(id=user,name=user,active=True,user=True,admin=False)"),
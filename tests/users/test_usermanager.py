@@ -8,6 +8,11 @@ __copyright__ = "Copyright (C) 2017 The OctoPrint Project - Released under terms
 
 import unittest
 import ddt
+import mock
+import os
+import shutil
+import tempfile
+import warnings
 
 import octoprint.users
 
@@ -22,3 +27,159 @@ class UserManagerTest(unittest.TestCase):
 
 		# should not throw an exception
 		octoprint.users.UserManager.createPasswordHash(password, salt=salt)
+
+
+class FilebasedUserManagerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.basefolder = tempfile.mkdtemp()
+		userfile = os.path.join(self.basefolder, "users.yaml")
+
+		self.settings = {
+			("accessControl", "userfile"): userfile,
+			("accessControl", "salt"): "abc",
+			("accessControl", "passwordHashing", "algorithm"): "pbkdf2_sha256",
+			("accessControl", "passwordHashing", "pbkdf2", "iterations"): 1000,
+			("accessControl", "passwordHashing", "cache", "size"): 32,
+			("accessControl", "passwordHashing", "cache", "ttl"): 300
+		}
+
+		def settings_get(path, *args, **kwargs):
+			return self.settings.get(tuple(path))
+
+		settings_patcher = mock.patch("octoprint.users.settings")
+		self.addCleanup(settings_patcher.stop)
+		settings_mock = settings_patcher.start()
+		settings_mock.return_value.get.side_effect = settings_get
+		settings_mock.return_value.getInt.side_effect = settings_get
+
+		self.user_manager = octoprint.users.FilebasedUserManager()
+
+	def tearDown(self):
+		shutil.rmtree(self.basefolder)
+
+	def test_findUser_apikey(self):
+		self.user_manager.addUser("user", "password", active=True, apikey="userkey")
+		self.user_manager.addUser("other", "password", active=True)
+
+		user = self.user_manager.findUser(apikey="userkey")
+		self.assertIsNotNone(user)
+		self.assertEqual("user", user.get_id())
+
+		self.assertIsNone(self.user_manager.findUser(apikey="unknown"))
+
+	def test_findUser_apikey_regenerated(self):
+		self.user_manager.addUser("user", "password", active=True, apikey="userkey")
+
+		new_key = self.user_manager.generateApiKey("user")
+
+		self.assertIsNone(self.user_manager.findUser(apikey="userkey"))
+		self.assertEqual("user", self.user_manager.findUser(apikey=new_key).get_id())
+
+	def test_findUser_apikey_deleted(self):
+		self.user_manager.addUser("user", "password", active=True, apikey="userkey")
+		self.user_manager.addUser("other", "password", active=True, apikey="otherkey")
+
+		self.user_manager.deleteApikey("user")
+		self.user_manager.removeUser("other")
+
+		self.assertIsNone(self.user_manager.findUser(apikey="userkey"))
+		self.assertIsNone(self.user_manager.findUser(apikey="otherkey"))
+
+	def test_changed_callback(self):
+		callback = mock.MagicMock()
+		self.user_manager.register_callback(callback)
+
+		self.user_manager.addUser("user", "password", active=True)
+
+		callback.assert_called_once_with("changed", None)
+
+	def test_checkPassword(self):
+		self.user_manager.addUser("user", "password", active=True)
+
+		password_hash = self.user_manager.findUser(userid="user")._passwordHash
+		self.assertTrue(password_hash.startswith("pbkdf2_sha256$1000$"))
+
+		self.assertTrue(self.user_manager.checkPassword("user", "password"))
+		self.assertFalse(self.user_manager.checkPassword("user", "wrong"))
+		self.assertFalse(self.user_manager.checkPassword("unknown", "password"))
+
+	def test_user_check_password(self):
+		self.user_manager.addUser("user", "password", active=True)
+		user = self.user_manager.findUser(userid="user")
+
+		self.assertTrue(user.check_password("password"))
+		self.assertFalse(user.check_password("wrong"))
+
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter("always")
+
+			# password hashes never match, not even the stored one
+			self.assertFalse(user.check_password(user._passwordHash))
+			self.assertFalse(user.check_password(octoprint.users.UserManager.createPasswordHash("password")))
+
+		self.assertEqual([DeprecationWarning, DeprecationWarning], [w.category for w in caught])
+
+	def test_checkPassword_per_user_salt(self):
+		self.user_manager.addUser("user", "password", active=True)
+		self.user_manager.addUser("other", "password", active=True)
+
+		self.assertNotEqual(self.user_manager.findUser(userid="user")._passwordHash,
+		                    self.user_manager.findUser(userid="other")._passwordHash)
+
+	def test_checkPassword_migrates_legacy_hash(self):
+		self.user_manager.addUser("user", "password", active=True)
+		self.user_manager.findUser(userid="user")._passwordHash = octoprint.users.UserManager.createPasswordHash("password", salt="abc")
+
+		self.assertTrue(self.user_manager.checkPassword("user", "password"))
+		self.assertTrue(self.user_manager.findUser(userid="user")._passwordHash.startswith("pbkdf2_sha256$1000$"))
+		self.assertTrue(self.user_manager.checkPassword("user", "password"))
+
+	def test_checkPassword_rehashes_on_changed_parameters(self):
+		self.user_manager.addUser("user", "password", active=True)
+
+		self.settings[("accessControl", "passwordHashing", "pbkdf2", "iterations")] = 2000
+
+		self.assertTrue(self.user_manager.checkPassword("user", "password"))
+		self.assertTrue(self.user_manager.findUser(userid="user")._passwordHash.startswith("pbkdf2_sha256$2000$"))
+
+	def test_checkPassword_cached(self):
+		self.user_manager.addUser("user", "password", active=True)
+		self.assertTrue(self.user_manager.checkPassword("user", "password"))
+
+		with mock.patch("octoprint.users.verify_password_hash") as verify_mock:
+			self.assertTrue(self.user_manager.checkPassword("user", "password"))
+			self.assertFalse(verify_mock.called)
+
+			verify_mock.return_value = False
+			self.assertFalse(self.user_manager.checkPassword("user", "wrong"))
+			self.assertTrue(verify_mock.called)
+
+
+class PasswordVerificationCacheTest(unittest.TestCase):
+
+	def test_expiry(self):
+		cache = octoprint.users.PasswordVerificationCache(size=2, ttl=10)
+
+		with mock.patch("octoprint.users.monotonic_time") as time_mock:
+			time_mock.return_value = 0
+			cache.add("user", "password", "hash")
+
+			time_mock.return_value = 5
+			self.assertTrue(cache.check("user", "password", "hash"))
+			self.assertFalse(cache.check("user", "password", "otherhash"))
+			self.assertFalse(cache.check("user", "wrong", "hash"))
+
+			time_mock.return_value = 11
+			self.assertFalse(cache.check("user", "password", "hash"))
+
+	def test_bounded(self):
+		cache = octoprint.users.PasswordVerificationCache(size=2, ttl=10)
+
+		cache.add("a", "password", "hash")
+		cache.add("b", "password", "hash")
+		cache.add("c", "password", "hash")
+
+		self.assertFalse(cache.check("a", "password", "hash"))
+		self.assertTrue(cache.check("b", "password", "hash"))
+		self.assertTrue(cache.check("c", "password", "hash"))
@@ -1,5 +1,6 @@
 
 import unittest
+import os
 import mock
 import ddt
 
@@ -249,3 +250,44 @@ class TestCommErrorHandling(unittest.TestCase):
 		self.assert_not_disconnected()
 		self.assert_not_print_cancelled()
 		self.assert_not_cleared_to_send()
+
+class TestPrintingGcodeFileInformation(unittest.TestCase):
+
+	def setUp(self):
+		import tempfile
+		self.folder = tempfile.mkdtemp()
+
+		self.lines = [u"G1 X{} Y{}\n".format(i, i) for i in range(5000)]
+		self.data = u"".join(self.lines).encode("utf-8")
+
+		self.path = os.path.join(self.folder, "test.gcode")
+		with open(self.path, "wb") as f:
+			f.write(self.data)
+
+	def tearDown(self):
+		import shutil
+		shutil.rmtree(self.folder)
+
+	def test_compressed(self):
+		import octoprint.util.compression
+		octoprint.util.compression.compress_file(self.path, block_size=1024)
+
+		file_information = octoprint.util.comm.PrintingGcodeFileInformation(self.path)
+		self.assertEqual(len(self.data), file_information.getFilesize())
+
+		file_information.start()
+		try:
+			line, pos, _ = file_information.getNext()
+			self.assertEqual(u"G1 X0 Y0", line)
+			self.assertEqual(len(self.lines[0]), pos)
+
+			# seek into the middle of a later block, e.g. for print recovery
+			offset = len(u"".join(self.lines[:3000]))
+			file_information.seek(offset)
+			self.assertEqual(offset, file_information.getFilepos())
+
+			line, pos, _ = file_information.getNext()
+			self.assertEqual(u"G1 X3000 Y3000", line)
+			self.assertEqual(offset + len(self.lines[3000]), pos)
+		finally:
+			file_information.close()
@@ -0,0 +1,128 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import codecs
+import gzip
+import io
+import os
+import random
+import shutil
+import tempfile
+
+from ddt import ddt, data, unpack
+
+import octoprint.util.compression
+from octoprint.util.compression import CompressedFile
+
+random.seed(42)
+GCODE = b"".join(b"G1 X%d Y%d E%.5f\n" % (random.randint(0, 200), random.randint(0, 200), random.random()) for _ in range(20000))
+
+
+class NonSeekableStream(object):
+	"""Only supports short reads, like a socket would."""
+
+	def __init__(self, data):
+		self._stream = io.BytesIO(data)
+
+	def read(self, n=-1):
+		if n < 0:
+			return self._stream.read()
+		return self._stream.read(min(n, 1000))
+
+
+@ddt
+class CompressionTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+		self.plain = os.path.join(self.folder, "plain.gcode")
+		with io.open(self.plain, "wb") as f:
+			f.write(GCODE)
+
+		self.compressed = os.path.join(self.folder, "compressed.gcode")
+		shutil.copy(self.plain, self.compressed)
+		octoprint.util.compression.compress_file(self.compressed, block_size=64 * 1024)
+
+		# regular gzip file consisting of two members
+		self.gzipped = os.path.join(self.folder, "gzipped.gcode")
+		with io.open(self.gzipped, "wb") as f:
+			for part in (GCODE[:100000], GCODE[100000:]):
+				member = gzip.GzipFile(fileobj=f, mode="wb")
+				member.write(part)
+				member.close()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def test_compress_file(self):
+		self.assertTrue(octoprint.util.compression.is_compressed(self.compressed))
+		self.assertFalse(octoprint.util.compression.is_compressed(self.plain))
+		self.assertLess(os.stat(self.compressed).st_size, len(GCODE))
+		self.assertEqual([], [name for name in os.listdir(self.folder) if name.endswith(".tmp")])
+
+	def test_compatible_with_gzip(self):
+		with gzip.open(self.compressed, "rb") as f:
+			self.assertEqual(GCODE, f.read())
+
+	@data("plain", "compressed", "gzipped")
+	def test_open_file(self, name):
+		with octoprint.util.compression.open_file(getattr(self, name)) as f:
+			self.assertEqual(GCODE, f.read())
+
+	@data("plain", "compressed", "gzipped")
+	def test_uncompressed_size(self, name):
+		self.assertEqual(len(GCODE), octoprint.util.compression.uncompressed_size(getattr(self, name)))
+
+	@data(
+		("compressed", 0),
+		("compressed", 65535),
+		("compressed", 65536),
+		("compressed", 200000),
+		("compressed", len(GCODE) - 5),
+		("gzipped", 150000),
+		("gzipped", 10),
+	)
+	@unpack
+	def test_seek(self, name, offset):
+		with octoprint.util.compression.open_file(getattr(self, name)) as f:
+			f.read(123456)
+
+			f.seek(offset)
+			self.assertEqual(offset, f.tell())
+			self.assertEqual(GCODE[offset:offset + 1000], f.read(1000))
+			self.assertEqual(min(offset + 1000, len(GCODE)), f.tell())
+
+	def test_seek_beyond_end(self):
+		with octoprint.util.compression.open_file(self.compressed) as f:
+			f.seek(len(GCODE) + 10)
+			self.assertEqual(b"", f.read(10))
+
+	def test_non_seekable_stream(self):
+		with io.open(self.gzipped, "rb") as f:
+			stream = NonSeekableStream(f.read())
+
+		compressed = CompressedFile(stream)
+		self.assertIsNone(compressed.size)
+		self.assertEqual(GCODE, compressed.read())
+
+	def test_compress_empty(self):
+		target = io.BytesIO()
+		octoprint.util.compression.compress(io.BytesIO(b""), target)
+
+		compressed = CompressedFile(io.BytesIO(target.getvalue()))
+		self.assertEqual(0, compressed.size)
+		self.assertEqual(b"", compressed.read())
+
+	def test_open_text(self):
+		with io.open(self.compressed, "wb") as f:
+			octoprint.util.compression.compress(io.BytesIO(codecs.BOM_UTF8 + u"G28 ; höme\n".encode("utf-8") + GCODE), f)
+
+		with octoprint.util.compression.open_text(self.compressed, encoding="utf-8") as f:
+			self.assertEqual("utf-8-sig", f.encoding)
+			self.assertEqual(u"G28 ; höme\n", f.readline())
+			self.assertEqual(GCODE.split(b"\n")[0].decode("utf-8") + u"\n", f.readline())
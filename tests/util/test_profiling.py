@@ -0,0 +1,183 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import time
+
+import mock
+
+from octoprint.util.profiling import StartupProfiler, HookProfiler
+
+
+class StartupProfilerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def test_phases(self):
+		profiler = StartupProfiler()
+
+		with profiler.phase("first"):
+			time.sleep(0.01)
+		with profiler.phase("second"):
+			pass
+
+		report = profiler.as_dict()
+		self.assertIsNone(report["finished"])
+		self.assertEqual(["first", "second"], [phase["name"] for phase in report["phases"]])
+		self.assertGreaterEqual(report["phases"][0]["duration"], 0.01)
+		self.assertGreaterEqual(report["phases"][1]["start"], report["phases"][0]["duration"])
+
+	def test_phase_on_error(self):
+		profiler = StartupProfiler()
+
+		try:
+			with profiler.phase("failing"):
+				raise RuntimeError("Failing on purpose")
+		except RuntimeError:
+			pass
+
+		self.assertEqual(["failing"], [phase["name"] for phase in profiler.as_dict()["phases"]])
+
+	def test_plugins_sorted_by_total(self):
+		profiler = StartupProfiler()
+		profiler.record_plugin("cheap", "import", 0.1)
+		profiler.record_plugin("expensive", "import", 0.5)
+		profiler.record_plugin("expensive", "on_after_startup", 8.0)
+		profiler.record_plugin("cheap", "import", 0.1)
+
+		plugins = profiler.as_dict()["plugins"]
+		self.assertEqual(["expensive", "cheap"], [plugin["key"] for plugin in plugins])
+		self.assertAlmostEqual(8.5, plugins[0]["total"])
+		self.assertAlmostEqual(0.2, plugins[1]["steps"]["import"])
+
+	def test_plugin_callbacks(self):
+		profiler = StartupProfiler()
+
+		with mock.patch("time.time", side_effect=[10.0, 12.0, 12.5]):
+			callbacks = profiler.plugin_callbacks("on_startup")
+			callbacks["callback"]("first", mock.MagicMock(), None)
+			callbacks["error_callback"]("second", mock.MagicMock(), RuntimeError())
+
+		steps = dict((plugin["key"], plugin["steps"]) for plugin in profiler.as_dict()["plugins"])
+		self.assertEqual(dict(on_startup=2.0), steps["first"])
+		self.assertEqual(dict(on_startup=0.5), steps["second"])
+
+	def test_finish_writes_report(self):
+		profiler = StartupProfiler()
+		profiler.report_path = os.path.join(self.folder, "startup_report.json")
+
+		with profiler.phase("settings"):
+			pass
+		profiler.record_plugin("some_plugin", "import", 1.0)
+		profiler.finish()
+
+		with open(profiler.report_path) as f:
+			report = json.load(f)
+		self.assertIsNotNone(report["finished"])
+		self.assertEqual("settings", report["phases"][0]["name"])
+		self.assertEqual("some_plugin", report["plugins"][0]["key"])
+
+		# phases finishing after the startup update the report
+		with profiler.phase("preemptive_cache"):
+			pass
+
+		with open(profiler.report_path) as f:
+			report = json.load(f)
+		self.assertEqual(["settings", "preemptive_cache"], [phase["name"] for phase in report["phases"]])
+
+	def test_cprofile(self):
+		path = os.path.join(self.folder, "startup.prof")
+		profiler = StartupProfiler(cprofile_path=path)
+		sum(range(1000))
+		profiler.stop_cprofile()
+
+		self.assertTrue(os.path.isfile(path))
+		pstats.Stats(path)
+
+		# stopping again is a no-op
+		profiler.stop_cprofile()
+
+
+class HookProfilerTest(unittest.TestCase):
+
+	def test_call(self):
+		profiler = HookProfiler()
+		callback = mock.MagicMock(return_value="result")
+
+		result = profiler.call("some.hook", "some_plugin", callback, "arg", key="value")
+
+		self.assertEqual("result", result)
+		callback.assert_called_once_with("arg", key="value")
+
+		plugins = profiler.as_dict()["plugins"]
+		self.assertEqual(1, len(plugins))
+		self.assertEqual("some_plugin", plugins[0]["key"])
+		self.assertEqual(1, plugins[0]["hooks"]["some.hook"]["count"])
+
+	def test_call_raising(self):
+		profiler = HookProfiler()
+		callback = mock.MagicMock(side_effect=RuntimeError("Failing on purpose"))
+
+		self.assertRaises(RuntimeError, profiler.call, "some.hook", "some_plugin", callback)
+		self.assertEqual(1, profiler.as_dict()["plugins"][0]["count"])
+
+	def test_accounting(self):
+		profiler = HookProfiler()
+		profiler.record("first.hook", "cheap", 0.1)
+		profiler.record("first.hook", "expensive", 0.5)
+		profiler.record("second.hook", "expensive", 0.2)
+		profiler.record("first.hook", "expensive", 0.3)
+
+		plugins = profiler.as_dict()["plugins"]
+		self.assertEqual(["expensive", "cheap"], [plugin["key"] for plugin in plugins])
+		self.assertEqual(3, plugins[0]["count"])
+		self.assertAlmostEqual(1.0, plugins[0]["durationTotal"])
+
+		first = plugins[0]["hooks"]["first.hook"]
+		self.assertEqual(2, first["count"])
+		self.assertAlmostEqual(0.8, first["durationTotal"])
+		self.assertAlmostEqual(0.5, first["durationMax"])
+
+	def test_slow_warning(self):
+		profiler = HookProfiler(slow_threshold=0.1)
+
+		with mock.patch.object(profiler, "_logger") as logger:
+			profiler.record("some.hook", "some_plugin", 0.05)
+			profiler.record("some.hook", "some_plugin", 0.2)
+			profiler.record("some.hook", "some_plugin", 0.3)
+
+			# rate limited
+			self.assertEqual(1, logger.warn.call_count)
+
+		self.assertEqual(2, profiler.as_dict()["plugins"][0]["hooks"]["some.hook"]["slow"])
+
+	def test_disabled(self):
+		profiler = HookProfiler(enabled=False)
+		callback = mock.MagicMock(return_value="result")
+
+		self.assertEqual("result", profiler.call("some.hook", "some_plugin", callback))
+		profiler.record("some.hook", "some_plugin", 1.0)
+		self.assertEqual([], profiler.as_dict()["plugins"])
+
+	def test_reset(self):
+		profiler = HookProfiler()
+		profiler.record("some.hook", "some_plugin", 1.0)
+		since = profiler.as_dict()["since"]
+
+		profiler.reset()
+
+		report = profiler.as_dict()
+		self.assertEqual([], report["plugins"])
+		self.assertGreaterEqual(report["since"], since)
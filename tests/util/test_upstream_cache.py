@@ -0,0 +1,149 @@
+# coding=utf-8
+from __future__ import absolute_import, division, print_function
+
+__license__ = 'GNU Affero General Public License http://www.gnu.org/licenses/agpl.html'
+__copyright__ = "Copyright (C) 2018 The OctoPrint Project - Released under terms of the AGPLv3 License"
+
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from BaseHTTPServer import HTTPServer
+from SimpleHTTPServer import SimpleHTTPRequestHandler
+
+from ddt import ddt, data, unpack
+
+from octoprint.util.upstream_cache import UpstreamCache
+
+URL = "https://plugins.octoprint.org/plugins.json"
+DATA = json.dumps([dict(id="some_plugin")])
+
+
+class MirrorHandler(SimpleHTTPRequestHandler):
+
+	def translate_path(self, path):
+		return os.path.join(self.server.root, path.lstrip("/"))
+
+	def log_message(self, *args, **kwargs):
+		pass
+
+
+@ddt
+class UpstreamCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.mirror = os.path.join(self.folder, "mirror")
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def _publisher(self):
+		return UpstreamCache(mode="publish", folder=self.mirror)
+
+	def _write_entry(self, key, entry):
+		if not os.path.isdir(self.mirror):
+			os.makedirs(self.mirror)
+		with open(os.path.join(self.mirror, key + ".json"), "wb") as f:
+			f.write(entry if isinstance(entry, str) else json.dumps(entry))
+
+	@data(
+		("off", None, None, False, False, True),
+		("publish", None, "folder", True, False, True),
+		("publish", None, None, False, False, True),
+		("consume", "url", None, False, True, True),
+		("consume", None, "folder", False, True, True),
+		("consume", None, None, False, False, True)
+	)
+	@unpack
+	def test_modes(self, mode, url, folder, publishing, consuming, may_fetch_directly):
+		cache = UpstreamCache(mode=mode, url=url, folder=folder)
+		self.assertEqual(publishing, cache.publishing)
+		self.assertEqual(consuming, cache.consuming)
+		self.assertEqual(may_fetch_directly, cache.may_fetch_directly)
+
+	def test_no_fallback(self):
+		self.assertFalse(UpstreamCache(mode="consume", folder=self.mirror, fallback=False).may_fetch_directly)
+		self.assertTrue(UpstreamCache(mode="off", folder=self.mirror, fallback=False).may_fetch_directly)
+
+	def test_publish_and_consume_folder(self):
+		self._publisher().publish("pluginmanager.repository", URL, DATA, "application/json")
+
+		with open(os.path.join(self.mirror, "pluginmanager.repository.json")) as f:
+			entry = json.load(f)
+		self.assertEqual(1, entry["format"])
+		self.assertEqual("pluginmanager.repository", entry["key"])
+		self.assertEqual(URL, entry["url"])
+		self.assertEqual("application/json", entry["content_type"])
+		self.assertEqual(DATA, entry["data"])
+
+		for source in (self.mirror, "file://" + self.mirror):
+			consumer = UpstreamCache(mode="consume", url=source)
+			self.assertEqual(DATA, consumer.get("pluginmanager.repository", URL))
+
+		# folder is used if no url is set
+		consumer = UpstreamCache(mode="consume", folder=self.mirror)
+		self.assertEqual(DATA, consumer.get("pluginmanager.repository", URL))
+
+	def test_consume_http(self):
+		self._publisher().publish("pluginmanager.repository", URL, DATA)
+
+		server = HTTPServer(("127.0.0.1", 0), MirrorHandler)
+		server.root = self.folder
+		thread = threading.Thread(target=server.serve_forever)
+		thread.daemon = True
+		thread.start()
+		try:
+			url = "http://127.0.0.1:{}/mirror/".format(server.server_address[1])
+			consumer = UpstreamCache(mode="consume", url=url)
+			self.assertEqual(DATA, consumer.get("pluginmanager.repository", URL))
+			self.assertIsNone(consumer.get("pluginmanager.notices", URL))
+		finally:
+			server.shutdown()
+			server.server_close()
+
+	def test_publish_when_not_publishing(self):
+		UpstreamCache(mode="consume", folder=self.mirror).publish("pluginmanager.repository", URL, DATA)
+		self.assertFalse(os.path.exists(self.mirror))
+
+	def test_get_when_not_consuming(self):
+		self._publisher().publish("pluginmanager.repository", URL, DATA)
+		self.assertIsNone(self._publisher().get("pluginmanager.repository", URL))
+
+	def test_missing(self):
+		consumer = UpstreamCache(mode="consume", url=os.path.join(self.folder, "nonexistent"))
+		self.assertIsNone(consumer.get("pluginmanager.repository", URL))
+
+	def test_url_mismatch(self):
+		self._publisher().publish("pluginmanager.repository", URL, DATA)
+		consumer = UpstreamCache(mode="consume", url=self.mirror)
+		self.assertIsNone(consumer.get("pluginmanager.repository", "https://example.com/plugins.json"))
+
+	def test_stale(self):
+		self._write_entry("pluginmanager.repository", dict(format=1,
+		                                                   key="pluginmanager.repository",
+		                                                   url=URL,
+		                                                   fetched=time.time() - 2 * 60 * 60,
+		                                                   data=DATA))
+
+		self.assertIsNone(UpstreamCache(mode="consume", url=self.mirror, max_age=60 * 60).get("pluginmanager.repository", URL))
+		self.assertEqual(DATA, UpstreamCache(mode="consume", url=self.mirror, max_age=3 * 60 * 60).get("pluginmanager.repository", URL))
+
+	@data(
+		"not json",
+		json.dumps([]),
+		json.dumps(dict(format=2, url=URL, fetched=0, data=DATA)),
+		json.dumps(dict(format=1, url=URL, data=DATA)),
+		json.dumps(dict(format=1, url=URL, fetched=time.time()))
+	)
+	def test_invalid_format(self, entry):
+		self._write_entry("pluginmanager.repository", entry)
+		self.assertIsNone(UpstreamCache(mode="consume", url=self.mirror).get("pluginmanager.repository", URL))
+
+	@data("../escape", "with/slash", "", "with space")
+	def test_invalid_key(self, key):
+		self.assertRaises(ValueError, UpstreamCache.filename, key)